@@ -10,6 +10,10 @@ class Settings(BaseSettings):
     supabase_url: str = ""
     supabase_service_key: str = ""
     admin_token: str = ""
+    # Per-stage profiles of tool calls (tool_calls.profile); traces memory, slows queries
+    profile_tool_calls: bool = False
+    # Worker processes for tool calls (assistant/pool.py); 0 runs them in the API process
+    tool_workers: int = 0
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
@@ -1,15 +1,19 @@
 """Barb API."""
 
+import asyncio
 import json
 import logging
 import os
+import threading
 import time
 from contextlib import asynccontextmanager
 from functools import lru_cache
 
-from fastapi import Depends, FastAPI, HTTPException
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
 from starlette.responses import JSONResponse, StreamingResponse
 
 from api.auth import get_current_user
@@ -17,15 +21,21 @@ from api.config import get_settings
 from api.db import get_db
 from api.errors import register_error_handlers
 from api.request_id import RequestIdFilter, RequestIdMiddleware
-from assistant.chat import Assistant
+from assistant.cache import TOOL_CACHE
+from assistant.chat import TOOL_NAMES, TOOL_TIMEOUT, Assistant
 from assistant.context import (
     WINDOW_SIZE,
     build_history_with_context,
     should_summarize,
     summarize,
 )
-from barb.data import DATA_DIR, load_data
-from config.market.instruments import get_instrument, register_instrument
+from assistant.pool import ToolPool
+from assistant.tools import execute_split, pick_data
+from barb.data import DATA_DIR, invalidate_data, load_data
+from barb.deadline import deadline
+from barb.ops import BarbError
+from barb.results import MAX_PAGE_SIZE, PAGE_SIZE, RESULTS
+from config.market.instruments import get_instrument, list_symbols, register_instrument
 
 if os.getenv("ENV") == "production":
 
@@ -55,6 +65,8 @@ logging.root.addFilter(RequestIdFilter())
 
 log = logging.getLogger(__name__)
 
+MAX_BATCH_QUERIES = 50
+
 
 def _load_instruments():
     """Load all instruments from Supabase instrument_full view into cache."""
@@ -65,10 +77,42 @@ def _load_instruments():
     log.info("Loaded %d instruments from Supabase", len(result.data))
 
 
+# Pre-forked tool workers, when TOOL_WORKERS > 0
+_TOOL_POOL: ToolPool | None = None
+
+
+def _start_tool_pool():
+    """Load every instrument's data, then fork the tool workers over it."""
+    global _TOOL_POOL
+    workers = get_settings().tool_workers
+    if workers <= 0:
+        return
+    data = {}
+    for symbol in list_symbols():
+        try:
+            data[symbol] = (
+                load_data(symbol, "1d"),
+                load_data(symbol, "1m"),
+                get_instrument(symbol)["sessions"],
+            )
+        except FileNotFoundError:
+            log.warning("No data for %s, not preloaded into tool pool", symbol)
+    _TOOL_POOL = ToolPool(data, workers)
+
+
+def _stop_tool_pool():
+    global _TOOL_POOL
+    if _TOOL_POOL is not None:
+        _TOOL_POOL.shutdown()
+        _TOOL_POOL = None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     _load_instruments()
+    _start_tool_pool()
     yield
+    _stop_tool_pool()
 
 
 app = FastAPI(title="Barb", version="0.1.0", lifespan=lifespan)
@@ -116,6 +160,21 @@ class MessageResponse(BaseModel):
     created_at: str
 
 
+class BatchQueryRequest(BaseModel):
+    instrument: str
+    queries: list[dict] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+
+class RerunRequest(BaseModel):
+    tool: str
+    instrument: str
+    input: dict
+    block: int = Field(..., ge=0)
+    offset: int = Field(0, ge=0)
+    limit: int = Field(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    sort: str | None = None
+
+
 class ChatRequest(BaseModel):
     conversation_id: str = Field(..., min_length=1)
     message: str = Field(..., min_length=1, max_length=10000)
@@ -141,6 +200,8 @@ def _get_assistant(instrument: str) -> Assistant:
         df_daily=load_data(instrument, "1d"),
         df_minute=load_data(instrument, "1m"),
         sessions=instrument_config["sessions"],
+        profile=settings.profile_tool_calls,
+        pool=_TOOL_POOL if _TOOL_POOL is not None and instrument in _TOOL_POOL else None,
     )
 
 
@@ -156,9 +217,16 @@ def _parse_tool_output(output):
         return {"raw": str(output)}
 
 
+_SSE_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
 def _sse(event: str, data) -> str:
-    """Format Server-Sent Event."""
-    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    """Format Server-Sent Event.
+
+    orjson: query tables can be tens of thousands of rows; NaN → null.
+    """
+    payload = orjson.dumps(data, default=str, option=_SSE_JSON_OPTIONS).decode()
+    return f"event: {event}\ndata: {payload}\n\n"
 
 
 def _load_history(db, conversation: dict) -> tuple[list[dict], list[dict]]:
@@ -265,6 +333,7 @@ def _persist_chat(
                     "output": _parse_tool_output(tc["output"]),
                     "error": tc["error"],
                     "duration_ms": tc["duration_ms"],
+                    "profile": tc.get("profile"),
                 }
                 for tc in result["tool_calls"]
             ]
@@ -418,14 +487,114 @@ def get_ohlc(symbol: str):
     return records
 
 
+def _result_page(cursor: str, offset: int, limit: int, sort: str | None) -> dict | None:
+    """Page of a stored result, None once expired.
+
+    Results of tool calls run in the tool pool stay in their worker, which
+    serves the page.
+    """
+    try:
+        if _TOOL_POOL is not None and _TOOL_POOL.owns(cursor):
+            return _TOOL_POOL.page(cursor, offset=offset, limit=limit, sort=sort)
+        return RESULTS.page(cursor, offset=offset, limit=limit, sort=sort)
+    except BarbError as e:
+        raise HTTPException(504 if e.error_type == "TimeoutError" else 400, str(e))
+
+
+@app.get("/api/results/{cursor}")
+def get_result_page(
+    cursor: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: str | None = None,
+    user: dict = Depends(get_current_user),
+):
+    """Page of a server-side query result (cursor from a paginated table block)."""
+    page = _result_page(cursor, offset, limit, sort)
+    if page is None:
+        raise HTTPException(404, "Result expired")
+    return page
+
+
+@app.post("/api/results/rerun")
+def rerun_result(request: RerunRequest, user: dict = Depends(get_current_user)):
+    """Page of a table block whose cursor has expired, re-running its tool call.
+
+    The body is the block's rerun source ({tool, instrument, input, block})
+    plus the page wanted. The response is a regular page with a fresh
+    cursor, which the UI pages further via GET /api/results/{cursor}.
+    """
+    if request.tool not in TOOL_NAMES:
+        raise HTTPException(400, f"Unknown tool: {request.tool}")
+    try:
+        assistant = _get_assistant(request.instrument)
+    except RuntimeError:
+        raise HTTPException(500, "ANTHROPIC_API_KEY not configured")
+    except ValueError:
+        raise HTTPException(404, f"Instrument not found: {request.instrument}")
+
+    # A cached reply may point at a cursor that has expired in its worker:
+    # then the call runs once more, past the tool cache
+    for refresh in (False, True):
+        try:
+            with deadline(TOOL_TIMEOUT):
+                _, card, _ = assistant.run_tool(request.tool, request.input, refresh=refresh)
+        except BarbError as e:
+            raise HTTPException(504 if e.error_type == "TimeoutError" else 400, str(e))
+        blocks = card["blocks"] if card else []
+        cursor = blocks[request.block].get("cursor") if request.block < len(blocks) else None
+        if cursor is None:
+            break
+        page = _result_page(cursor, request.offset, request.limit, request.sort)
+        if page is not None:
+            return page
+    raise HTTPException(404, "Result no longer available")
+
+
+@app.post("/api/query/batch")
+def query_batch(request: BatchQueryRequest, user: dict = Depends(get_current_user)):
+    """Run many Barb Script queries on one instrument, sharing scoped data.
+
+    Results come back in request order; a failing query gets {"error": {...}}
+    instead of failing the batch. Long tables are paginated like chat
+    results: the first PAGE_SIZE rows, the rest via GET /api/results/{cursor}.
+    The batch shares one TOOL_TIMEOUT: queries still running or not yet
+    started when it expires fail with a TimeoutError error.
+    """
+    instrument_config = get_instrument(request.instrument)
+    if not instrument_config:
+        raise HTTPException(404, f"Instrument not found: {request.instrument}")
+    sessions = instrument_config["sessions"]
+    df_daily = load_data(request.instrument, "1d")
+    df_minute = load_data(request.instrument, "1m")
+
+    with deadline(TOOL_TIMEOUT):
+        results, timings = execute_split(
+            request.queries,
+            lambda query: pick_data(query, df_daily, df_minute, sessions),
+            sessions,
+            page_size=PAGE_SIZE,
+        )
+    return {"results": results, "timings": timings}
+
+
 @app.post("/api/admin/reload-data")
 def reload_data(token: str = ""):
-    """Clear load_data LRU cache so next request picks up fresh parquet files."""
+    """Clear load_data LRU cache so next request picks up fresh parquet files.
+
+    Bumps the data version and empties the tool result cache.
+
+    Tool workers hold the old frames: the pool is re-forked over fresh data.
+    """
     settings = get_settings()
     if not settings.admin_token or token != settings.admin_token:
         raise HTTPException(403, "Invalid admin token")
-    load_data.cache_clear()
+    invalidate_data()
+    TOOL_CACHE.clear()
     _get_assistant.cache_clear()
+    if _TOOL_POOL is not None:
+        _stop_tool_pool()
+        _start_tool_pool()
     log.info("Data and assistant caches cleared")
     return {"status": "ok"}
 
@@ -652,8 +821,34 @@ def delete_conversation(
     return {"ok": True}
 
 
+async def _stream_until_disconnect(request: Request, events, cancel: threading.Event):
+    """Stream a sync SSE generator; set cancel as soon as the client disconnects.
+
+    Tool calls run between yields, so a dropped connection would otherwise
+    only be noticed at the next send. Watching receive() lets a running
+    query stop at its next deadline checkpoint (barb/deadline.py).
+    """
+
+    async def watch():
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        cancel.set()
+
+    watcher = asyncio.create_task(watch())
+    try:
+        async for chunk in iterate_in_threadpool(events):
+            yield chunk
+    finally:
+        watcher.cancel()
+        cancel.set()
+
+
 @app.post("/api/chat/stream")
-def chat_stream(request: ChatRequest, user: dict = Depends(get_current_user)):
+def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    user: dict = Depends(get_current_user),
+):
     db = get_db()
 
     # Load conversation, verify ownership
@@ -683,6 +878,7 @@ def chat_stream(request: ChatRequest, user: dict = Depends(get_current_user)):
         raise HTTPException(400, f"Unknown instrument: {instrument}")
 
     raw_history, history = _load_history(db, conversation)
+    cancel = threading.Event()
 
     def generate():
         # Update title immediately so sidebar reflects it before model responds
@@ -704,7 +900,7 @@ def chat_stream(request: ChatRequest, user: dict = Depends(get_current_user)):
         done_data = None
 
         try:
-            for event in assistant.chat_stream(request.message, history):
+            for event in assistant.chat_stream(request.message, history, cancel=cancel):
                 yield _sse(event["event"], event["data"])
 
                 if event["event"] == "done":
@@ -747,7 +943,7 @@ def chat_stream(request: ChatRequest, user: dict = Depends(get_current_user)):
             )
 
     return StreamingResponse(
-        generate(),
+        _stream_until_disconnect(http_request, generate(), cancel),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -0,0 +1,177 @@
+"""Process-local cache of tool results.
+
+The same questions — "average range by weekday in 2024", "days with RSI
+below 30" — come up again and again across users and conversations. A
+tool call is a pure function of its input, the instrument and the data,
+so its result is cached under:
+
+    (tool, instrument, data_version(), canonical input, extra args)
+
+The canonical input is JSON with sorted keys; expression fields (map
+values, where, select, strategy entry/exits) are re-printed from their
+AST, so whitespace and redundant parentheses don't split the cache.
+Installing new data bumps data_version(): old entries can never match and
+/api/admin/reload-data also clears the cache.
+
+Entries are bounded by bytes (estimated JSON size plus parked result
+frames), least recently used evicted first. Paginated results (query
+tables, backtest trade tables) keep their rows in RESULTS; a hit re-parks
+the same frames under fresh cursors, so every answer has live
+pagination. Results from tool workers (assistant/pool.py) keep the
+worker's cursor until it expires there. Errors (including timeouts) and
+profiles are never served from cache.
+"""
+
+import ast
+import threading
+from collections import OrderedDict
+
+import orjson
+
+from barb.data import data_version
+from barb.expressions import _preprocess_keywords
+from barb.results import RESULTS
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Input fields holding Barb Script expressions (query, steps, strategy)
+_EXPRESSION_FIELDS = {
+    "where",
+    "select",
+    "entry",
+    "exit_target",
+    "stop_loss",
+    "take_profit",
+    "trailing_stop",
+}
+# Input fields that don't change the result
+_IGNORED_FIELDS = {"title"}
+_CURSOR_FIELDS = ("cursor", "source_cursor")
+_SIZE_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class ToolCache:
+    """Thread-safe LRU of tool results, bounded by bytes."""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[bytes, tuple[dict, dict, int]] = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tool: str, instrument: str, payload: dict, *args) -> bytes:
+        """Cache key of a tool call; args are extra call parameters (page size)."""
+        canonical = {
+            "tool": tool,
+            "instrument": instrument.upper(),
+            "data_version": data_version(),
+            "input": _canonical(payload),
+            "args": list(args),
+        }
+        return orjson.dumps(canonical, option=orjson.OPT_SORT_KEYS)
+
+    def get(self, key: bytes) -> dict | None:
+        """Cached result with live cursors, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        result, parked, _ = entry
+
+        result = dict(result)
+        if "card" in result and any(isinstance(slot, int) for slot in parked):
+            card = result["card"]
+            result["card"] = {**card, "blocks": list(card["blocks"])}
+        for slot, (df, prepare) in parked.items():
+            cursor = RESULTS.put(df, prepare)
+            if isinstance(slot, int):
+                blocks = result["card"]["blocks"]
+                blocks[slot] = {**blocks[slot], "cursor": cursor}
+            else:
+                result[slot] = cursor
+        return result
+
+    def put(self, key: bytes, result: dict):
+        """Store a successful result. Errors and unsizable results are skipped."""
+        if str(result.get("model_response", "")).startswith("Error:"):
+            return
+        result = {**result, "profile": None}
+        parked = {}
+        nbytes = 0
+        for slot, cursor in _cursors(result).items():
+            entry = RESULTS.peek(cursor)
+            if entry is None:
+                # Parked in a tool worker: served as is until it expires there
+                continue
+            parked[slot] = entry
+            nbytes += int(entry[0].memory_usage(index=True).sum())
+        try:
+            nbytes += len(orjson.dumps(result, default=str, option=_SIZE_OPTIONS))
+        except TypeError:
+            return
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._used -= old[2]
+            while self._entries and self._used + nbytes > self.max_bytes:
+                _, (_, _, size) = self._entries.popitem(last=False)
+                self._used -= size
+            self._entries[key] = (result, parked, nbytes)
+            self._used += nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._used = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._used
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def _cursors(result: dict) -> dict:
+    """Cursors of a result by slot: field name, or block index of a backtest card's table."""
+    slots = {field: result[field] for field in _CURSOR_FIELDS if result.get(field)}
+    card = result.get("card")
+    for i, block in enumerate(card["blocks"] if card else []):
+        if block.get("cursor"):
+            slots[i] = block["cursor"]
+    return slots
+
+
+def _canonical(value, field: str = ""):
+    """Input with expressions normalized; key order is left to the JSON dump."""
+    if isinstance(value, dict):
+        if field == "map":
+            return {name: _canonical_expression(expr) for name, expr in value.items()}
+        return {k: _canonical(v, k) for k, v in value.items() if k not in _IGNORED_FIELDS}
+    if isinstance(value, list):
+        return [_canonical(v, field) for v in value]
+    if field in _EXPRESSION_FIELDS and isinstance(value, str):
+        return _canonical_expression(value)
+    return value
+
+
+def _canonical_expression(expr):
+    """'close>open ' and '(close > open)' → 'close > open'."""
+    if not isinstance(expr, str):
+        return expr
+    try:
+        return ast.unparse(ast.parse(_preprocess_keywords(expr.strip()), mode="eval"))
+    except SyntaxError:
+        return " ".join(expr.split())
+
+
+TOOL_CACHE = ToolCache()
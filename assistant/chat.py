@@ -2,23 +2,54 @@
 
 import json
 import logging
+import threading
 import time
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from typing import TYPE_CHECKING
 
 import anthropic
 import pandas as pd
 
+from assistant.cache import TOOL_CACHE
 from assistant.prompt import build_system_prompt
-from assistant.tools import BARB_TOOL, run_query
-from assistant.tools.backtest import BACKTEST_TOOL, run_backtest_tool
-from barb.ops import INTRADAY_TIMEFRAMES as _INTRADAY
+from assistant.tools import BARB_TOOL, BATCH_TOOL, pick_data, run_query, run_query_batch
+from assistant.tools.backtest import (
+    BACKTEST_SWEEP_TOOL,
+    BACKTEST_TOOL,
+    PORTFOLIO_BACKTEST_TOOL,
+    WALK_FORWARD_TOOL,
+    run_backtest_sweep_tool,
+    run_backtest_tool,
+    run_portfolio_backtest_tool,
+    run_walk_forward_tool,
+    tool_reply,
+)
+from barb.data import read_data
+from barb.deadline import deadline
+from barb.ops import BarbError
+from barb.results import PAGE_SIZE
 from config.models import DEFAULT_MODEL, get_model
 
+if TYPE_CHECKING:
+    from assistant.pool import ToolPool
+
 log = logging.getLogger(__name__)
 
 MAX_TOOL_ROUNDS = 5
+# Wall-clock limit of one tool call (query, batch or backtest), seconds
+TOOL_TIMEOUT = 60
 MODEL = DEFAULT_MODEL
 
+TOOLS = [
+    BARB_TOOL,
+    BATCH_TOOL,
+    BACKTEST_TOOL,
+    BACKTEST_SWEEP_TOOL,
+    WALK_FORWARD_TOOL,
+    PORTFOLIO_BACKTEST_TOOL,
+]
+TOOL_NAMES = frozenset(tool["name"] for tool in TOOLS)
+
 
 class Assistant:
     """Chat assistant using Anthropic Claude with prompt caching."""
@@ -33,6 +64,8 @@ class Assistant:
         df_minute: pd.DataFrame,
         sessions: dict,
         model: str | None = None,
+        profile: bool = False,
+        pool: "ToolPool | None" = None,
     ):
         if model:
             self.model = model  # override class-level default
@@ -41,24 +74,33 @@ class Assistant:
         self.df_daily = df_daily
         self.df_minute = df_minute
         self.sessions = sessions
+        # Record per-stage profiles of tool calls (persisted with tool_calls)
+        self.profile = profile
+        # Run tools in pre-forked worker processes (assistant/pool.py) when set
+        self.pool = pool
         self.system_prompt = build_system_prompt(instrument)
 
     def chat_stream(
         self,
         message: str,
         history: list[dict] | None = None,
+        cancel: threading.Event | None = None,
     ) -> Generator[dict]:
         """Process chat message, yielding SSE events.
 
         Yields dicts with "event" and "data" keys:
             tool_start, tool_end, data_block, text_delta, done.
+
+        cancel: set when the client is gone — a running tool call stops at
+        its next checkpoint and no further model round starts (no done event).
         """
         messages = _build_messages(history or [], message)
-        yield from self._run_stream(messages)
+        yield from self._run_stream(messages, cancel)
 
     def _run_stream(
         self,
         messages: list[dict],
+        cancel: threading.Event | None = None,
     ) -> Generator[dict]:
         """Core streaming loop."""
         total_input_tokens = 0
@@ -70,6 +112,10 @@ class Assistant:
         answer = ""
 
         for round_num in range(MAX_TOOL_ROUNDS):
+            if cancel is not None and cancel.is_set():
+                log.info("Client disconnected, stopping after %d rounds", round_num)
+                return
+
             # Stream response with prompt caching
             with self.client.messages.stream(
                 model=self.model,
@@ -82,7 +128,7 @@ class Assistant:
                         "cache_control": {"type": "ephemeral"},
                     }
                 ],
-                tools=[BARB_TOOL, BACKTEST_TOOL],
+                tools=TOOLS,
                 messages=messages,
             ) as stream:
                 # Collect response
@@ -155,18 +201,22 @@ class Assistant:
                 call_error = None
                 model_response = ""
                 block = None
+                profile = None
 
                 try:
-                    if tu["name"] == "run_backtest":
-                        model_response, block = self._exec_backtest(tu["input"], title)
-                    else:
-                        model_response, block = self._exec_query(tu["input"], title)
+                    # Checked between pipeline stages, see barb/deadline.py
+                    with deadline(TOOL_TIMEOUT, cancel):
+                        model_response, block, profile = self.run_tool(
+                            tu["name"], tu["input"], title
+                        )
 
                     if model_response.startswith("Error:"):
                         call_error = model_response[7:].strip()
                 except Exception as exc:
                     call_error = str(exc)
                     model_response = f"Error: {call_error}"
+                    if isinstance(exc, BarbError):
+                        profile = exc.profile
                     log.exception("Tool call failed")
 
                 duration_ms = int((time.time() - call_start) * 1000)
@@ -187,6 +237,7 @@ class Assistant:
                         "output": model_response,
                         "error": call_error,
                         "duration_ms": duration_ms,
+                        "profile": profile,
                     }
                 )
 
@@ -229,46 +280,173 @@ class Assistant:
             },
         }
 
-    def _exec_query(self, input_data: dict, title: str) -> tuple[str, dict | None]:
-        """Execute run_query tool. Returns (model_response, data_card)."""
-        query = input_data.get("query", {})
+    def run_tool(
+        self, name: str, input_data: dict, title: str = "", refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute a tool call. Returns (model_response, data_card, profile).
 
-        # For steps queries, from/session are inside steps[0]
-        step0 = query["steps"][0] if query.get("steps") else query
-        timeframe = step0.get("from", "daily")
-        session_name = step0.get("session")
-
-        if timeframe in _INTRADAY:
-            df = self.df_minute
-        elif session_name:
-            # RTH-like sessions (within one day) need minute data
-            # ETH-like sessions (wrap midnight) ≈ settlement, use daily
-            times = self.sessions.get(session_name.upper())
-            if times and pd.Timestamp(times[0]).time() < pd.Timestamp(times[1]).time():
-                df = self.df_minute
-            else:
-                df = self.df_daily
+        Paginated tables of the card get a rerun source — the tool call
+        itself — so the UI can re-run it once the cursor has expired
+        (POST /api/results/rerun). refresh: skip TOOL_CACHE lookups.
+        """
+        if name == "run_backtest":
+            run = self._exec_backtest
+        elif name == "run_backtest_sweep":
+            run = self._exec_sweep
+        elif name == "run_walk_forward":
+            run = self._exec_walk_forward
+        elif name == "run_portfolio_backtest":
+            run = self._exec_portfolio
+        elif name == "run_query_batch":
+            run = self._exec_batch
         else:
-            df = self.df_daily
-
-        result = run_query(query, df, self.sessions)
+            run = self._exec_query
+        model_response, card, profile = run(input_data, title, refresh=refresh)
+        return model_response, _with_rerun(card, name, self.instrument, input_data), profile
+
+    def _exec_query(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_query tool. Returns (model_response, data_card, profile)."""
+        query = input_data.get("query", {})
+        key = TOOL_CACHE.key("run_query", self.instrument, query, PAGE_SIZE)
+        result = None if refresh else TOOL_CACHE.get(key)
+        if result is None:
+            if self.pool is not None:
+                result = self.pool.call(
+                    "run_query", self.instrument, query, PAGE_SIZE, self.profile
+                )
+            else:
+                df = self._pick_df(query)
+                result = run_query(
+                    query, df, self.sessions, page_size=PAGE_SIZE, profile=self.profile
+                )
+            TOOL_CACHE.put(key, result)
         model_response = result.get("model_response", "")
         card = _build_query_card(result, title)
-        return model_response, card
+        return model_response, card, result.get("profile")
+
+    def _exec_batch(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_query_batch tool. Returns (model_response, data_card, profile)."""
+        items = input_data.get("queries", [])
+        if self.pool is not None:
+            result = self.pool.call("run_query_batch", self.instrument, items)
+        else:
+            result = run_query_batch(items, self._pick_df, self.sessions)
+        model_response = result.get("model_response", "")
+        card = _build_batch_card(result.get("results"), title)
+        # Batch stage timings are cheap, record them whenever profiling is on
+        profile = {"batches": result["timings"]} if self.profile and result.get("timings") else None
+        return model_response, card, profile
+
+    def _pick_df(self, query: dict) -> pd.DataFrame:
+        return pick_data(query, self.df_daily, self.df_minute, self.sessions)
+
+    def _exec_backtest(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_backtest tool. Returns (model_response, data_block, profile)."""
+        return self._exec_backtest_tool(
+            "run_backtest",
+            input_data,
+            title,
+            lambda: run_backtest_tool(
+                input_data, self.df_minute, self.sessions, profile=self.profile
+            ),
+            refresh,
+        )
+
+    def _exec_sweep(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_backtest_sweep tool. Returns (model_response, data_block, profile)."""
+        return self._exec_backtest_tool(
+            "run_backtest_sweep",
+            input_data,
+            title,
+            lambda: run_backtest_sweep_tool(
+                input_data, self.df_minute, self.sessions, profile=self.profile
+            ),
+            refresh,
+        )
 
-    def _exec_backtest(self, input_data: dict, title: str) -> tuple[str, dict | None]:
-        """Execute run_backtest tool. Returns (model_response, data_block)."""
-        from assistant.tools.backtest import _build_backtest_card
+    def _exec_walk_forward(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_walk_forward tool. Returns (model_response, data_block, profile)."""
+        return self._exec_backtest_tool(
+            "run_walk_forward",
+            input_data,
+            title,
+            lambda: run_walk_forward_tool(
+                input_data, self.df_minute, self.sessions, profile=self.profile
+            ),
+            refresh,
+        )
 
-        tool_result = run_backtest_tool(input_data, self.df_minute, self.sessions)
-        model_response = tool_result.get("model_response", "")
-        bt_result = tool_result.get("result")
+    def _exec_portfolio(
+        self, input_data: dict, title: str, refresh: bool = False
+    ) -> tuple[str, dict | None, dict | None]:
+        """Execute run_portfolio_backtest tool. Returns (model_response, data_block, profile)."""
+
+        def read_minute(symbol: str) -> pd.DataFrame:
+            # Other instruments are read uncached and dropped after their backtest
+            if symbol == self.instrument.upper():
+                return self.df_minute
+            return read_data(symbol, "1m")
+
+        return self._exec_backtest_tool(
+            "run_portfolio_backtest",
+            input_data,
+            title,
+            lambda: run_portfolio_backtest_tool(input_data, read_minute, profile=self.profile),
+            refresh,
+        )
 
-        if not bt_result:
-            return model_response, None
+    def _exec_backtest_tool(
+        self,
+        tool: str,
+        input_data: dict,
+        title: str,
+        run_local: Callable[[], dict],
+        refresh: bool = False,
+    ) -> tuple[str, dict | None, dict | None]:
+        """Run a backtest tool in the pool or locally, through the tool cache.
+
+        Replies are JSON (tool_reply) with an untitled card, cached and
+        shared by any title; the call's title goes in front here.
+        """
+        key = TOOL_CACHE.key(tool, self.instrument, input_data)
+        reply = None if refresh else TOOL_CACHE.get(key)
+        if reply is None:
+            if self.pool is not None:
+                reply = self.pool.call(tool, self.instrument, input_data, self.profile)
+            else:
+                reply = tool_reply(tool, run_local())
+            TOOL_CACHE.put(key, reply)
+        card = reply.get("card")
+        if card is not None:
+            card = {**card, "title": title + card["title"]}
+        return reply.get("model_response", ""), card, reply.get("profile")
 
-        card = _build_backtest_card(bt_result, title)
-        return model_response, card
+
+def _with_rerun(card: dict | None, tool: str, instrument: str, input_data: dict) -> dict | None:
+    """Card whose paginated tables carry the tool call that re-creates them.
+
+    Cursors live in server memory for RESULT_TTL; messages.data keeps the
+    card for good. rerun is {tool, instrument, input, block}: the block's
+    index in the card re-built by the call.
+    """
+    if card is None or not any(block.get("cursor") for block in card["blocks"]):
+        return card
+    rerun = {"tool": tool, "instrument": instrument, "input": input_data}
+    blocks = [
+        {**block, "rerun": {**rerun, "block": i}} if block.get("cursor") else block
+        for i, block in enumerate(card["blocks"])
+    ]
+    return {**card, "blocks": blocks}
 
 
 def _build_query_card(result: dict, title: str) -> dict | None:
@@ -299,17 +477,49 @@ def _build_query_card(result: dict, title: str) -> dict | None:
             }
         )
 
-    blocks.append(
-        {
-            "type": "table",
-            "columns": columns,
-            "rows": ui_data,
-        }
-    )
+    table_block = {
+        "type": "table",
+        "columns": columns,
+        "rows": ui_data,
+    }
+    # Paginated: rows is the first page, the rest via GET /api/results/{cursor}
+    if table_data and result.get("cursor"):
+        table_block["cursor"] = result["cursor"]
+        table_block["total_rows"] = result["total_rows"]
+    elif not table_data and result.get("source_cursor"):
+        table_block["cursor"] = result["source_cursor"]
+        table_block["total_rows"] = result["source_row_count"]
+    blocks.append(table_block)
 
     return {"title": title, "blocks": blocks}
 
 
+def _build_batch_card(results: list[dict] | None, title: str) -> dict | None:
+    """Build DataCard for run_query_batch: one table row per query."""
+    if not results:
+        return None
+    rows = [{"query": r["label"], "result": _short_result(r)} for r in results]
+    return {
+        "title": title,
+        "blocks": [{"type": "table", "columns": ["query", "result"], "rows": rows}],
+    }
+
+
+def _short_result(result: dict):
+    """One-cell view of a batch item: the value, or the size of the table."""
+    if result["error"]:
+        return f"Error: {result['error']}"
+    summary = result["summary"]
+    stype = summary.get("type")
+    if stype == "scalar":
+        return summary.get("value")
+    if stype == "dict":
+        return ", ".join(f"{k}={v}" for k, v in summary.get("values", {}).items())
+    if stype == "grouped":
+        return f"{summary.get('rows', 0)} groups"
+    return f"{summary.get('rows', 0)} rows"
+
+
 def _build_messages(history: list[dict], message: str) -> list[dict]:
     """Convert chat history to Anthropic messages format."""
     messages = []
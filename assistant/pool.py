@@ -0,0 +1,399 @@
+"""Pre-forked process pool for tool execution.
+
+Queries and backtests are CPU-bound pandas/NumPy work. Run in the API
+process they hold the GIL against request handling and other users' SSE
+streams. ToolPool forks worker processes *after* instrument data is
+loaded: workers inherit the DataFrames copy-on-write, so the gigabytes of
+minute bars are shared, never copied.
+
+Each worker is a process with two pipes, one for tasks and one for result
+pages. Nothing on them is pickled: a task is the tool name, the symbol and
+the tool's JSON input; the reply is the tool's JSON output — for
+backtests the finished data card (tool_reply in assistant/tools/backtest.py)
+— both as orjson bytes. A worker runs one task at a time.
+
+Paginated results stay in the worker that produced them. Its RESULTS store
+prefixes cursors with the worker ("w1.…"), and /api/results/{cursor} asks
+that worker for the page; a thread in the worker answers while it runs
+other tasks. Cursors of a restarted worker are expired, as after an API
+restart.
+
+Deadlines and cancellation cross the process boundary: the caller's
+active deadline (barb/deadline.py) is re-created in the worker, and each
+worker has a cancel flag (barb/forking.py) that the caller raises when
+its own cancel event fires. The worker's checkpoints read that flag.
+Fan-outs inside a worker (sweeps) get its share of the CPUs. The
+caller enforces the deadline too: a worker still busy _KILL_GRACE seconds
+past it (stuck between checkpoints) is killed and re-forked, as is a
+worker that died. Either way the call raises a BarbError.
+
+Linux only (fork start method). Forking after the API has started threads
+is safe here because workers only run barb code, never the event loop.
+"""
+
+import logging
+import math
+import multiprocessing
+import queue
+import re
+import threading
+import time
+
+import orjson
+
+from assistant.tools import pick_data, run_query, run_query_batch
+from assistant.tools.backtest import (
+    run_backtest_sweep_tool,
+    run_backtest_tool,
+    run_portfolio_backtest_tool,
+    run_walk_forward_tool,
+    tool_reply,
+)
+from barb.data import read_data
+from barb.deadline import current_deadline, deadline
+from barb.forking import POLL_INTERVAL, CancelFlags, cpu_budget, limit_fan_out
+from barb.ops import BarbError
+from barb.results import MAX_BYTES, RESULTS
+
+log = logging.getLogger(__name__)
+
+# Seconds a worker gets past the deadline (or after cancel) before it is killed
+_KILL_GRACE = 5.0
+# Seconds to wait for a result page before giving up on a busy worker
+_PAGE_TIMEOUT = 30.0
+_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+# Cursors parked in a worker: "w{index}." + random id ('.' never occurs in the id)
+_WORKER_CURSOR = re.compile(r"w(\d+)\.")
+
+# Inherited by workers at fork: symbol → (df_daily, df_minute, sessions)
+_DATA: dict[str, tuple] = {}
+# Inherited by workers at fork: cancel flag per worker
+_CANCEL: CancelFlags | None = None
+# API-side pipe ends of all workers; a new worker closes its inherited copies
+_API_ENDS: list = []
+
+
+# --- Worker side ---
+
+
+def _task_run_query(data: tuple, query: dict, page_size: int | None, profile: bool) -> dict:
+    df_daily, df_minute, sessions = data
+    df = pick_data(query, df_daily, df_minute, sessions)
+    return run_query(query, df, sessions, page_size=page_size, profile=profile)
+
+
+def _task_run_query_batch(data: tuple, items: list[dict]) -> dict:
+    df_daily, df_minute, sessions = data
+    return run_query_batch(
+        items, lambda query: pick_data(query, df_daily, df_minute, sessions), sessions
+    )
+
+
+def _task_run_backtest(data: tuple, input_data: dict, profile: bool) -> dict:
+    _, df_minute, sessions = data
+    return tool_reply(
+        "run_backtest", run_backtest_tool(input_data, df_minute, sessions, profile=profile)
+    )
+
+
+def _task_run_backtest_sweep(data: tuple, input_data: dict, profile: bool) -> dict:
+    _, df_minute, sessions = data
+    return tool_reply(
+        "run_backtest_sweep",
+        run_backtest_sweep_tool(input_data, df_minute, sessions, profile=profile),
+    )
+
+
+def _task_run_walk_forward(data: tuple, input_data: dict, profile: bool) -> dict:
+    _, df_minute, sessions = data
+    return tool_reply(
+        "run_walk_forward", run_walk_forward_tool(input_data, df_minute, sessions, profile=profile)
+    )
+
+
+def _task_run_portfolio_backtest(data: tuple, input_data: dict, profile: bool) -> dict:
+    # Preloaded instruments are shared; others are read per task, then dropped
+    def read_minute(symbol: str):
+        return _DATA[symbol][1] if symbol in _DATA else read_data(symbol, "1m")
+
+    return tool_reply(
+        "run_portfolio_backtest",
+        run_portfolio_backtest_tool(input_data, read_minute, profile=profile),
+    )
+
+
+_TASKS = {
+    "run_query": _task_run_query,
+    "run_query_batch": _task_run_query_batch,
+    "run_backtest": _task_run_backtest,
+    "run_backtest_sweep": _task_run_backtest_sweep,
+    "run_walk_forward": _task_run_walk_forward,
+    "run_portfolio_backtest": _task_run_portfolio_backtest,
+}
+
+
+def _worker_main(index: int, tasks, pages, workers: int):
+    """Worker process: serve tasks until the API closes the task pipe."""
+    for conn in _API_ENDS:
+        conn.close()
+    # Entries inherited from the API process belong to it
+    RESULTS.clear()
+    RESULTS.prefix = f"w{index}."
+    RESULTS.max_bytes = MAX_BYTES // workers
+    # Sweeps in concurrent workers share the CPUs instead of each taking all
+    limit_fan_out(cpu_budget() // workers)
+    threading.Thread(target=_serve_pages, args=(pages,), daemon=True).start()
+
+    while True:
+        try:
+            message = tasks.recv_bytes()
+        except (EOFError, OSError):
+            return
+        tasks.send_bytes(_run_task(index, message))
+
+
+def _run_task(index: int, message: bytes) -> bytes:
+    """Run one task message, return the reply message: {result} or {error}."""
+    request = orjson.loads(message)
+    seconds, elapsed = request["limit"]
+    try:
+        with deadline(seconds, _CANCEL.event(index), elapsed=elapsed):
+            result = _TASKS[request["task"]](_DATA[request["symbol"]], *request["args"])
+        return orjson.dumps({"result": result}, option=_JSON_OPTIONS)
+    except BarbError as e:
+        return orjson.dumps({"error": _error_fields(e)}, option=_JSON_OPTIONS)
+    except Exception as e:
+        log.exception("Tool task %s failed", request["task"])
+        error = BarbError(str(e) or type(e).__name__, error_type=type(e).__name__, step="worker")
+        return orjson.dumps({"error": _error_fields(error)}, option=_JSON_OPTIONS)
+
+
+def _serve_pages(conn):
+    """Page thread of a worker: answer page requests from its RESULTS."""
+    while True:
+        try:
+            request = orjson.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            return
+        reply = {"id": request["id"]}
+        try:
+            reply["page"] = RESULTS.page(
+                request["cursor"], request["offset"], request["limit"], request["sort"]
+            )
+        except BarbError as e:
+            reply["error"] = _error_fields(e)
+        conn.send_bytes(orjson.dumps(reply, option=_JSON_OPTIONS))
+
+
+def _error_fields(error: BarbError) -> dict:
+    return {
+        "message": str(error),
+        "error_type": error.error_type,
+        "step": error.step,
+        "expression": error.expression,
+        "profile": error.profile,
+    }
+
+
+def _barb_error(fields: dict) -> BarbError:
+    error = BarbError(
+        fields["message"],
+        error_type=fields["error_type"],
+        step=fields["step"],
+        expression=fields["expression"],
+    )
+    error.profile = fields["profile"]
+    return error
+
+
+# --- API side ---
+
+
+class _Worker:
+    """API-side handle of one worker process and its pipes."""
+
+    def __init__(self, ctx, index: int, workers: int):
+        self.tasks, worker_tasks = ctx.Pipe()
+        self.pages, worker_pages = ctx.Pipe()
+        _API_ENDS.extend((self.tasks, self.pages))
+        # Not a daemon: backtest sweeps fork their own processes in the worker
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(index, worker_tasks, worker_pages, workers),
+            name=f"tool-worker-{index}",
+        )
+        self.process.start()
+        worker_tasks.close()
+        worker_pages.close()
+        self.page_lock = threading.Lock()
+        self.page_id = 0
+
+    def stop(self, timeout: float | None = None):
+        """Close the pipes (the worker exits at EOF); kill it after timeout."""
+        for conn in (self.tasks, self.pages):
+            _API_ENDS.remove(conn)
+            conn.close()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class ToolPool:
+    """Fixed set of forked workers holding every instrument's data."""
+
+    def __init__(self, data: dict[str, tuple], workers: int):
+        """Fork workers now, sharing data copy-on-write.
+
+        Args:
+            data: {symbol: (df_daily, df_minute, sessions)}
+            workers: Number of worker processes
+        """
+        global _CANCEL
+        self._ctx = multiprocessing.get_context("fork")
+        _DATA.clear()
+        _DATA.update({symbol.upper(): frames for symbol, frames in data.items()})
+        _CANCEL = CancelFlags(workers)
+        self._cancel = _CANCEL
+
+        self.workers = workers
+        self._workers = [_Worker(self._ctx, index, workers) for index in range(workers)]
+        self._idle = queue.SimpleQueue()
+        for index in range(workers):
+            self._idle.put(index)
+        self.symbols = frozenset(_DATA)
+        log.info("Tool pool: %d workers, %d instruments", workers, len(_DATA))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self.symbols
+
+    def call(self, name: str, symbol: str, *args):
+        """Run a tool in a worker and wait for it, honoring the active deadline.
+
+        args must be JSON-serializable; so is the returned result.
+
+        Raises:
+            BarbError: From the tool, including TimeoutError / CancelledError;
+                WorkerError if the worker died
+        """
+        seconds, elapsed, cancel = current_deadline()
+        expires = time.monotonic() + seconds - elapsed if seconds is not None else math.inf
+        message = orjson.dumps(
+            {"task": name, "symbol": symbol.upper(), "limit": [seconds, elapsed], "args": args},
+            option=_JSON_OPTIONS,
+        )
+
+        index = self._acquire(expires, cancel, seconds)
+        try:
+            reply = self._run(index, message, expires, cancel, seconds)
+        finally:
+            self._idle.put(index)
+        if "error" in reply:
+            raise _barb_error(reply["error"])
+        return reply["result"]
+
+    def owns(self, cursor: str) -> bool:
+        """Whether a result cursor is parked in one of the workers."""
+        match = _WORKER_CURSOR.match(cursor)
+        return match is not None and int(match.group(1)) < self.workers
+
+    def page(self, cursor: str, offset: int, limit: int, sort: str | None = None) -> dict | None:
+        """RESULTS.page() of a cursor parked in a worker. None if expired.
+
+        Raises:
+            BarbError: Unknown sort column; TimeoutError if the worker
+                doesn't answer within _PAGE_TIMEOUT
+        """
+        worker = self._workers[int(_WORKER_CURSOR.match(cursor).group(1))]
+        with worker.page_lock:
+            worker.page_id += 1
+            request = {
+                "id": worker.page_id,
+                "cursor": cursor,
+                "offset": offset,
+                "limit": limit,
+                "sort": sort,
+            }
+            try:
+                worker.pages.send_bytes(orjson.dumps(request))
+                give_up = time.monotonic() + _PAGE_TIMEOUT
+                while True:
+                    if not worker.pages.poll(max(give_up - time.monotonic(), 0)):
+                        raise BarbError(
+                            "Result page timed out", error_type="TimeoutError", step="page"
+                        )
+                    reply = orjson.loads(worker.pages.recv_bytes())
+                    # Skip late answers to requests that already timed out
+                    if reply["id"] == worker.page_id:
+                        break
+            except (EOFError, OSError):
+                # Worker restarted meanwhile: its results are gone
+                return None
+        if "error" in reply:
+            raise _barb_error(reply["error"])
+        return reply["page"]
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop(timeout=_KILL_GRACE)
+
+    def _acquire(self, expires: float, cancel, seconds: float | None) -> int:
+        """Index of an idle worker; waits while all are busy."""
+        while True:
+            try:
+                return self._idle.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if cancel is not None and cancel.is_set():
+                    raise BarbError(
+                        "Execution cancelled", error_type="CancelledError", step="queue"
+                    ) from None
+                if time.monotonic() > expires:
+                    raise BarbError(
+                        f"Execution exceeded the {seconds:g}s time limit",
+                        error_type="TimeoutError",
+                        step="queue",
+                    ) from None
+
+    def _run(self, index: int, message: bytes, expires: float, cancel, seconds) -> dict:
+        """Send a task to worker index and wait for its reply message."""
+        worker = self._workers[index]
+        self._cancel.clear(index)
+        give_up = expires + _KILL_GRACE
+        cancelled = False
+        try:
+            worker.tasks.send_bytes(message)
+            while not worker.tasks.poll(POLL_INTERVAL):
+                if not worker.process.is_alive():
+                    raise EOFError
+                now = time.monotonic()
+                if not cancelled and self._cancel.forward(cancel, index):
+                    # The worker stops at its next checkpoint
+                    cancelled = True
+                    give_up = min(give_up, now + _KILL_GRACE)
+                if now > give_up:
+                    self._restart(index)
+                    if cancelled:
+                        raise BarbError(
+                            "Execution cancelled", error_type="CancelledError", step="pool"
+                        )
+                    raise BarbError(
+                        f"Execution exceeded the {seconds:g}s time limit",
+                        error_type="TimeoutError",
+                        step="pool",
+                    )
+            return orjson.loads(worker.tasks.recv_bytes())
+        except (EOFError, OSError):
+            self._restart(index)
+            raise BarbError(
+                "Tool worker exited unexpectedly (out of memory?), please retry",
+                error_type="WorkerError",
+                step="pool",
+            ) from None
+
+    def _restart(self, index: int):
+        """Kill worker index and fork a fresh one in its place."""
+        log.warning("Restarting tool worker %d", index)
+        worker = self._workers[index]
+        worker.process.kill()
+        worker.stop()
+        self._workers[index] = _Worker(self._ctx, index, self.workers)
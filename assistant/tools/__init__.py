@@ -1,8 +1,12 @@
 """Single Barb Script tool for Anthropic Claude."""
 
+from collections.abc import Callable
+
+import pandas as pd
+
 from assistant.tools.reference import build_function_reference
-from barb.interpreter import execute
-from barb.ops import BarbError
+from barb.interpreter import execute, execute_batch
+from barb.ops import INTRADAY_TIMEFRAMES, BarbError
 
 _EXPRESSIONS_MD = build_function_reference()
 
@@ -26,7 +30,7 @@ Execution order is FIXED: session → period → from → map → where → grou
 
 IMPORTANT:
 - group_by requires a COLUMN NAME, not an expression. Create column in map first.
-- select with group_by supports: count(), sum(col), mean(col), min(col), max(col), std(col), median(col), pct(condition).
+- select with group_by: one aggregate per item — count(), count(condition), sum, mean, min, max, std, median, pct(condition), percentile(col, p), correlation(col1, col2), last(col). Arguments can be expressions: mean(high - low).
 - select without group_by: any expression including last(col), percentile(col, p), correlation(col1, col2).
 - pct(condition) returns fraction (0.0-1.0): pct(gap_pct() > 0) → 0.58.
 - hour() and minute() return 0 on daily/weekly/monthly data (no time component). Use intraday timeframe (1m, 5m, 1h) for time-of-day analysis.
@@ -270,34 +274,180 @@ Bad: "В 18:00 зафиксировано 7 минимумов" — hr=18 is the
 }
 
 
-def run_query(query: dict, df, sessions: dict) -> dict:
+BATCH_TOOL = {
+    "name": "run_query_batch",
+    "description": """Execute several Barb Script queries in one call.
+
+Use when one question needs many small queries over the same data — e.g. the same
+statistic for every year, every session, or several thresholds. Each query has the
+same format as run_query. Queries sharing session/period/from (and map) reuse the
+filtered data, so a batch is much faster than separate run_query calls.
+
+Each result comes back on its own line, prefixed with its label. A failing query
+reports its error without affecting the others. Prefer run_query for a single query.
+""",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "queries": {
+                "type": "array",
+                "minItems": 1,
+                "maxItems": 50,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "label": {
+                            "type": "string",
+                            "description": "Short name of this query (shown to user)",
+                        },
+                        "query": {"type": "object", "description": "Barb Script query object"},
+                    },
+                    "required": ["label", "query"],
+                },
+            },
+            "title": {
+                "type": "string",
+                "description": "Short descriptive title for the whole batch (shown to user)",
+            },
+        },
+        "required": ["queries", "title"],
+    },
+}
+
+
+def pick_data(query: dict, df_daily, df_minute, sessions: dict):
+    """Minute or daily bars, whichever the query's scope needs."""
+    # For steps queries, from/session are inside steps[0]
+    step0 = query["steps"][0] if query.get("steps") else query
+    timeframe = step0.get("from", "daily")
+    session_name = step0.get("session")
+
+    if timeframe in INTRADAY_TIMEFRAMES:
+        return df_minute
+    if session_name:
+        # RTH-like sessions (within one day) need minute data
+        # ETH-like sessions (wrap midnight) ≈ settlement, use daily
+        times = sessions.get(session_name.upper())
+        if times and pd.Timestamp(times[0]).time() < pd.Timestamp(times[1]).time():
+            return df_minute
+    return df_daily
+
+
+def run_query(
+    query: dict, df, sessions: dict, page_size: int | None = None, profile: bool = False
+) -> dict:
     """Execute Barb Script query and return structured result.
 
     Returns dict with:
         - model_response: str - compact summary for model
-        - table: list | None - full data for UI
-        - source_rows: list | None - evidence for aggregations
+        - table: list | None - data for UI (first page_size rows if paginated)
+        - cursor: str | None - result store cursor for the remaining rows
+        - total_rows: int | None - full table length
+        - source_rows: list | None - evidence sample for aggregations
+        - source_row_count: int | None - full evidence count
+        - source_cursor: str | None - result store cursor for the full evidence
         - chart: dict | None - chart hints (category, value columns)
+        - profile: dict | None - stage timings (if profile=True)
     """
     try:
-        result = execute(query, df, sessions)
+        result = execute(query, df, sessions, page_size=page_size, profile=profile)
         summary = result.get("summary", {})
 
         return {
             "model_response": _format_summary_for_model(summary),
             "table": result.get("table"),
+            "cursor": result.get("cursor"),
+            "total_rows": result.get("total_rows"),
             "source_rows": result.get("source_rows"),
             "source_row_count": result.get("source_row_count"),
+            "source_cursor": result.get("source_cursor"),
             "chart": result.get("chart"),
+            "profile": result["metadata"].get("profile"),
         }
 
     except BarbError as e:
-        return {"model_response": f"Error: {e}", "table": None, "source_rows": None, "chart": None}
+        return {
+            "model_response": f"Error: {e}",
+            "table": None,
+            "source_rows": None,
+            "chart": None,
+            "profile": e.profile,
+        }
     except Exception as e:
         msg = f"Error: {type(e).__name__}: {e}"
         return {"model_response": msg, "table": None, "source_rows": None, "chart": None}
 
 
+def execute_split(
+    queries: list[dict],
+    pick_df: Callable[[dict], object],
+    sessions: dict,
+    page_size: int | None = None,
+) -> tuple[list[dict], list[dict]]:
+    """execute_batch over queries that may need different DataFrames.
+
+    Queries are grouped by pick_df(query); each group runs as one batch.
+
+    Returns:
+        (execute_batch results in input order, timings of each group's batch)
+    """
+    groups: dict[int, tuple] = {}
+    for i, query in enumerate(queries):
+        df = pick_df(query)
+        groups.setdefault(id(df), (df, []))[1].append(i)
+
+    results = [None] * len(queries)
+    timings = []
+    for df, indices in groups.values():
+        batch = execute_batch([queries[i] for i in indices], df, sessions, page_size=page_size)
+        for i, result in zip(indices, batch["results"], strict=True):
+            results[i] = result
+        timings.append(batch["timings"])
+    return results, timings
+
+
+def run_query_batch(
+    items: list[dict],
+    pick_df: Callable[[dict], object],
+    sessions: dict,
+) -> dict:
+    """Execute a batch of labeled queries, sharing scoped data between them.
+
+    Only summaries are kept, so queries run summary-only (page_size=0):
+    no table is serialized or parked in RESULTS.
+
+    Args:
+        items: [{"label": str, "query": dict}, ...]
+        pick_df: Query → DataFrame to run it on (minute or daily bars).
+            Queries on the same DataFrame run as one execute_batch.
+
+    Returns dict with:
+        - model_response: str - one summary line block per label
+        - results: list - per item {label, summary, error} in input order
+        - timings: list - execute_batch stage timings, one per DataFrame
+    """
+    try:
+        queries = [item.get("query") or {} for item in items]
+        batch, timings = execute_split(queries, pick_df, sessions, page_size=0)
+        results = []
+        for i, (item, result) in enumerate(zip(items, batch, strict=True)):
+            label = item.get("label") or f"#{i + 1}"
+            if "error" in result:
+                error = result["error"]["message"]
+                results.append({"label": label, "summary": None, "error": error})
+            else:
+                results.append({"label": label, "summary": result["summary"], "error": None})
+    except Exception as e:
+        msg = f"Error: {type(e).__name__}: {e}"
+        return {"model_response": msg, "results": None, "timings": None}
+
+    lines = []
+    for r in results:
+        text = f"Error: {r['error']}" if r["error"] else _format_summary_for_model(r["summary"])
+        lines.append(f"[{r['label']}] {text}")
+    return {"model_response": "\n".join(lines), "results": results, "timings": timings}
+
+
 def _format_summary_for_model(summary: dict) -> str:
     """Format summary into compact string for model."""
     stype = summary.get("type", "unknown")
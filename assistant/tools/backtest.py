@@ -1,13 +1,26 @@
 """Backtest tool for Anthropic Claude."""
 
 from collections import defaultdict
+from collections.abc import Callable
 
+import numpy as np
 import pandas as pd
 
 from barb.backtest.engine import run_backtest
-from barb.backtest.metrics import BacktestResult
+from barb.backtest.kernel import EXIT_REASONS
+from barb.backtest.metrics import BacktestResult, Trades
+from barb.backtest.portfolio import (
+    MAX_PORTFOLIO_INSTRUMENTS,
+    PortfolioResult,
+    run_portfolio_backtest,
+)
 from barb.backtest.strategy import Strategy
-from barb.ops import filter_period, filter_session
+from barb.backtest.sweep import MAX_SWEEP_VARIANTS, SWEEP_FIELDS, SweepResult, run_backtest_sweep
+from barb.backtest.walkforward import WalkForwardResult, run_walk_forward
+from barb.ops import BarbError, filter_period, filter_session
+from barb.profile import profiling, stage
+from barb.results import PAGE_SIZE, RESULTS
+from config.market.instruments import get_instrument, list_symbols
 
 BACKTEST_TOOL = {
     "name": "run_backtest",
@@ -16,7 +29,7 @@ BACKTEST_TOOL = {
 Simulates trades bar-by-bar and returns performance metrics.
 Uses the same expression syntax as run_query for entry/exit conditions.
 
-Default timeframe is daily. Use "from" for intraday backtests (1h, 15m, etc.).
+Default timeframe is daily. Use "from" for intraday backtests (1h, 15m, 1m for scalping, etc.).
 exit_bars and breakeven_bars count bars at the chosen timeframe.
 
 Strategy fields:
@@ -87,7 +100,11 @@ After results — analyze strategy QUALITY, don't just repeat numbers:
 - Concentration: if top 3 trades dominate total PnL — flag fragility.
 - Trade count below 30 → warn about insufficient data.
 - Suggest one specific variation (tighter stop, trend filter, session filter).
-- PF > 2.0 or win rate > 70% → express skepticism, suggest stress testing.
+- PF > 2.0 or win rate > 70% → express skepticism, suggest stress testing
+  (run_backtest_sweep for neighbouring parameters, run_walk_forward for out-of-sample).
+- Bootstrap line: if the PF interval's low end is below 1 or P(loss) is above ~10%,
+  the edge is not established — say so. The reshuffled Max DD range is the drawdown
+  to be prepared for, not the single historical value.
 - 0 trades → explain why condition may be too restrictive, suggest relaxing.
 </analysis-rules>""",
     "input_schema": {
@@ -142,7 +159,7 @@ After results — analyze strategy QUALITY, don't just repeat numbers:
             },
             "from": {
                 "type": "string",
-                "description": "Bar timeframe: daily (default), 1h, 4h, 15m, 5m, etc.",
+                "description": "Bar timeframe: daily (default), 4h, 1h, 15m, 5m, 1m, etc.",
             },
             "session": {
                 "type": "string",
@@ -163,10 +180,184 @@ After results — analyze strategy QUALITY, don't just repeat numbers:
 }
 
 
+BACKTEST_SWEEP_TOOL = {
+    "name": "run_backtest_sweep",
+    "description": f"""Backtest one strategy with a grid of exit parameters.
+
+Same strategy format as run_backtest. "grid" lists values to try per field; every
+combination is one variant (at most {MAX_SWEEP_VARIANTS}). Data preparation and the
+entry condition are computed once and shared, so a sweep is much faster than separate
+run_backtest calls. Variants come back ranked by sort_by.
+
+Sweepable fields: {", ".join(SWEEP_FIELDS)}. The entry is fixed — to compare entries,
+run separate backtests. null as a value turns that exit off (e.g. no stop).
+
+Use when the user asks which stop/target/holding period works best, or to check a
+backtest's robustness after run_backtest.
+
+<examples>
+User: Which stop works best for the RSI < 30 long — 1%, 1.5% or 2%? Target 3%.
+→ run_backtest_sweep(strategy={{"entry": "rsi(close, 14) < 30", "direction": "long",
+    "take_profit": "3%"}}, grid={{"stop_loss": ["1%", "1.5%", "2%"]}},
+    session="RTH", title="RSI < 30: stop sweep")
+</examples>
+
+<analysis-rules>
+- Robustness: do neighbouring values give similar results, or is the best variant an isolated spike?
+  A plateau is trustworthy, a spike is likely curve-fitting.
+- Best of many variants is optimistic — the more variants, the more skepticism.
+- Compare the best variant with the median one, not only with the worst.
+- Trade count below 30 in the top variants → warn about insufficient data.
+</analysis-rules>""",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "strategy": BACKTEST_TOOL["input_schema"]["properties"]["strategy"],
+            "grid": {
+                "type": "object",
+                "description": "Field → list of values to try, e.g. "
+                '{"stop_loss": ["1%", "2%"], "exit_bars": [5, 10]}',
+                "additionalProperties": {"type": "array"},
+            },
+            "sort_by": {
+                "type": "string",
+                "description": "Metric to rank by: total_pnl (default), profit_factor, "
+                "win_rate, expectancy, recovery_factor, max_drawdown (lower is better)",
+            },
+            "from": BACKTEST_TOOL["input_schema"]["properties"]["from"],
+            "session": BACKTEST_TOOL["input_schema"]["properties"]["session"],
+            "period": BACKTEST_TOOL["input_schema"]["properties"]["period"],
+            "title": BACKTEST_TOOL["input_schema"]["properties"]["title"],
+        },
+        "required": ["strategy", "grid", "title"],
+    },
+}
+
+WALK_FORWARD_TOOL = {
+    "name": "run_walk_forward",
+    "description": """Walk-forward test of a strategy: choose parameters in-sample, trade them out-of-sample.
+
+History is cut into train/test windows by calendar months. In each train window every
+grid variant is backtested and the best one (by sort_by) trades the following test
+window. Test windows are consecutive — their trades form one out-of-sample equity curve.
+Rolling (default): fixed-length train window slides forward. anchored=true: train always
+starts at the beginning of the data.
+
+Same strategy and grid format as run_backtest_sweep. Without grid, the strategy is only
+split into out-of-sample windows (stability over time).
+
+Use when the user asks whether a strategy/optimization would have held up, for
+out-of-sample validation, or to check stability over time. Needs more data than
+train_months + test_months; prefer daily or 1h for multi-year tests.
+
+<examples>
+User: Would optimizing the stop every year have worked for the RSI < 30 long?
+→ run_walk_forward(strategy={"entry": "rsi(close, 14) < 30", "direction": "long",
+    "take_profit": "3%", "exit_bars": 5}, grid={"stop_loss": ["1%", "1.5%", "2%"]},
+    train_months=24, test_months=12, title="RSI < 30: walk-forward")
+</examples>
+
+<analysis-rules>
+- Judge the OUT-OF-SAMPLE result, not in-sample: OOS total, PF and drawdown.
+- Efficiency (OOS P&L per bar ÷ in-sample P&L per bar): above ~50% is robust,
+  near 0 or negative — the optimization doesn't carry forward.
+- Parameter stability: the same variant chosen in most windows is a good sign;
+  jumping between extremes means the grid is fitting noise.
+- Count losing test windows; one window carrying the total is fragile.
+</analysis-rules>""",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "strategy": BACKTEST_TOOL["input_schema"]["properties"]["strategy"],
+            "grid": BACKTEST_SWEEP_TOOL["input_schema"]["properties"]["grid"],
+            "sort_by": BACKTEST_SWEEP_TOOL["input_schema"]["properties"]["sort_by"],
+            "train_months": {
+                "type": "integer",
+                "minimum": 1,
+                "description": "Train window length in months, default 24",
+            },
+            "test_months": {
+                "type": "integer",
+                "minimum": 1,
+                "description": "Test window length (and step) in months, default 6",
+            },
+            "anchored": {
+                "type": "boolean",
+                "description": "Train from the start of the data (default false: rolling)",
+            },
+            "from": BACKTEST_TOOL["input_schema"]["properties"]["from"],
+            "session": BACKTEST_TOOL["input_schema"]["properties"]["session"],
+            "period": BACKTEST_TOOL["input_schema"]["properties"]["period"],
+            "title": BACKTEST_TOOL["input_schema"]["properties"]["title"],
+        },
+        "required": ["strategy", "title"],
+    },
+}
+
+PORTFOLIO_BACKTEST_TOOL = {
+    "name": "run_portfolio_backtest",
+    "description": f"""Backtest one strategy on several instruments at once, as a portfolio.
+
+Same strategy format as run_backtest. Each instrument is backtested on its own data;
+trades are merged by exit date into one equity curve. P&L is converted to money with
+each instrument's point value (points only if some instrument has none), so results
+of different instruments add up.
+
+Give "instruments" (symbols, at most {MAX_PORTFOLIO_INSTRUMENTS}) or "category" (every
+instrument of a catalog category, e.g. "index", "energy"). session is applied per
+instrument with its own session times.
+
+Use when the user asks whether a strategy works beyond the current instrument, on a
+basket or sector, or for diversification.
+
+<examples>
+User: Does the RSI < 30 long work on all index futures?
+→ run_portfolio_backtest(strategy={{"entry": "rsi(close, 14) < 30", "direction": "long",
+    "stop_loss": "2%", "take_profit": "3%"}}, category="index",
+    title="RSI < 30: index portfolio")
+</examples>
+
+<analysis-rules>
+- Is the edge broad (most instruments profitable) or carried by one or two? Cite shares.
+- Compare portfolio drawdown with the sum of single-instrument drawdowns — diversification.
+- Instruments without data are listed; say they were skipped.
+- Trade count below 30 on an instrument → its result alone is not significant.
+</analysis-rules>""",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "strategy": BACKTEST_TOOL["input_schema"]["properties"]["strategy"],
+            "instruments": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": 'Instrument symbols, e.g. ["NQ", "ES", "YM"]',
+            },
+            "category": {
+                "type": "string",
+                "description": "Instrument category — all its instruments (instead of instruments)",
+            },
+            "from": BACKTEST_TOOL["input_schema"]["properties"]["from"],
+            "session": BACKTEST_TOOL["input_schema"]["properties"]["session"],
+            "period": BACKTEST_TOOL["input_schema"]["properties"]["period"],
+            "title": BACKTEST_TOOL["input_schema"]["properties"]["title"],
+        },
+        "required": ["strategy", "title"],
+    },
+}
+
+# Variants listed for the model, best first
+_SWEEP_SUMMARY_ROWS = 15
+# Instruments with their own equity line on the portfolio chart, largest first
+_PORTFOLIO_CHART_LEGS = 8
+# Points on an equity chart; longer curves keep each span's extremes
+_CHART_POINTS = 1200
+
+
 def run_backtest_tool(
     input_data: dict,
     df_minute: pd.DataFrame,
     sessions: dict,
+    profile: bool = False,
 ) -> dict:
     """Execute backtest and return structured result.
 
@@ -176,9 +367,187 @@ def run_backtest_tool(
     Returns dict with:
         - model_response: compact summary for model
         - backtest: full data for UI (metrics, trades, equity_curve, strategy)
+        - profile: stage timings incl. data preparation (if profile=True)
     """
-    strat = input_data["strategy"]
-    strategy = Strategy(
+    strategy = _strategy_from_input(input_data["strategy"])
+    timeframe = input_data.get("from", "daily")
+
+    with profiling(profile) as profiler:
+        df = _filter_data(input_data, df_minute, sessions)
+        result = run_backtest(df, strategy, timeframe=timeframe)
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+
+    return {
+        "model_response": _format_summary(result),
+        "result": result,
+        "profile": result.metadata.get("profile"),
+    }
+
+
+def run_backtest_sweep_tool(
+    input_data: dict,
+    df_minute: pd.DataFrame,
+    sessions: dict,
+    profile: bool = False,
+) -> dict:
+    """Execute a parameter sweep and return structured result.
+
+    Returns dict with:
+        - model_response: ranked variants, one line each
+        - result: SweepResult for the UI card
+        - profile: stage timings incl. data preparation (if profile=True)
+    """
+    strategy = _strategy_from_input(input_data["strategy"])
+    timeframe = input_data.get("from", "daily")
+    sort_by = input_data.get("sort_by") or "total_pnl"
+
+    with profiling(profile) as profiler:
+        df = _filter_data(input_data, df_minute, sessions)
+        result = run_backtest_sweep(
+            df, strategy, input_data.get("grid") or {}, timeframe=timeframe, sort_by=sort_by
+        )
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+
+    return {
+        "model_response": _format_sweep(result),
+        "result": result,
+        "profile": result.metadata.get("profile"),
+    }
+
+
+def run_walk_forward_tool(
+    input_data: dict,
+    df_minute: pd.DataFrame,
+    sessions: dict,
+    profile: bool = False,
+) -> dict:
+    """Execute a walk-forward test and return structured result.
+
+    Returns dict with:
+        - model_response: out-of-sample summary + one line per window
+        - result: WalkForwardResult for the UI card
+        - profile: stage timings incl. data preparation (if profile=True)
+    """
+    strategy = _strategy_from_input(input_data["strategy"])
+
+    with profiling(profile) as profiler:
+        df = _filter_data(input_data, df_minute, sessions)
+        result = run_walk_forward(
+            df,
+            strategy,
+            input_data.get("grid"),
+            timeframe=input_data.get("from", "daily"),
+            train_months=input_data.get("train_months", 24),
+            test_months=input_data.get("test_months", 6),
+            anchored=bool(input_data.get("anchored", False)),
+            sort_by=input_data.get("sort_by") or "total_pnl",
+        )
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+
+    return {
+        "model_response": _format_walk_forward(result),
+        "result": result,
+        "profile": result.metadata.get("profile"),
+    }
+
+
+def run_portfolio_backtest_tool(
+    input_data: dict,
+    read_minute: Callable[[str], pd.DataFrame],
+    profile: bool = False,
+) -> dict:
+    """Execute a portfolio backtest and return structured result.
+
+    read_minute: symbol → its minute bars, uncached; FileNotFoundError
+    without data. Called in the portfolio's workers, one instrument at a time.
+
+    Returns dict with:
+        - model_response: portfolio headline + one line per instrument
+        - result: PortfolioResult for the UI card
+        - profile: stage timings (if profile=True)
+    """
+    strategy = _strategy_from_input(input_data["strategy"])
+    symbols = _portfolio_symbols(input_data)
+
+    # Money only if every instrument has a point value, in one currency
+    instruments = {symbol: get_instrument(symbol) for symbol in symbols}
+    currencies = {i["currency"] for i in instruments.values()}
+    point_values, unit = None, "pts"
+    if len(currencies) == 1 and all(i["point_value"] for i in instruments.values()):
+        point_values = {symbol: i["point_value"] for symbol, i in instruments.items()}
+        unit = currencies.pop()
+
+    def load(symbol: str) -> pd.DataFrame:
+        return _filter_data(input_data, read_minute(symbol), instruments[symbol]["sessions"])
+
+    result = run_portfolio_backtest(
+        symbols,
+        strategy,
+        load,
+        timeframe=input_data.get("from", "daily"),
+        point_values=point_values,
+        profile=profile,
+    )
+
+    return {
+        "model_response": _format_portfolio(result, unit),
+        "result": result,
+        "profile": result.metadata.get("profile"),
+    }
+
+
+def tool_reply(tool: str, tool_result: dict) -> dict:
+    """JSON reply of a backtest tool: model text, data card and profile.
+
+    The card is built without a title — its title is only the suffix
+    (" · 42 trades"), the caller puts the tool call's title in front. A
+    reply holds no result objects, so it crosses the tool pool's pipes and
+    is cached as is, whatever title the next call asks for.
+    """
+    result = tool_result.get("result")
+    return {
+        "model_response": tool_result.get("model_response", ""),
+        "card": _CARD_BUILDERS[tool](result, "") if result else None,
+        "profile": tool_result.get("profile"),
+    }
+
+
+def _portfolio_symbols(input_data: dict) -> list[str]:
+    """Registered symbols of the input's instruments or category."""
+    if input_data.get("instruments"):
+        symbols = [symbol.upper() for symbol in input_data["instruments"]]
+        unknown = [symbol for symbol in symbols if get_instrument(symbol) is None]
+        if unknown:
+            raise BarbError(
+                f"Unknown instrument: {', '.join(unknown)}. "
+                f"Available: {', '.join(sorted(list_symbols()))}",
+                error_type="ValidationError",
+                step="portfolio",
+            )
+        return symbols
+
+    category = (input_data.get("category") or "").lower()
+    if not category:
+        raise BarbError(
+            "Give instruments or category", error_type="ValidationError", step="portfolio"
+        )
+    categories = {symbol: get_instrument(symbol)["category"].lower() for symbol in list_symbols()}
+    symbols = [symbol for symbol, c in categories.items() if c == category]
+    if not symbols:
+        available = ", ".join(sorted(set(filter(None, categories.values()))))
+        raise BarbError(
+            f"Unknown category '{category}'. Available: {available}",
+            error_type="ValidationError",
+            step="portfolio",
+        )
+    return symbols
+
+
+def _strategy_from_input(strat: dict) -> Strategy:
+    return Strategy(
         entry=strat["entry"],
         direction=strat["direction"],
         exit_target=strat.get("exit_target"),
@@ -191,23 +560,18 @@ def run_backtest_tool(
         commission=strat.get("commission", 0.0),
     )
 
-    # Data preparation — uses interpreter functions (same as query engine)
-    df = df_minute
+
+def _filter_data(input_data: dict, df: pd.DataFrame, sessions: dict) -> pd.DataFrame:
+    """Session/period filtering — uses interpreter functions (same as query engine)."""
     session = input_data.get("session")
     period = input_data.get("period")
-    timeframe = input_data.get("from", "daily")
-
     if session:
-        df, _ = filter_session(df, session, sessions)
+        with stage("session"):
+            df, _ = filter_session(df, session, sessions)
     if period:
-        df = filter_period(df, period)
-
-    result = run_backtest(df, strategy, timeframe=timeframe)
-
-    return {
-        "model_response": _format_summary(result),
-        "result": result,
-    }
+        with stage("period"):
+            df = filter_period(df, period)
+    return df
 
 
 def _build_backtest_card(result: BacktestResult, title: str) -> dict:
@@ -245,99 +609,149 @@ def _build_backtest_card(result: BacktestResult, title: str) -> dict:
     ]
     if pnl_color:
         items[3]["color"] = pnl_color
-
-    metrics_block = {"type": "metrics-grid", "items": items}
-
-    # 2. area-chart — equity + drawdown
-    equity = 0.0
-    peak = 0.0
-    chart_data = []
-    for t in result.trades:
-        equity += t.pnl
-        peak = max(peak, equity)
-        chart_data.append(
+    r = result.robustness
+    if r is not None:
+        items.append(
             {
-                "date": str(t.exit_date),
-                "equity": round(equity, 2),
-                "drawdown": round(equity - peak, 2),
+                "label": f"P&L {r.confidence:.0%}",
+                "value": f"{r.total_pnl.low:+,.0f} … {r.total_pnl.high:+,.0f}",
             }
         )
+        items.append({"label": "P(loss)", "value": f"{r.prob_loss:.0%}"})
 
-    area_block = {
-        "type": "area-chart",
-        "x_key": "date",
-        "series": [
-            {"key": "equity", "label": "Equity", "style": "line"},
-            {"key": "drawdown", "label": "Drawdown", "style": "area", "color": "red"},
-        ],
-        "data": chart_data,
-    }
+    metrics_block = {"type": "metrics-grid", "items": items}
 
-    # 3. horizontal-bar — exit type breakdown
-    exits = defaultdict(lambda: {"pnl": 0.0, "count": 0, "wins": 0, "losses": 0})
-    for t in result.trades:
-        exits[t.exit_reason]["pnl"] += t.pnl
-        exits[t.exit_reason]["count"] += 1
-        if t.pnl > 0:
-            exits[t.exit_reason]["wins"] += 1
-        else:
-            exits[t.exit_reason]["losses"] += 1
+    # 2. area-chart — equity + drawdown
+    trades = result.trades
+    area_block = _equity_chart(trades)
 
+    # 3. horizontal-bar — exit type breakdown
+    exits = _exit_breakdown(trades)
     exit_items = [
         {
             "label": reason.replace("_", " ").title(),
-            "value": round(d["pnl"], 1),
-            "detail": f"{d['count']} trades (W:{d['wins']} L:{d['losses']})",
+            "value": round(pnl, 1),
+            "detail": f"{count} trades (W:{wins} L:{count - wins})",
         }
-        for reason, d in sorted(exits.items(), key=lambda x: x[1]["pnl"], reverse=True)
+        for reason, (pnl, count, wins) in sorted(exits.items(), key=lambda x: x[1][0], reverse=True)
     ]
 
     hbar_block = {"type": "horizontal-bar", "items": exit_items}
 
-    # 4. table — all trades
-    trade_rows = [
+    # 4. table — first page of trades, the rest behind a cursor
+    table_block = _paged_table(
         {
-            "entry_date": str(t.entry_date),
-            "exit_date": str(t.exit_date),
-            "direction": t.direction,
-            "entry_price": t.entry_price,
-            "exit_price": t.exit_price,
-            "pnl": round(t.pnl, 2),
-            "exit_reason": t.exit_reason,
-            "bars_held": t.bars_held,
+            "entry_date": np.datetime_as_string(trades.entry_date, unit="D"),
+            "exit_date": np.datetime_as_string(trades.exit_date, unit="D"),
+            "direction": np.where(trades.is_long, "long", "short"),
+            "entry_price": trades.entry_price,
+            "exit_price": trades.exit_price,
+            "pnl": trades.pnl.round(2),
+            "exit_reason": np.array(EXIT_REASONS)[trades.exit_reason],
+            "bars_held": trades.bars_held,
+            "mae": trades.mae.round(2),
+            "mfe": trades.mfe.round(2),
         }
-        for t in result.trades
-    ]
+    )
 
-    table_block = {
+    card_title = f"{title} · {m.total_trades} trades"
+    return {
+        "title": card_title,
+        "blocks": [metrics_block, area_block, hbar_block, table_block],
+    }
+
+
+def _paged_table(columns: dict[str, np.ndarray]) -> dict:
+    """table block of the first PAGE_SIZE rows; longer tables park all rows in RESULTS.
+
+    The rest comes via GET /api/results/{cursor}, like paginated query results.
+    """
+    total = len(next(iter(columns.values())))
+    first = [values[:PAGE_SIZE].tolist() for values in columns.values()]
+    block = {
         "type": "table",
-        "columns": [
-            "entry_date",
-            "exit_date",
-            "direction",
-            "entry_price",
-            "exit_price",
-            "pnl",
-            "exit_reason",
-            "bars_held",
+        "columns": list(columns),
+        "rows": [dict(zip(columns, row)) for row in zip(*first)],
+    }
+    if total > PAGE_SIZE:
+        block["cursor"] = RESULTS.put(pd.DataFrame(columns))
+        block["total_rows"] = total
+    return block
+
+
+def _equity_chart(trades: Trades, lines: dict[str, np.ndarray] | None = None) -> dict:
+    """area-chart block: equity and drawdown after each trade.
+
+    lines: more per-trade values to plot, {key: values}. Beyond _CHART_POINTS
+    trades the curve is downsampled (_chart_points).
+    """
+    equity = np.cumsum(trades.pnl)
+    drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0.0))
+    points = _chart_points(equity, drawdown)
+    columns = {
+        "date": _date_strings(trades.exit_date[points]),
+        "equity": equity[points].round(2).tolist(),
+        "drawdown": drawdown[points].round(2).tolist(),
+        **{key: values[points].round(2).tolist() for key, values in (lines or {}).items()},
+    }
+
+    return {
+        "type": "area-chart",
+        "x_key": "date",
+        "series": [
+            {"key": "equity", "label": "Equity", "style": "line"},
+            {"key": "drawdown", "label": "Drawdown", "style": "area", "color": "red"},
         ],
-        "rows": trade_rows,
+        "data": [dict(zip(columns, point)) for point in zip(*columns.values())],
     }
 
-    card_title = f"{title} · {m.total_trades} trades"
+
+def _chart_points(equity: np.ndarray, drawdown: np.ndarray) -> np.ndarray:
+    """Positions of the trades to plot: all, or at most _CHART_POINTS.
+
+    Downsampled curves keep the first and last trade and, in each of equal
+    spans, the equity low and high and the deepest drawdown — peaks and
+    max drawdown look as in the full curve.
+    """
+    n = len(equity)
+    if n <= _CHART_POINTS:
+        return np.arange(n)
+    edges = np.linspace(0, n, _CHART_POINTS // 3 + 1).astype(np.intp)
+    keep = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        keep += [
+            lo + int(equity[lo:hi].argmin()),
+            lo + int(equity[lo:hi].argmax()),
+            lo + int(drawdown[lo:hi].argmin()),
+        ]
+    return np.unique(keep)
+
+
+def _date_strings(dates: np.ndarray) -> list[str]:
+    """ISO dates (for JSON/SSE/Supabase)."""
+    return np.datetime_as_string(dates, unit="D").tolist()
+
+
+def _exit_breakdown(trades: Trades) -> dict[str, tuple[float, int, int]]:
+    """Exit reason → (P&L, trades, winning trades), for the reasons that occur."""
+    codes = trades.exit_reason
+    size = len(EXIT_REASONS)
+    pnl = np.bincount(codes, weights=trades.pnl, minlength=size)
+    count = np.bincount(codes, minlength=size)
+    wins = np.bincount(codes, weights=trades.pnl > 0, minlength=size)
     return {
-        "title": card_title,
-        "blocks": [metrics_block, area_block, hbar_block, table_block],
+        EXIT_REASONS[c]: (float(pnl[c]), int(count[c]), int(wins[c])) for c in np.flatnonzero(count)
     }
 
 
 def _format_summary(result: BacktestResult) -> str:
-    """Format backtest result into 5-line summary for model analysis."""
+    """Format backtest result into 6-line summary (+ bootstrap line) for model analysis."""
     m = result.metrics
 
     if m.total_trades == 0:
         return "Backtest: 0 trades — entry condition never triggered in this period."
 
+    trades = result.trades
     pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
     rf = f"{m.recovery_factor:.2f}" if m.recovery_factor != float("inf") else "inf"
 
@@ -349,7 +763,7 @@ def _format_summary(result: BacktestResult) -> str:
     )
 
     # Line 2: trade-level stats
-    sorted_pnls = sorted((t.pnl for t in result.trades), reverse=True)
+    sorted_pnls = np.sort(trades.pnl)[::-1]
     best = sorted_pnls[0]
     worst = sorted_pnls[-1]
     line2 = (
@@ -360,35 +774,340 @@ def _format_summary(result: BacktestResult) -> str:
     )
 
     # Line 3: yearly breakdown from trades
-    yearly = defaultdict(lambda: {"pnl": 0.0, "count": 0})
-    for t in result.trades:
-        year = t.entry_date.year if hasattr(t.entry_date, "year") else int(str(t.entry_date)[:4])
-        yearly[year]["pnl"] += t.pnl
-        yearly[year]["count"] += 1
-    parts = [f"{y} {d['pnl']:+.1f} ({d['count']})" for y, d in sorted(yearly.items())]
+    years, year_of = np.unique(trades.entry_date.astype("datetime64[Y]"), return_inverse=True)
+    yearly_pnl = np.bincount(year_of, weights=trades.pnl)
+    yearly_count = np.bincount(year_of)
+    parts = [
+        f"{y} {pnl:+.1f} ({count})"
+        for y, pnl, count in zip(years.astype(str), yearly_pnl, yearly_count)
+    ]
     line3 = f"By year: {' | '.join(parts)}"
 
     # Line 4: exit type P&L breakdown with win/loss counts
-    exits = defaultdict(lambda: {"pnl": 0.0, "count": 0, "wins": 0, "losses": 0})
-    for t in result.trades:
-        exits[t.exit_reason]["pnl"] += t.pnl
-        exits[t.exit_reason]["count"] += 1
-        if t.pnl > 0:
-            exits[t.exit_reason]["wins"] += 1
-        else:
-            exits[t.exit_reason]["losses"] += 1
     exit_parts = [
-        f"{r} {d['count']} (W:{d['wins']} L:{d['losses']}, {d['pnl']:+.1f})"
-        for r, d in sorted(exits.items())
+        f"{r} {count} (W:{wins} L:{count - wins}, {pnl:+.1f})"
+        for r, (pnl, count, wins) in sorted(_exit_breakdown(trades).items())
     ]
     line4 = f"Exits: {' | '.join(exit_parts)}"
 
     # Line 5: concentration — top 3 trades as % of total PnL
-    top3_pnl = sum(sorted_pnls[:3])
+    top3_pnl = sorted_pnls[:3].sum()
     if m.total_pnl != 0:
         top3_pct = abs(top3_pnl / m.total_pnl) * 100
         line5 = f"Top 3 trades: {top3_pnl:+.1f} pts ({top3_pct:.1f}% of total PnL)"
     else:
         line5 = f"Top 3 trades: {top3_pnl:+.1f} pts"
 
-    return f"{line1}\n{line2}\n{line3}\n{line4}\n{line5}"
+    # Line 6: excursions — how far winners went against, how far losers went for
+    winners = trades.pnl > 0
+    line6 = f"Excursions: avg MAE {m.avg_mae:.1f} | avg MFE {m.avg_mfe:.1f} pts"
+    if winners.any():
+        line6 += f" | Winners MAE p90 {np.percentile(trades.mae[winners], 90):.1f}"
+    if not winners.all():
+        line6 += f" | Losers MFE median {np.median(trades.mfe[~winners]):.1f}"
+
+    lines = [line1, line2, line3, line4, line5, line6]
+
+    # Line 7: Monte Carlo intervals (barb/backtest/robustness.py)
+    r = result.robustness
+    if r is not None:
+        pf_high = f"{r.profit_factor.high:.2f}" if r.profit_factor.high != float("inf") else "inf"
+        lines.append(
+            f"Bootstrap {r.confidence:.0%} ({r.samples}×): "
+            f"Total {r.total_pnl.low:+.1f}..{r.total_pnl.high:+.1f} | "
+            f"PF {r.profit_factor.low:.2f}..{pf_high} | "
+            f"WR {r.win_rate.low:.1f}..{r.win_rate.high:.1f}% | "
+            f"Max DD {r.max_drawdown.low:.1f}..{r.max_drawdown.high:.1f} "
+            f"(reshuffled {r.shuffled_max_drawdown.low:.1f}..{r.shuffled_max_drawdown.high:.1f}) | "
+            f"P(loss) {r.prob_loss:.0%}"
+        )
+
+    return "\n".join(lines)
+
+
+def _format_param(value) -> str:
+    return "off" if value is None else str(value)
+
+
+def _format_sweep(result: SweepResult) -> str:
+    """Ranked variants, one line each, best first."""
+    rows = result.rows
+    lines = [f"Sweep: {len(rows)} variants ranked by {result.sort_by}"]
+    for rank, row in enumerate(rows[:_SWEEP_SUMMARY_ROWS], 1):
+        m = row.metrics
+        params = ", ".join(f"{name}={_format_param(v)}" for name, v in row.params.items())
+        if m.total_trades == 0:
+            lines.append(f"{rank}. {params} | 0 trades")
+            continue
+        pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
+        lines.append(
+            f"{rank}. {params} | {m.total_trades} trades | WR {m.win_rate:.1f}% | PF {pf} | "
+            f"Total {m.total_pnl:+.1f} | Max DD {m.max_drawdown:.1f}"
+        )
+    if len(rows) > _SWEEP_SUMMARY_ROWS:
+        lines.append(f"... {len(rows) - _SWEEP_SUMMARY_ROWS} more variants")
+
+    pnls = sorted(row.metrics.total_pnl for row in rows)
+    median = pnls[len(pnls) // 2]
+    profitable = sum(pnl > 0 for pnl in pnls)
+    lines.append(f"Profitable: {profitable}/{len(rows)} | Median total {median:+.1f}")
+    return "\n".join(lines)
+
+
+def _build_sweep_card(result: SweepResult, title: str) -> dict:
+    """Build typed DataCard from SweepResult: one table row per variant, best first."""
+    rows = []
+    for row in result.rows:
+        m = row.metrics
+        pf = round(m.profit_factor, 2) if m.profit_factor != float("inf") else "inf"
+        rows.append(
+            {
+                **{name: _format_param(v) for name, v in row.params.items()},
+                "trades": m.total_trades,
+                "win_rate": round(m.win_rate, 1),
+                "pf": pf,
+                "total_pnl": round(m.total_pnl, 2),
+                "max_drawdown": round(m.max_drawdown, 2),
+                "expectancy": round(m.expectancy, 2),
+            }
+        )
+
+    table_block = {
+        "type": "table",
+        "columns": [
+            *result.fields,
+            "trades",
+            "win_rate",
+            "pf",
+            "total_pnl",
+            "max_drawdown",
+            "expectancy",
+        ],
+        "rows": rows,
+    }
+    return {"title": f"{title} · {len(rows)} variants", "blocks": [table_block]}
+
+
+def _format_params(params: dict) -> str:
+    return ", ".join(f"{name}={_format_param(v)}" for name, v in params.items()) or "as given"
+
+
+def _format_walk_forward(result: WalkForwardResult) -> str:
+    """Out-of-sample headline, efficiency and parameter stability, then one line per window."""
+    m = result.metrics
+    mode = "anchored" if result.anchored else "rolling"
+    pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
+    lines = [
+        f"Walk-forward ({mode}): {len(result.windows)} windows | "
+        f"OOS {m.total_trades} trades | Win Rate {m.win_rate:.1f}% | PF {pf} | "
+        f"Total {m.total_pnl:+.1f} pts | Max DD {m.max_drawdown:.1f} pts"
+    ]
+
+    efficiency = "n/a" if result.efficiency is None else f"{result.efficiency * 100:.0f}%"
+    losing = sum(w.test_metrics.total_pnl < 0 for w in result.windows)
+    lines.append(
+        f"Efficiency (OOS vs in-sample P&L per bar): {efficiency} | "
+        f"Losing test windows: {losing}/{len(result.windows)}"
+    )
+
+    if result.fields:
+        chosen = defaultdict(int)
+        for w in result.windows:
+            chosen[_format_params(w.params)] += 1
+        parts = [f"{params} ×{n}" for params, n in sorted(chosen.items(), key=lambda x: -x[1])]
+        lines.append(f"Chosen: {' | '.join(parts)}")
+
+    for w in result.windows:
+        lines.append(
+            f"{w.test_start}..{w.test_end}: {_format_params(w.params)} | "
+            f"IS {w.train_metrics.total_pnl:+.1f} ({w.train_metrics.total_trades}) | "
+            f"OOS {w.test_metrics.total_pnl:+.1f} ({w.test_metrics.total_trades})"
+        )
+    return "\n".join(lines)
+
+
+def _build_walk_forward_card(result: WalkForwardResult, title: str) -> dict:
+    """Build typed DataCard from WalkForwardResult.
+
+    Returns {title, blocks: [metrics-grid, area-chart (stitched OOS equity), table (windows)]}.
+    """
+    m = result.metrics
+    pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
+    efficiency = "n/a" if result.efficiency is None else f"{result.efficiency * 100:.0f}%"
+    items = [
+        {"label": "Windows", "value": str(len(result.windows))},
+        {"label": "OOS Trades", "value": str(m.total_trades)},
+        {"label": "Win Rate", "value": f"{m.win_rate:.1f}%"},
+        {"label": "PF", "value": pf},
+        {"label": "OOS P&L", "value": f"{m.total_pnl:+,.1f}"},
+        {"label": "Max DD", "value": f"{m.max_drawdown:,.1f}"},
+        {"label": "Efficiency", "value": efficiency},
+    ]
+    if m.total_pnl:
+        items[4]["color"] = "green" if m.total_pnl > 0 else "red"
+
+    rows = [
+        {
+            "test_start": str(w.test_start),
+            "test_end": str(w.test_end),
+            **{name: _format_param(v) for name, v in w.params.items()},
+            "is_pnl": round(w.train_metrics.total_pnl, 2),
+            "oos_trades": w.test_metrics.total_trades,
+            "oos_win_rate": round(w.test_metrics.win_rate, 1),
+            "oos_pnl": round(w.test_metrics.total_pnl, 2),
+        }
+        for w in result.windows
+    ]
+    table_block = {
+        "type": "table",
+        "columns": [
+            "test_start",
+            "test_end",
+            *result.fields,
+            "is_pnl",
+            "oos_trades",
+            "oos_win_rate",
+            "oos_pnl",
+        ],
+        "rows": rows,
+    }
+
+    return {
+        "title": f"{title} · {len(result.windows)} windows",
+        "blocks": [
+            {"type": "metrics-grid", "items": items},
+            _equity_chart(result.trades),
+            table_block,
+        ],
+    }
+
+
+def _format_portfolio(result: PortfolioResult, unit: str) -> str:
+    """Portfolio headline, then one line per instrument, largest contribution first."""
+    m = result.metrics
+    lines = []
+    if m.total_trades == 0:
+        lines.append(
+            f"Portfolio: {len(result.legs)} instruments | 0 trades — "
+            "entry condition never triggered in this period."
+        )
+    else:
+        pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
+        lines.append(
+            f"Portfolio: {len(result.legs)} instruments | {m.total_trades} trades | "
+            f"Win Rate {m.win_rate:.1f}% | PF {pf} | "
+            f"Total {m.total_pnl:+,.1f} {unit} | Max DD {m.max_drawdown:,.1f} {unit}"
+        )
+        profitable = sum(leg.pnl > 0 for leg in result.legs)
+        single_dd = sum(leg.metrics.max_drawdown * leg.point_value for leg in result.legs)
+        lines.append(
+            f"Profitable instruments: {profitable}/{len(result.legs)} | "
+            f"Sum of single-instrument Max DD: {single_dd:,.1f} {unit}"
+        )
+        r = result.robustness
+        if r is not None:
+            lines.append(
+                f"Bootstrap {r.confidence:.0%} ({r.samples}×): "
+                f"Total {r.total_pnl.low:+,.1f}..{r.total_pnl.high:+,.1f} {unit} | "
+                f"P(loss) {r.prob_loss:.0%}"
+            )
+
+    for leg in sorted(result.legs, key=lambda leg: -leg.pnl):
+        lm = leg.metrics
+        if lm.total_trades == 0:
+            lines.append(f"{leg.symbol}: 0 trades")
+            continue
+        pf = f"{lm.profit_factor:.2f}" if lm.profit_factor != float("inf") else "inf"
+        share = f" ({leg.pnl / m.total_pnl:.0%} of total)" if m.total_pnl else ""
+        money = f" = {leg.pnl:+,.1f} {unit}" if unit != "pts" else ""
+        lines.append(
+            f"{leg.symbol}: {lm.total_trades} trades | WR {lm.win_rate:.1f}% | PF {pf} | "
+            f"{lm.total_pnl:+.1f} pts{money}{share}"
+        )
+    if result.missing:
+        lines.append(f"No data (skipped): {', '.join(result.missing)}")
+    return "\n".join(lines)
+
+
+def _build_portfolio_card(result: PortfolioResult, title: str) -> dict:
+    """Build typed DataCard from PortfolioResult.
+
+    Returns {title, blocks: [metrics-grid, area-chart (equity + per-instrument
+    contributions), table (instruments)]}.
+    """
+    m = result.metrics
+    pf = f"{m.profit_factor:.2f}" if m.profit_factor != float("inf") else "inf"
+    items = [
+        {"label": "Instruments", "value": str(len(result.legs))},
+        {"label": "Trades", "value": str(m.total_trades)},
+        {"label": "Win Rate", "value": f"{m.win_rate:.1f}%"},
+        {"label": "PF", "value": pf},
+        {"label": "Total P&L", "value": f"{m.total_pnl:+,.1f}"},
+        {"label": "Max DD", "value": f"{m.max_drawdown:,.1f}"},
+    ]
+    if m.total_pnl:
+        items[4]["color"] = "green" if m.total_pnl > 0 else "red"
+    r = result.robustness
+    if r is not None:
+        items.append(
+            {
+                "label": f"P&L {r.confidence:.0%}",
+                "value": f"{r.total_pnl.low:+,.0f} … {r.total_pnl.high:+,.0f}",
+            }
+        )
+        items.append({"label": "P(loss)", "value": f"{r.prob_loss:.0%}"})
+
+    # Equity + cumulative contribution of the largest legs after each trade
+    charted = sorted(result.legs, key=lambda leg: -abs(leg.pnl))[:_PORTFOLIO_CHART_LEGS]
+    charted = [leg.symbol for leg in charted if len(leg.trades)]
+    symbols = np.array(result.symbols, dtype=object)
+    contributions = {
+        symbol: np.cumsum(np.where(symbols == symbol, result.trades.pnl, 0.0)) for symbol in charted
+    }
+    chart = _equity_chart(result.trades, contributions)
+    chart["series"] += [{"key": s, "label": s, "style": "line"} for s in charted]
+
+    rows = [
+        {
+            "instrument": leg.symbol,
+            "trades": leg.metrics.total_trades,
+            "win_rate": round(leg.metrics.win_rate, 1),
+            "pf": (
+                round(leg.metrics.profit_factor, 2)
+                if leg.metrics.profit_factor != float("inf")
+                else "inf"
+            ),
+            "total_pts": round(leg.metrics.total_pnl, 2),
+            "point_value": leg.point_value,
+            "pnl": round(leg.pnl, 2),
+            "share": round(leg.pnl / m.total_pnl * 100, 1) if m.total_pnl else None,
+        }
+        for leg in sorted(result.legs, key=lambda leg: -leg.pnl)
+    ]
+    table_block = {
+        "type": "table",
+        "columns": [
+            "instrument",
+            "trades",
+            "win_rate",
+            "pf",
+            "total_pts",
+            "point_value",
+            "pnl",
+            "share",
+        ],
+        "rows": rows,
+    }
+
+    return {
+        "title": f"{title} · {len(result.legs)} instruments",
+        "blocks": [{"type": "metrics-grid", "items": items}, chart, table_block],
+    }
+
+
+_CARD_BUILDERS = {
+    "run_backtest": _build_backtest_card,
+    "run_backtest_sweep": _build_sweep_card,
+    "run_walk_forward": _build_walk_forward_card,
+    "run_portfolio_backtest": _build_portfolio_card,
+}
@@ -1,6 +1,15 @@
 """Backtest engine for trading strategies."""
 
 from barb.backtest.engine import run_backtest
+from barb.backtest.portfolio import run_portfolio_backtest
 from barb.backtest.strategy import Strategy
+from barb.backtest.sweep import run_backtest_sweep
+from barb.backtest.walkforward import run_walk_forward
 
-__all__ = ["Strategy", "run_backtest"]
+__all__ = [
+    "Strategy",
+    "run_backtest",
+    "run_backtest_sweep",
+    "run_portfolio_backtest",
+    "run_walk_forward",
+]
@@ -1,29 +1,39 @@
 """Core backtest engine — simulates trades on historical data."""
 
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
 import numpy as np
 import pandas as pd
 
+from barb.backtest import kernel
 from barb.backtest.metrics import (
     BacktestResult,
-    Trade,
+    Trades,
     build_equity_curve,
     calculate_metrics,
 )
-from barb.backtest.strategy import Strategy, resolve_level
+from barb.backtest.robustness import trade_robustness
+from barb.backtest.strategy import Strategy
+from barb.deadline import check
 from barb.expressions import evaluate
 from barb.functions import FUNCTIONS
 from barb.ops import BarbError, resample
+from barb.profile import profiling, stage
 
 # Allowed timeframes for backtesting.
-# 1m excluded: resample is no-op, millions of bars, minute exit resolution pointless.
 # weekly+ excluded: too few bars, exit_bars semantics absurd.
-_BACKTEST_TIMEFRAMES = {"5m", "15m", "30m", "1h", "2h", "4h", "daily"}
+_BACKTEST_TIMEFRAMES = {"1m", "5m", "15m", "30m", "1h", "2h", "4h", "daily"}
+
+# Bars simulated between deadline checks
+_CHUNK_BARS = 4096
 
 
 def run_backtest(
     df: pd.DataFrame,
     strategy: Strategy,
     timeframe: str = "daily",
+    profile: bool = False,
 ) -> BacktestResult:
     """Run a backtest on historical data.
 
@@ -32,10 +42,46 @@ def run_backtest(
             Can be minute-level (will be resampled) or already at target timeframe.
         strategy: Strategy definition
         timeframe: Bar timeframe for simulation ("daily", "1h", "15m", etc.)
+        profile: Add metadata["profile"] with wall time and peak memory per
+            stage (see barb/profile.py).
 
     Returns:
-        BacktestResult with trades, metrics, and equity curve
+        BacktestResult with trades, metrics, equity curve and Monte Carlo
+        robustness intervals
     """
+    with profiling(profile) as profiler:
+        result = _run_backtest(df, strategy, timeframe)
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+    return result
+
+
+def _run_backtest(df: pd.DataFrame, strategy: Strategy, timeframe: str) -> BacktestResult:
+    _check_direction(strategy)
+    prepared = _prepare(df, strategy.entry, timeframe, [strategy.exit_target])
+    if prepared is None:
+        trades = Trades.from_trades([])
+        return BacktestResult(trades=trades, metrics=calculate_metrics(trades), equity_curve=[])
+
+    # Simulate trades
+    with stage("simulate"):
+        trades = _simulate(prepared, strategy)
+
+    # Calculate metrics
+    with stage("metrics"):
+        metrics = calculate_metrics(trades)
+        equity = build_equity_curve(trades)
+
+    # Confidence intervals from resampled trades (barb/backtest/robustness.py)
+    with stage("robustness"):
+        robustness = trade_robustness(trades.pnl)
+
+    return BacktestResult(
+        trades=trades, metrics=metrics, equity_curve=equity, robustness=robustness
+    )
+
+
+def _check_direction(strategy: Strategy):
     if strategy.direction not in ("long", "short"):
         raise BarbError(
             f"Invalid direction '{strategy.direction}'. Must be 'long' or 'short'",
@@ -43,6 +89,44 @@ def run_backtest(
             step="backtest",
         )
 
+
+@dataclass(frozen=True)
+class _Prepared:
+    """Everything a simulation needs that depends only on data, timeframe and entry."""
+
+    bars: pd.DataFrame
+    entry_mask: pd.Series
+    minute_index: "_MinuteIndex | None"
+    # exit_target expression → its values on every bar
+    targets: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def exit_target(self, expression: str) -> np.ndarray:
+        """Values of an exit_target expression on every bar, evaluated once.
+
+        Over the full bar series: indicators warm up on the whole history,
+        so values match run_query, and every variant and window of a sweep
+        or walk-forward reads the same series.
+        """
+        values = self.targets.get(expression)
+        if values is None:
+            with stage("exit_target"):
+                result = evaluate(expression, self.bars, FUNCTIONS)
+            if isinstance(result, pd.Series):
+                values = result.to_numpy(dtype=np.float64)
+            else:
+                values = np.full(len(self.bars), float(result))
+            self.targets[expression] = values
+        return values
+
+
+def _prepare(
+    df: pd.DataFrame, entry: str, timeframe: str, exit_targets: Iterable[str | None] = ()
+) -> _Prepared | None:
+    """Resample, minute index, entry mask and exit targets.
+
+    exit_targets: expressions of the strategies to simulate (None = no
+    target), evaluated here once each. None if there is nothing to simulate.
+    """
     if timeframe not in _BACKTEST_TIMEFRAMES:
         raise BarbError(
             f"Unsupported timeframe '{timeframe}'. "
@@ -52,446 +136,222 @@ def run_backtest(
         )
 
     if df.empty:
-        return BacktestResult(trades=[], metrics=calculate_metrics([]), equity_curve=[])
+        return None
 
     # Resample to target timeframe (no-op if already at that resolution)
-    bars = resample(df, timeframe)
+    with stage("from"):
+        bars = resample(df, timeframe)
 
     if len(bars) < 2:
-        return BacktestResult(trades=[], metrics=calculate_metrics([]), equity_curve=[])
+        return None
 
     # Map each bar to its minute-level data for precise exit resolution.
     # For daily data passed directly, each bar maps to itself (1 row).
-    minute_by_bar = _build_minute_index(df, bars)
+    # At 1m the bars are the minutes: exits are checked on the bar itself.
+    with stage("minute_index"):
+        minute_index = None if timeframe == "1m" else _build_minute_index(df, bars)
 
     # Evaluate entry condition on all bars
-    entry_mask = evaluate(strategy.entry, bars, FUNCTIONS)
-    if isinstance(entry_mask, pd.Series):
-        entry_mask = entry_mask.fillna(False).astype(bool)
-    else:
-        entry_mask = pd.Series(bool(entry_mask), index=bars.index)
+    with stage("entry"):
+        entry_mask = evaluate(entry, bars, FUNCTIONS)
+        if isinstance(entry_mask, pd.Series):
+            entry_mask = entry_mask.fillna(False).astype(bool)
+        else:
+            entry_mask = pd.Series(bool(entry_mask), index=bars.index)
 
-    # Simulate trades
-    trades = _simulate(bars, entry_mask, strategy, minute_by_bar)
+    prepared = _Prepared(bars=bars, entry_mask=entry_mask, minute_index=minute_index)
+    for expression in dict.fromkeys(exit_targets):
+        if expression is not None:
+            prepared.exit_target(expression)
+    return prepared
 
-    # Calculate metrics
-    metrics = calculate_metrics(trades)
-    equity = build_equity_curve(trades)
 
-    return BacktestResult(trades=trades, metrics=metrics, equity_curve=equity)
+@dataclass(frozen=True)
+class _MinuteIndex:
+    """Minute bars of every simulation bar, as offsets into contiguous arrays.
 
+    Bar i covers rows starts[i]:ends[i] of high/low. Slices are views:
+    memory is the two price arrays plus two offsets per bar.
+    """
 
-def _build_minute_index(minutes: pd.DataFrame, bars: pd.DataFrame) -> dict[int, pd.DataFrame]:
-    """Map bar index → minute-level data for exit resolution.
+    high: np.ndarray
+    low: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
 
-    Uses searchsorted on sorted DatetimeIndex — O(m log n) where
-    m = len(minutes), n = len(bars).
-    """
-    if minutes.empty or bars.empty:
-        return {}
 
-    # For each minute row, find which bar it belongs to
-    indices = bars.index.searchsorted(minutes.index, side="right") - 1
+def _build_minute_index(minutes: pd.DataFrame, bars: pd.DataFrame) -> _MinuteIndex | None:
+    """Map bar index → minute-level rows for exit resolution.
 
-    # Group by bar index
-    result = {}
-    unique_indices = np.unique(indices)
-    for idx in unique_indices:
-        if 0 <= idx < len(bars):
-            mask = indices == idx
-            result[int(idx)] = minutes[mask]
+    One searchsorted of the bar starts into the (sorted) minute timestamps:
+    bar i owns the minutes in [bars[i], bars[i + 1]). Minutes before the
+    first bar belong to none.
+    """
+    if minutes.empty or bars.empty:
+        return None
 
-    return result
+    starts = minutes.index.searchsorted(bars.index, side="left")
+    ends = np.append(starts[1:], len(minutes))
+    return _MinuteIndex(
+        high=minutes["high"].to_numpy(dtype=np.float64),
+        low=minutes["low"].to_numpy(dtype=np.float64),
+        starts=starts,
+        ends=ends,
+    )
 
 
 def _simulate(
-    bars: pd.DataFrame,
-    entry_mask: pd.Series,
+    prepared: _Prepared,
     strategy: Strategy,
-    minute_by_bar: dict[int, pd.DataFrame] | None = None,
-) -> list[Trade]:
-    """Bar-by-bar simulation loop.
+    start: int = 0,
+    stop: int | None = None,
+) -> Trades:
+    """Bar-by-bar simulation loop (barb/backtest/kernel.py).
 
     Uses minute bars for precise exit resolution when available.
-    Falls back to daily bar checks (conservative assumption) otherwise.
+    Falls back to bar checks (conservative assumption) otherwise.
+
+    Bars stream through the kernel _CHUNK_BARS at a time with the position
+    state carried over, so working memory (and, without numba, the Python
+    lists of bar values) is bounded by the chunk — not by millions of 1m bars.
+
+    start/stop limit the simulation to bars start..stop-1, as if the data
+    ended there (an open trade closes on the last bar), while indicators
+    keep the history before start. A signal on bar start-1 enters on start.
     """
-    trades = []
-    in_position = False
-    entry_price = 0.0
-    entry_date = None
-    entry_bar_idx = 0
-    stop_price = None
-    target_price = None
-    tp_price = None
-    trail_points = None
-    best_price = None
-    stop_reason = "stop"
-    breakeven_activated = False
-    is_long = strategy.direction == "long"
-    if minute_by_bar is None:
-        minute_by_bar = {}
-
-    for i in range(len(bars)):
-        bar = bars.iloc[i]
-        bar_date = bars.index[i]
-
-        if in_position:
-            bars_held = i - entry_bar_idx
-
-            # Breakeven: after N bars, if in profit, move stop to entry
-            if (
-                strategy.breakeven_bars is not None
-                and not breakeven_activated
-                and bars_held >= strategy.breakeven_bars
-            ):
-                in_profit = bar["open"] > entry_price if is_long else bar["open"] < entry_price
-                if in_profit:
-                    stop_price = entry_price
-                    stop_reason = "breakeven"
-                    breakeven_activated = True
-
-            # Use minute bars for precise exit, fall back to bar-level check
-            bar_minutes = minute_by_bar.get(i)
-            exit_price, exit_reason, best_price = _resolve_exit(
-                bar,
-                bar_minutes,
-                is_long,
-                stop_price,
-                tp_price,
-                target_price,
-                strategy.exit_bars,
-                bars_held,
-                trail_points,
-                best_price,
-                stop_reason,
-            )
-
-            # End of data — force close
-            if exit_price is None and i == len(bars) - 1:
-                exit_price = bar["close"]
-                exit_reason = "end"
-
-            if exit_price is not None:
-                trades.append(
-                    _build_trade(
-                        entry_date,
-                        bar_date,
-                        entry_price,
-                        exit_price,
-                        strategy,
-                        is_long,
-                        bars_held,
-                        exit_reason,
-                    )
-                )
-                in_position = False
-
-        elif i > 0 and entry_mask.iloc[i - 1]:
-            # Signal on previous bar → enter on this bar's open
-            entry_price = bar["open"]
-            entry_date = bar_date
-            entry_bar_idx = i
-
-            # Apply slippage to entry
-            if is_long:
-                entry_price += strategy.slippage
-            else:
-                entry_price -= strategy.slippage
-
-            # Calculate stop/target prices
-            stop_price = _calc_stop(entry_price, strategy, is_long)
-            tp_price = _calc_take_profit(entry_price, strategy, is_long)
-            target_price = _calc_exit_target(bars, i - 1, strategy)
-
-            # Initialize trailing stop
-            trail_points = None
-            best_price = None
-            if strategy.trailing_stop is not None:
-                trail_points = resolve_level(strategy.trailing_stop, entry_price)
-                best_price = entry_price
-
-            # Reset breakeven state
-            stop_reason = "stop"
-            breakeven_activated = False
-
-            in_position = True
-
-            # Check if exit happens on the same bar we entered
-            bar_minutes = minute_by_bar.get(i)
-            exit_price, exit_reason, best_price = _resolve_exit(
-                bar,
-                bar_minutes,
-                is_long,
-                stop_price,
-                tp_price,
-                target_price,
-                strategy.exit_bars,
-                0,
-                trail_points,
-                best_price,
-                stop_reason,
-            )
-
-            if exit_price is not None:
-                trades.append(
-                    _build_trade(
-                        entry_date,
-                        bar_date,
-                        entry_price,
-                        exit_price,
-                        strategy,
-                        is_long,
-                        0,
-                        exit_reason,
-                    )
-                )
-                in_position = False
-
-    return trades
-
-
-def _build_trade(
-    entry_date,
-    exit_date_raw,
-    entry_price: float,
-    exit_price: float,
-    strategy: Strategy,
-    is_long: bool,
-    bars_held: int,
-    exit_reason: str,
-) -> Trade:
-    """Create Trade with slippage and P&L calculation."""
-    # Apply slippage to exit
-    if is_long:
-        exit_price -= strategy.slippage
+    bars, entry_mask, minute_index = prepared.bars, prepared.entry_mask, prepared.minute_index
+    stop = len(bars) if stop is None else stop
+    columns = [
+        bars["open"].to_numpy(dtype=np.float64),
+        bars["high"].to_numpy(dtype=np.float64),
+        bars["low"].to_numpy(dtype=np.float64),
+        bars["close"].to_numpy(dtype=np.float64),
+        entry_mask.to_numpy(dtype=bool),
+        _exit_targets(prepared, strategy, max(start - 1, 0), stop),
+    ]
+    rules = _rules(strategy)
+    state = kernel.new_state()
+    rows = np.empty((_CHUNK_BARS, kernel.N_TRADE))
+    found = [rows[:0].copy()]
+
+    for begin in range(start, stop, _CHUNK_BARS):
+        check("simulate")
+        end = min(begin + _CHUNK_BARS, stop)
+        # The bar before the chunk carries the entry signal for its first bar
+        base = max(begin - 1, 0)
+        chunk = [column[base:end] for column in columns]
+        minute_high, minute_low, starts, ends = _chunk_minutes(minute_index, base, end)
+        if not kernel.JIT:
+            # Plain Python indexes lists of floats much faster than arrays.
+            # Per-bar values only: the chunk's minutes stay arrays, and
+            # kernel.exit_in_span converts one bar's span at a time.
+            chunk = [a.tolist() for a in chunk]
+            starts, ends = starts.tolist(), ends.tolist()
+        count = kernel.simulate_bars(
+            *chunk,
+            minute_high,
+            minute_low,
+            starts,
+            ends,
+            rules,
+            state,
+            rows,
+            base,
+            begin - base,
+            stop - 1,
+        )
+        found.append(rows[:count].copy())
+
+    rows = np.concatenate(found)
+    entries = rows[:, kernel.TRADE_ENTRY].astype(np.intp)
+    exits = rows[:, kernel.TRADE_EXIT].astype(np.intp)
+    entry_price = rows[:, kernel.TRADE_ENTRY_PRICE]
+    # Exit slippage and commission
+    if strategy.direction == "long":
+        exit_price = rows[:, kernel.TRADE_EXIT_PRICE] - strategy.slippage
         pnl = exit_price - entry_price
     else:
-        exit_price += strategy.slippage
+        exit_price = rows[:, kernel.TRADE_EXIT_PRICE] + strategy.slippage
         pnl = entry_price - exit_price
-
     pnl -= strategy.commission
 
-    return Trade(
-        entry_date=entry_date.date() if hasattr(entry_date, "date") else entry_date,
-        entry_price=round(entry_price, 4),
-        exit_date=exit_date_raw.date() if hasattr(exit_date_raw, "date") else exit_date_raw,
-        exit_price=round(exit_price, 4),
-        direction=strategy.direction,
-        pnl=round(pnl, 4),
-        exit_reason=exit_reason,
-        bars_held=bars_held,
+    return Trades(
+        entry_date=_bar_dates(bars.index, entries),
+        entry_price=entry_price.round(4),
+        exit_date=_bar_dates(bars.index, exits),
+        exit_price=exit_price.round(4),
+        is_long=np.full(len(rows), strategy.direction == "long"),
+        pnl=pnl.round(4),
+        exit_reason=rows[:, kernel.TRADE_REASON].astype(np.int8),
+        bars_held=(exits - entries).astype(np.int64),
+        mae=rows[:, kernel.TRADE_MAE].round(4),
+        mfe=rows[:, kernel.TRADE_MFE].round(4),
     )
 
 
-def _resolve_exit(
-    daily_bar: pd.Series,
-    day_minutes: pd.DataFrame | None,
-    is_long: bool,
-    stop_price: float | None,
-    tp_price: float | None,
-    target_price: float | None,
-    exit_bars: int | None,
-    bars_held: int,
-    trail_points: float | None = None,
-    best_price: float | None = None,
-    stop_reason: str = "stop",
-) -> tuple[float | None, str | None, float | None]:
-    """Find exit using minute bars if available, otherwise daily bar.
-
-    Returns (exit_price, exit_reason, best_price). best_price tracks the
-    furthest favorable price for trailing stop calculation.
-    """
-    # Price-based exits: use minute bars when available
-    if day_minutes is not None and len(day_minutes) > 0:
-        exit_price, exit_reason, best_price = _find_exit_in_minutes(
-            day_minutes,
-            is_long,
-            stop_price,
-            tp_price,
-            target_price,
-            trail_points,
-            best_price,
-            stop_reason,
-        )
-    else:
-        exit_price, exit_reason, best_price = _check_exit_levels(
-            daily_bar,
-            is_long,
-            stop_price,
-            tp_price,
-            target_price,
-            trail_points,
-            best_price,
-            stop_reason,
-        )
-
-    if exit_price is not None:
-        return exit_price, exit_reason, best_price
-
-    # Timeout — bar-level concept (exit_bars counts bars at chosen timeframe)
-    if exit_bars is not None and bars_held >= exit_bars:
-        return daily_bar["close"], "timeout", best_price
-
-    return None, None, best_price
+def _bar_dates(index: pd.Index, positions: np.ndarray) -> np.ndarray:
+    """Trade dates of bars as datetime64[D] (wall-clock date for a tz-aware index)."""
+    taken = index[positions]
+    if isinstance(taken, pd.DatetimeIndex):
+        taken = taken.tz_localize(None) if taken.tz is not None else taken
+        return taken.to_numpy().astype("datetime64[D]")
+    return np.asarray(taken, dtype="datetime64[D]")
+
+
+def _chunk_minutes(minute_index: _MinuteIndex | None, base: int, end: int) -> list[np.ndarray]:
+    """Minute high/low of bars base..end-1 and their spans, rebased to the slice."""
+    if minute_index is None:
+        empty = np.empty(0)
+        no_span = np.zeros(end - base, dtype=np.int64)
+        return [empty, empty, no_span, no_span]
+    lo = minute_index.starts[base]
+    hi = minute_index.ends[end - 1]
+    return [
+        minute_index.high[lo:hi],
+        minute_index.low[lo:hi],
+        minute_index.starts[base:end] - lo,
+        minute_index.ends[base:end] - lo,
+    ]
+
+
+def _rules(strategy: Strategy) -> np.ndarray:
+    """Strategy exits as kernel rule slots."""
+    rules = np.full(kernel.N_RULES, np.nan)
+    rules[kernel.RULE_LONG] = 1 if strategy.direction == "long" else 0
+    for slot, pct_slot, value in (
+        (kernel.RULE_STOP, kernel.RULE_STOP_PCT, strategy.stop_loss),
+        (kernel.RULE_TAKE_PROFIT, kernel.RULE_TAKE_PROFIT_PCT, strategy.take_profit),
+        (kernel.RULE_TRAIL, kernel.RULE_TRAIL_PCT, strategy.trailing_stop),
+    ):
+        if value is None:
+            continue
+        is_pct = isinstance(value, str) and value.endswith("%")
+        rules[slot] = float(value.rstrip("%")) if is_pct else float(value)
+        rules[pct_slot] = 1 if is_pct else 0
+    rules[kernel.RULE_EXIT_BARS] = -1 if strategy.exit_bars is None else strategy.exit_bars
+    rules[kernel.RULE_BREAKEVEN_BARS] = (
+        -1 if strategy.breakeven_bars is None else strategy.breakeven_bars
+    )
+    rules[kernel.RULE_SLIPPAGE] = strategy.slippage
+    return rules
 
 
-def _find_exit_in_minutes(
-    minutes: pd.DataFrame,
-    is_long: bool,
-    stop_price: float | None,
-    tp_price: float | None,
-    target_price: float | None,
-    trail_points: float | None = None,
-    best_price: float | None = None,
-    stop_reason: str = "stop",
-) -> tuple[float | None, str | None, float | None]:
-    """Walk minute bars chronologically to find first exit trigger.
+def _exit_targets(
+    prepared: _Prepared,
+    strategy: Strategy,
+    start: int = 0,
+    stop: int | None = None,
+) -> np.ndarray:
+    """Exit target price fixed at each signal bar in start..stop-1, NaN where there is none.
 
-    When trailing stop is active, best_price is updated each bar and the
-    trailing stop level follows. The effective stop is the tighter of
-    fixed stop_price and trailing stop (fixed acts as floor).
+    Read from the expression's values on the full series (_Prepared.exit_target).
     """
-    for _, bar in minutes.iterrows():
-        # Update trailing stop from this bar's favorable price
-        if trail_points is not None and best_price is not None:
-            if is_long:
-                best_price = max(best_price, bar["high"])
-                trail_stop = best_price - trail_points
-            else:
-                best_price = min(best_price, bar["low"])
-                trail_stop = best_price + trail_points
-            effective_stop, is_trailing = _pick_tighter_stop(stop_price, trail_stop, is_long)
-        else:
-            effective_stop = stop_price
-            is_trailing = False
-
-        # Stop loss (fixed/breakeven or trailing)
-        if effective_stop is not None:
-            if is_long and bar["low"] <= effective_stop:
-                reason = "trailing_stop" if is_trailing else stop_reason
-                return effective_stop, reason, best_price
-            if not is_long and bar["high"] >= effective_stop:
-                reason = "trailing_stop" if is_trailing else stop_reason
-                return effective_stop, reason, best_price
-
-        # Take profit
-        if tp_price is not None:
-            if is_long and bar["high"] >= tp_price:
-                return tp_price, "take_profit", best_price
-            if not is_long and bar["low"] <= tp_price:
-                return tp_price, "take_profit", best_price
-
-        # Exit target
-        if target_price is not None:
-            if is_long and bar["high"] >= target_price:
-                return target_price, "target", best_price
-            if not is_long and bar["low"] <= target_price:
-                return target_price, "target", best_price
-
-    return None, None, best_price
-
-
-def _check_exit_levels(
-    bar: pd.Series,
-    is_long: bool,
-    stop_price: float | None,
-    tp_price: float | None,
-    target_price: float | None,
-    trail_points: float | None = None,
-    best_price: float | None = None,
-    stop_reason: str = "stop",
-) -> tuple[float | None, str | None, float | None]:
-    """Check price-based exit levels on a single bar (daily fallback).
-
-    Used when minute data is not available. Conservative assumption:
-    stop checked before take-profit (pessimistic).
-    """
-    # Update trailing stop from this bar
-    if trail_points is not None and best_price is not None:
-        if is_long:
-            best_price = max(best_price, bar["high"])
-            trail_stop = best_price - trail_points
-        else:
-            best_price = min(best_price, bar["low"])
-            trail_stop = best_price + trail_points
-        effective_stop, is_trailing = _pick_tighter_stop(stop_price, trail_stop, is_long)
-    else:
-        effective_stop = stop_price
-        is_trailing = False
-
-    # 1. Stop loss (fixed/breakeven or trailing)
-    if effective_stop is not None:
-        if is_long and bar["low"] <= effective_stop:
-            reason = "trailing_stop" if is_trailing else stop_reason
-            return effective_stop, reason, best_price
-        if not is_long and bar["high"] >= effective_stop:
-            reason = "trailing_stop" if is_trailing else stop_reason
-            return effective_stop, reason, best_price
-
-    # 2. Take profit
-    if tp_price is not None:
-        if is_long and bar["high"] >= tp_price:
-            return tp_price, "take_profit", best_price
-        if not is_long and bar["low"] <= tp_price:
-            return tp_price, "take_profit", best_price
-
-    # 3. Exit target (fixed price from expression)
-    if target_price is not None:
-        if is_long and bar["high"] >= target_price:
-            return target_price, "target", best_price
-        if not is_long and bar["low"] <= target_price:
-            return target_price, "target", best_price
-
-    return None, None, best_price
-
-
-def _pick_tighter_stop(
-    fixed_stop: float | None,
-    trail_stop: float,
-    is_long: bool,
-) -> tuple[float, bool]:
-    """Return (effective_stop, is_trailing).
-
-    Picks whichever stop is tighter (closer to current price).
-    For long: higher stop = tighter. For short: lower stop = tighter.
-    """
-    if fixed_stop is None:
-        return trail_stop, True
-    if is_long:
-        if trail_stop >= fixed_stop:
-            return trail_stop, True
-        return fixed_stop, False
-    else:
-        if trail_stop <= fixed_stop:
-            return trail_stop, True
-        return fixed_stop, False
-
-
-def _calc_stop(entry_price: float, strategy: Strategy, is_long: bool) -> float | None:
-    """Calculate absolute stop price."""
-    if strategy.stop_loss is None:
-        return None
-    points = resolve_level(strategy.stop_loss, entry_price)
-    return entry_price - points if is_long else entry_price + points
-
-
-def _calc_take_profit(entry_price: float, strategy: Strategy, is_long: bool) -> float | None:
-    """Calculate absolute take profit price."""
-    if strategy.take_profit is None:
-        return None
-    points = resolve_level(strategy.take_profit, entry_price)
-    return entry_price + points if is_long else entry_price - points
-
-
-def _calc_exit_target(daily: pd.DataFrame, signal_bar_idx: int, strategy: Strategy) -> float | None:
-    """Evaluate exit_target expression on the signal bar → fixed price."""
+    targets = np.full(len(prepared.bars), np.nan)
     if strategy.exit_target is None:
-        return None
-    # Evaluate on signal bar with enough history for indicators
-    end = signal_bar_idx + 1
-    start = max(0, end - 200)  # 200 bars of history for indicators
-    context = daily.iloc[start:end]
-    result = evaluate(strategy.exit_target, context, FUNCTIONS)
-    if isinstance(result, pd.Series):
-        return float(result.iloc[-1])
-    return float(result)
+        return targets
+    stop = len(prepared.bars) if stop is None else stop
+    # Only signals with a next bar to enter on
+    signals = np.flatnonzero(prepared.entry_mask.to_numpy(dtype=bool)[start : stop - 1]) + start
+    if len(signals):
+        targets[signals] = prepared.exit_target(strategy.exit_target)[signals]
+    return targets
@@ -0,0 +1,430 @@
+"""Bar-by-bar trade simulation over plain arrays.
+
+The simulation is a small state machine (flat → in position → flat) over
+bar open/high/low/close, the entry signal and each bar's span of minute
+high/low. It only touches numbers: no Series, no per-bar allocations, so
+the same code runs as plain Python or compiled with numba when it is
+installed (pip install barb[jit]).
+
+Rules and levels are float64 slots (NaN = not set, -1 = no bar count).
+The state lives in a float64 array between calls, so the caller streams
+the bars through in chunks — memory stays bounded by the chunk size even
+for millions of 1m bars, and the deadline is checked in between
+(compiled code can't be interrupted).
+
+Exit reasons are integer codes, see EXIT_REASONS; trades come out as rows
+of a float64 array (TRADE_* columns), with the trade's maximum adverse and
+favorable excursion tracked over the same minutes the exits are checked on.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional dependency: pip install barb[jit]
+    njit = None
+
+JIT = njit is not None
+
+# Without numba, spans of at least this many minutes are checked with
+# array operations instead of the per-minute loop
+_VECTOR_SPAN = 64
+
+EXIT_REASONS = ("stop", "breakeven", "trailing_stop", "take_profit", "target", "timeout", "end")
+_STOP, _BREAKEVEN, _TRAILING, _TAKE_PROFIT, _TARGET, _TIMEOUT, _END = range(7)
+
+# Strategy rules: levels are points, or percent of the entry price if *_PCT
+(
+    RULE_LONG,
+    RULE_STOP,
+    RULE_STOP_PCT,
+    RULE_TAKE_PROFIT,
+    RULE_TAKE_PROFIT_PCT,
+    RULE_TRAIL,
+    RULE_TRAIL_PCT,
+    RULE_EXIT_BARS,
+    RULE_BREAKEVEN_BARS,
+    RULE_SLIPPAGE,
+) = range(10)
+N_RULES = 10
+
+# Simulation state carried between chunks
+(
+    STATE_IN_POSITION,
+    STATE_ENTRY_IDX,
+    STATE_ENTRY_PRICE,
+    STATE_STOP_PRICE,
+    STATE_STOP_REASON,
+    STATE_BREAKEVEN_ON,
+    STATE_TP_PRICE,
+    STATE_TARGET_PRICE,
+    STATE_TRAIL_POINTS,
+    STATE_BEST_PRICE,
+    STATE_MAX_HIGH,
+    STATE_MIN_LOW,
+) = range(12)
+N_STATE = 12
+
+# Trade rows: entry bar, exit bar, prices before exit slippage, reason code,
+# excursions from the entry price in points (>= 0)
+(
+    TRADE_ENTRY,
+    TRADE_EXIT,
+    TRADE_ENTRY_PRICE,
+    TRADE_EXIT_PRICE,
+    TRADE_REASON,
+    TRADE_MAE,
+    TRADE_MFE,
+) = range(7)
+N_TRADE = 7
+
+
+def new_state() -> np.ndarray:
+    """Flat, before the first bar."""
+    state = np.full(N_STATE, np.nan)
+    state[STATE_IN_POSITION] = 0
+    return state
+
+
+def simulate_bars(
+    open_,
+    high,
+    low,
+    close,
+    entry,
+    targets,
+    minute_high,
+    minute_low,
+    starts,
+    ends,
+    rules,
+    state,
+    trades,
+    base,
+    first,
+    last,
+):
+    """Advance the simulation over one chunk of bars → number of trades.
+
+    Bar arrays hold bars base, base + 1, ...; the chunk starts at local
+    position first (the bar before it is included for its entry signal)
+    and runs to the end of the arrays. last is the global index of the
+    final bar of the data. entry[k]: signal → enter on the next bar's open.
+    targets[k]: exit target price fixed at signal bar k (NaN = none). Bar
+    k's minutes are minute_high/low[starts[k]:ends[k]]; a bar without
+    minutes is checked on its own high/low.
+
+    Finished trades are written to trades from row 0, with global bar
+    indices. Excursions span the entry price, every minute held before the
+    exit minute and the exit price (before exit slippage).
+    """
+    is_long = rules[RULE_LONG] > 0
+    exit_bars = rules[RULE_EXIT_BARS]
+    breakeven_bars = rules[RULE_BREAKEVEN_BARS]
+    slippage = rules[RULE_SLIPPAGE]
+
+    in_position = state[STATE_IN_POSITION] > 0
+    entry_idx = int(state[STATE_ENTRY_IDX]) if in_position else 0
+    entry_price = state[STATE_ENTRY_PRICE]
+    stop_price = state[STATE_STOP_PRICE]
+    stop_reason = int(state[STATE_STOP_REASON]) if in_position else _STOP
+    breakeven_on = state[STATE_BREAKEVEN_ON] > 0
+    tp_price = state[STATE_TP_PRICE]
+    target_price = state[STATE_TARGET_PRICE]
+    trail_points = state[STATE_TRAIL_POINTS]
+    best_price = state[STATE_BEST_PRICE]
+    max_high = state[STATE_MAX_HIGH]
+    min_low = state[STATE_MIN_LOW]
+    count = 0
+
+    for k in range(first, len(open_)):
+        i = base + k
+        if in_position:
+            bars_held = i - entry_idx
+
+            # Breakeven: after N bars, if in profit, move stop to entry
+            if breakeven_bars >= 0 and not breakeven_on and bars_held >= breakeven_bars:
+                in_profit = open_[k] > entry_price if is_long else open_[k] < entry_price
+                if in_profit:
+                    stop_price = entry_price
+                    stop_reason = _BREAKEVEN
+                    breakeven_on = True
+
+        elif i > 0 and entry[k - 1]:
+            # Signal on previous bar → enter on this bar's open
+            entry_idx = i
+            bars_held = 0
+            entry_price = open_[k] + slippage if is_long else open_[k] - slippage
+            stop_price = _level(entry_price, rules[RULE_STOP], rules[RULE_STOP_PCT], not is_long)
+            tp_price = _level(
+                entry_price, rules[RULE_TAKE_PROFIT], rules[RULE_TAKE_PROFIT_PCT], is_long
+            )
+            target_price = targets[k - 1]
+            trail_points = np.nan
+            best_price = np.nan
+            if rules[RULE_TRAIL] == rules[RULE_TRAIL]:
+                trail_points = _points(entry_price, rules[RULE_TRAIL], rules[RULE_TRAIL_PCT])
+                best_price = entry_price
+            stop_reason = _STOP
+            breakeven_on = False
+            max_high = entry_price
+            min_low = entry_price
+            in_position = True
+
+        else:
+            continue
+
+        # Price-based exits on the bar's minutes, or the bar itself
+        if starts[k] < ends[k]:
+            exit_price, reason, best_price, max_high, min_low = exit_in_span(
+                minute_high,
+                minute_low,
+                starts[k],
+                ends[k],
+                is_long,
+                stop_price,
+                stop_reason,
+                tp_price,
+                target_price,
+                trail_points,
+                best_price,
+                max_high,
+                min_low,
+            )
+        else:
+            exit_price, reason, best_price, max_high, min_low = exit_in_span(
+                high,
+                low,
+                k,
+                k + 1,
+                is_long,
+                stop_price,
+                stop_reason,
+                tp_price,
+                target_price,
+                trail_points,
+                best_price,
+                max_high,
+                min_low,
+            )
+
+        # Timeout — bar-level concept (exit_bars counts bars at chosen timeframe)
+        if reason < 0 and exit_bars >= 0 and bars_held >= exit_bars:
+            exit_price = close[k]
+            reason = _TIMEOUT
+
+        # End of data — force close (not on the entry bar)
+        if reason < 0 and bars_held > 0 and i == last:
+            exit_price = close[k]
+            reason = _END
+
+        if reason >= 0:
+            if exit_price > max_high:
+                max_high = exit_price
+            if exit_price < min_low:
+                min_low = exit_price
+            trades[count, TRADE_ENTRY] = entry_idx
+            trades[count, TRADE_EXIT] = i
+            trades[count, TRADE_ENTRY_PRICE] = entry_price
+            trades[count, TRADE_EXIT_PRICE] = exit_price
+            trades[count, TRADE_REASON] = reason
+            if is_long:
+                trades[count, TRADE_MAE] = entry_price - min_low
+                trades[count, TRADE_MFE] = max_high - entry_price
+            else:
+                trades[count, TRADE_MAE] = max_high - entry_price
+                trades[count, TRADE_MFE] = entry_price - min_low
+            count += 1
+            in_position = False
+
+    state[STATE_IN_POSITION] = 1 if in_position else 0
+    state[STATE_ENTRY_IDX] = entry_idx
+    state[STATE_ENTRY_PRICE] = entry_price
+    state[STATE_STOP_PRICE] = stop_price
+    state[STATE_STOP_REASON] = stop_reason
+    state[STATE_BREAKEVEN_ON] = 1 if breakeven_on else 0
+    state[STATE_TP_PRICE] = tp_price
+    state[STATE_TARGET_PRICE] = target_price
+    state[STATE_TRAIL_POINTS] = trail_points
+    state[STATE_BEST_PRICE] = best_price
+    state[STATE_MAX_HIGH] = max_high
+    state[STATE_MIN_LOW] = min_low
+    return count
+
+
+def _points(entry_price, value, is_pct):
+    """Level in points: as is, or percent of the entry price."""
+    if is_pct > 0:
+        return entry_price * value / 100
+    return value
+
+
+def _level(entry_price, value, is_pct, above):
+    """Absolute price of a level value away from entry, NaN if not set."""
+    if value != value:
+        return np.nan
+    points = _points(entry_price, value, is_pct)
+    return entry_price + points if above else entry_price - points
+
+
+def exit_in_span(
+    highs,
+    lows,
+    start,
+    end,
+    is_long,
+    stop_price,
+    stop_reason,
+    tp_price,
+    target_price,
+    trail_points,
+    best_price,
+    max_high,
+    min_low,
+):
+    """First exit over highs/lows[start:end] → (price, reason, best_price, max_high, min_low).
+
+    reason is -1 when nothing triggers. Per minute: the trailing level
+    follows best_price, the effective stop is the tighter of it and the
+    fixed stop; then stop, take profit, target — in that order.
+    max_high/min_low extend over the minutes before the exit minute (all
+    of them without an exit).
+    """
+    trailing = trail_points == trail_points
+    for j in range(start, end):
+        high = highs[j]
+        low = lows[j]
+        effective_stop = stop_price
+        reason = stop_reason
+
+        if trailing:
+            if is_long:
+                if high > best_price:
+                    best_price = high
+                trail_stop = best_price - trail_points
+                if stop_price != stop_price or trail_stop >= stop_price:
+                    effective_stop = trail_stop
+                    reason = _TRAILING
+            else:
+                if low < best_price:
+                    best_price = low
+                trail_stop = best_price + trail_points
+                if stop_price != stop_price or trail_stop <= stop_price:
+                    effective_stop = trail_stop
+                    reason = _TRAILING
+
+        if is_long:
+            if low <= effective_stop:
+                return effective_stop, reason, best_price, max_high, min_low
+            if high >= tp_price:
+                return tp_price, _TAKE_PROFIT, best_price, max_high, min_low
+            if high >= target_price:
+                return target_price, _TARGET, best_price, max_high, min_low
+        else:
+            if high >= effective_stop:
+                return effective_stop, reason, best_price, max_high, min_low
+            if low <= tp_price:
+                return tp_price, _TAKE_PROFIT, best_price, max_high, min_low
+            if low <= target_price:
+                return target_price, _TARGET, best_price, max_high, min_low
+
+        if high > max_high:
+            max_high = high
+        if low < min_low:
+            min_low = low
+
+    return np.nan, -1, best_price, max_high, min_low
+
+
+def _first_exit(
+    highs,
+    lows,
+    is_long,
+    stop_price,
+    stop_reason,
+    tp_price,
+    target_price,
+    trail_points,
+    best_price,
+    max_high,
+    min_low,
+):
+    """exit_in_span over whole arrays: a hit mask per level, argmax for the first hit.
+
+    The trailing level is the running max of highs (min of lows for short)
+    via fmax/fmin accumulate, which skip missing prices like the loop does;
+    so do the excursion extremes (fmax/fmin reduce).
+    """
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    n = len(highs)
+    adverse, favorable = (lows, highs) if is_long else (highs, lows)
+
+    trailing = trail_points == trail_points
+    stop = stop_price
+    is_trailing = None
+    if trailing:
+        if is_long:
+            best = np.fmax.accumulate(np.fmax(highs, best_price))
+            trail = best - trail_points
+        else:
+            best = np.fmin.accumulate(np.fmin(lows, best_price))
+            trail = best + trail_points
+        if stop_price != stop_price:
+            stop = trail
+            is_trailing = np.ones(n, dtype=bool)
+        else:
+            is_trailing = trail >= stop_price if is_long else trail <= stop_price
+            stop = np.where(is_trailing, trail, stop_price)
+
+    if is_long:
+        stop_at = _first(adverse <= stop)
+        tp_at = _first(favorable >= tp_price)
+        target_at = _first(favorable >= target_price)
+    else:
+        stop_at = _first(adverse >= stop)
+        tp_at = _first(favorable <= tp_price)
+        target_at = _first(favorable <= target_price)
+
+    first = min(stop_at, tp_at, target_at)
+    if trailing:
+        best_price = float(best[min(first, n - 1)])
+    max_high = float(np.fmax.reduce(highs[:first], initial=max_high))
+    min_low = float(np.fmin.reduce(lows[:first], initial=min_low))
+    if first == n:
+        return np.nan, -1, best_price, max_high, min_low
+    if stop_at == first:
+        if trailing and is_trailing[first]:
+            return float(stop[first]), _TRAILING, best_price, max_high, min_low
+        return stop_price, stop_reason, best_price, max_high, min_low
+    if tp_at == first:
+        return tp_price, _TAKE_PROFIT, best_price, max_high, min_low
+    return target_price, _TARGET, best_price, max_high, min_low
+
+
+def _first(hits: np.ndarray) -> int:
+    """Position of the first True, len(hits) if none."""
+    first = int(hits.argmax())
+    return first if hits[first] else len(hits)
+
+
+if JIT:
+    _points = njit(cache=True)(_points)
+    _level = njit(cache=True)(_level)
+    exit_in_span = njit(cache=True)(exit_in_span)
+    simulate_bars = njit(cache=True, nogil=True)(simulate_bars)
+else:
+    _exit_in_span_loop = exit_in_span
+
+    def exit_in_span(highs, lows, start, end, *levels):
+        """Plain Python: short spans in the loop, long ones vectorized.
+
+        Minute arrays are converted one span at a time: Python floats
+        index and compare much faster than array scalars.
+        """
+        if end - start >= _VECTOR_SPAN:
+            return _first_exit(highs[start:end], lows[start:end], *levels)
+        if isinstance(highs, np.ndarray):
+            highs, lows = highs[start:end].tolist(), lows[start:end].tolist()
+            start, end = 0, end - start
+        return _exit_in_span_loop(highs, lows, start, end, *levels)
@@ -1,8 +1,18 @@
-"""Trade results and performance metrics."""
+"""Trade results and performance metrics.
 
-from dataclasses import dataclass
+The engine emits trades as columns (Trades: one NumPy array per field),
+so metrics and equity are array reductions, not loops over trade
+objects. Trade is one row of them — what iterating Trades yields.
+"""
+
+from dataclasses import dataclass, field, fields
 from datetime import date
 
+import numpy as np
+
+from barb.backtest.kernel import EXIT_REASONS
+from barb.backtest.robustness import Robustness
+
 
 @dataclass
 class Trade:
@@ -14,6 +24,79 @@ class Trade:
     pnl: float  # points (after slippage)
     exit_reason: str  # "stop" | "target" | "take_profit" | "timeout" | "end"
     bars_held: int
+    mae: float = 0.0  # maximum adverse excursion from entry, points (>= 0)
+    mfe: float = 0.0  # maximum favorable excursion from entry, points (>= 0)
+
+
+@dataclass(eq=False)
+class Trades:
+    """Trades as columns: trade i is row i of every array, in exit order.
+
+    Iterating or indexing with an int gives Trade rows; a slice or mask
+    gives Trades. Columns follow Trade's fields.
+    """
+
+    entry_date: np.ndarray  # datetime64[D]
+    entry_price: np.ndarray  # float64
+    exit_date: np.ndarray  # datetime64[D]
+    exit_price: np.ndarray  # float64, after slippage
+    is_long: np.ndarray  # bool
+    pnl: np.ndarray  # float64, points (after slippage and commission)
+    exit_reason: np.ndarray  # int8 codes into EXIT_REASONS
+    bars_held: np.ndarray  # int64
+    mae: np.ndarray  # float64, points
+    mfe: np.ndarray  # float64, points
+
+    @classmethod
+    def from_trades(cls, trades: list[Trade]) -> "Trades":
+        return cls(
+            entry_date=np.array([t.entry_date for t in trades], dtype="datetime64[D]"),
+            entry_price=np.array([t.entry_price for t in trades], dtype=np.float64),
+            exit_date=np.array([t.exit_date for t in trades], dtype="datetime64[D]"),
+            exit_price=np.array([t.exit_price for t in trades], dtype=np.float64),
+            is_long=np.array([t.direction == "long" for t in trades], dtype=bool),
+            pnl=np.array([t.pnl for t in trades], dtype=np.float64),
+            exit_reason=np.array(
+                [EXIT_REASONS.index(t.exit_reason) for t in trades], dtype=np.int8
+            ),
+            bars_held=np.array([t.bars_held for t in trades], dtype=np.int64),
+            mae=np.array([t.mae for t in trades], dtype=np.float64),
+            mfe=np.array([t.mfe for t in trades], dtype=np.float64),
+        )
+
+    @classmethod
+    def concat(cls, parts: list["Trades"]) -> "Trades":
+        """Trades of parts, one after another."""
+        if not parts:
+            return cls.from_trades([])
+        return cls(**{name: np.concatenate([getattr(p, name) for p in parts]) for name in _COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.pnl)
+
+    def __iter__(self):
+        columns = [getattr(self, name).tolist() for name in _COLUMNS]
+        columns[4] = ["long" if is_long else "short" for is_long in columns[4]]
+        columns[6] = [EXIT_REASONS[code] for code in columns[6]]
+        return (Trade(*row) for row in zip(*columns))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            i = range(len(self))[key]
+            return next(iter(self[i : i + 1]))
+        return Trades(**{name: getattr(self, name)[key] for name in _COLUMNS})
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, list):
+            return list(self) == other
+        if not isinstance(other, Trades):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            np.array_equal(getattr(self, name), getattr(other, name)) for name in _COLUMNS
+        )
+
+
+_COLUMNS = tuple(f.name for f in fields(Trades))
 
 
 @dataclass
@@ -34,18 +117,24 @@ class BacktestMetrics:
     recovery_factor: float  # total_pnl / max_drawdown (inf if max_dd = 0)
     gross_profit: float  # sum of winning trade pnls
     gross_loss: float  # sum of losing trade pnls (negative number)
+    avg_mae: float  # points, average maximum adverse excursion
+    avg_mfe: float  # points, average maximum favorable excursion
 
 
 @dataclass
 class BacktestResult:
-    trades: list[Trade]
+    trades: Trades
     metrics: BacktestMetrics
     equity_curve: list[float]  # cumulative P&L after each trade
+    robustness: Robustness | None = None  # bootstrap/reshuffle intervals, None below 2 trades
+    metadata: dict = field(default_factory=dict)  # {"profile": ...} when profiled
 
 
-def calculate_metrics(trades: list[Trade]) -> BacktestMetrics:
-    """Calculate performance metrics from a list of trades."""
-    if not trades:
+def calculate_metrics(trades: Trades | list[Trade]) -> BacktestMetrics:
+    """Calculate performance metrics from trades, in order."""
+    trades = as_trades(trades)
+    total = len(trades)
+    if not total:
         return BacktestMetrics(
             total_trades=0,
             winning_trades=0,
@@ -63,71 +152,57 @@ def calculate_metrics(trades: list[Trade]) -> BacktestMetrics:
             recovery_factor=0.0,
             gross_profit=0.0,
             gross_loss=0.0,
+            avg_mae=0.0,
+            avg_mfe=0.0,
         )
 
-    wins = [t for t in trades if t.pnl > 0]
-    losses = [t for t in trades if t.pnl <= 0]
-
-    gross_profit = sum(t.pnl for t in wins)
-    gross_loss = abs(sum(t.pnl for t in losses))
-
-    # Equity curve + max drawdown
-    equity = []
-    cumulative = 0.0
-    peak = 0.0
-    max_dd = 0.0
-    for t in trades:
-        cumulative += t.pnl
-        equity.append(cumulative)
-        if cumulative > peak:
-            peak = cumulative
-        dd = peak - cumulative
-        if dd > max_dd:
-            max_dd = dd
-
-    # Consecutive wins/losses
-    max_consec_wins = 0
-    max_consec_losses = 0
-    current_wins = 0
-    current_losses = 0
-    for t in trades:
-        if t.pnl > 0:
-            current_wins += 1
-            current_losses = 0
-            if current_wins > max_consec_wins:
-                max_consec_wins = current_wins
-        else:
-            current_losses += 1
-            current_wins = 0
-            if current_losses > max_consec_losses:
-                max_consec_losses = current_losses
+    pnl = trades.pnl
+    win = pnl > 0
+    wins = int(np.count_nonzero(win))
+    losses = total - wins
+    gross_profit = float(pnl[win].sum())
+    gross_loss = abs(float(pnl[~win].sum()))
+
+    # Equity curve + max drawdown (the peak starts at 0)
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+    max_dd = float((peak - equity).max())
+    cumulative = float(equity[-1])
+
+    # Consecutive wins/losses: lengths of the runs of equal outcomes
+    starts = np.flatnonzero(np.diff(win, prepend=not win[0]))
+    lengths = np.diff(starts, append=total)
+    won = win[starts]
+    max_consec_wins = int(lengths[won].max(initial=0))
+    max_consec_losses = int(lengths[~won].max(initial=0))
 
-    total = len(trades)
     return BacktestMetrics(
         total_trades=total,
-        winning_trades=len(wins),
-        losing_trades=len(losses),
-        win_rate=len(wins) / total * 100 if total else 0.0,
+        winning_trades=wins,
+        losing_trades=losses,
+        win_rate=wins / total * 100,
         profit_factor=gross_profit / gross_loss if gross_loss > 0 else float("inf"),
-        avg_win=gross_profit / len(wins) if wins else 0.0,
-        avg_loss=-gross_loss / len(losses) if losses else 0.0,
+        avg_win=gross_profit / wins if wins else 0.0,
+        avg_loss=-gross_loss / losses if losses else 0.0,
         max_drawdown=max_dd,
         total_pnl=cumulative,
-        expectancy=cumulative / total if total else 0.0,
-        avg_bars_held=sum(t.bars_held for t in trades) / total if total else 0.0,
+        expectancy=cumulative / total,
+        avg_bars_held=float(trades.bars_held.sum()) / total,
         max_consecutive_wins=max_consec_wins,
         max_consecutive_losses=max_consec_losses,
         recovery_factor=cumulative / max_dd if max_dd > 0 else float("inf"),
         gross_profit=gross_profit,
         gross_loss=-gross_loss,  # store as negative
+        avg_mae=float(trades.mae.mean()),
+        avg_mfe=float(trades.mfe.mean()),
     )
 
 
-def build_equity_curve(trades: list[Trade]) -> list[float]:
+def build_equity_curve(trades: Trades | list[Trade]) -> list[float]:
     """Build cumulative P&L curve from trades."""
-    curve = []
-    cumulative = 0.0
-    for t in trades:
-        cumulative += t.pnl
-        curve.append(round(cumulative, 4))
-    return curve
+    return np.round(np.cumsum(as_trades(trades).pnl), 4).tolist()
+
+
+def as_trades(trades: Trades | list[Trade]) -> Trades:
+    """Trades as columns; a list of Trade rows is converted."""
+    return trades if isinstance(trades, Trades) else Trades.from_trades(trades)
@@ -0,0 +1,182 @@
+"""Portfolio backtests — one strategy across many instruments.
+
+Every instrument is its own backtest: its own bars, entry mask and
+trades, in points. The portfolio converts each instrument's P&L to
+currency with its point value and merges the trades by exit date into
+one equity curve, so the combined metrics answer "what would trading
+this on all of them have made".
+
+Instruments stream through barb/backtest/sweep.py's map_forked: a worker
+loads one instrument, simulates it and keeps only its trades before
+loading the next, so memory is bounded by one instrument per worker, not
+by the size of the catalog. The loader is the caller's (read the
+parquet, apply session and period filters); it must not cache.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from barb.backtest.engine import _check_direction, _prepare, _simulate
+from barb.backtest.metrics import (
+    BacktestMetrics,
+    Trades,
+    build_equity_curve,
+    calculate_metrics,
+)
+from barb.backtest.robustness import Robustness, trade_robustness
+from barb.backtest.strategy import Strategy
+from barb.backtest.sweep import _PARALLEL_MIN_WORK, default_workers, map_forked
+from barb.ops import BarbError
+from barb.profile import profiling, stage
+
+MAX_PORTFOLIO_INSTRUMENTS = 64
+
+
+@dataclass
+class PortfolioLeg:
+    symbol: str
+    point_value: float  # currency per point; 1.0 keeps P&L in points
+    trades: Trades  # P&L in points, as run_backtest
+    metrics: BacktestMetrics  # in points
+    pnl: float  # contribution to the portfolio: total P&L × point value
+
+
+@dataclass
+class PortfolioResult:
+    legs: list[PortfolioLeg]  # instruments with data, in the given order
+    trades: Trades  # all legs' trades, P&L and excursions × point value, by exit date
+    symbols: list[str]  # instrument of each trade in trades
+    metrics: BacktestMetrics  # of the merged trades
+    equity_curve: list[float]  # cumulative merged P&L after each trade
+    robustness: Robustness | None  # of the merged trades, None below 2 trades
+    missing: list[str] = field(default_factory=list)  # instruments without data
+    metadata: dict = field(default_factory=dict)  # {"profile": ...} when profiled
+
+
+def run_portfolio_backtest(
+    symbols: list[str],
+    strategy: Strategy,
+    load: Callable[[str], pd.DataFrame],
+    timeframe: str = "daily",
+    point_values: dict[str, float] | None = None,
+    workers: int | None = None,
+    profile: bool = False,
+) -> PortfolioResult:
+    """Backtest one strategy on every instrument and merge the trades.
+
+    Args:
+        symbols: Instruments, in the order legs are reported.
+        strategy: Strategy definition, the same for every instrument.
+        load: symbol → pre-filtered DataFrame, as run_backtest takes.
+            Raises FileNotFoundError for an instrument without data (it is
+            skipped and listed in result.missing). Called in the workers.
+        timeframe: Bar timeframe for simulation.
+        point_values: symbol → currency per point, for every symbol. None:
+            P&L stays in points (only comparable across similar instruments).
+        workers: Processes to stream instruments through. None: one per
+            CPU when there is more than one instrument.
+        profile: Add metadata["profile"] (see barb/profile.py).
+
+    Raises:
+        BarbError: No or too many instruments, point values missing,
+            invalid direction or timeframe.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        raise BarbError(
+            "No instruments to backtest", error_type="ValidationError", step="portfolio"
+        )
+    if len(symbols) > MAX_PORTFOLIO_INSTRUMENTS:
+        raise BarbError(
+            f"Portfolio has {len(symbols)} instruments, "
+            f"at most {MAX_PORTFOLIO_INSTRUMENTS} allowed",
+            error_type="ValidationError",
+            step="portfolio",
+        )
+    _check_direction(strategy)
+    if point_values is not None:
+        unknown = [s for s in symbols if not point_values.get(s)]
+        if unknown:
+            raise BarbError(
+                f"No point value for {', '.join(unknown)}",
+                error_type="ValidationError",
+                step="portfolio",
+            )
+
+    with profiling(profile) as profiler:
+        with stage("portfolio"):
+            if workers is None:
+                # Reading an instrument's minute bars is worth a worker by itself
+                workers = default_workers(_PARALLEL_MIN_WORK) if len(symbols) > 1 else 1
+            runs = map_forked(
+                lambda symbol: _run_leg(load, symbol, strategy, timeframe),
+                symbols,
+                workers,
+                step="portfolio",
+            )
+
+        with stage("merge"):
+            legs, missing = [], []
+            for symbol, trades in zip(symbols, runs):
+                if trades is None:
+                    missing.append(symbol)
+                    continue
+                metrics = calculate_metrics(trades)
+                point_value = point_values[symbol] if point_values is not None else 1.0
+                legs.append(
+                    PortfolioLeg(
+                        symbol=symbol,
+                        point_value=point_value,
+                        trades=trades,
+                        metrics=metrics,
+                        pnl=metrics.total_pnl * point_value,
+                    )
+                )
+            merged = Trades.concat(
+                [
+                    replace(
+                        leg.trades,
+                        pnl=leg.trades.pnl * leg.point_value,
+                        mae=leg.trades.mae * leg.point_value,
+                        mfe=leg.trades.mfe * leg.point_value,
+                    )
+                    for leg in legs
+                ]
+            )
+            legs_of = np.repeat([leg.symbol for leg in legs], [len(leg.trades) for leg in legs])
+            # Stable: same-day exits keep leg order
+            order = np.lexsort((merged.entry_date, merged.exit_date))
+            trades = merged[order]
+
+        with stage("robustness"):
+            robustness = trade_robustness(trades.pnl)
+
+    result = PortfolioResult(
+        legs=legs,
+        trades=trades,
+        symbols=legs_of[order].tolist(),
+        metrics=calculate_metrics(trades),
+        equity_curve=build_equity_curve(trades),
+        robustness=robustness,
+        missing=missing,
+    )
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+    return result
+
+
+def _run_leg(
+    load: Callable[[str], pd.DataFrame], symbol: str, strategy: Strategy, timeframe: str
+) -> Trades | None:
+    """Trades of one instrument, None without data. Its bars are dropped on return."""
+    try:
+        df = load(symbol)
+    except FileNotFoundError:
+        return None
+    prepared = _prepare(df, strategy.entry, timeframe, [strategy.exit_target])
+    if prepared is None:
+        return Trades.from_trades([])
+    return _simulate(prepared, strategy)
@@ -0,0 +1,125 @@
+"""Monte Carlo robustness of backtest trades.
+
+calculate_metrics gives point estimates: one total, one drawdown, one PF
+for the one order the trades happened in. Resampling the trade P&Ls
+shows how much of that is luck:
+
+- bootstrap: draw N trades with replacement → intervals for total P&L,
+  max drawdown, profit factor and win rate (would a similar sample of
+  trades still have an edge?);
+- reshuffle: the same trades in random order → drawdown interval (total,
+  PF and win rate don't depend on order; drawdown is sequence risk).
+
+Every resample is one row of a 2-D matrix; equity is a cumsum along the
+rows, so thousands of resamples are a handful of array operations: about
+0.1 s for 1000 bootstrap + 1000 reshuffled samples of 2000 trades. Rows
+go in small blocks to bound memory; by default long trade lists (1m
+scalping) get fewer samples, so the cost stays bounded by _MAX_CELLS.
+The generator is seeded: the same trades always give the same intervals.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from barb.deadline import check
+
+N_SAMPLES = 1000
+CONFIDENCE = 0.95
+
+# Cells of one resample matrix block: small enough (float64: 512 KB) that
+# the chain of passes over it runs in cache
+_BLOCK_CELLS = 65536
+# Default samples shrink so that samples × trades stays below this...
+_MAX_CELLS = 4_000_000
+# ...but not below this many samples
+_MIN_SAMPLES = 100
+
+
+@dataclass
+class Interval:
+    low: float
+    median: float
+    high: float
+
+
+@dataclass
+class Robustness:
+    samples: int
+    confidence: float  # e.g. 0.95: low/high are the 2.5th/97.5th percentiles
+    total_pnl: Interval  # bootstrap
+    max_drawdown: Interval  # bootstrap
+    profit_factor: Interval  # bootstrap, inf where a sample has no losses
+    win_rate: Interval  # bootstrap, percent
+    shuffled_max_drawdown: Interval  # same trades, random order
+    prob_loss: float  # share of bootstrap samples with total P&L <= 0
+
+
+def trade_robustness(
+    pnls,
+    samples: int | None = None,
+    confidence: float = CONFIDENCE,
+    seed: int = 0,
+) -> Robustness | None:
+    """Bootstrap and reshuffle intervals of trade P&Ls, in trade order. None below 2 trades.
+
+    samples: resamples of each kind. None: N_SAMPLES, fewer for very long
+    trade lists (see _MAX_CELLS).
+    """
+    pnls = np.asarray(pnls, dtype=np.float64)
+    n = len(pnls)
+    if n < 2:
+        return None
+    if samples is None:
+        samples = min(N_SAMPLES, max(_MIN_SAMPLES, _MAX_CELLS // n))
+
+    rng = np.random.default_rng(seed)
+    rows_per_block = max(1, _BLOCK_CELLS // n)
+    total, drawdown, pf, win_rate, shuffled = (np.empty(samples) for _ in range(5))
+
+    for begin in range(0, samples, rows_per_block):
+        check("robustness")
+        end = min(begin + rows_per_block, samples)
+        boot = pnls[rng.integers(0, n, (end - begin, n))]
+        total[begin:end] = boot.sum(axis=1)
+        drawdown[begin:end] = _max_drawdown(boot)
+        pf[begin:end] = _profit_factor(boot)
+        win_rate[begin:end] = np.count_nonzero(boot > 0, axis=1) * (100 / n)
+        del boot
+        order = rng.permuted(np.broadcast_to(pnls, (end - begin, n)), axis=1)
+        shuffled[begin:end] = _max_drawdown(order)
+
+    def interval(values: np.ndarray) -> Interval:
+        tail = (1 - confidence) / 2
+        # inverted_cdf picks sample values: no interpolation between inf PFs
+        low, median, high = np.quantile(values, [tail, 0.5, 1 - tail], method="inverted_cdf")
+        return Interval(low=float(low), median=float(median), high=float(high))
+
+    return Robustness(
+        samples=samples,
+        confidence=confidence,
+        total_pnl=interval(total),
+        max_drawdown=interval(drawdown),
+        profit_factor=interval(pf),
+        win_rate=interval(win_rate),
+        shuffled_max_drawdown=interval(shuffled),
+        prob_loss=float((total <= 0).mean()),
+    )
+
+
+def _max_drawdown(pnls: np.ndarray) -> np.ndarray:
+    """Per row: largest drop of the equity from its running peak (peak starts at 0)."""
+    equity = np.cumsum(pnls, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 0, out=peak)
+    peak -= equity
+    return peak.max(axis=1)
+
+
+def _profit_factor(pnls: np.ndarray) -> np.ndarray:
+    """Per row: gross profit / gross loss, inf without losses (as calculate_metrics)."""
+    gross_profit = np.maximum(pnls, 0).sum(axis=1)
+    gross_loss = -np.minimum(pnls, 0).sum(axis=1)
+    pf = np.full(len(pnls), np.inf)
+    np.divide(gross_profit, gross_loss, out=pf, where=gross_loss > 0)
+    return pf
@@ -0,0 +1,254 @@
+"""Parameter sweeps — one strategy, a grid of exit settings.
+
+"Which stop works best, 1%, 1.5% or 2%?" is one backtest per variant, but
+the expensive part — resample, minute index, entry mask — depends only on
+the data, timeframe and entry. run_backtest_sweep prepares it once and
+simulates every combination of the grid against the shared bars, then
+ranks the variants by one metric.
+
+Large sweeps fan out to a fork-based process pool (map_forked, also used
+by walk-forward): workers inherit the prepared bars copy-on-write and
+receive only item numbers. Small ones run in-process, where forking costs
+more than it saves. The caller's deadline and cancel event carry over to
+the workers (barb/forking.py, shared with assistant/pool.py). Worker
+counts come from cpu_budget(): inside a tool worker a sweep gets that
+worker's share of the CPUs, and a map_forked child never forks again.
+"""
+
+import itertools
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, fields, replace
+
+import pandas as pd
+
+from barb.backtest.engine import _check_direction, _prepare, _Prepared, _simulate
+from barb.backtest.metrics import BacktestMetrics, calculate_metrics
+from barb.backtest.strategy import Strategy
+from barb.deadline import check, current_deadline, deadline
+from barb.forking import POLL_INTERVAL, CancelFlags, cpu_budget, limit_fan_out
+from barb.ops import BarbError
+from barb.profile import profiling, stage
+
+# Strategy fields a grid can vary. The entry is shared by all variants.
+SWEEP_FIELDS = (
+    "direction",
+    "stop_loss",
+    "take_profit",
+    "trailing_stop",
+    "exit_target",
+    "exit_bars",
+    "breakeven_bars",
+    "slippage",
+    "commission",
+)
+MAX_SWEEP_VARIANTS = 256
+# Metrics where lower ranks higher
+_LOWER_IS_BETTER = {"max_drawdown", "max_consecutive_losses", "avg_bars_held", "avg_mae"}
+_METRICS = tuple(f.name for f in fields(BacktestMetrics))
+
+# Simulated bars (bars × variants) below which work runs in-process
+_PARALLEL_MIN_WORK = 2_000_000
+
+# Inherited by workers at fork: token → (function, items, cancel flags) of
+# each running map. Maps can run concurrently (tools in API threads), so a
+# worker looks up its own map by the token it is sent.
+_JOBS: dict[int, tuple] = {}
+_JOB_TOKENS = itertools.count()
+
+
+@dataclass
+class SweepRow:
+    params: dict  # swept field → value of this variant
+    metrics: BacktestMetrics
+
+
+@dataclass
+class SweepResult:
+    rows: list[SweepRow]  # ranked, best first
+    fields: list[str]  # swept fields, in grid order
+    sort_by: str
+    metadata: dict = field(default_factory=dict)  # {"profile": ...} when profiled
+
+
+def run_backtest_sweep(
+    df: pd.DataFrame,
+    strategy: Strategy,
+    grid: dict[str, list],
+    timeframe: str = "daily",
+    sort_by: str = "total_pnl",
+    workers: int | None = None,
+    profile: bool = False,
+) -> SweepResult:
+    """Backtest every combination of grid values and rank the variants.
+
+    Args:
+        df: Pre-filtered DataFrame, as for run_backtest.
+        strategy: Base strategy; grid values replace its fields.
+        grid: {field: [values]} over SWEEP_FIELDS. None as a value turns
+            the exit off for that variant.
+        timeframe: Bar timeframe for simulation.
+        sort_by: BacktestMetrics field to rank by. Higher is better, except
+            max_drawdown, max_consecutive_losses, avg_bars_held and avg_mae.
+        workers: Processes to fan out to. None: in-process for small
+            sweeps, otherwise one per CPU (at most one per variant).
+        profile: Add metadata["profile"] (see barb/profile.py).
+
+    Raises:
+        BarbError: Invalid grid, sort metric, direction or timeframe.
+    """
+    names, strategies = _variants(strategy, grid)
+    _check_sort_by(sort_by)
+
+    with profiling(profile) as profiler:
+        prepared = _prepare(df, strategy.entry, timeframe, [s.exit_target for s in strategies])
+        with stage("sweep"):
+            if prepared is None:
+                metrics = [calculate_metrics([]) for _ in strategies]
+            else:
+                if workers is None:
+                    workers = default_workers(len(prepared.bars) * len(strategies))
+                metrics = map_forked(
+                    lambda s: _run_variant(prepared, s), strategies, workers, step="sweep"
+                )
+
+    rows = [
+        SweepRow(params={name: getattr(s, name) for name in names}, metrics=m)
+        for s, m in zip(strategies, metrics)
+    ]
+    rows = rank(rows, lambda row: row.metrics, sort_by)
+
+    result = SweepResult(rows=rows, fields=names, sort_by=sort_by)
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+    return result
+
+
+def rank(items: list, metrics_of: Callable, sort_by: str) -> list:
+    """Items ordered best first by metrics_of(item).sort_by; ties keep their order."""
+    sign = 1 if sort_by in _LOWER_IS_BETTER else -1
+    return sorted(items, key=lambda item: sign * getattr(metrics_of(item), sort_by))
+
+
+def _check_sort_by(sort_by: str):
+    if sort_by not in _METRICS:
+        raise BarbError(
+            f"Unknown sort metric '{sort_by}'. Available: {', '.join(_METRICS)}",
+            error_type="ValidationError",
+            step="sweep",
+        )
+
+
+def _variants(strategy: Strategy, grid: dict[str, list]) -> tuple[list[str], list[Strategy]]:
+    """Validated swept field names and one Strategy per grid combination."""
+    if not grid:
+        raise BarbError("Sweep grid is empty", error_type="ValidationError", step="sweep")
+    for name, values in grid.items():
+        if name not in SWEEP_FIELDS:
+            raise BarbError(
+                f"Can't sweep '{name}'. Sweepable fields: {', '.join(SWEEP_FIELDS)}",
+                error_type="ValidationError",
+                step="sweep",
+            )
+        if not isinstance(values, list) or not values:
+            raise BarbError(
+                f"Sweep values for '{name}' must be a non-empty list",
+                error_type="ValidationError",
+                step="sweep",
+            )
+
+    count = 1
+    for values in grid.values():
+        count *= len(values)
+    if count > MAX_SWEEP_VARIANTS:
+        raise BarbError(
+            f"Sweep has {count} variants, at most {MAX_SWEEP_VARIANTS} allowed",
+            error_type="ValidationError",
+            step="sweep",
+        )
+
+    names = list(grid)
+    strategies = [
+        replace(strategy, **dict(zip(names, combo))) for combo in itertools.product(*grid.values())
+    ]
+    for s in strategies:
+        _check_direction(s)
+    return names, strategies
+
+
+def _run_variant(prepared: _Prepared, strategy: Strategy) -> BacktestMetrics:
+    trades = _simulate(prepared, strategy)
+    return calculate_metrics(trades)
+
+
+# --- Process fan-out ---
+
+
+def default_workers(work: int) -> int:
+    """Processes for this many simulated bars: 1 (in-process) for small work."""
+    if work < _PARALLEL_MIN_WORK:
+        return 1
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    return cpu_budget()
+
+
+def map_forked(fn: Callable, items: list, workers: int, step: str) -> list:
+    """[fn(item) for item in items], fanned out to forked workers if workers > 1.
+
+    fn may be a closure: workers inherit it at fork, only item numbers and
+    results cross the process boundary. check(step) runs before each item.
+    """
+    if workers <= 1 or len(items) <= 1:
+        results = []
+        for item in items:
+            check(step)
+            results.append(fn(item))
+        return results
+    return _map_parallel(fn, items, workers, step)
+
+
+def _run_chunk(token: int, positions: list[int], limit: tuple, step: str) -> list:
+    """Runs in a worker: results of the items at these positions."""
+    seconds, elapsed = limit
+    fn, items, flags = _JOBS[token]
+    # Already one of the fan-out's processes: nested maps run in-process
+    limit_fan_out(1)
+    results = []
+    with deadline(seconds, flags.event(0), elapsed=elapsed):
+        for i in positions:
+            check(step)
+            results.append(fn(items[i]))
+    return results
+
+
+def _map_parallel(fn: Callable, items: list, workers: int, step: str) -> list:
+    ctx = multiprocessing.get_context("fork")
+    seconds, elapsed, cancel = current_deadline()
+    workers = min(workers, len(items))
+    # Interleaved, so neighbouring (similar) items spread across workers
+    chunks = [list(range(w, len(items), workers)) for w in range(workers)]
+
+    # Registered before the workers fork, which happens on submit
+    token = next(_JOB_TOKENS)
+    flags = CancelFlags(1)
+    _JOBS[token] = (fn, items, flags)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+            futures = [
+                executor.submit(_run_chunk, token, chunk, (seconds, elapsed), step)
+                for chunk in chunks
+            ]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=POLL_INTERVAL)
+                # Workers stop at their next checkpoint
+                flags.forward(cancel, 0)
+            results = [None] * len(items)
+            for chunk, future in zip(chunks, futures):
+                for position, result in zip(chunk, future.result()):
+                    results[position] = result
+    finally:
+        del _JOBS[token]
+    return results
@@ -0,0 +1,221 @@
+"""Walk-forward analysis — pick parameters in-sample, trade them out-of-sample.
+
+One backtest over the whole history reports how good the best settings
+*were*. Walk-forward asks whether choosing them would have worked: the
+history is cut into train/test windows (rolling — a fixed-length train
+window slides forward; anchored — train always starts at the beginning),
+the grid is swept on each train window, and the best variant trades the
+following test window. The test windows are consecutive, so their trades
+stitch into one out-of-sample equity curve.
+
+Resample, minute index and the entry mask are computed once over the full
+history and shared by every window (indicators at a window's first bar
+see the bars before it, as they would live). Windows run in parallel via
+barb/backtest/sweep.py's map_forked.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+
+import pandas as pd
+
+from barb.backtest.engine import _check_direction, _prepare, _Prepared, _simulate
+from barb.backtest.metrics import (
+    BacktestMetrics,
+    Trades,
+    build_equity_curve,
+    calculate_metrics,
+)
+from barb.backtest.strategy import Strategy
+from barb.backtest.sweep import _check_sort_by, _variants, default_workers, map_forked, rank
+from barb.ops import BarbError
+from barb.profile import profiling, stage
+
+
+@dataclass
+class WalkForwardWindow:
+    train_start: date
+    train_end: date  # last bar of the train window
+    test_start: date
+    test_end: date  # last bar of the test window
+    train_bars: int
+    test_bars: int
+    params: dict  # swept field → value chosen in train
+    train_metrics: BacktestMetrics  # chosen variant, in-sample
+    test_metrics: BacktestMetrics  # chosen variant, out-of-sample
+    trades: Trades  # out-of-sample
+
+
+@dataclass
+class WalkForwardResult:
+    windows: list[WalkForwardWindow]
+    trades: Trades  # out-of-sample trades of all windows, in order
+    metrics: BacktestMetrics  # of the stitched out-of-sample trades
+    equity_curve: list[float]  # stitched out-of-sample equity
+    fields: list[str]  # swept fields, in grid order
+    sort_by: str
+    anchored: bool
+    # Out-of-sample P&L per bar ÷ in-sample P&L per bar of the chosen
+    # variants; None when in-sample P&L is not positive
+    efficiency: float | None
+    metadata: dict = field(default_factory=dict)  # {"profile": ...} when profiled
+
+
+@dataclass(frozen=True)
+class _Window:
+    """Bar positions: train is train_start..test_start-1, test is test_start..test_stop-1."""
+
+    train_start: int
+    test_start: int
+    test_stop: int
+
+
+def run_walk_forward(
+    df: pd.DataFrame,
+    strategy: Strategy,
+    grid: dict[str, list] | None = None,
+    timeframe: str = "daily",
+    train_months: int = 24,
+    test_months: int = 6,
+    anchored: bool = False,
+    sort_by: str = "total_pnl",
+    workers: int | None = None,
+    profile: bool = False,
+) -> WalkForwardResult:
+    """Walk-forward backtest: grid sweep on each train window, best variant on the next test window.
+
+    Args:
+        df: Pre-filtered DataFrame, as for run_backtest.
+        strategy: Base strategy; grid values replace its fields.
+        grid: {field: [values]} as for run_backtest_sweep. None or empty:
+            the strategy as is, every window (out-of-sample slicing only).
+        timeframe: Bar timeframe for simulation.
+        train_months: Train window length (anchored: the first one).
+        test_months: Test window length; windows step forward by it.
+        anchored: Train from the start of the data instead of a rolling window.
+        sort_by: BacktestMetrics field the train window selects by.
+        workers: Processes to fan windows out to. None: in-process for
+            small work, otherwise one per CPU.
+        profile: Add metadata["profile"] (see barb/profile.py).
+
+    Raises:
+        BarbError: Invalid grid, sort metric, window lengths, direction or
+            timeframe, or data too short for one train + test window.
+    """
+    if grid:
+        names, strategies = _variants(strategy, grid)
+    else:
+        _check_direction(strategy)
+        names, strategies = [], [strategy]
+    _check_sort_by(sort_by)
+    for name, months in (("train_months", train_months), ("test_months", test_months)):
+        if not isinstance(months, int) or months < 1:
+            raise BarbError(
+                f"{name} must be a positive number of months, got {months!r}",
+                error_type="ValidationError",
+                step="walk_forward",
+            )
+
+    with profiling(profile) as profiler:
+        prepared = _prepare(df, strategy.entry, timeframe, [s.exit_target for s in strategies])
+        index = prepared.bars.index if prepared is not None else df.index
+        windows = _windows(index, train_months, test_months, anchored)
+        if prepared is None or not windows:
+            raise BarbError(
+                f"Not enough data for walk-forward: {train_months} months train "
+                f"+ {test_months} months test",
+                error_type="ValidationError",
+                step="walk_forward",
+            )
+
+        with stage("walk_forward"):
+            if workers is None:
+                train_bars = sum(w.test_start - w.train_start for w in windows)
+                workers = default_workers(train_bars * len(strategies))
+            picked = map_forked(
+                lambda w: _run_window(prepared, strategies, w, sort_by),
+                windows,
+                workers,
+                step="walk_forward",
+            )
+
+    dates = index.date if isinstance(index, pd.DatetimeIndex) else index
+    result_windows = []
+    for w, (best, train_metrics, trades) in zip(windows, picked):
+        result_windows.append(
+            WalkForwardWindow(
+                train_start=dates[w.train_start],
+                train_end=dates[w.test_start - 1],
+                test_start=dates[w.test_start],
+                test_end=dates[w.test_stop - 1],
+                train_bars=w.test_start - w.train_start,
+                test_bars=w.test_stop - w.test_start,
+                params={name: getattr(strategies[best], name) for name in names},
+                train_metrics=train_metrics,
+                test_metrics=calculate_metrics(trades),
+                trades=trades,
+            )
+        )
+
+    trades = Trades.concat([w.trades for w in result_windows])
+    train_pnl = sum(w.train_metrics.total_pnl for w in result_windows)
+    efficiency = None
+    if train_pnl > 0:
+        test_rate = sum(w.test_metrics.total_pnl for w in result_windows) / sum(
+            w.test_bars for w in result_windows
+        )
+        efficiency = test_rate / (train_pnl / sum(w.train_bars for w in result_windows))
+    result = WalkForwardResult(
+        windows=result_windows,
+        trades=trades,
+        metrics=calculate_metrics(trades),
+        equity_curve=build_equity_curve(trades),
+        fields=names,
+        sort_by=sort_by,
+        anchored=anchored,
+        efficiency=efficiency,
+    )
+    if profiler is not None and profiler.memory:
+        result.metadata["profile"] = profiler.profile
+    return result
+
+
+def _windows(index: pd.Index, train_months: int, test_months: int, anchored: bool) -> list[_Window]:
+    """Train/test windows over the bars, on calendar months from the first bar's month.
+
+    Test windows follow each other until the data ends; the last one may be
+    shorter. A train window needs at least 2 bars, a test window 1.
+    """
+    if len(index) < 2 or not isinstance(index, pd.DatetimeIndex):
+        return []
+    origin = index[0].normalize().replace(day=1)
+    windows = []
+    k = 0
+    while True:
+        test_from = origin + pd.DateOffset(months=train_months + k * test_months)
+        test_start = int(index.searchsorted(test_from))
+        if test_start >= len(index):
+            return windows
+        train_from = origin if anchored else test_from - pd.DateOffset(months=train_months)
+        train_start = int(index.searchsorted(train_from))
+        test_stop = int(index.searchsorted(test_from + pd.DateOffset(months=test_months)))
+        if test_start - train_start >= 2 and test_stop > test_start:
+            windows.append(_Window(train_start, test_start, test_stop))
+        k += 1
+
+
+def _run_window(
+    prepared: _Prepared, strategies: list[Strategy], window: _Window, sort_by: str
+) -> tuple[int, BacktestMetrics, Trades]:
+    """(chosen variant, its train metrics, its test trades) of one window."""
+    train = [
+        calculate_metrics(_simulate_span(prepared, s, window.train_start, window.test_start))
+        for s in strategies
+    ]
+    best = rank(list(range(len(strategies))), lambda i: train[i], sort_by)[0]
+    trades = _simulate_span(prepared, strategies[best], window.test_start, window.test_stop)
+    return best, train[best], trades
+
+
+def _simulate_span(prepared: _Prepared, strategy: Strategy, start: int, stop: int) -> Trades:
+    return _simulate(prepared, strategy, start=start, stop=stop)
@@ -7,10 +7,18 @@ import pandas as pd
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# Bumped by invalidate_data(); part of every tool result cache key
+_DATA_VERSION = 0
+
 
 @lru_cache
 def load_data(instrument: str, timeframe: str = "1d", asset_type: str = "futures") -> pd.DataFrame:
-    """Load instrument data as pandas DataFrame with DatetimeIndex.
+    """Load instrument data as pandas DataFrame with DatetimeIndex, cached (see read_data)."""
+    return read_data(instrument, timeframe, asset_type)
+
+
+def read_data(instrument: str, timeframe: str = "1d", asset_type: str = "futures") -> pd.DataFrame:
+    """Read instrument data from parquet, uncached (the caller drops it when done).
 
     Args:
         instrument: Symbol name (e.g. "NQ", "ES")
@@ -26,3 +34,15 @@ def load_data(instrument: str, timeframe: str = "1d", asset_type: str = "futures
         df = df.set_index("timestamp")
     df = df[["open", "high", "low", "close", "volume"]]
     return df.sort_index()
+
+
+def data_version() -> int:
+    """Version of the loaded data; changes whenever new data is installed."""
+    return _DATA_VERSION
+
+
+def invalidate_data():
+    """Drop loaded frames so the next load_data() reads fresh parquet files."""
+    global _DATA_VERSION
+    load_data.cache_clear()
+    _DATA_VERSION += 1
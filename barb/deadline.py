@@ -0,0 +1,97 @@
+"""Cooperative deadlines and cancellation for query and backtest execution.
+
+A caller wraps execution in deadline(seconds, cancel). Pipeline code checks
+it between stages: every profile.stage() — pipeline steps, map columns,
+function calls — and each chunk of backtest bars calls check(). Past the
+deadline, or once the cancel event is set (client disconnected), check()
+raises a BarbError and execution unwinds from the next checkpoint.
+
+Checks are cooperative: a single long vectorized call runs to completion,
+but nothing after it starts. Without an active deadline check() is one
+ContextVar lookup.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from barb.ops import BarbError
+
+# error_type of the BarbError check() raises: unwind, never retry or fall back
+INTERRUPTS = frozenset({"TimeoutError", "CancelledError"})
+
+
+@dataclass
+class _Deadline:
+    seconds: float | None
+    expires: float
+    cancel: object | None  # has is_set()
+
+
+_ACTIVE: ContextVar[_Deadline | None] = ContextVar("barb_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None, cancel=None, elapsed: float = 0.0):
+    """Run the block under a time limit (None = no limit) and/or a cancel event.
+
+    cancel is anything with is_set() (threading.Event, or a flag shared with
+    another process). elapsed: part of the limit already spent elsewhere —
+    used when a deadline is handed over to a worker process.
+
+    Nested deadlines only tighten: the earlier expiry wins, an outer cancel
+    event is kept if the inner block doesn't bring its own.
+    """
+    if seconds is not None:
+        expires = time.monotonic() + seconds - elapsed
+    else:
+        expires = float("inf")
+    outer = _ACTIVE.get()
+    if outer is not None:
+        if outer.expires < expires:
+            seconds, expires = outer.seconds, outer.expires
+        cancel = cancel or outer.cancel
+    token = _ACTIVE.set(_Deadline(seconds, expires, cancel))
+    try:
+        yield
+    finally:
+        _ACTIVE.reset(token)
+
+
+def deadline_active() -> bool:
+    return _ACTIVE.get() is not None
+
+
+def current_deadline() -> tuple[float | None, float, object | None]:
+    """(seconds, elapsed, cancel) of the active deadline, to hand it to a worker.
+
+    (None, 0.0, None) without one.
+    """
+    active = _ACTIVE.get()
+    if active is None:
+        return None, 0.0, None
+    elapsed = 0.0
+    if active.seconds is not None:
+        elapsed = active.seconds - (active.expires - time.monotonic())
+    return active.seconds, elapsed, active.cancel
+
+
+def check(step: str = ""):
+    """Raise if the active deadline passed or execution was cancelled.
+
+    Raises:
+        BarbError: error_type "TimeoutError" or "CancelledError"; step is
+            the checkpoint that noticed it.
+    """
+    active = _ACTIVE.get()
+    if active is None:
+        return
+    if active.cancel is not None and active.cancel.is_set():
+        raise BarbError("Execution cancelled", error_type="CancelledError", step=step)
+    if time.monotonic() >= active.expires:
+        raise BarbError(
+            f"Execution exceeded the {active.seconds:g}s time limit",
+            error_type="TimeoutError",
+            step=step,
+        )
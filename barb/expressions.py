@@ -10,38 +10,40 @@ import datetime
 import operator
 import re
 
+import numpy as np
 import pandas as pd
 
+from barb.profile import stage
+
 
 def _is_date_series(s) -> bool:
-    """Check if Series contains date objects."""
-    if not isinstance(s, pd.Series):
-        return False
-    if len(s) == 0:
-        return False
-    first = s.iloc[0]
-    return isinstance(first, datetime.date)
+    """Check if Series holds datetime64 values (date() and friends)."""
+    return isinstance(s, pd.Series) and pd.api.types.is_datetime64_any_dtype(s.dtype)
 
 
-def _parse_date_string(s: str) -> datetime.date | None:
-    """Parse date string like '2024-03-15' to date object."""
+def _parse_date_string(s: str) -> np.datetime64 | None:
+    """Parse date string like '2024-03-15' to a datetime64[D] scalar."""
     if not isinstance(s, str):
         return None
     try:
-        return datetime.datetime.strptime(s, "%Y-%m-%d").date()
+        return np.datetime64(datetime.datetime.strptime(s, "%Y-%m-%d").date(), "D")
     except ValueError:
         return None
 
 
 def _coerce_for_date_comparison(left, right):
-    """Convert string to date if comparing date Series with string."""
+    """Convert string to datetime64 if comparing date Series with string.
+
+    Keeps the comparison on the datetime64 (int64) values instead of
+    per-element Python objects.
+    """
     if _is_date_series(left) and isinstance(right, str):
         parsed = _parse_date_string(right)
-        if parsed:
+        if parsed is not None:
             return left, parsed
     if _is_date_series(right) and isinstance(left, str):
         parsed = _parse_date_string(left)
-        if parsed:
+        if parsed is not None:
             return parsed, right
     return left, right
 
@@ -64,6 +66,26 @@ def _preprocess_keywords(expr: str) -> str:
     return expr
 
 
+def split_top_level(text: str) -> list[str]:
+    """Split on commas outside parentheses/brackets.
+
+    'mean(x), percentile(x, 0.9)' → ['mean(x)', 'percentile(x, 0.9)']
+    """
+    parts = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
 # Operators mapped to pandas-compatible callables
 _BINARY_OPS = {
     ast.Add: operator.add,
@@ -109,6 +131,82 @@ def evaluate(expr: str, df: pd.DataFrame, functions: dict) -> pd.Series | float
     return _eval_node(tree.body, df, functions)
 
 
+def resolve(expr: str, columns, functions: dict) -> None:
+    """Raise the errors evaluate() would, without computing anything.
+
+    Parse errors, unknown columns and functions, unsupported syntax — in
+    evaluation order. For expressions whose values are never needed (map
+    columns pruned by barb/planner.py) but must still fail the same way.
+
+    Raises:
+        ExpressionError: As evaluate() on a DataFrame with these columns
+    """
+    parsed_expr = _preprocess_keywords(expr)
+    try:
+        tree = ast.parse(parsed_expr, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Parse error in '{expr}': {e.msg}") from e
+    _resolve_node(tree.body, list(columns), functions)
+
+
+def _resolve_node(node: ast.AST, columns: list, functions: dict):
+    """_eval_node's checks on names, functions and syntax, in the same order."""
+    if isinstance(node, ast.Constant):
+        return
+
+    if isinstance(node, ast.Name):
+        if node.id not in ("true", "false") and node.id not in columns:
+            raise ExpressionError(f"Unknown column '{node.id}'. Available: {', '.join(columns)}")
+        return
+
+    if isinstance(node, ast.BinOp):
+        _resolve_node(node.left, columns, functions)
+        _resolve_node(node.right, columns, functions)
+        if type(node.op) not in _BINARY_OPS:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        return
+
+    if isinstance(node, ast.UnaryOp):
+        _resolve_node(node.operand, columns, functions)
+        if not isinstance(node.op, (ast.USub, ast.Not)):
+            raise ExpressionError(f"Unsupported unary operator: {type(node.op).__name__}")
+        return
+
+    if isinstance(node, ast.Compare):
+        _resolve_node(node.left, columns, functions)
+        for op, comparator_node in zip(node.ops, node.comparators):
+            _resolve_node(comparator_node, columns, functions)
+            if not isinstance(op, (ast.In, ast.NotIn)) and type(op) not in _COMPARE_OPS:
+                raise ExpressionError(f"Unsupported comparison: {type(op).__name__}")
+        return
+
+    if isinstance(node, ast.BoolOp):
+        for value in node.values:
+            _resolve_node(value, columns, functions)
+        if not isinstance(node.op, (ast.And, ast.Or)):
+            raise ExpressionError(f"Unsupported boolean op: {type(node.op).__name__}")
+        return
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name):
+            raise ExpressionError("Only simple function calls allowed (no methods)")
+        func_name = _REVERSE_ALIASES.get(node.func.id, node.func.id)
+        if func_name not in functions:
+            raise ExpressionError(
+                f"Unknown function '{func_name}'. Available: {', '.join(sorted(functions))}"
+            )
+        for arg in node.args:
+            _resolve_node(arg, columns, functions)
+        return
+
+    if isinstance(node, ast.List):
+        for el in node.elts:
+            _resolve_node(el, columns, functions)
+        return
+
+    raise ExpressionError(f"Unsupported expression type: {type(node).__name__}")
+
+
 def _eval_node(node: ast.AST, df: pd.DataFrame, functions: dict):
     """Recursively evaluate an AST node."""
 
@@ -155,7 +253,7 @@ def _eval_node(node: ast.AST, df: pd.DataFrame, functions: dict):
                 right = _eval_node(comparator_node, df, functions)
                 # Auto-convert date strings in list when comparing with date Series
                 if _is_date_series(current) and isinstance(right, list):
-                    right = [_parse_date_string(x) or x for x in right]
+                    right = [_coerce_for_date_comparison(current, x)[1] for x in right]
                 if isinstance(current, pd.Series):
                     comparison = current.isin(right)
                 else:
@@ -209,7 +307,8 @@ def _eval_node(node: ast.AST, df: pd.DataFrame, functions: dict):
         # Pass df as context for functions that need it (time functions, count)
         func = functions[func_name]
         try:
-            return func(df, *args)
+            with stage(f"fn:{func_name}"):
+                return func(df, *args)
         except TypeError as e:
             # Only catch argument count mismatches, not internal type errors
             if "argument" in str(e) or "positional" in str(e):
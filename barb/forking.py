@@ -0,0 +1,71 @@
+"""Shared plumbing of fork-based fan-out: cancel flags and the CPU budget.
+
+Two places fork worker processes: the tool pool (assistant/pool.py) and
+map_forked (barb/backtest/sweep.py) for sweeps, walk-forward windows and
+portfolio instruments. Both hand the caller's cancel event to forked
+children the same way: a shared byte array created before the fork, one
+flag per slot. The waiting parent polls every POLL_INTERVAL and raises
+the flag once its own event fires; the child's deadline checkpoints read
+it through CancelFlags.event().
+
+They also nest — a sweep runs inside a tool worker — so fan-out sizes come
+from cpu_budget(), not the machine's CPU count. A forked worker calls
+limit_fan_out() first: a tool worker gets its share of the CPUs, a
+map_forked child none, and nested fan-outs stay within the CPUs instead
+of multiplying processes.
+"""
+
+import multiprocessing
+import os
+
+# How often a waiting parent looks at its cancel event, seconds
+POLL_INTERVAL = 0.1
+
+# Processes a fan-out in this process may use; None = all its CPUs
+_FAN_OUT: int | None = None
+
+
+class _Flag:
+    """Child-side cancel event (has is_set()) backed by one shared flag."""
+
+    def __init__(self, flags, slot: int):
+        self._flags = flags
+        self._slot = slot
+
+    def is_set(self) -> bool:
+        return bool(self._flags[self._slot])
+
+
+class CancelFlags:
+    """Cancel flags shared with forked children, one per slot.
+
+    Create before forking; children inherit the shared memory.
+    """
+
+    def __init__(self, slots: int):
+        self._flags = multiprocessing.get_context("fork").RawArray("b", slots)
+
+    def event(self, slot: int) -> _Flag:
+        """Cancel event for deadline() in the child working on slot."""
+        return _Flag(self._flags, slot)
+
+    def forward(self, cancel, slot: int) -> bool:
+        """Raise slot's flag once the caller's cancel event fires. True if raised."""
+        if cancel is not None and cancel.is_set():
+            self._flags[slot] = 1
+        return bool(self._flags[slot])
+
+    def clear(self, slot: int):
+        self._flags[slot] = 0
+
+
+def cpu_budget() -> int:
+    """Processes a fan-out started in this process may use."""
+    cpus = len(os.sched_getaffinity(0))
+    return cpus if _FAN_OUT is None else min(cpus, _FAN_OUT)
+
+
+def limit_fan_out(processes: int):
+    """Cap fan-outs of this forked process at processes (at least 1)."""
+    global _FAN_OUT
+    _FAN_OUT = max(1, processes)
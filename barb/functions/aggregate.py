@@ -1,6 +1,29 @@
 """Aggregate functions: mean, sum, min, max, std, median, count, pct, percentile, etc."""
 
 import numpy as np
+import pandas as pd
+
+from barb.ops import BarbError
+
+
+def check_condition(func: str, value, expression: str = ""):
+    """Raise unless value is a boolean condition: count(close > open), not count(close)."""
+    if not pd.api.types.is_bool_dtype(getattr(value, "dtype", None)):
+        dtype = getattr(value, "dtype", type(value).__name__)
+        raise BarbError(
+            f"{func}() takes a condition like {func}(close > open), got {dtype} values",
+            error_type="ValidationError",
+            step="select",
+            expression=expression,
+        )
+
+
+def _count(df, cond=None) -> int:
+    if cond is None:
+        return len(df)
+    check_condition("count", cond)
+    return int(cond.sum())
+
 
 AGGREGATE_FUNCTIONS = {
     "mean": lambda df, col: col.mean(),
@@ -9,7 +32,7 @@ AGGREGATE_FUNCTIONS = {
     "min": lambda df, col: col.min(),
     "std": lambda df, col: col.std(),
     "median": lambda df, col: col.median(),
-    "count": lambda df: len(df),
+    "count": _count,
     "pct": lambda df, col: col.sum() / len(df) if len(df) > 0 else 0,
     "percentile": lambda df, col, p: col.quantile(float(p)),
     "correlation": lambda df, col1, col2: col1.corr(col2),
@@ -17,7 +40,7 @@ AGGREGATE_FUNCTIONS = {
 }
 
 # Aggregate functions allowed in group_by context.
-# Keys = Barb names, values = pandas agg method names.
+# Keys = Barb names, values = Groups.reduce() reductions (barb/grouping.py).
 AGGREGATE_FUNCS: dict[str, str] = {
     "mean": "mean",
     "sum": "sum",
@@ -25,7 +48,18 @@ AGGREGATE_FUNCS: dict[str, str] = {
     "min": "min",
     "std": "std",
     "median": "median",
+    "count": "count",
     "pct": "mean",
+    "percentile": "quantile",
+    "correlation": "corr",
+    "last": "last",
+}
+
+# Argument count per aggregate (count: none, or a condition)
+AGGREGATE_ARITY: dict[str, tuple[int, ...]] = {
+    "count": (0, 1),
+    "percentile": (2,),
+    "correlation": (2,),
 }
 
 AGGREGATE_SIGNATURES = {
@@ -35,7 +69,7 @@ AGGREGATE_SIGNATURES = {
     "min": "min(col)",
     "std": "std(col)",
     "median": "median(col)",
-    "count": "count()",
+    "count": "count([condition])",
     "pct": "pct(condition)",
     "percentile": "percentile(col, p)",
     "correlation": "correlation(col1, col2)",
@@ -49,7 +83,7 @@ AGGREGATE_DESCRIPTIONS = {
     "min": "minimum value",
     "std": "standard deviation",
     "median": "middle value",
-    "count": "number of bars",
+    "count": "number of bars (with a condition: bars where it is true)",
     "pct": "percentage of rows where condition is true (0.0–1.0)",
     "percentile": "value at p-th percentile",
     "correlation": "Pearson correlation (-1 to 1)",
@@ -1,32 +1,91 @@
 """Time functions — from largest to smallest unit.
 
 year, quarter, month, date, day_of_month, dayofweek, hour, minute.
+
+Calendar fields are computed once per DatetimeIndex and cached. Copies of a
+frame (df.copy() in compute_map, views) share the cache; filtering or
+resampling produces a new index and a new cache entry. Entries die with the
+index data, so reloading base data invalidates them automatically.
 """
 
 import datetime
+import weakref
 
+import numpy as np
 import pandas as pd
 
+# Smallest dtype that holds each field. Widened to int32 on read (pandas'
+# own field dtype) so arithmetic like hour() * 100 can't overflow.
+_FIELD_DTYPES = {
+    "year": np.int16,
+    "quarter": np.int8,
+    "month": np.int8,
+    "day": np.int8,
+    "dayofweek": np.int8,
+    "hour": np.int8,
+    "minute": np.int8,
+}
+
+# id(index data) → {field: ndarray}. Cleared by weakref.finalize.
+_CALENDAR_CACHE: dict[int, dict[str, np.ndarray]] = {}
+
+
+def _calendar(df) -> dict[str, np.ndarray]:
+    """Per-index cache of calendar fields, keyed by the index's backing array."""
+    data = df.index.array
+    key = id(data)
+    cache = _CALENDAR_CACHE.get(key)
+    if cache is None:
+        cache = {}
+        _CALENDAR_CACHE[key] = cache
+        weakref.finalize(data, _CALENDAR_CACHE.pop, key, None)
+    return cache
+
+
+def _field(df, name: str) -> np.ndarray:
+    """Calendar field as a read-only compact array."""
+    if not isinstance(df.index, pd.DatetimeIndex):
+        return getattr(df.index, name)
+    cache = _calendar(df)
+    values = cache.get(name)
+    if values is None:
+        if name == "date":
+            values = df.index.values.astype("datetime64[D]")
+        else:
+            values = np.asarray(getattr(df.index, name), dtype=_FIELD_DTYPES[name])
+        values.flags.writeable = False
+        cache[name] = values
+    return values
+
+
+def _calendar_series(name: str):
+    """Build a TIME_FUNCTIONS entry for an integer calendar field."""
+
+    def func(df):
+        return pd.Series(_field(df, name).astype(np.int32), index=df.index)
+
+    return func
+
 
 def _date(df, *args):
-    """date() → Series of dates; date('2024-01-15') → date literal for comparison."""
+    """date() → datetime64 date series; date('2024-01-15') → date literal for comparison."""
     if not args:
-        return pd.Series(df.index.date, index=df.index)
-    return datetime.datetime.strptime(args[0], "%Y-%m-%d").date()
+        return pd.Series(_field(df, "date"), index=df.index)
+    return np.datetime64(datetime.datetime.strptime(args[0], "%Y-%m-%d").date(), "D")
 
 
 TIME_FUNCTIONS = {
     # Large units
-    "year": lambda df: pd.Series(df.index.year, index=df.index),
-    "quarter": lambda df: pd.Series(df.index.quarter, index=df.index),
-    "month": lambda df: pd.Series(df.index.month, index=df.index),
+    "year": _calendar_series("year"),
+    "quarter": _calendar_series("quarter"),
+    "month": _calendar_series("month"),
     # Date
     "date": _date,
-    "day_of_month": lambda df: pd.Series(df.index.day, index=df.index),
-    "dayofweek": lambda df: pd.Series(df.index.dayofweek, index=df.index),
+    "day_of_month": _calendar_series("day"),
+    "dayofweek": _calendar_series("dayofweek"),
     # Time
-    "hour": lambda df: pd.Series(df.index.hour, index=df.index),
-    "minute": lambda df: pd.Series(df.index.minute, index=df.index),
+    "hour": _calendar_series("hour"),
+    "minute": _calendar_series("minute"),
 }
 
 TIME_SIGNATURES = {
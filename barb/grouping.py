@@ -0,0 +1,104 @@
+"""Grouped aggregation over factorized keys.
+
+group_by keys are often object columns — date() strings, labels from
+if(...). Hashing them is the expensive part of a groupby, so Groups
+factorizes the keys into integer codes once per query; every aggregate in
+the select list then reduces over those codes.
+
+Groups are numbered in sorted key order and rows with a missing key are
+dropped — the same groups, order and index as df.groupby(keys).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Groups:
+    """Rows of a DataFrame labelled with integer group codes."""
+
+    def __init__(self, df: pd.DataFrame, keys: list[str]):
+        key_codes = []
+        levels = []
+        for key in keys:
+            codes, uniques = pd.factorize(df[key], sort=True)
+            key_codes.append(codes)
+            levels.append(uniques)
+
+        if len(keys) == 1:
+            codes = key_codes[0]
+            self.index = levels[0].rename(keys[0])
+        else:
+            # Combined code per row in lexicographic key order, then renumbered
+            # to the combinations that actually occur
+            valid = np.logical_and.reduce([c >= 0 for c in key_codes])
+            dims = tuple(len(u) for u in levels)
+            flat = np.ravel_multi_index([c[valid] for c in key_codes], dims)
+            combos, inverse = np.unique(flat, return_inverse=True)
+            codes = np.full(len(df), -1, dtype=np.intp)
+            codes[valid] = inverse
+            positions = np.unravel_index(combos, dims)
+            self.index = pd.MultiIndex.from_arrays(
+                [u.take(p) for u, p in zip(levels, positions)], names=keys
+            )
+
+        # Missing keys (code -1) are dropped, like groupby(dropna=True)
+        self._keep = None if (codes >= 0).all() else codes >= 0
+        self.codes = codes if self._keep is None else codes[self._keep]
+        self.n = len(self.index)
+
+    def reduce(self, how: str, *values, param=None) -> pd.Series:
+        """One value per group, indexed by the group keys.
+
+        how: count, sum, mean, min, max, std, median, quantile (param = q),
+        last, corr (two value arrays). values are per-row Series or scalars
+        aligned with the grouped DataFrame.
+        """
+        if how == "count" and not values:
+            return pd.Series(np.bincount(self.codes, minlength=self.n), index=self.index)
+
+        columns = [self._rows(v) for v in values]
+        if how == "last":
+            return self._last(columns[0])
+        if how == "corr":
+            return self._corr(*columns)
+
+        grouped = columns[0].groupby(self.codes, sort=True)
+        if how == "count":
+            # count(condition): rows where the condition holds
+            result = grouped.sum()
+        elif how == "quantile":
+            result = grouped.quantile(param)
+        else:
+            result = grouped.agg(how)
+        return result.set_axis(self.index)
+
+    def _rows(self, values) -> pd.Series:
+        """Per-row values without the dropped rows, positionally indexed."""
+        if not isinstance(values, pd.Series):
+            size = len(self._keep) if self._keep is not None else len(self.codes)
+            values = pd.Series(np.full(size, values))
+        values = values.reset_index(drop=True)
+        return values if self._keep is None else values[self._keep].reset_index(drop=True)
+
+    def _last(self, values: pd.Series) -> pd.Series:
+        """Value of each group's last row, missing or not (like last(col))."""
+        _, first_from_end = np.unique(self.codes[::-1], return_index=True)
+        positions = len(self.codes) - 1 - first_from_end
+        return values.iloc[positions].set_axis(self.index)
+
+    def _corr(self, x: pd.Series, y: pd.Series) -> pd.Series:
+        """Pearson correlation per group over rows where both values exist."""
+        x = x.to_numpy(dtype=float)
+        y = y.to_numpy(dtype=float)
+        both = ~(np.isnan(x) | np.isnan(y))
+        codes, x, y = self.codes[both], x[both], y[both]
+
+        count = np.bincount(codes, minlength=self.n).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dx = x - (np.bincount(codes, x, self.n) / count)[codes]
+            dy = y - (np.bincount(codes, y, self.n) / count)[codes]
+            cov = np.bincount(codes, dx * dy, self.n)
+            var = np.bincount(codes, dx * dx, self.n) * np.bincount(codes, dy * dy, self.n)
+            corr = cov / np.sqrt(var)
+        corr[(count < 2) | (var == 0)] = np.nan
+        return pd.Series(corr, index=self.index)
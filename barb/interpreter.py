@@ -5,13 +5,32 @@ Single-step pipeline: session → period → from → map → where → group_by
 Multi-step (steps): each step's output is the next step's input.
 """
 
+import ast
+import contextvars
 import datetime
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
 
+import numpy as np
 import pandas as pd
 
-from barb.expressions import ExpressionError, evaluate
+from barb.deadline import INTERRUPTS
+from barb.expressions import (
+    ExpressionError,
+    _preprocess_keywords,
+    evaluate,
+    resolve,
+    split_top_level,
+)
 from barb.functions import AGGREGATE_FUNCS, FUNCTIONS
+from barb.functions.aggregate import AGGREGATE_ARITY, check_condition
+from barb.grouping import Groups
+from barb.lookback import required_lookback
 from barb.ops import (
     INTRADAY_TIMEFRAMES,
     TIMEFRAMES,
@@ -20,7 +39,11 @@ from barb.ops import (
     filter_period,
     filter_session,
     resample,
+    warmup_bars,
 )
+from barb.planner import CheckOp, GroupOp, MapOp, TrimOp, WhereOp, map_levels, plan_steps
+from barb.profile import profiling, profiling_active, stage
+from barb.results import PAGE_SIZE, RESULTS
 from barb.validation import validate_expressions
 
 # Standard OHLC column order
@@ -51,18 +74,27 @@ _MONTH_NAMES = {
     11: "November",
     12: "December",
 }
+_HOUR_NAMES = {h: f"{h:02d}:00-{h:02d}:59" for h in range(24)}
 DISPLAY_FORMATS = {
     "dayofweek()": lambda v: v.map(_DAY_NAMES),
     "month()": lambda v: v.map(_MONTH_NAMES),
-    "hour()": lambda v: v.map(lambda h: f"{int(h):02d}:00-{int(h):02d}:59"),
+    "hour()": lambda v: v.map(_HOUR_NAMES),
 }
 
+# "HH:MM" for every minute of the day, indexed by minutes since midnight
+_TIME_LABELS = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
 # Columns to preserve original precision (source data, not calculated)
 _PRESERVE_PRECISION = {"open", "high", "low", "close", "volume"}
 
 # Decimal places for calculated values (FP noise removal)
 CALCULATED_PRECISION = 4
 
+# Concurrent map evaluation: bounded pool, only worth it on large frames
+MAP_WORKERS = min(4, os.cpu_count() or 1)
+_PARALLEL_MIN_ROWS = 20_000
+_MAP_POOL: ThreadPoolExecutor | None = None
+
 # Fields allowed in a query
 _VALID_FIELDS = {
     "session",
@@ -79,94 +111,249 @@ _VALID_FIELDS = {
 }
 
 
-def execute(query: dict, df: pd.DataFrame, sessions: dict) -> dict:
+def execute(
+    query: dict,
+    df: pd.DataFrame,
+    sessions: dict,
+    page_size: int | None = None,
+    profile: bool = False,
+) -> dict:
     """Execute a Barb Script query.
 
     Args:
         query: JSON query dict (flat or with steps)
         df: DataFrame with DatetimeIndex and OHLCV columns (daily or minute)
         sessions: {"RTH": ("09:30", "17:00"), ...}
+        page_size: If set and the table is longer, return only the first page
+            and park the full result in barb.results.RESULTS under "cursor".
+            0 is summary only: no table or source rows, nothing parked.
+        profile: Add metadata["profile"] — wall time and peak memory of each
+            stage, map column and function call (see barb/profile.py).
 
     Returns:
         {"summary": ..., "table": [...] | None, "source_rows": ...,
-         "source_row_count": ..., "metadata": {...}, "query": query, "chart": ...}
+         "source_row_count": ..., "metadata": {...}, "query": query, "chart": ...,
+         "cursor": str | None, "total_rows": int}  (cursor/total_rows for tables)
+
+        source_rows is a sample of at most page_size (default PAGE_SIZE) rows;
+        source_row_count is the full count, source_cursor fetches the rest.
 
     Raises:
         BarbError: On validation or execution failure
     """
-    _validate(query)
-
-    if "steps" in query:
-        return _execute_steps(query, df, sessions)
-
-    validate_expressions(query)
+    with profiling(profile) as profiler:
+        result = _execute(query, df, sessions, page_size)
+    if profiler is not None and profiler.memory:
+        result["metadata"]["profile"] = profiler.profile
+    return result
 
-    warnings = []
 
-    timeframe = query.get("from", "1m")
+def _execute(query: dict, df: pd.DataFrame, sessions: dict, page_size: int | None) -> dict:
+    with stage("validate"):
+        _validate(query)
+        if "steps" not in query:
+            validate_expressions(query)
 
-    # 1. SESSION — filter by time of day
-    session_name = query.get("session")
-    if session_name:
-        # Skip session filtering if data has no time component (daily bars)
-        has_time = hasattr(df.index, "hour") and (df.index.hour != 0).any()
-        if has_time:
-            df, warn = filter_session(df, session_name, sessions)
-            if warn:
-                warnings.append(warn)
-
-    # 2. PERIOD — filter by date range
-    period = query.get("period")
-    if period:
-        df = filter_period(df, period)
+    if "steps" in query:
+        return _execute_steps(query, df, sessions, page_size)
 
-    # 3. FROM — resample to target timeframe
-    df = resample(df, timeframe)
+    warnings = []
 
-    # 3.5. SESSION BOUNDARIES — for session_high/low/open/close
-    if session_name and session_name.upper() in sessions:
-        df = add_session_id(df, sessions[session_name.upper()])
+    # 1-3. SESSION → PERIOD → FROM (+ warm-up history for indicators)
+    df, period_start = _scope(df, query, sessions, warnings)
 
     # 4. MAP — compute derived columns
     if query.get("map"):
-        df = compute_map(df, query["map"])
+        with stage("map"):
+            df = compute_map(df, query["map"])
+
+    return _execute_tail(df, query, period_start, warnings, page_size)
+
 
+def _execute_tail(
+    df: pd.DataFrame, query: dict, period_start, warnings: list, page_size: int | None
+) -> dict:
+    """Steps 5-9 of a flat query on a scoped, mapped frame: where → ... → limit."""
     # 5. WHERE — filter rows
     if query.get("where"):
-        df = filter_where(df, query["where"])
+        with stage("where"):
+            df = filter_where(df, query["where"])
 
-    rows_after_filter = len(df)
+    # Drop warm-up rows: they only fed indicators inside the period
+    if period_start is not None:
+        df = df[df.index >= period_start]
 
-    # 6-7. GROUP BY + SELECT
-    group_by = query.get("group_by")
-    select_raw = query.get("select")
+    rows_after_filter = len(df)
 
     # Save filtered rows before aggregation destroys them
     source_df = df
 
+    # 6-9. GROUP BY + SELECT → SORT → LIMIT
+    result_df = _finish(df, query)
+
+    with stage("serialize"):
+        return _build_response(
+            result_df,
+            query,
+            rows_after_filter,
+            query.get("session"),
+            query.get("from", "1m"),
+            warnings,
+            source_df,
+            page_size,
+        )
+
+
+def _finish(df: pd.DataFrame, query: dict):
+    """group_by + select → sort → limit of a flat query or the last step."""
+    group_by = query.get("group_by")
+    select_raw = query.get("select")
+
     if group_by:
-        select = _normalize_select(select_raw or "count()")
-        result_df = _group_aggregate(df, group_by, select)
+        with stage("group_by"):
+            select = _normalize_select(select_raw or "count()")
+            result_df = _group_aggregate(df, group_by, select)
     elif select_raw:
-        select = _normalize_select(select_raw)
-        result_df = _aggregate(df, select)
+        with stage("select"):
+            select = _normalize_select(select_raw)
+            result_df = _aggregate(df, select)
     else:
         result_df = df
 
-    # 8. SORT
     if query.get("sort") and isinstance(result_df, pd.DataFrame):
-        result_df = sort_df(result_df, query["sort"])
+        with stage("sort"):
+            result_df = sort_df(result_df, query["sort"], limit=query.get("limit") or None)
 
-    # 9. LIMIT
     if query.get("limit") and isinstance(result_df, pd.DataFrame):
-        result_df = result_df.head(query["limit"])
+        with stage("limit"):
+            result_df = result_df.head(query["limit"])
+    return result_df
 
-    return _build_response(
-        result_df, query, rows_after_filter, session_name, timeframe, warnings, source_df
-    )
 
+# --- Batch ---
+
+
+_BATCH_STAGES = ("session_ms", "scope_ms", "map_ms", "queries_ms")
+
+
+@dataclass
+class _Shared:
+    """Intermediate frames reused across a batch, keyed by what produced them."""
+
+    sessioned: dict = field(default_factory=dict)
+    scoped: dict = field(default_factory=dict)
+    mapped: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=lambda: dict.fromkeys(_BATCH_STAGES, 0.0))
+
+
+def execute_batch(
+    queries: list[dict], df: pd.DataFrame, sessions: dict, page_size: int | None = None
+) -> dict:
+    """Execute many queries over the same data, sharing work between them.
+
+    Flat queries are grouped by scope: the session filter runs once per
+    session, session → period → from once per (session, period, from,
+    warm-up), and map once per identical map on a scope. Each query then
+    runs its own where → group_by → select → sort → limit. Steps queries
+    run on their own.
+
+    Returns:
+        {"results": [execute() response or {"error": {...}} per query, in order],
+         "timings": {"session_ms", "scope_ms", "map_ms", "queries_ms", "total_ms",
+                     "queries", "scopes", "maps"}}
+    """
+    start = time.perf_counter()
+    shared = _Shared()
+    results = []
+    for query in queries:
+        try:
+            results.append(_execute_shared(query, df, sessions, page_size, shared))
+        except BarbError as e:
+            results.append(
+                {
+                    "error": {
+                        "message": str(e),
+                        "error_type": e.error_type,
+                        "step": e.step,
+                        "expression": e.expression,
+                    }
+                }
+            )
+
+    timings = {k: round(v, 1) for k, v in shared.timings.items()}
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    timings["queries"] = len(queries)
+    timings["scopes"] = len(shared.scoped)
+    timings["maps"] = len(shared.mapped)
+    return {"results": results, "timings": timings}
+
+
+def _execute_shared(
+    query: dict, df: pd.DataFrame, sessions: dict, page_size: int | None, shared: _Shared
+) -> dict:
+    """execute() for one batch query, taking scoped and mapped frames from shared."""
+    if not isinstance(query, dict):
+        raise BarbError(
+            f"query must be an object, got {type(query).__name__}",
+            error_type="ValidationError",
+            step="validate",
+        )
+    _validate(query)
+
+    if "steps" in query:
+        with _timed(shared.timings, "queries_ms"):
+            return _execute_steps(query, df, sessions, page_size)
 
-def _execute_steps(query: dict, df: pd.DataFrame, sessions: dict) -> dict:
+    validate_expressions(query)
+    warnings = []
+
+    # Session filter: once per session
+    session_name = query.get("session")
+    if session_name not in shared.sessioned:
+        added = []
+        with _timed(shared.timings, "session_ms"):
+            sessioned = _filter_session(df, session_name, sessions, added)
+        shared.sessioned[session_name] = (sessioned, added)
+    sessioned, added = shared.sessioned[session_name]
+    warnings.extend(added)
+
+    # Period + resample (+ warm-up): once per scope
+    lookback = None
+    if query.get("period"):
+        lookback = required_lookback(query.get("map"), query.get("where"))
+    scope_key = repr((session_name, query.get("period"), query.get("from", "1m"), lookback))
+    if scope_key not in shared.scoped:
+        added = []
+        with _timed(shared.timings, "scope_ms"):
+            scoped = _scope(sessioned, query, sessions, added, session_filtered=True)
+        shared.scoped[scope_key] = (scoped, added)
+    (scoped_df, period_start), added = shared.scoped[scope_key]
+    warnings.extend(added)
+
+    # Map: once per identical map on a scope
+    if query.get("map"):
+        map_key = repr((scope_key, list(query["map"].items())))
+        if map_key not in shared.mapped:
+            with _timed(shared.timings, "map_ms"):
+                shared.mapped[map_key] = compute_map(scoped_df, query["map"])
+        scoped_df = shared.mapped[map_key]
+
+    with _timed(shared.timings, "queries_ms"):
+        return _execute_tail(scoped_df, query, period_start, warnings, page_size)
+
+
+@contextmanager
+def _timed(timings: dict, key: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] += (time.perf_counter() - start) * 1000
+
+
+def _execute_steps(
+    query: dict, df: pd.DataFrame, sessions: dict, page_size: int | None = None
+) -> dict:
     """Execute a multi-step query. Each step's output feeds the next."""
     steps = query["steps"]
     if not isinstance(steps, list) or len(steps) == 0:
@@ -177,70 +364,37 @@ def _execute_steps(query: dict, df: pd.DataFrame, sessions: dict) -> dict:
         )
 
     warnings = []
-    timeframe = "1m"
-    session_name = None
-
-    for i, step in enumerate(steps):
-        # Step 1: scope data (session → period → from)
-        if i == 0:
-            session_name = step.get("session")
-            timeframe = step.get("from", "1m")
-
-            if session_name:
-                has_time = hasattr(df.index, "hour") and (df.index.hour != 0).any()
-                if has_time:
-                    df, warn = filter_session(df, session_name, sessions)
-                    if warn:
-                        warnings.append(warn)
-
-            period = step.get("period")
-            if period:
-                df = filter_period(df, period)
-
-            df = resample(df, timeframe)
-
-            # Session boundaries for session_high/low/open/close
-            if session_name and session_name.upper() in sessions:
-                df = add_session_id(df, sessions[session_name.upper()])
-
-        # All steps: map → where
-        if step.get("map"):
-            df = compute_map(df, step["map"])
-        if step.get("where"):
-            df = filter_where(df, step["where"])
-
-        # Intermediate steps: group_by → select (output feeds next step)
-        is_last = i == len(steps) - 1
-        if not is_last:
-            group_by = step.get("group_by")
-            select_raw = step.get("select")
-            if group_by:
-                select = _normalize_select(select_raw or "count()")
-                df = _group_aggregate(df, group_by, select)
-                df = df.reset_index()
+    first = steps[0]
+    session_name = first.get("session")
+    timeframe = first.get("from", "1m")
+
+    # Step 1 scopes data (session → period → from); then the optimized plan
+    # runs every step's map → where, with group_by between steps
+    df, period_start = _scope(df, first, sessions, warnings)
+    with stage("plan"):
+        plan = plan_steps(query)
+    for op in plan:
+        if isinstance(op, MapOp):
+            with stage("map"):
+                df = compute_map(df, op.columns)
+        elif isinstance(op, CheckOp):
+            check_map(df, op.columns)
+        elif isinstance(op, WhereOp):
+            with stage("where"):
+                df = _filter_where_all(df, op.exprs)
+        elif isinstance(op, TrimOp):
+            if period_start is not None:
+                df = df[df.index >= period_start]
+        elif isinstance(op, GroupOp):
+            with stage("group_by"):
+                select = _normalize_select(op.select or "count()")
+                df = _group_aggregate(df, op.group_by, select).reset_index()
 
     # Finalize with last step: group_by → select → sort → limit
     last = steps[-1]
     rows_after_filter = len(df)
     source_df = df
-
-    group_by = last.get("group_by")
-    select_raw = last.get("select")
-
-    if group_by:
-        select = _normalize_select(select_raw or "count()")
-        result_df = _group_aggregate(df, group_by, select)
-    elif select_raw:
-        select = _normalize_select(select_raw)
-        result_df = _aggregate(df, select)
-    else:
-        result_df = df
-
-    if last.get("sort") and isinstance(result_df, pd.DataFrame):
-        result_df = sort_df(result_df, last["sort"])
-
-    if last.get("limit") and isinstance(result_df, pd.DataFrame):
-        result_df = result_df.head(last["limit"])
+    result_df = _finish(df, last)
 
     # Build virtual query for response formatting
     all_maps = {}
@@ -250,28 +404,98 @@ def _execute_steps(query: dict, df: pd.DataFrame, sessions: dict) -> dict:
     virtual_query = {"from": timeframe, "map": all_maps}
     if query.get("columns"):
         virtual_query["columns"] = query["columns"]
-    for field in ("group_by", "select", "sort", "limit"):
-        if field in last:
-            virtual_query[field] = last[field]
-
-    return _build_response(
-        result_df,
-        virtual_query,
-        rows_after_filter,
-        session_name,
-        timeframe,
-        warnings,
-        source_df,
-    )
+    for key in ("group_by", "select", "sort", "limit"):
+        if key in last:
+            virtual_query[key] = last[key]
+
+    with stage("serialize"):
+        return _build_response(
+            result_df,
+            virtual_query,
+            rows_after_filter,
+            session_name,
+            timeframe,
+            warnings,
+            source_df,
+            page_size,
+        )
+
+
+def _filter_session(df: pd.DataFrame, session_name, sessions: dict, warnings: list):
+    """Step 1: session filter. No-op without a session or on daily bars."""
+    if not session_name:
+        return df
+    # Skip session filtering if data has no time component (daily bars)
+    has_time = hasattr(df.index, "hour") and (df.index.hour != 0).any()
+    if has_time:
+        df, warn = filter_session(df, session_name, sessions)
+        if warn:
+            warnings.append(warn)
+    return df
+
+
+def _scope(
+    df: pd.DataFrame, query: dict, sessions: dict, warnings: list, session_filtered: bool = False
+) -> tuple:
+    """Steps 1-3: session → period → from, with warm-up history when needed.
+
+    session_filtered: df already went through step 1 (batch reuses it).
+
+    When a period is set and map/where need N bars of history (see
+    barb/lookback.py), up to N bars before the period are prepended so
+    indicators are warmed up on the first in-period row.
+
+    Returns (df, period_start). period_start is the first in-period bar
+    label when warm-up rows were added (caller trims after map/where),
+    otherwise None.
+    """
+    timeframe = query.get("from", "1m")
+
+    # 1. SESSION — filter by time of day
+    session_name = query.get("session")
+    if session_name and not session_filtered:
+        with stage("session"):
+            df = _filter_session(df, session_name, sessions, warnings)
+
+    # 2. PERIOD — filter by date range
+    warmup = None
+    period = query.get("period")
+    if period:
+        with stage("period"):
+            scoped = filter_period(df, period)
+            lookback = required_lookback(query.get("map"), query.get("where"))
+            if lookback and not scoped.empty:
+                warmup = warmup_bars(df, scoped.index[0], timeframe, lookback)
+            df = scoped
+
+    # 3. FROM — resample to target timeframe
+    with stage("from"):
+        df = resample(df, timeframe)
+
+        period_start = None
+        if warmup is not None and not warmup.empty and not df.empty:
+            period_start = df.index[0]
+            df = pd.concat([warmup, df])
+
+    # 3.5. SESSION BOUNDARIES — for session_high/low/open/close
+    if session_name and session_name.upper() in sessions:
+        with stage("session_id"):
+            df = add_session_id(df, sessions[session_name.upper()])
+
+    return df, period_start
 
 
 # --- Normalization ---
 
 
 def _normalize_select(select) -> str | list[str]:
-    """Split comma-separated select into list: 'sum(x), sum(y)' → ['sum(x)', 'sum(y)']."""
+    """Split comma-separated select into list: 'sum(x), sum(y)' → ['sum(x)', 'sum(y)'].
+
+    Commas inside calls don't split: 'percentile(x, 0.9)' stays one expression.
+    """
     if isinstance(select, str) and "," in select:
-        return [s.strip() for s in select.split(",") if s.strip()]
+        parts = split_top_level(select)
+        return parts if len(parts) > 1 else select
     return select
 
 
@@ -315,18 +539,78 @@ def _validate(query: dict):
 
 
 def compute_map(df: pd.DataFrame, map_config: dict) -> pd.DataFrame:
-    """Step 4: Compute derived columns in declaration order."""
+    """Step 4: Compute derived columns in declaration order.
+
+    On large frames, columns that don't read each other (see
+    planner.map_levels) are evaluated concurrently on a small thread pool —
+    NumPy and pandas window kernels release the GIL. Pool threads run in a
+    copy of the caller's context, so deadline checks apply inside them. Any
+    other failure falls back to sequential evaluation so errors are
+    reported exactly as before; a timeout or cancel unwinds.
+    """
+    levels = None
+    # Profiled runs stay sequential so each column gets its own timing
+    if MAP_WORKERS > 1 and len(df) >= _PARALLEL_MIN_ROWS and not profiling_active():
+        levels = map_levels(map_config, df.columns)
+    if levels is None:
+        return _compute_map_sequential(df, map_config)
+
+    out = df.copy()
+    try:
+        for level in levels:
+            if len(level) == 1:
+                values = [evaluate(map_config[level[0]], out, FUNCTIONS)]
+            else:
+                futures = [
+                    _map_pool().submit(
+                        contextvars.copy_context().run, evaluate, map_config[name], out, FUNCTIONS
+                    )
+                    for name in level
+                ]
+                values = [future.result() for future in futures]
+            for name, value in zip(level, values):
+                out[name] = value
+    except Exception as e:
+        if isinstance(e, BarbError) and e.error_type in INTERRUPTS:
+            raise
+        return _compute_map_sequential(df, map_config)
+
+    # Levels assign out of declaration order; restore it
+    ordered = list(df.columns) + list(map_config)
+    if list(out.columns) != ordered:
+        out = out[ordered]
+    return out
+
+
+def _compute_map_sequential(df: pd.DataFrame, map_config: dict) -> pd.DataFrame:
     df = df.copy()
     for name, expr in map_config.items():
-        if not isinstance(expr, str):
+        _check_map_value(name, expr)
+        try:
+            with stage(f"map:{name}"):
+                df[name] = evaluate(expr, df, FUNCTIONS)
+        except ExpressionError as e:
             raise BarbError(
-                f"map value for '{name}' must be a string expression, got {type(expr).__name__}",
-                error_type="TypeError",
+                str(e),
+                error_type="ExpressionError",
                 step="map",
-                expression=str(expr),
-            )
+                expression=expr,
+            ) from e
+    return df
+
+
+def check_map(df: pd.DataFrame, map_config: dict):
+    """Raise the errors compute_map would on these columns, computing nothing.
+
+    For map columns the planner pruned: names and functions are resolved
+    against df's columns and the columns declared before, as compute_map
+    would evaluate them.
+    """
+    columns = list(df.columns)
+    for name, expr in map_config.items():
+        _check_map_value(name, expr)
         try:
-            df[name] = evaluate(expr, df, FUNCTIONS)
+            resolve(expr, columns, FUNCTIONS)
         except ExpressionError as e:
             raise BarbError(
                 str(e),
@@ -334,11 +618,50 @@ def compute_map(df: pd.DataFrame, map_config: dict) -> pd.DataFrame:
                 step="map",
                 expression=expr,
             ) from e
-    return df
+        if name not in columns:
+            columns.append(name)
+
+
+def _check_map_value(name: str, expr):
+    if not isinstance(expr, str):
+        raise BarbError(
+            f"map value for '{name}' must be a string expression, got {type(expr).__name__}",
+            error_type="TypeError",
+            step="map",
+            expression=str(expr),
+        )
+
+
+def _map_pool() -> ThreadPoolExecutor:
+    global _MAP_POOL
+    if _MAP_POOL is None:
+        _MAP_POOL = ThreadPoolExecutor(max_workers=MAP_WORKERS, thread_name_prefix="barb-map")
+    return _MAP_POOL
+
+
+def _reset_map_pool():
+    # A forked child inherits the executor but not its threads
+    global _MAP_POOL
+    _MAP_POOL = None
+
+
+os.register_at_fork(after_in_child=_reset_map_pool)
 
 
 def filter_where(df: pd.DataFrame, where_expr: str) -> pd.DataFrame:
     """Step 5: Filter rows by boolean expression."""
+    return df[_where_mask(df, where_expr)]
+
+
+def _filter_where_all(df: pd.DataFrame, exprs: list[str]) -> pd.DataFrame:
+    """Filter by several predicates evaluated on the same frame (one materialization)."""
+    mask = _where_mask(df, exprs[0])
+    for expr in exprs[1:]:
+        mask = mask & _where_mask(df, expr)
+    return df[mask]
+
+
+def _where_mask(df: pd.DataFrame, where_expr: str) -> pd.Series:
     try:
         mask = evaluate(where_expr, df, FUNCTIONS)
     except ExpressionError as e:
@@ -356,7 +679,7 @@ def filter_where(df: pd.DataFrame, where_expr: str) -> pd.DataFrame:
             step="where",
             expression=where_expr,
         )
-    return df[mask]
+    return mask
 
 
 def _group_aggregate(df: pd.DataFrame, group_by, select) -> pd.DataFrame:
@@ -376,14 +699,15 @@ def _group_aggregate(df: pd.DataFrame, group_by, select) -> pd.DataFrame:
                 expression=col,
             )
 
-    groups = df.groupby(group_by)
+    # Keys factorized once, shared by every aggregate
+    groups = Groups(df, group_by)
     result_parts = {}
 
     for s in select:
         col_name, value = _eval_aggregate(groups, df, s)
         result_parts[col_name] = value
 
-    result = pd.DataFrame(result_parts)
+    result = pd.DataFrame(result_parts, index=groups.index)
     return result
 
 
@@ -418,43 +742,93 @@ def _aggregate(df: pd.DataFrame, select) -> float | int | dict:
     return results
 
 
-def _eval_aggregate(groups, df: pd.DataFrame, select_expr: str) -> tuple[str, pd.Series]:
-    """Evaluate one aggregate expression on grouped data."""
+def _eval_aggregate(groups: Groups, df: pd.DataFrame, select_expr: str) -> tuple[str, pd.Series]:
+    """Evaluate one aggregate expression on grouped data.
+
+    select_expr is func(args) with func from AGGREGATE_FUNCS. Arguments are
+    expressions — mean(high - low), pct(gap() > 0), count(green()) — each
+    evaluated once over all rows, then reduced per group.
+    """
     col_name = _aggregate_col_name(select_expr)
+    call = _parse_aggregate_call(select_expr)
+    func_name = call.func.id
 
-    if select_expr.strip() == "count()":
-        return col_name, groups.size()
+    if func_name not in AGGREGATE_FUNCS:
+        raise BarbError(
+            f"Unknown aggregate function '{func_name}' in group context",
+            error_type="UnknownFunction",
+            step="select",
+            expression=select_expr,
+        )
 
-    # Parse: mean(range) → func=mean, col=range
-    match = re.match(r"(\w+)\((\w+)\)", select_expr.strip())
-    if not match:
+    arity = AGGREGATE_ARITY.get(func_name, (1,))
+    if len(call.args) not in arity:
         raise BarbError(
-            f"Cannot parse aggregate expression: '{select_expr}'",
-            error_type="ParseError",
+            f"Wrong arguments for '{func_name}': got {len(call.args)} args",
+            error_type="ExpressionError",
             step="select",
             expression=select_expr,
         )
 
-    func_name, col = match.groups()
+    param = None
+    arg_nodes = call.args
+    if func_name == "percentile":
+        arg_nodes, param = call.args[:1], _percentile_param(call.args[1], select_expr)
 
-    if func_name not in AGGREGATE_FUNCS:
+    values = [_eval_aggregate_arg(node, df, select_expr) for node in arg_nodes]
+    if func_name == "count" and values:
+        check_condition("count", values[0], select_expr)
+    return col_name, groups.reduce(AGGREGATE_FUNCS[func_name], *values, param=param)
+
+
+def _parse_aggregate_call(select_expr: str) -> ast.Call:
+    try:
+        tree = ast.parse(_preprocess_keywords(select_expr.strip()), mode="eval")
+    except SyntaxError:
+        tree = None
+    call = tree.body if tree is not None else None
+    if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)) or call.keywords:
         raise BarbError(
-            f"Unknown aggregate function '{func_name}' in group context",
-            error_type="UnknownFunction",
+            f"Cannot parse aggregate expression: '{select_expr}'",
+            error_type="ParseError",
             step="select",
             expression=select_expr,
         )
+    return call
 
-    if col not in df.columns:
-        available = ", ".join(sorted(df.columns))
+
+def _percentile_param(node: ast.AST, select_expr: str) -> float:
+    value = node.value if isinstance(node, ast.Constant) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
         raise BarbError(
-            f"Column '{col}' not found. Available: {available}",
+            "percentile() p must be a number between 0 and 1",
             error_type="ValidationError",
             step="select",
             expression=select_expr,
         )
+    return float(value)
+
 
-    return col_name, groups[col].agg(AGGREGATE_FUNCS[func_name])
+def _eval_aggregate_arg(node: ast.AST, df: pd.DataFrame, select_expr: str):
+    if isinstance(node, ast.Name) and node.id not in df.columns:
+        if node.id not in ("true", "false"):
+            available = ", ".join(sorted(df.columns))
+            raise BarbError(
+                f"Column '{node.id}' not found. Available: {available}",
+                error_type="ValidationError",
+                step="select",
+                expression=select_expr,
+            )
+    try:
+        # Keyword aliases (_barb_if_) survive unparse; evaluate() resolves them
+        return evaluate(ast.unparse(node), df, FUNCTIONS)
+    except ExpressionError as e:
+        raise BarbError(
+            str(e),
+            error_type="ExpressionError",
+            step="select",
+            expression=select_expr,
+        ) from e
 
 
 def _aggregate_col_name(expr: str) -> str:
@@ -468,8 +842,14 @@ def _aggregate_col_name(expr: str) -> str:
     return expr
 
 
-def sort_df(df: pd.DataFrame, sort: str) -> pd.DataFrame:
-    """Step 8: Sort result."""
+def sort_df(df: pd.DataFrame, sort: str, limit: int | None = None) -> pd.DataFrame:
+    """Step 8: Sort result.
+
+    Sorting is stable: equal values keep their row order, missing values go
+    last. With limit, only the first limit rows are returned; a column sort
+    then selects them in O(n) instead of sorting everything — same rows,
+    same order.
+    """
     parts = sort.split()
     col = parts[0]
     ascending = len(parts) < 2 or parts[1].lower() != "desc"
@@ -481,9 +861,13 @@ def sort_df(df: pd.DataFrame, sort: str) -> pd.DataFrame:
     if col == "date" and ("timestamp" in df.columns or "timestamp" in index_names):
         col = "timestamp"
     if col in index_names:
-        return df.sort_index(ascending=ascending)
+        return df.sort_index(ascending=ascending, kind="stable").head(limit)
     if col in df.columns:
-        return df.sort_values(col, ascending=ascending)
+        if limit and limit < len(df):
+            positions = _top_positions(df[col], limit, ascending)
+            if positions is not None:
+                return df.take(positions)
+        return df.sort_values(col, ascending=ascending, kind="stable").head(limit)
 
     available = ", ".join(sorted(list(df.columns) + index_names))
     raise BarbError(
@@ -494,6 +878,48 @@ def sort_df(df: pd.DataFrame, sort: str) -> pd.DataFrame:
     )
 
 
+def _top_positions(column: pd.Series, k: int, ascending: bool) -> np.ndarray | None:
+    """Positions of the first k rows of a stable sort of column, in order.
+
+    np.partition finds the k-th value; rows strictly better are all in,
+    rows equal to it fill the rest in row order. Only those k rows are
+    sorted. None when the column isn't numeric/datetime, or when fewer
+    than k values are present (missing values would be in the result).
+    """
+    dtype = column.dtype
+    if not isinstance(dtype, np.dtype) or dtype.kind not in "biufmM":
+        return None
+    values = column.to_numpy()
+    if dtype.kind in "mM":
+        missing = np.isnat(values)
+        values = values.view(np.int64)
+    elif dtype.kind == "f":
+        missing = np.isnan(values)
+    else:
+        missing = None
+    present = values if missing is None else values[~missing]
+    if len(present) <= k:
+        return None
+
+    if ascending:
+        kth = np.partition(present, k - 1)[k - 1]
+        better = values < kth
+    else:
+        kth = np.partition(present, len(present) - k)[len(present) - k]
+        better = values > kth
+    if missing is not None:
+        better &= ~missing
+    chosen = np.flatnonzero(better)
+    ties = np.flatnonzero(values == kth)[: k - len(chosen)]
+    chosen = np.sort(np.concatenate([chosen, ties]))
+
+    # Stable sort of the k rows; descending = reversed stable ascending of the reversed rows
+    if ascending:
+        return chosen[np.argsort(values[chosen], kind="stable")]
+    reverse = chosen[::-1]
+    return reverse[np.argsort(values[reverse], kind="stable")][::-1]
+
+
 def _prepare_for_output(df: pd.DataFrame, query: dict) -> pd.DataFrame:
     """Prepare DataFrame for JSON output: split timestamp, order columns.
 
@@ -519,11 +945,22 @@ def _prepare_for_output(df: pd.DataFrame, query: dict) -> pd.DataFrame:
     timeframe = query.get("from", "1m")
     if "timestamp" in df.columns:
         ts = pd.to_datetime(df["timestamp"])
-        df["date"] = ts.dt.strftime("%Y-%m-%d")
+        if ts.dt.tz is not None:
+            ts = ts.dt.tz_localize(None)
+        minutes = ts.to_numpy(dtype="datetime64[m]")
+        days = minutes.astype("datetime64[D]")
+        df["date"] = _format_dates(days)
         if timeframe in INTRADAY_TIMEFRAMES:
-            df["time"] = ts.dt.strftime("%H:%M")
+            df["time"] = _TIME_LABELS[(minutes - days).astype(np.int64)]
         df = df.drop(columns=["timestamp"])
 
+    # date() columns are datetime64 at midnight → "YYYY-MM-DD"
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values = df[col]
+            if ((values.dt.normalize() == values) | values.isna()).all():
+                df[col] = _format_dates(values.to_numpy(dtype="datetime64[D]"))
+
     # Projection: model controls which columns to show
     columns = query.get("columns")
     if columns:
@@ -569,39 +1006,70 @@ def _prepare_for_output(df: pd.DataFrame, query: dict) -> pd.DataFrame:
     return df
 
 
-def _serialize_records(records: list[dict]) -> list[dict]:
-    """Convert DataFrame records to JSON-serializable format.
+def _format_dates(days: np.ndarray) -> np.ndarray:
+    """datetime64[D] array → "YYYY-MM-DD" strings (None for NaT), without strftime."""
+    out = np.datetime_as_string(days, unit="D").astype(object)
+    out[np.isnat(days)] = None
+    return out
 
-    Rounds calculated float values to CALCULATED_PRECISION, preserves OHLCV precision.
-    """
-    result = []
-    for record in records:
-        row = {}
-        for key, value in record.items():
-            if pd.isna(value):
-                row[key] = None
-            elif isinstance(value, pd.Timestamp):
-                row[key] = value.isoformat()
-            elif isinstance(value, datetime.date):
-                row[key] = value.isoformat()
-            elif hasattr(value, "item"):  # numpy types
-                v = value.item()
-                if key in _PRESERVE_PRECISION or not isinstance(v, float):
-                    row[key] = v
-                else:
-                    row[key] = round(v, CALCULATED_PRECISION)
-            elif isinstance(value, float):
-                if key in _PRESERVE_PRECISION:
-                    row[key] = value
-                else:
-                    row[key] = round(value, CALCULATED_PRECISION)
-            else:
-                row[key] = value
-        result.append(row)
-    return result
 
+def _serialize_table(df: pd.DataFrame) -> list[dict]:
+    """Convert a prepared DataFrame to JSON-serializable records.
 
-def _build_response(result, query, rows, session, timeframe, warnings, source_df=None) -> dict:
+    Works column by column: each column is converted to Python values once
+    with NumPy, then rows are zipped together. Rounds calculated float values
+    to CALCULATED_PRECISION, preserves OHLCV precision, NaN/NaT → None.
+    """
+    names = list(df.columns)
+    columns = [_serialize_column(name, df.iloc[:, i]) for i, name in enumerate(names)]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _serialize_column(name: str, col: pd.Series) -> list:
+    dtype = col.dtype
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in "biu":
+            return col.to_numpy().tolist()
+        if dtype.kind == "f":
+            values = col.to_numpy()
+            if name not in _PRESERVE_PRECISION:
+                values = np.round(values, CALCULATED_PRECISION)
+            return _with_nulls(values, np.isnan(values))
+        if dtype.kind == "M":
+            values = col.to_numpy()
+            return _with_nulls(np.datetime_as_string(values, unit="s"), np.isnat(values))
+
+    # Object and extension dtypes: strings, dates, mixed values
+    return [_serialize_value(name, v) for v in col.tolist()]
+
+
+def _with_nulls(values: np.ndarray, mask: np.ndarray) -> list:
+    """Array → list of Python values, with None at masked positions."""
+    if not mask.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[mask] = None
+    return out.tolist()
+
+
+def _serialize_value(name: str, value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if name not in _PRESERVE_PRECISION:
+            return round(value, CALCULATED_PRECISION)
+    return value
+
+
+def _build_response(
+    result, query, rows, session, timeframe, warnings, source_df=None, page_size=None
+) -> dict:
     """Build the structured response with summary for model and table for UI."""
     metadata = {
         "rows": rows,
@@ -617,31 +1085,50 @@ def _build_response(result, query, rows, session, timeframe, warnings, source_df
     if sort_col:
         summary_columns.add(sort_col)
 
-    # Source rows: evidence for aggregated results (scalar/dict only)
+    # Source rows: evidence for aggregated results. Only a sample is
+    # formatted; the full set is parked unformatted behind source_cursor.
     source_rows = None
     source_row_count = None
+    source_cursor = None
     has_aggregation = query.get("select") is not None
 
     is_valid_source = source_df is not None and isinstance(source_df, pd.DataFrame)
+    summary_only = page_size == 0
     if has_aggregation and is_valid_source and not source_df.empty:
         source_row_count = len(source_df)
-        prepared = _prepare_for_output(source_df, query)
-        source_rows = _serialize_records(prepared.to_dict("records"))
+    if source_row_count and not summary_only:
+        sample_size = page_size or PAGE_SIZE
+        source_rows = _serialize_table(_prepare_for_output(source_df.head(sample_size), query))
+        if source_row_count > sample_size:
+            source_cursor = RESULTS.put(
+                source_df, prepare=partial(_prepare_for_output, query=query)
+            )
 
     # DataFrame result (table or grouped)
     if isinstance(result, pd.DataFrame):
         prepared = _prepare_for_output(result, query)
-        table = _serialize_records(prepared.to_dict("records"))
         is_grouped = query.get("group_by") is not None
 
         summary = _build_summary_for_table(
-            table,
+            prepared,
             query,
             summary_columns,
             map_columns,
             is_grouped,
         )
 
+        # Long tables: ship the first page, keep the rest server-side.
+        # Only the shipped rows are serialized.
+        total_rows = len(prepared)
+        cursor = None
+        if summary_only:
+            table = []
+        elif page_size is not None and total_rows > page_size:
+            cursor = RESULTS.put(prepared)
+            table = _serialize_table(prepared.head(page_size))
+        else:
+            table = _serialize_table(prepared)
+
         # Chart hint for grouped results
         chart = None
         if is_grouped:
@@ -658,9 +1145,12 @@ def _build_response(result, query, rows, session, timeframe, warnings, source_df
             "table": table,
             "source_rows": source_rows,
             "source_row_count": source_row_count,
+            "source_cursor": source_cursor,
             "metadata": metadata,
             "query": query,
             "chart": chart,
+            "cursor": cursor,
+            "total_rows": total_rows,
         }
 
     # Dict result (multiple aggregates)
@@ -675,6 +1165,7 @@ def _build_response(result, query, rows, session, timeframe, warnings, source_df
             "table": None,
             "source_rows": source_rows,
             "source_row_count": source_row_count,
+            "source_cursor": source_cursor,
             "metadata": metadata,
             "query": query,
         }
@@ -693,70 +1184,77 @@ def _build_response(result, query, rows, session, timeframe, warnings, source_df
         "table": None,
         "source_rows": source_rows,
         "source_row_count": source_row_count,
+        "source_cursor": source_cursor,
         "metadata": metadata,
         "query": query,
     }
 
 
 def _build_summary_for_table(
-    table: list,
+    prepared: pd.DataFrame,
     query: dict,
     summary_columns: set,
     map_columns: list,
     is_grouped: bool,
 ) -> dict:
-    """Build summary metadata from the formatted table (what the user sees)."""
+    """Build summary metadata from the prepared table (what the user sees).
+
+    Computed on the DataFrame with column reductions; only the first, last,
+    min and max rows are serialized. Values match the serialized table.
+    """
     summary = {
         "type": "grouped" if is_grouped else "table",
-        "rows": len(table),
+        "rows": len(prepared),
     }
 
     if is_grouped:
         group_by = query.get("group_by")
         summary["by"] = group_by if isinstance(group_by, str) else group_by[0]
 
+    if prepared.empty:
+        return summary
+
     # Stats for numeric columns in summary_columns
-    if table:
-        stats = {}
-        for col in summary_columns:
-            if col not in table[0]:
-                continue
-            vals = [r[col] for r in table if isinstance(r.get(col), (int, float))]
-            if vals:
-                stats[col] = {
-                    "min": min(vals),
-                    "max": max(vals),
-                    "mean": round(sum(vals) / len(vals), 2),
-                }
-        if stats:
-            summary["stats"] = stats
+    stats = {}
+    for col in summary_columns:
+        values = _numeric_values(prepared, col)
+        if values is not None:
+            stats[col] = {
+                "min": _serialize_value(col, values.min()),
+                "max": _serialize_value(col, values.max()),
+                "mean": round(float(values.mean()), 2),
+            }
+    if stats:
+        summary["stats"] = stats
 
     # First/last rows with date/time + map columns
-    if table:
-        first_last_cols = ["date", "time"] + map_columns
-        first_last_cols = [c for c in first_last_cols if c in table[0]]
-
-        first_row = {k: table[0][k] for k in first_last_cols if k in table[0]}
-        last_row = {k: table[-1][k] for k in first_last_cols if k in table[-1]}
-
-        if first_row:
-            summary["first"] = first_row
-        if last_row and len(table) > 1:
-            summary["last"] = last_row
+    first_last_cols = [c for c in ["date", "time"] + map_columns if c in prepared.columns]
+    if first_last_cols:
+        edges = _serialize_table(prepared[first_last_cols].iloc[[0, -1]])
+        summary["first"] = edges[0]
+        if len(prepared) > 1:
+            summary["last"] = edges[1]
 
     # For grouped: find min/max rows by first aggregate column
-    if is_grouped and table:
+    if is_grouped:
         group_by = query.get("group_by")
         group_keys = [group_by] if isinstance(group_by, str) else (group_by or [])
-        agg_cols = [c for c in table[0] if c not in group_keys]
+        agg_cols = [c for c in prepared.columns if c not in group_keys]
         if agg_cols:
             agg_col = agg_cols[0]
-            numeric_rows = [r for r in table if isinstance(r.get(agg_col), (int, float))]
-            if numeric_rows:
-                min_row = min(numeric_rows, key=lambda r: r[agg_col])
-                max_row = max(numeric_rows, key=lambda r: r[agg_col])
-                keys = group_keys + [agg_col]
-                summary["min_row"] = {k: min_row[k] for k in keys if k in min_row}
-                summary["max_row"] = {k: max_row[k] for k in keys if k in max_row}
+            values = _numeric_values(prepared, agg_col)
+            if values is not None:
+                keys = [k for k in group_keys + [agg_col] if k in prepared.columns]
+                # idxmin/idxmax: first occurrence on ties, like min()/max()
+                rows = prepared.loc[[values.idxmin(), values.idxmax()], keys]
+                summary["min_row"], summary["max_row"] = _serialize_table(rows)
 
     return summary
+
+
+def _numeric_values(df: pd.DataFrame, col: str) -> pd.Series | None:
+    """Non-null values of a numeric (or boolean) column; None if there are none."""
+    if col not in df.columns or not pd.api.types.is_numeric_dtype(df[col]):
+        return None
+    values = df[col].dropna()
+    return values if len(values) else None
@@ -0,0 +1,263 @@
+"""Static lookback analysis for Barb Script expressions.
+
+Derives how many bars of history an expression needs before its first
+row to produce the same values it would on the full series. Used by the
+interpreter to load warm-up history in front of a period window, so that
+sma(close, 200) over "2024-03" isn't computed on 21 bars.
+No DataFrame required — pure AST analysis, like validation.py.
+"""
+
+import ast
+
+from barb.expressions import _REVERSE_ALIASES, _preprocess_keywords
+
+# Recursive smoothers never fully forget their seed. Warm-up of k * n bars
+# leaves a seed weight of about e^-12 for both EMA (alpha = 2/(n+1)) and
+# Wilder's RMA (alpha = 1/n) — well under the 0.1 TradingView tolerance.
+_EMA_WARMUP = 6
+_WILDER_WARMUP = 12
+
+# Depend on every earlier row (running state, whole-column stats).
+# Warm-up would change their values, so queries using them keep the period scope.
+_UNBOUNDED = {
+    "cummax",
+    "cummin",
+    "cumsum",
+    "streak",
+    "bars_since",
+    "rank",
+    "valuewhen",
+    "sar",
+    "obv",
+    "ad_line",
+    "mean",
+    "sum",
+    "max",
+    "min",
+    "std",
+    "median",
+    "count",
+    "pct",
+    "percentile",
+    "correlation",
+    "last",
+}
+
+
+class _UnboundedError(Exception):
+    """Lookback can't be bounded statically (path-dependent or non-constant)."""
+
+
+def _n(args: list, i: int, default: float | None = None) -> int:
+    """Numeric parameter at position i, or default if omitted."""
+    if i < len(args):
+        value = args[i]
+        if value is None:
+            raise _UnboundedError
+        return int(value)
+    if default is None:
+        raise _UnboundedError
+    return int(default)
+
+
+def _ema(n: int) -> int:
+    return _EMA_WARMUP * n
+
+
+def _wilder(n: int) -> int:
+    return _WILDER_WARMUP * n
+
+
+def _macd(a: list) -> int:
+    return _ema(max(_n(a, 1, 12), _n(a, 2, 26)))
+
+
+def _macd_signal(a: list) -> int:
+    return _macd(a) + _ema(_n(a, 3, 9))
+
+
+def _kc(a: list) -> int:
+    return max(_ema(_n(a, 0, 20)), _wilder(_n(a, 1, 10)) + 1)
+
+
+# Own lookback of each function in bars, given its numeric arguments
+# (None for non-constant arguments). Nested arguments add their own lookback.
+_LOOKBACKS = {
+    # core
+    "abs": lambda a: 0,
+    "log": lambda a: 0,
+    "sqrt": lambda a: 0,
+    "sign": lambda a: 0,
+    "round": lambda a: 0,
+    "if": lambda a: 0,
+    # lag
+    "prev": lambda a: _n(a, 1, 1),
+    "next": lambda a: 0,
+    # window
+    "rolling_mean": lambda a: _n(a, 1),
+    "rolling_sum": lambda a: _n(a, 1),
+    "rolling_max": lambda a: _n(a, 1),
+    "rolling_min": lambda a: _n(a, 1),
+    "rolling_std": lambda a: _n(a, 1),
+    "rolling_count": lambda a: _n(a, 1),
+    "ema": lambda a: _ema(_n(a, 1)),
+    "sma": lambda a: _n(a, 1),
+    "wma": lambda a: _n(a, 1),
+    "hma": lambda a: _n(a, 1) + int(_n(a, 1) ** 0.5),
+    "vwma": lambda a: _n(a, 0, 20),
+    "rma": lambda a: _wilder(_n(a, 1)),
+    # pattern
+    "rising": lambda a: _n(a, 1, 1),
+    "falling": lambda a: _n(a, 1, 1),
+    "pivothigh": lambda a: _n(a, 0, 5) + _n(a, 1, 5),
+    "pivotlow": lambda a: _n(a, 0, 5) + _n(a, 1, 5),
+    # time
+    "year": lambda a: 0,
+    "quarter": lambda a: 0,
+    "month": lambda a: 0,
+    "date": lambda a: 0,
+    "day_of_month": lambda a: 0,
+    "dayofweek": lambda a: 0,
+    "hour": lambda a: 0,
+    "minute": lambda a: 0,
+    # convenience
+    "gap": lambda a: 1,
+    "gap_pct": lambda a: 1,
+    "change": lambda a: _n(a, 1, 1),
+    "change_pct": lambda a: _n(a, 1, 1),
+    "range": lambda a: 0,
+    "range_pct": lambda a: 0,
+    "midpoint": lambda a: 0,
+    "typical_price": lambda a: 0,
+    "body": lambda a: 0,
+    "body_pct": lambda a: 0,
+    "upper_wick": lambda a: 0,
+    "lower_wick": lambda a: 0,
+    "green": lambda a: 0,
+    "red": lambda a: 0,
+    "doji": lambda a: 0,
+    "inside_bar": lambda a: 1,
+    "outside_bar": lambda a: 1,
+    "crossover": lambda a: 1,
+    "crossunder": lambda a: 1,
+    # oscillators
+    "rsi": lambda a: _wilder(_n(a, 1, 14)) + 1,
+    "stoch_k": lambda a: _n(a, 0, 14),
+    "stoch_d": lambda a: _n(a, 0, 14) + _n(a, 1, 3),
+    "cci": lambda a: _n(a, 0, 20),
+    "williams_r": lambda a: _n(a, 0, 14),
+    "mfi": lambda a: _n(a, 0, 14) + 1,
+    "roc": lambda a: _n(a, 1, 1),
+    "momentum": lambda a: _n(a, 1, 10),
+    # volatility
+    "tr": lambda a: 1,
+    "atr": lambda a: _wilder(_n(a, 0, 14)) + 1,
+    "natr": lambda a: _wilder(_n(a, 0, 14)) + 1,
+    "bbands_upper": lambda a: _n(a, 1, 20),
+    "bbands_middle": lambda a: _n(a, 1, 20),
+    "bbands_lower": lambda a: _n(a, 1, 20),
+    "bbands_width": lambda a: _n(a, 1, 20),
+    "bbands_pctb": lambda a: _n(a, 1, 20),
+    "kc_upper": _kc,
+    "kc_middle": lambda a: _ema(_n(a, 0, 20)),
+    "kc_lower": _kc,
+    "kc_width": _kc,
+    "donchian_upper": lambda a: _n(a, 0, 20),
+    "donchian_lower": lambda a: _n(a, 0, 20),
+    # trend
+    "macd": _macd,
+    "macd_signal": _macd_signal,
+    "macd_hist": _macd_signal,
+    "adx": lambda a: 2 * _wilder(_n(a, 0, 14)) + 1,
+    "plus_di": lambda a: _wilder(_n(a, 0, 14)) + 1,
+    "minus_di": lambda a: _wilder(_n(a, 0, 14)) + 1,
+    "supertrend": lambda a: _wilder(_n(a, 0, 10)) + 1,
+    "supertrend_dir": lambda a: _wilder(_n(a, 0, 10)) + 1,
+    # volume
+    "vwap_day": lambda a: 0,
+    "volume_ratio": lambda a: _n(a, 0, 20),
+    "volume_sma": lambda a: _n(a, 0, 20),
+    # session
+    "session_high": lambda a: 0,
+    "session_low": lambda a: 0,
+    "session_open": lambda a: 0,
+    "session_close": lambda a: 0,
+}
+
+
+def required_lookback(map_config: dict | None, where: str | None = None) -> int | None:
+    """Bars of history needed before the first row by map and where expressions.
+
+    Map columns are resolved in declaration order, so a where referencing
+    a map column inherits that column's lookback.
+
+    Returns:
+        Max lookback in bars (0 = row-local), or None if any expression
+        is path-dependent or uses non-constant window arguments.
+    """
+    columns: dict[str, int] = {}
+    try:
+        for name, expr in (map_config or {}).items():
+            columns[name] = _expr_lookback(expr, columns)
+        needed = max(columns.values(), default=0)
+        if where:
+            needed = max(needed, _expr_lookback(where, columns))
+    except _UnboundedError:
+        return None
+    return needed
+
+
+def _expr_lookback(expr, columns: dict[str, int]) -> int:
+    if not isinstance(expr, str):
+        raise _UnboundedError
+    try:
+        tree = ast.parse(_preprocess_keywords(expr), mode="eval")
+    except SyntaxError as e:
+        raise _UnboundedError from e
+    return _node_lookback(tree.body, columns)
+
+
+def _node_lookback(node: ast.AST, columns: dict[str, int]) -> int:
+    """Lookback of a node = own lookback + deepest lookback among its inputs."""
+    if isinstance(node, ast.Constant):
+        return 0
+
+    if isinstance(node, ast.Name):
+        return columns.get(node.id, 0)
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name):
+            raise _UnboundedError
+        func_name = _REVERSE_ALIASES.get(node.func.id, node.func.id)
+        if func_name in _UNBOUNDED or func_name not in _LOOKBACKS:
+            raise _UnboundedError
+        args = [_numeric(arg) for arg in node.args]
+        inner = max((_node_lookback(arg, columns) for arg in node.args), default=0)
+        return _LOOKBACKS[func_name](args) + inner
+
+    if isinstance(node, ast.BinOp):
+        return max(_node_lookback(node.left, columns), _node_lookback(node.right, columns))
+
+    if isinstance(node, ast.UnaryOp):
+        return _node_lookback(node.operand, columns)
+
+    if isinstance(node, ast.Compare):
+        nodes = [node.left, *node.comparators]
+        return max(_node_lookback(n, columns) for n in nodes)
+
+    if isinstance(node, ast.BoolOp):
+        return max(_node_lookback(v, columns) for v in node.values)
+
+    if isinstance(node, ast.List):
+        return max((_node_lookback(el, columns) for el in node.elts), default=0)
+
+    raise _UnboundedError
+
+
+def _numeric(node: ast.AST) -> float | None:
+    """Constant number argument, or None for columns/expressions."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        if isinstance(node.value, bool) or node.value < 0:
+            return None
+        return node.value
+    return None
@@ -23,6 +23,8 @@ class BarbError(Exception):
         self.error_type = error_type
         self.step = step
         self.expression = expression
+        # Partial execution profile, set when the error left a profiled block
+        self.profile: dict | None = None
 
 
 # Valid values for the "from" field
@@ -195,3 +197,54 @@ def resample(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
     # Drop periods with no data. Can't use dropna(how="all") because
     # volume.sum() returns 0 for empty groups, not NaN.
     return resampled.dropna(subset=["open"])
+
+
+# Approximate span of one bar, used to size warm-up windows before doubling.
+_BAR_SPANS = {
+    "1m": pd.Timedelta(minutes=1),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "1h": pd.Timedelta(hours=1),
+    "2h": pd.Timedelta(hours=2),
+    "4h": pd.Timedelta(hours=4),
+    "daily": pd.Timedelta(days=1),
+    "weekly": pd.Timedelta(weeks=1),
+    "monthly": pd.Timedelta(days=31),
+    "quarterly": pd.Timedelta(days=92),
+    "yearly": pd.Timedelta(days=366),
+}
+
+
+def warmup_bars(df: pd.DataFrame, start, timeframe: str, bars: int) -> pd.DataFrame:
+    """Resampled history strictly before `start`, at least `bars` bars if available.
+
+    Used to warm up indicators in front of a period window. Rows before
+    `start` are resampled on their own, so bars inside the window keep
+    exactly the OHLCV they'd have without warm-up (a weekly bar straddling
+    the period start is not merged with pre-period minutes).
+
+    Args:
+        df: Unscoped data (session-filtered, not period-filtered)
+        start: First timestamp of the period window
+        timeframe: Target timeframe
+        bars: Number of warm-up bars wanted
+    """
+    end = df.index.searchsorted(start, side="left")
+    if bars <= 0 or end == 0:
+        return df.iloc[0:0]
+
+    # Gaps (nights, weekends, sessions) make bars sparser than their span.
+    # Start with 2x and double until enough bars or the start of data.
+    span = _BAR_SPANS[timeframe] * bars * 2
+    while True:
+        begin = df.index.searchsorted(start - span, side="left")
+        history = resample(df.iloc[begin:end], timeframe)
+        if len(history) > bars or begin == 0:
+            break
+        span *= 2
+
+    # Drop a trailing partial bar that shares its label with the window's first bar
+    first_label = resample(df.iloc[end : end + 1], timeframe).index[0]
+    history = history[history.index < first_label]
+    return history.iloc[-bars:]
@@ -0,0 +1,333 @@
+"""Logical plan optimizer for multi-step queries.
+
+Flattens steps into a list of operations and applies three rewrites that
+never change the result:
+
+  1. Prune map columns nothing downstream reads (later maps, where,
+     group_by, select, sort, columns) and that never reach the output.
+     A pruned column is still checked in place (CheckOp): an invalid
+     expression fails as it would without the planner.
+  2. Push row-local where predicates ahead of row-local map columns they
+     don't read, so those columns are computed on fewer rows. Window and
+     path-dependent columns stay in front of the filter: they must see
+     every row to produce the same values.
+  3. Fuse the operations between group_by boundaries: consecutive map
+     columns run in one compute_map call (one frame copy instead of one per
+     step), consecutive filters build one mask.
+
+Pure AST analysis, like lookback.py. Any expression that doesn't parse
+disables the rewrites — execution then reports the error as usual.
+"""
+
+import ast
+from dataclasses import dataclass, field
+
+from barb.expressions import _REVERSE_ALIASES, _preprocess_keywords
+
+_OHLCV = frozenset({"open", "high", "low", "close", "volume"})
+
+# Functions whose value at a row depends only on that row (and its timestamp)
+_ROW_LOCAL = {
+    "abs",
+    "log",
+    "sqrt",
+    "sign",
+    "round",
+    "if",
+    "year",
+    "quarter",
+    "month",
+    "date",
+    "day_of_month",
+    "dayofweek",
+    "hour",
+    "minute",
+    "range",
+    "range_pct",
+    "midpoint",
+    "typical_price",
+    "body",
+    "body_pct",
+    "upper_wick",
+    "lower_wick",
+    "green",
+    "red",
+    "doji",
+}
+
+
+@dataclass
+class MapOp:
+    """Compute derived columns in order (one compute_map call)."""
+
+    columns: dict[str, str]
+
+
+@dataclass
+class CheckOp:
+    """Resolve names and functions of pruned map columns, computing nothing."""
+
+    columns: dict[str, str]
+
+
+@dataclass
+class WhereOp:
+    """Filter rows. All predicates are evaluated on the same input frame."""
+
+    exprs: list[str]
+
+
+@dataclass
+class TrimOp:
+    """Drop warm-up rows in front of the period (after step 0's map/where)."""
+
+
+@dataclass
+class GroupOp:
+    """Intermediate group_by + select; output feeds the next step."""
+
+    group_by: str | list[str]
+    select: str | list[str] | None
+
+
+@dataclass
+class _Expr:
+    """Parsed facts about one expression."""
+
+    refs: set[str] = field(default_factory=set)
+    row_local: bool = True
+
+
+def plan_steps(query: dict) -> list:
+    """Optimized operations for everything before the last step's group_by/select.
+
+    Returns:
+        List of MapOp / CheckOp / WhereOp / TrimOp / GroupOp, executed in order.
+    """
+    ops = _flatten(query["steps"])
+    try:
+        ops = _prune(ops, query)
+        ops = _push_down(ops)
+    except SyntaxError:
+        pass
+    return _fuse(ops)
+
+
+def map_levels(map_config: dict, existing) -> list[list[str]] | None:
+    """Dependency levels of map columns, for concurrent evaluation.
+
+    Level k holds columns that only read base columns and columns of
+    levels < k, so columns within a level are independent of each other.
+
+    Returns:
+        Levels in order (names within a level in declaration order), or None
+        when evaluation must stay sequential: a column shadows an existing
+        one, an expression reads a not-yet-declared column (sequential
+        evaluation reports it), an expression doesn't parse, or there is
+        nothing to run side by side.
+    """
+    names = list(map_config)
+    if len(names) < 2 or set(names) & set(existing):
+        return None
+
+    level_of: dict[str, int] = {}
+    for i, name in enumerate(names):
+        try:
+            refs = _analyze(map_config[name]).refs
+        except SyntaxError:
+            return None
+        if refs & set(names[i:]):
+            return None
+        level_of[name] = 1 + max((level_of[r] for r in refs if r in level_of), default=-1)
+
+    levels = [[] for _ in range(max(level_of.values()) + 1)]
+    for name in names:
+        levels[level_of[name]].append(name)
+    if all(len(level) == 1 for level in levels):
+        return None
+    return levels
+
+
+# --- Flatten ---
+
+
+def _flatten(steps: list[dict]) -> list:
+    """One op per map column / where / boundary, in execution order."""
+    ops = []
+    for i, step in enumerate(steps):
+        for name, expr in (step.get("map") or {}).items():
+            ops.append(MapOp({name: expr}))
+        if step.get("where"):
+            ops.append(WhereOp([step["where"]]))
+        if i == 0:
+            ops.append(TrimOp())
+        if i < len(steps) - 1 and step.get("group_by"):
+            ops.append(GroupOp(step["group_by"], step.get("select")))
+    return ops
+
+
+# --- Rule 1: prune ---
+
+
+def _prune(ops: list, query: dict) -> list:
+    """Backward liveness pass over map columns.
+
+    Columns after the last GroupOp end up in the table or source_rows, so
+    they are only pruned when the output is a plain table projected to
+    `columns`. Before a GroupOp only group keys and aggregated columns survive.
+    """
+    last = query["steps"][-1]
+    aggregated = bool(last.get("group_by") or last.get("select"))
+    projected = bool(query.get("columns")) and not aggregated
+    keep_all = not projected
+
+    live = set(query.get("columns") or [])
+    live |= _names_of(last.get("group_by"))
+    live |= _select_refs(last.get("select"))
+    if last.get("sort"):
+        live.add(last["sort"].split()[0])
+
+    kept = []
+    for op in reversed(ops):
+        if isinstance(op, MapOp):
+            ((name, expr),) = op.columns.items()
+            if not (keep_all or name in live or name in _OHLCV):
+                kept.append(CheckOp(op.columns))
+                continue
+            info = _analyze(expr)
+            live.discard(name)
+            live |= info.refs
+        elif isinstance(op, WhereOp):
+            live |= _analyze(op.exprs[0]).refs
+        elif isinstance(op, GroupOp):
+            # Upstream columns only matter through the aggregation
+            keep_all = False
+            live = _names_of(op.group_by) | _select_refs(op.select)
+        kept.append(op)
+    return kept[::-1]
+
+
+# --- Rule 2: predicate pushdown ---
+
+
+def _push_down(ops: list) -> list:
+    """Move each row-local where ahead of row-local maps it doesn't read."""
+    ops = list(ops)
+    for i in range(len(ops)):
+        op = ops[i]
+        if not isinstance(op, WhereOp):
+            continue
+        info = _analyze(op.exprs[0])
+        if not info.row_local:
+            continue
+        j = i
+        while j > 0 and _commutes(ops[j - 1], info):
+            j -= 1
+        if j < i:
+            ops.insert(j, ops.pop(i))
+    return ops
+
+
+def _commutes(prev, where: _Expr) -> bool:
+    """Can a row-local filter run before prev without changing any value?"""
+    if isinstance(prev, (TrimOp, CheckOp)):
+        return True
+    if isinstance(prev, MapOp):
+        ((name, expr),) = prev.columns.items()
+        return name not in where.refs and _analyze(expr).row_local
+    return False
+
+
+# --- Rule 3: fusion ---
+
+
+def _fuse(ops: list) -> list:
+    fused = []
+    for op in ops:
+        prev = fused[-1] if fused else None
+        if isinstance(op, (MapOp, CheckOp)) and type(prev) is type(op):
+            # A repeated name must see the earlier value: start a new op
+            if not set(op.columns) & set(prev.columns):
+                prev.columns.update(op.columns)
+                continue
+        if isinstance(op, WhereOp) and isinstance(prev, WhereOp):
+            # Evaluating on the unfiltered frame is only safe for row-local predicates
+            try:
+                row_local = all(_analyze(e).row_local for e in op.exprs)
+            except SyntaxError:
+                row_local = False
+            if row_local:
+                prev.exprs.extend(op.exprs)
+                continue
+        if isinstance(op, MapOp):
+            op = MapOp(dict(op.columns))
+        elif isinstance(op, CheckOp):
+            op = CheckOp(dict(op.columns))
+        elif isinstance(op, WhereOp):
+            op = WhereOp(list(op.exprs))
+        fused.append(op)
+    return fused
+
+
+# --- AST helpers ---
+
+
+def _analyze(expr) -> _Expr:
+    """Column references and row-locality of an expression.
+
+    Raises:
+        SyntaxError: Expression isn't a parseable string
+    """
+    if not isinstance(expr, str):
+        raise SyntaxError(f"not an expression: {expr!r}")
+    tree = ast.parse(_preprocess_keywords(expr), mode="eval")
+    info = _Expr()
+    func_names = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if _REVERSE_ALIASES.get(name, name) not in _ROW_LOCAL:
+                info.row_local = False
+            # Functions read OHLCV columns implicitly (atr(14), green())
+            info.refs |= _OHLCV
+        elif isinstance(node, ast.Name):
+            if id(node) not in func_names and node.id not in ("true", "false"):
+                info.refs.add(node.id)
+        elif not isinstance(node, _ROW_LOCAL_NODES):
+            info.row_local = False
+    return info
+
+
+_ROW_LOCAL_NODES = (
+    ast.Expression,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.BoolOp,
+    ast.List,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.boolop,
+)
+
+
+def _names_of(value) -> set[str]:
+    if isinstance(value, str):
+        return {value}
+    return set(value or [])
+
+
+def _select_refs(select) -> set[str]:
+    """Columns read by select: 'mean(range), max(gap)' → {range, gap, ohlcv}."""
+    if not select:
+        return set()
+    if isinstance(select, str):
+        select = [select]
+    refs = set()
+    for expr in select:
+        refs |= _analyze(expr).refs
+    return refs
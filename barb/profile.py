@@ -0,0 +1,154 @@
+"""Per-stage execution profiler.
+
+execute(..., profile=True) and run_backtest(..., profile=True) record wall
+time and peak memory of every stage into metadata["profile"]:
+
+    {"total_ms": 812.4, "peak_kb": 10240.0, "stages": [
+        {"name": "session", "ms": 412.0, "peak_kb": 2048.5},
+        {"name": "map", "ms": 201.3, "peak_kb": 5120.0, "children": [
+            {"name": "map:rsi", "ms": 200.9, "peak_kb": 5100.0, "children": [
+                {"name": "fn:rsi", "ms": 200.1, "peak_kb": 5000.0}]}]},
+        {"name": "serialize", ...}]}
+
+peak_kb is the peak of traced allocations above the level at stage start
+(tracemalloc), so each nested stage reports its own peak. Memory tracing
+slows allocation-heavy code — profiling is opt-in per call.
+
+Under a deadline (barb/deadline.py) execution is always timed, without
+memory tracing, so a timeout or cancellation BarbError carries the partial
+profile in e.profile: finished stages plus the one that was interrupted.
+
+The active profiler lives in a ContextVar: pipeline code calls stage()
+unconditionally, and it is a no-op when nothing is being profiled. Every
+stage() is also a deadline checkpoint.
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from barb.deadline import check, deadline_active
+from barb.ops import BarbError
+
+_ACTIVE: ContextVar["Profiler | None"] = ContextVar("barb_profiler", default=None)
+
+
+@dataclass
+class _Frame:
+    name: str
+    start: float
+    base_mem: int
+    peak_mem: int
+    ms: float = 0.0
+    children: list["_Frame"] = field(default_factory=list)
+
+    def to_dict(self, memory: bool) -> dict:
+        out = {"name": self.name, "ms": round(self.ms, 3)}
+        if memory:
+            out["peak_kb"] = round((self.peak_mem - self.base_mem) / 1024, 1)
+        if self.children:
+            out["children"] = [c.to_dict(memory) for c in self.children]
+        return out
+
+
+class Profiler:
+    """Tree of timed stages, with peak memory deltas if memory is traced."""
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self._stack: list[_Frame] = []
+        current = self._flush()
+        self._root = _Frame("total", time.perf_counter(), current, current)
+        self._stack.append(self._root)
+        # Final result, set when the profiling() block exits
+        self.profile: dict | None = None
+
+    @contextmanager
+    def stage(self, name: str):
+        current = self._flush()
+        frame = _Frame(name, time.perf_counter(), current, current)
+        self._stack[-1].children.append(frame)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._flush()
+            self._stack.pop()
+            frame.ms = (time.perf_counter() - frame.start) * 1000
+
+    def result(self) -> dict:
+        self._flush()
+        root = self._root
+        out = {"total_ms": round((time.perf_counter() - root.start) * 1000, 3)}
+        if self.memory:
+            out["peak_kb"] = round((root.peak_mem - root.base_mem) / 1024, 1)
+        out["stages"] = [c.to_dict(self.memory) for c in root.children]
+        return out
+
+    def _flush(self) -> int:
+        """Credit the peak since the last flush to every open stage, start a new window."""
+        if not self.memory:
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame.peak_mem = max(frame.peak_mem, peak)
+        tracemalloc.reset_peak()
+        return current
+
+
+@contextmanager
+def profiling(enabled: bool = True):
+    """Profile the block. Yields the Profiler, or None when not profiling.
+
+    enabled=False still times the block (without memory) when a deadline is
+    active, for the partial profile of a timeout; check profiler.memory or
+    the caller's own flag before reporting it. A BarbError leaving the
+    block gets the profile so far as e.profile.
+
+    Inside an already profiled block this yields None: the stages land in
+    the outer profile instead of starting a second one.
+    """
+    if _ACTIVE.get() is not None or not (enabled or deadline_active()):
+        yield None
+        return
+
+    started = enabled and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profiler = Profiler(memory=enabled)
+    token = _ACTIVE.set(profiler)
+    try:
+        yield profiler
+    except BarbError as e:
+        e.profile = profiler.result()
+        raise
+    finally:
+        _ACTIVE.reset(token)
+        # Result must be taken before tracing stops
+        profiler.profile = profiler.result()
+        if started:
+            tracemalloc.stop()
+
+
+def profiling_active() -> bool:
+    """A full profile (requested with profile=True) is being recorded."""
+    profiler = _ACTIVE.get()
+    return profiler is not None and profiler.memory
+
+
+@contextmanager
+def stage(name: str):
+    """Record the block as a stage of the active profile (no-op if none).
+
+    Raises:
+        BarbError: Deadline passed or execution cancelled (see barb/deadline.py)
+    """
+    check(name)
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
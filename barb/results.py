@@ -0,0 +1,202 @@
+"""Server-side result store — cursors over query results.
+
+A minute-level query without limit can return hundreds of thousands of
+rows. Instead of pushing them all through SSE and into messages.data, the
+interpreter parks the prepared DataFrame here under a cursor id and sends
+only the first page. The UI fetches further pages (or a sorted view) on
+demand via /api/results/{cursor}.
+
+Entries can be lazy: aggregate queries park their raw source rows with a
+prepare function, and formatting happens only when the UI first asks for
+a page.
+
+Entries live for RESULT_TTL seconds; at most MAX_RESULTS / MAX_BYTES are
+kept, oldest evicted first. In-memory and per-process — a cursor after a
+restart is simply expired. Tool workers (assistant/pool.py) keep their
+own stores; their cursors carry a prefix the API routes pages by.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from barb.ops import BarbError
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+RESULT_TTL = 30 * 60
+MAX_RESULTS = 64
+MAX_BYTES = 512 * 1024 * 1024
+
+
+@dataclass
+class _Entry:
+    source: pd.DataFrame
+    prepare: Callable[[pd.DataFrame], pd.DataFrame] | None
+    expires: float
+    nbytes: int
+    # sort spec → row order, computed once per cursor
+    orders: dict[str, np.ndarray] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Prepared rows, materialized on first access."""
+        with self.lock:
+            if self.prepare is not None:
+                self.source = self.prepare(self.source).reset_index(drop=True)
+                self.prepare = None
+        return self.source
+
+
+class ResultStore:
+    """Thread-safe TTL store of prepared result DataFrames."""
+
+    def __init__(
+        self,
+        ttl: float = RESULT_TTL,
+        max_entries: int = MAX_RESULTS,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Cursor prefix naming the owning process ("w0." in tool workers)
+        self.prefix = ""
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        df: pd.DataFrame,
+        prepare: Callable[[pd.DataFrame], pd.DataFrame] | None = None,
+    ) -> str:
+        """Store a result, return its cursor.
+
+        Args:
+            df: Prepared DataFrame (output of _prepare_for_output), or raw
+                rows if prepare is given.
+            prepare: Deferred formatting, applied on first page fetch.
+        """
+        cursor = self.prefix + secrets.token_urlsafe(16)
+        now = time.monotonic()
+        # Size at put time; a single oversized result still fits alone
+        nbytes = int(df.memory_usage(index=True).sum())
+        if prepare is None:
+            df = df.reset_index(drop=True)
+        with self._lock:
+            self._evict(now)
+            used = sum(e.nbytes for e in self._entries.values())
+            while self._entries and (
+                len(self._entries) >= self.max_entries or used + nbytes > self.max_bytes
+            ):
+                _, oldest = self._entries.popitem(last=False)
+                used -= oldest.nbytes
+            self._entries[cursor] = _Entry(df, prepare, now + self.ttl, nbytes)
+        return cursor
+
+    def get(self, cursor: str) -> pd.DataFrame | None:
+        entry = self._get(cursor)
+        return entry.df if entry else None
+
+    def page(
+        self,
+        cursor: str,
+        offset: int = 0,
+        limit: int = PAGE_SIZE,
+        sort: str | None = None,
+    ) -> dict | None:
+        """Slice of a stored result, optionally sorted. None if cursor expired.
+
+        sort uses query syntax: "column" or "column desc".
+
+        Raises:
+            BarbError: Unknown sort column
+        """
+        from barb.interpreter import _serialize_table
+
+        entry = self._get(cursor)
+        if entry is None:
+            return None
+
+        df = entry.df
+        offset = max(offset, 0)
+        limit = min(max(limit, 0), MAX_PAGE_SIZE)
+        if sort:
+            rows = df.take(self._order(entry, sort)[offset : offset + limit])
+        else:
+            rows = df.iloc[offset : offset + limit]
+
+        return {
+            "cursor": cursor,
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "total_rows": len(df),
+            "columns": list(df.columns),
+            "rows": _serialize_table(rows),
+        }
+
+    def peek(self, cursor: str) -> tuple[pd.DataFrame, Callable | None] | None:
+        """(df, prepare) of an entry without removing it, or None if expired.
+
+        For re-parking the same rows under a new cursor (cached tool results).
+        """
+        entry = self._get(cursor)
+        if entry is None:
+            return None
+        with entry.lock:
+            return entry.source, entry.prepare
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(time.monotonic())
+            return len(self._entries)
+
+    def _get(self, cursor: str) -> _Entry | None:
+        with self._lock:
+            self._evict(time.monotonic())
+            return self._entries.get(cursor)
+
+    def _evict(self, now: float):
+        expired = [k for k, e in self._entries.items() if e.expires <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def _order(self, entry: _Entry, sort: str) -> np.ndarray:
+        order = entry.orders.get(sort)
+        if order is not None:
+            return order
+
+        parts = sort.split()
+        col = parts[0] if parts else ""
+        ascending = len(parts) < 2 or parts[1].lower() != "desc"
+        if col not in entry.df.columns:
+            available = ", ".join(entry.df.columns)
+            raise BarbError(
+                f"Sort column '{col}' not found. Available: {available}",
+                error_type="ValidationError",
+                step="sort",
+                expression=sort,
+            )
+
+        # Stable: ties keep the original result order; NaN always last
+        order = np.asarray(
+            entry.df[col].sort_values(ascending=ascending, kind="stable").index, dtype=np.intp
+        )
+        entry.orders[sort] = order
+        return order
+
+
+# Process-wide store shared by the interpreter and the API
+RESULTS = ResultStore()
@@ -13,6 +13,7 @@ from barb.expressions import (
     _COMPARE_OPS,
     _REVERSE_ALIASES,
     _preprocess_keywords,
+    split_top_level,
 )
 from barb.functions import AGGREGATE_FUNCS, FUNCTIONS
 
@@ -29,9 +30,6 @@ class ValidationError(Exception):
 # Standalone = not part of ==, !=, <=, >=
 _LONE_EQUALS_RE = re.compile(r"(?<![=!<>])=(?!=)")
 
-# Group aggregate pattern: func(col) or count()
-_AGG_EXPR_RE = re.compile(r"^(\w+)\((\w+)?\)$")
-
 _KNOWN_FUNCTIONS = set(FUNCTIONS.keys())
 
 
@@ -240,7 +238,7 @@ def _walk_ast(node: ast.AST, label: str, step: str, errors: list[dict]) -> None:
 def _check_select(select_raw: str, group_by, errors: list[dict]) -> None:
     """Check select expressions. Handles comma-separated lists."""
     if "," in select_raw:
-        parts = [s.strip() for s in select_raw.split(",") if s.strip()]
+        parts = split_top_level(select_raw)
     else:
         parts = [select_raw.strip()]
 
@@ -252,26 +250,27 @@ def _check_select(select_raw: str, group_by, errors: list[dict]) -> None:
 
 
 def _check_group_select(expr: str, errors: list[dict]) -> None:
-    """Check a select expression in group_by context (must be func(col) or count())."""
+    """Check a select expression in group_by context: an aggregate call, func(args)."""
     expr = expr.strip()
-    if expr == "count()":
-        return
+    try:
+        call = ast.parse(_preprocess_keywords(expr), mode="eval").body
+    except SyntaxError:
+        call = None
 
-    match = _AGG_EXPR_RE.match(expr)
-    if not match:
+    if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)):
         errors.append(
             {
                 "step": "select",
                 "expression": expr,
                 "message": (
                     f"Cannot parse aggregate expression: '{expr}'. "
-                    "Expected: func(column) or count()"
+                    "Expected: func(expression) or count()"
                 ),
             }
         )
         return
 
-    func_name = match.group(1)
+    func_name = call.func.id
     if func_name not in AGGREGATE_FUNCS:
         errors.append(
             {
@@ -283,6 +282,10 @@ def _check_group_select(expr: str, errors: list[dict]) -> None:
                 ),
             }
         )
+        return
+
+    for arg in call.args:
+        _walk_ast(arg, "select", "select", errors)
 
 
 def _suggest_column_name(expr: str) -> str:
@@ -56,6 +56,11 @@ def register_instrument(row: dict) -> None:
     _CACHE[row["symbol"].upper()] = normalized
 
 
+def list_symbols() -> list[str]:
+    """Symbols of all registered instruments."""
+    return list(_CACHE)
+
+
 def get_instrument(symbol: str) -> dict | None:
     """Get instrument configuration from cache."""
     return _CACHE.get(symbol.upper())
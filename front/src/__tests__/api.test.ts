@@ -4,6 +4,8 @@ import {
   listConversations,
   removeConversation,
   getMessages,
+  getResultPage,
+  rerunResult,
   sendMessageStream,
 } from "@/lib/api";
 
@@ -109,6 +111,59 @@ describe("getMessages", () => {
   });
 });
 
+describe("getResultPage", () => {
+  const page = {
+    cursor: "w0.abc",
+    offset: 500,
+    limit: 500,
+    sort: "pnl desc",
+    total_rows: 1200,
+    columns: ["pnl"],
+    rows: [{ pnl: 1 }],
+  };
+
+  it("requests the page with offset, limit and sort", async () => {
+    mockFetch.mockResolvedValue(jsonResponse(page));
+
+    const result = await getResultPage(
+      "w0.abc",
+      { offset: 500, limit: 500, sort: "pnl desc" },
+      "tok-123",
+    );
+
+    expect(result).toEqual(page);
+    expect(mockFetch).toHaveBeenCalledWith(
+      expect.stringContaining("/api/results/w0.abc?offset=500&limit=500&sort=pnl+desc"),
+      expect.objectContaining({
+        headers: expect.objectContaining({ Authorization: "Bearer tok-123" }),
+      }),
+    );
+  });
+
+  it("returns null once the cursor has expired", async () => {
+    mockFetch.mockResolvedValue(errorResponse(404, "Result expired"));
+    expect(await getResultPage("gone", { offset: 0, limit: 500 }, "tok")).toBeNull();
+  });
+});
+
+describe("rerunResult", () => {
+  it("posts the rerun source with the page", async () => {
+    const rerun = { tool: "run_query", instrument: "NQ", input: { query: {} }, block: 0 };
+    mockFetch.mockResolvedValue(jsonResponse({ cursor: "new", rows: [] }));
+
+    const result = await rerunResult(rerun, { offset: 500, limit: 500 }, "tok-123");
+
+    expect(result.cursor).toBe("new");
+    expect(mockFetch).toHaveBeenCalledWith(
+      expect.stringContaining("/api/results/rerun"),
+      expect.objectContaining({
+        method: "POST",
+        body: JSON.stringify({ ...rerun, offset: 500, limit: 500 }),
+      }),
+    );
+  });
+});
+
 describe("sendMessageStream", () => {
   it("dispatches SSE events to callbacks", async () => {
     mockFetch.mockResolvedValue(
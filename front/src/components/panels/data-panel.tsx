@@ -32,6 +32,8 @@ import {
 } from "@/components/ui/table";
 import { formatLabel } from "@/components/ai/data-card";
 import { BarChart } from "@/components/charts/bar-chart";
+import { useAuth } from "@/hooks/use-auth";
+import { PAGE_SIZE, useResultPage } from "@/hooks/use-result-page";
 import { formatColumnLabel, formatValue } from "@/lib/format";
 import type {
   AreaChartBlock,
@@ -77,54 +79,102 @@ function buildColumns(keys: string[]): ColumnDef<Row>[] {
 const coreRowModel = getCoreRowModel<Row>();
 const sortedRowModel = getSortedRowModel<Row>();
 
+/** Query-syntax sort of a paginated result: "column" or "column desc" */
+function sortParam(sorting: SortingState): string | undefined {
+  const [first] = sorting;
+  if (!first) return undefined;
+  return first.desc ? `${first.id} desc` : first.id;
+}
+
 function TableBlockView({ block }: { block: TableBlock }) {
+  const { session } = useAuth();
   const [sorting, setSorting] = useState<SortingState>([]);
+  const [offset, setOffset] = useState(0);
   const columns = buildColumns(block.columns);
 
+  // Tables with a cursor hold only one page: sort and page on the server
+  const paged = block.cursor !== undefined;
+  const total = block.total_rows ?? block.rows.length;
+  const { rows, loading } = useResultPage(
+    block,
+    session?.access_token ?? "",
+    offset,
+    paged ? sortParam(sorting) : undefined,
+  );
+
   const table = useReactTable({
-    data: block.rows,
+    data: paged ? rows : block.rows,
     columns,
     getCoreRowModel: coreRowModel,
     getSortedRowModel: sortedRowModel,
-    onSortingChange: setSorting,
+    manualSorting: paged,
+    onSortingChange: (updater) => {
+      setSorting(updater);
+      setOffset(0);
+    },
     state: { sorting },
   });
 
   return (
-    <Table className="w-auto mx-6">
-      <TableHeader>
-        {table.getHeaderGroups().map((group) => (
-          <TableRow key={group.id}>
-            {group.headers.map((header) => (
-              <TableHead key={header.id} className="min-w-[180px]">
-                {header.isPlaceholder
-                  ? null
-                  : flexRender(header.column.columnDef.header, header.getContext())}
-              </TableHead>
-            ))}
-          </TableRow>
-        ))}
-      </TableHeader>
-      <TableBody>
-        {table.getRowModel().rows.length ? (
-          table.getRowModel().rows.map((row) => (
-            <TableRow key={row.id}>
-              {row.getVisibleCells().map((cell) => (
-                <TableCell key={cell.id}>
-                  {flexRender(cell.column.columnDef.cell, cell.getContext())}
-                </TableCell>
+    <>
+      <Table className="w-auto mx-6">
+        <TableHeader>
+          {table.getHeaderGroups().map((group) => (
+            <TableRow key={group.id}>
+              {group.headers.map((header) => (
+                <TableHead key={header.id} className="min-w-[180px]">
+                  {header.isPlaceholder
+                    ? null
+                    : flexRender(header.column.columnDef.header, header.getContext())}
+                </TableHead>
               ))}
             </TableRow>
-          ))
-        ) : (
-          <TableRow>
-            <TableCell colSpan={columns.length} className="h-24 text-center">
-              No data.
-            </TableCell>
-          </TableRow>
-        )}
-      </TableBody>
-    </Table>
+          ))}
+        </TableHeader>
+        <TableBody>
+          {table.getRowModel().rows.length ? (
+            table.getRowModel().rows.map((row) => (
+              <TableRow key={row.id}>
+                {row.getVisibleCells().map((cell) => (
+                  <TableCell key={cell.id}>
+                    {flexRender(cell.column.columnDef.cell, cell.getContext())}
+                  </TableCell>
+                ))}
+              </TableRow>
+            ))
+          ) : (
+            <TableRow>
+              <TableCell colSpan={columns.length} className="h-24 text-center">
+                No data.
+              </TableCell>
+            </TableRow>
+          )}
+        </TableBody>
+      </Table>
+      {paged && (
+        <div className="flex items-center gap-2 mx-6 mb-4 text-sm text-muted-foreground">
+          <span className="tabular-nums">
+            Rows {offset + 1}–{Math.min(offset + PAGE_SIZE, total)} of {total}
+          </span>
+          <Button
+            variant="outline"
+            size="sm"
+            disabled={loading || offset === 0}
+            onClick={() => setOffset(Math.max(0, offset - PAGE_SIZE))}
+          >
+            Previous
+          </Button>
+          <Button
+            variant="outline"
+            size="sm"
+            disabled={loading || offset + PAGE_SIZE >= total}
+            onClick={() => setOffset(offset + PAGE_SIZE)}
+          >
+            Next
+          </Button>
+        </div>
+      )}
+    </>
   );
 }
 
@@ -280,7 +330,8 @@ export function DataPanel({ data, onClose }: DataPanelProps) {
             case "bar-chart":
               return <BarChartBlockView key={i} block={block} />;
             case "table":
-              return <TableBlockView key={i} block={block} />;
+              // A new cursor is a new result: reset sorting, offset and rows
+              return <TableBlockView key={block.cursor ?? i} block={block} />;
           }
         })}
       </div>
@@ -0,0 +1,61 @@
+import { useEffect, useRef, useState } from "react";
+import { toast } from "sonner";
+import { getResultPage, rerunResult, type ResultPage } from "@/lib/api";
+import type { TableBlock } from "@/types";
+
+/** Rows per page, same as the first page sent with a block (barb/results.py) */
+export const PAGE_SIZE = 500;
+
+type Row = Record<string, unknown>;
+
+/**
+ * Rows of a paginated table block at offset, sorted server-side.
+ *
+ * The first unsorted page is block.rows. Other pages come from the block's
+ * cursor; once it has expired, from its rerun source, whose new cursor then
+ * serves the following pages.
+ */
+export function useResultPage(
+  block: TableBlock,
+  token: string,
+  offset: number,
+  sort: string | undefined,
+) {
+  const cursor = useRef(block.cursor);
+  const [rows, setRows] = useState<Row[]>(block.rows);
+  const [loading, setLoading] = useState(false);
+
+  useEffect(() => {
+    if (offset === 0 && !sort) {
+      setRows(block.rows);
+      return;
+    }
+
+    const page = { offset, limit: PAGE_SIZE, sort };
+    const load = async (): Promise<ResultPage> => {
+      const result = cursor.current
+        ? await getResultPage(cursor.current, page, token)
+        : null;
+      if (result) return result;
+      if (!block.rerun) throw new Error("Result expired");
+      return rerunResult(block.rerun, page, token);
+    };
+
+    setLoading(true);
+    let cancelled = false;
+    load()
+      .then((result) => {
+        cursor.current = result.cursor;
+        if (!cancelled) setRows(result.rows);
+      })
+      .catch((err) => {
+        if (!cancelled) {
+          toast.error(err instanceof Error ? err.message : "Failed to load rows");
+        }
+      })
+      .finally(() => { if (!cancelled) setLoading(false); });
+    return () => { cancelled = true; };
+  }, [block, token, offset, sort]);
+
+  return { rows, loading };
+}
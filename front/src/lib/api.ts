@@ -2,6 +2,7 @@ import type {
   Conversation,
   Instrument,
   Message,
+  RerunSource,
   SSEDataBlockEvent,
   SSEDoneEvent,
   SSEErrorEvent,
@@ -154,6 +155,58 @@ export async function removeUserInstrument(
   await handleVoidResponse(res);
 }
 
+// --- Paginated results ---
+
+export interface ResultPage {
+  cursor: string;
+  offset: number;
+  limit: number;
+  sort: string | null;
+  total_rows: number;
+  columns: string[];
+  rows: Record<string, unknown>[];
+}
+
+export interface PageParams {
+  offset: number;
+  limit: number;
+  /** "column" or "column desc" */
+  sort?: string;
+}
+
+/** Page of a server-side result; null once the cursor has expired. */
+export async function getResultPage(
+  cursor: string,
+  page: PageParams,
+  token: string,
+): Promise<ResultPage | null> {
+  const params = new URLSearchParams({
+    offset: String(page.offset),
+    limit: String(page.limit),
+  });
+  if (page.sort) params.set("sort", page.sort);
+  const res = await fetch(
+    `${API_URL}/api/results/${encodeURIComponent(cursor)}?${params.toString()}`,
+    { headers: authHeaders(token) },
+  );
+  if (res.status === 404) return null;
+  return handleResponse<ResultPage>(res);
+}
+
+/** Page of an expired result, re-created by its tool call (with a new cursor). */
+export async function rerunResult(
+  rerun: RerunSource,
+  page: PageParams,
+  token: string,
+): Promise<ResultPage> {
+  const res = await fetch(`${API_URL}/api/results/rerun`, {
+    method: "POST",
+    headers: authHeaders(token),
+    body: JSON.stringify({ ...rerun, ...page }),
+  });
+  return handleResponse<ResultPage>(res);
+}
+
 // --- SSE type guards ---
 
 function has<K extends string>(obj: unknown, key: K): obj is Record<K, unknown> {
@@ -36,10 +36,24 @@ export interface Conversation {
 
 // --- Data blocks: typed content for panel rendering ---
 
+/** Tool call that re-creates a paginated table once its cursor has expired */
+export interface RerunSource {
+  tool: string;
+  instrument: string;
+  input: Record<string, unknown>;
+  /** Index of the table block in the re-created card */
+  block: number;
+}
+
 export interface TableBlock {
   type: "table";
   columns: string[];
   rows: Record<string, unknown>[];
+  /** Set when rows is only the first page: fetch more via GET /api/results/{cursor} */
+  cursor?: string;
+  total_rows?: number;
+  /** Set with cursor on chat cards: POST /api/results/rerun after the cursor expires */
+  rerun?: RerunSource;
 }
 
 export interface BarChartBlock {
@@ -0,0 +1,2 @@
+alter table public.tool_calls
+  add column profile jsonb;
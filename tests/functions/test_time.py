@@ -1,5 +1,11 @@
 """Tests for time functions."""
 
+import gc
+
+import numpy as np
+import pandas as pd
+
+import barb.functions.time as time_mod
 from barb.functions import FUNCTIONS
 
 
@@ -35,3 +41,41 @@ class TestTime:
         result = FUNCTIONS["minute"](df)
         # Daily bars at midnight → minute is 0
         assert result.iloc[0] == 0
+
+    def test_date_is_datetime64(self, df):
+        result = FUNCTIONS["date"](df)
+        assert pd.api.types.is_datetime64_any_dtype(result)
+        assert result.iloc[0] == pd.Timestamp("2024-01-02")
+
+    def test_date_literal(self, df):
+        assert FUNCTIONS["date"](df, "2024-01-15") == np.datetime64("2024-01-15", "D")
+
+    def test_fields_widened_for_arithmetic(self, df):
+        """Cached fields are compact, but hour() * 100 must not overflow."""
+        minutes = df.set_axis(pd.date_range("2024-01-02 23:50", periods=10, freq="min"))
+        result = FUNCTIONS["hour"](minutes) * 100 + FUNCTIONS["minute"](minutes)
+        assert result.iloc[0] == 2350
+
+
+class TestCalendarCache:
+    def test_cached_per_index(self, df):
+        time_mod._field(df, "hour")
+        cache = time_mod._calendar(df)
+        assert cache["hour"].dtype == np.int8
+        # df.copy() shares the index data → same cache entry
+        assert time_mod._calendar(df.copy()) is cache
+
+    def test_new_index_new_entry(self, df):
+        time_mod._field(df, "year")
+        filtered = df[df["close"] > 101]
+        assert "year" not in time_mod._calendar(filtered)
+        assert FUNCTIONS["year"](filtered).index.equals(filtered.index)
+
+    def test_cache_released_with_data(self):
+        frame = pd.DataFrame({"close": [1.0, 2.0]}, index=pd.date_range("2024-01-01", periods=2))
+        FUNCTIONS["month"](frame)
+        key = id(frame.index.array)
+        assert key in time_mod._CALENDAR_CACHE
+        del frame
+        gc.collect()
+        assert key not in time_mod._CALENDAR_CACHE
@@ -3,10 +3,13 @@
 import json
 from unittest.mock import MagicMock, patch
 
+import numpy as np
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
 
-from api.main import _parse_tool_output, app
+from api.main import _parse_tool_output, _persist_chat, _sse, app
+from barb.results import PAGE_SIZE, RESULTS
 
 # --- _parse_tool_output (pure function) ---
 
@@ -40,6 +43,22 @@ class TestParseToolOutput:
         assert result == {"raw": "42"}
 
 
+# --- _sse (pure function) ---
+
+
+class TestSse:
+    def test_format(self):
+        assert _sse("done", {"a": 1}) == 'event: done\ndata: {"a":1}\n\n'
+
+    def test_numpy_and_nan(self):
+        body = _sse("data", {"rows": np.array([1, 2]), "v": np.float64(1.5), "x": float("nan")})
+        payload = json.loads(body.split("data: ", 1)[1])
+        assert payload == {"rows": [1, 2], "v": 1.5, "x": None}
+
+    def test_unicode_not_escaped(self):
+        assert "Среднее" in _sse("text_delta", {"delta": "Среднее"})
+
+
 # --- API Endpoints (with mocked DB and auth) ---
 
 MOCK_USER = {"sub": "user-abc-123", "aud": "authenticated"}
@@ -173,6 +192,158 @@ class TestDeleteConversation:
         assert r.status_code == 404
 
 
+class TestGetResultPage:
+    def test_page(self, client):
+        cursor = RESULTS.put(pd.DataFrame({"date": ["2024-01-02", "2024-01-03"], "x": [2.0, 1.0]}))
+        r = client.get(f"/api/results/{cursor}", params={"limit": 1, "sort": "x"})
+        assert r.status_code == 200
+        assert r.json()["rows"] == [{"date": "2024-01-03", "x": 1.0}]
+        assert r.json()["total_rows"] == 2
+
+    def test_expired(self, client):
+        r = client.get("/api/results/does-not-exist")
+        assert r.status_code == 404
+
+    def test_bad_sort(self, client):
+        cursor = RESULTS.put(pd.DataFrame({"x": [1.0]}))
+        r = client.get(f"/api/results/{cursor}", params={"sort": "nope"})
+        assert r.status_code == 400
+
+
+class TestRerunResult:
+    def _body(self, **kw):
+        return {"tool": "run_query", "instrument": "NQ", "input": {"query": {}}, "block": 0, **kw}
+
+    def _card(self, cursor):
+        return {"title": "", "blocks": [{"type": "table", "cursor": cursor}]}
+
+    def test_page_of_rerun(self, client):
+        cursor = RESULTS.put(pd.DataFrame({"x": [2.0, 1.0, 3.0]}))
+        assistant = MagicMock()
+        assistant.run_tool.return_value = ("ok", self._card(cursor), None)
+        with patch("api.main._get_assistant", return_value=assistant):
+            r = client.post("/api/results/rerun", json=self._body(offset=1, sort="x"))
+        assert r.status_code == 200
+        assert r.json()["cursor"] == cursor
+        assert r.json()["rows"] == [{"x": 2.0}, {"x": 3.0}]
+        assistant.run_tool.assert_called_once_with("run_query", {"query": {}}, refresh=False)
+
+    def test_expired_cached_cursor_runs_again(self, client):
+        cursor = RESULTS.put(pd.DataFrame({"x": [1.0]}))
+        assistant = MagicMock()
+        assistant.run_tool.side_effect = [
+            ("ok", self._card("gone"), None),
+            ("ok", self._card(cursor), None),
+        ]
+        with patch("api.main._get_assistant", return_value=assistant):
+            r = client.post("/api/results/rerun", json=self._body())
+        assert r.status_code == 200
+        assert r.json()["cursor"] == cursor
+        assert assistant.run_tool.call_args.kwargs == {"refresh": True}
+
+    def test_no_table_anymore(self, client):
+        assistant = MagicMock()
+        assistant.run_tool.return_value = ("Error: boom", None, None)
+        with patch("api.main._get_assistant", return_value=assistant):
+            r = client.post("/api/results/rerun", json=self._body())
+        assert r.status_code == 404
+
+    def test_unknown_tool(self, client):
+        r = client.post("/api/results/rerun", json=self._body(tool="rm_rf"))
+        assert r.status_code == 400
+
+
+class TestQueryBatch:
+    def _daily(self, days=5):
+        index = pd.date_range("2024-01-02", periods=days, freq="D")
+        return pd.DataFrame(
+            {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}, index=index
+        )
+
+    def test_results_in_order(self, client):
+        df = self._daily()
+        with (
+            patch("api.main.get_instrument", return_value={"sessions": {}}),
+            patch("api.main.load_data", return_value=df),
+        ):
+            r = client.post(
+                "/api/query/batch",
+                json={
+                    "instrument": "NQ",
+                    "queries": [
+                        {"from": "daily", "select": "count()"},
+                        {"from": "daily", "where": "nope > 1"},
+                    ],
+                },
+            )
+        assert r.status_code == 200
+        results = r.json()["results"]
+        assert results[0]["summary"]["value"] == 5
+        assert results[1]["error"]["step"] == "where"
+
+    def test_long_table_paginated(self, client):
+        df = self._daily(days=PAGE_SIZE + 100)
+        with (
+            patch("api.main.get_instrument", return_value={"sessions": {}}),
+            patch("api.main.load_data", return_value=df),
+        ):
+            r = client.post(
+                "/api/query/batch",
+                json={"instrument": "NQ", "queries": [{"from": "daily"}]},
+            )
+        result = r.json()["results"][0]
+        assert len(result["table"]) == PAGE_SIZE
+        assert result["total_rows"] == PAGE_SIZE + 100
+        assert RESULTS.page(result["cursor"], offset=PAGE_SIZE)["rows"]
+
+    def test_deadline(self, client):
+        with (
+            patch("api.main.get_instrument", return_value={"sessions": {}}),
+            patch("api.main.load_data", return_value=self._daily()),
+            patch("api.main.TOOL_TIMEOUT", 0),
+        ):
+            r = client.post(
+                "/api/query/batch",
+                json={"instrument": "NQ", "queries": [{"from": "daily", "select": "count()"}]},
+            )
+        assert r.status_code == 200
+        assert r.json()["results"][0]["error"]["error_type"] == "TimeoutError"
+
+    def test_unknown_instrument(self, client):
+        with patch("api.main.get_instrument", return_value=None):
+            r = client.post("/api/query/batch", json={"instrument": "XX", "queries": [{}]})
+        assert r.status_code == 404
+
+    def test_empty_batch_rejected(self, client):
+        r = client.post("/api/query/batch", json={"instrument": "NQ", "queries": []})
+        assert r.status_code == 422
+
+
+class TestPersistChat:
+    def test_tool_call_profile_saved(self):
+        tables = {}
+
+        def table(name):
+            tables.setdefault(name, _mock_table_chain([{"id": "msg-1"}]))
+            return tables[name]
+
+        db = MagicMock()
+        db.table.side_effect = table
+        profile = {"total_ms": 12.5, "peak_kb": 64.0, "stages": []}
+        result = {
+            "answer": "42",
+            "data": [],
+            "usage": {"input_tokens": 1, "output_tokens": 1},
+            "tool_calls": [
+                {"tool_name": "run_query", "input": {}, "output": "Result: 42",
+                 "error": None, "duration_ms": 13, "profile": profile},
+            ],
+        }
+        _persist_chat(db, {"id": "conv-1", "usage": {}}, "hi", result)
+        rows = tables["tool_calls"].insert.call_args[0][0]
+        assert rows[0]["profile"] == profile
+
+
 class TestGetMessages:
     def test_success(self, client):
         messages = [
@@ -4,6 +4,9 @@ Uses both synthetic data (deterministic, hand-verified trades)
 and real NQ data (smoke tests on real market data).
 """
 
+from datetime import date
+
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -141,6 +144,34 @@ class TestMetrics:
         curve = build_equity_curve(trades)
         assert curve == [10, 5]
 
+    def test_avg_excursions(self):
+        trades = [
+            Trade("2024-01-01", 100, "2024-01-02", 110, "long", 10, "target", 1, 2.0, 12.0),
+            Trade("2024-01-03", 105, "2024-01-04", 100, "short", -5, "stop", 1, 5.0, 1.0),
+        ]
+        m = calculate_metrics(trades)
+        assert m.avg_mae == 3.5
+        assert m.avg_mfe == 6.5
+
+    def test_trades_columns(self):
+        from barb.backtest.metrics import Trades
+
+        rows = [
+            Trade(date(2024, 1, 1), 100.0, date(2024, 1, 2), 110.0, "long", 10.0, "target", 1),
+            Trade(date(2024, 1, 3), 105.0, date(2024, 1, 4), 110.0, "short", -5.0, "stop", 2),
+            Trade(date(2024, 1, 5), 102.0, date(2024, 1, 8), 108.0, "long", 6.0, "end", 3),
+        ]
+        trades = Trades.from_trades(rows)
+        assert len(trades) == 3
+        assert list(trades) == rows
+        assert trades[1] == rows[1]
+        assert trades[-1] == rows[2]
+        assert trades[1:] == rows[1:]
+        assert trades[trades.pnl > 0] == [rows[0], rows[2]]
+        assert Trades.concat([trades[:1], trades[1:]]) == trades
+        assert len(Trades.concat([])) == 0
+        assert trades.exit_reason.dtype == np.int8
+
 
 # --- Engine: synthetic data ---
 
@@ -318,6 +349,27 @@ class TestEngineRealData:
             if trade.exit_reason == "target":
                 assert trade.pnl != 0  # Should have some P&L
 
+    def test_exit_target_full_history(self):
+        """Target = the expression over the whole series at the signal bar, as run_query sees it."""
+        from barb.expressions import evaluate
+        from barb.functions import FUNCTIONS
+
+        df = _random_daily()
+        strategy = Strategy(
+            entry="close < open", direction="long", exit_target="ema(close, 300)", exit_bars=5
+        )
+        result = run_backtest(df, strategy)
+        ema = evaluate("ema(close, 300)", df, FUNCTIONS)
+        targets = [t for t in result.trades if t.exit_reason == "target"]
+        assert len(targets) > 10
+        for trade in targets:
+            signal = df.index.get_loc(pd.Timestamp(trade.entry_date)) - 1
+            assert trade.exit_price == pytest.approx(ema.iloc[signal])
+        # A late signal: a 200-bar window would not have warmed the EMA up
+        late = signal
+        short = evaluate("ema(close, 300)", df.iloc[late - 199 : late + 1], FUNCTIONS)
+        assert short.iloc[-1] != pytest.approx(ema.iloc[late])
+
 
 # --- Minute-level exit resolution ---
 
@@ -338,11 +390,104 @@ def _make_minutes(prices):
     )
 
 
-class TestFindExitInMinutes:
+def _exit_in_span(
+    minutes,
+    is_long,
+    stop_price,
+    tp_price,
+    target_price,
+    trail_points=None,
+    best_price=None,
+    stop_reason="stop",
+):
+    """kernel.exit_in_span over all of minutes → (price, reason, best), None if no exit."""
+    from barb.backtest import kernel
+
+    highs = np.asarray(minutes["high"], dtype=np.float64)
+    lows = np.asarray(minutes["low"], dtype=np.float64)
+    trailing = trail_points is not None
+    price, reason, best, _, _ = kernel.exit_in_span(
+        highs,
+        lows,
+        0,
+        len(highs),
+        is_long,
+        np.nan if stop_price is None else stop_price,
+        kernel.EXIT_REASONS.index(stop_reason),
+        np.nan if tp_price is None else tp_price,
+        np.nan if target_price is None else target_price,
+        trail_points if trailing else np.nan,
+        best_price if trailing else np.nan,
+        np.nan,
+        np.nan,
+    )
+    best = float(best) if trailing else best_price
+    if reason < 0:
+        return None, None, best
+    return float(price), kernel.EXIT_REASONS[reason], best
+
+
+def _bar_exit(bar, minutes=None, **exits):
+    """(exit_price, exit_reason) of a long entered on bar's open, None if it stays open.
+
+    _simulate over a signal bar and bar; minutes, if given, are bar's.
+    """
+    from barb.backtest.engine import _build_minute_index, _Prepared, _simulate
+
+    signal = dict.fromkeys(("open", "high", "low", "close"), bar["open"])
+    bars = pd.DataFrame(
+        [signal, bar],
+        index=pd.DatetimeIndex(["2024-01-01 09:30", "2024-01-02 09:30"]),
+        dtype=float,
+    )
+    minute_index = None if minutes is None else _build_minute_index(minutes, bars)
+    prepared = _Prepared(bars, pd.Series([True, False], index=bars.index), minute_index)
+    trades = _simulate(prepared, Strategy(entry="signal", direction="long", **exits))
+    if not len(trades):
+        return None
+    return trades[0].exit_price, trades[0].exit_reason
+
+
+class TestMinuteIndex:
+    def test_offsets_match_bar_boundaries(self):
+        """Each bar owns the minutes in [bar start, next bar start)."""
+        from barb.backtest.engine import _build_minute_index
+        from barb.ops import resample
+
+        minutes = _make_minutes([(100 + i, 101 + i, 99 + i, 100 + i) for i in range(12)])
+        bars = resample(minutes, "5m")
+        index = _build_minute_index(minutes, bars)
+        for i, start in enumerate(bars.index):
+            own = minutes[(minutes.index >= start) & (minutes.index < start + pd.Timedelta("5min"))]
+            span = slice(index.starts[i], index.ends[i])
+            assert index.high[span].tolist() == own["high"].tolist()
+            assert index.low[span].tolist() == own["low"].tolist()
+
+    def test_minutes_before_first_bar_dropped(self):
+        from barb.backtest.engine import _build_minute_index
+
+        minutes = _make_minutes([(100, 101, 99, 100)] * 4)
+        bars = minutes.iloc[2:]
+        index = _build_minute_index(minutes, bars)
+        assert index.starts.tolist() == [2, 3]
+        assert index.ends.tolist() == [3, 4]
+
+    def test_bar_without_minutes(self):
+        from barb.backtest.engine import _build_minute_index
+
+        minutes = _make_minutes([(100, 101, 99, 100)] * 2)
+        bars = pd.DataFrame(
+            {"open": [1.0, 1.0]},
+            index=pd.DatetimeIndex(["2024-01-02 09:00", "2024-01-02 09:30"]),
+        )
+        index = _build_minute_index(minutes, bars)
+        assert index.starts.tolist() == [0, 0]
+        assert index.ends.tolist() == [0, 2]
+
+
+class TestExitInSpan:
     def test_stop_hit_first(self):
         """Stop triggers before take profit in minute sequence."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Minute 1: price drops to stop, minute 2: price rises to TP
         minutes = _make_minutes(
             [
@@ -350,14 +495,12 @@ class TestFindExitInMinutes:
                 (96, 106, 96, 105),  # high=106 would hit TP at 105, but stop already hit
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, True, 97.0, 105.0, None)
+        price, reason, _ = _exit_in_span(minutes, True, 97.0, 105.0, None)
         assert reason == "stop"
         assert price == 97.0
 
     def test_tp_hit_first(self):
         """Take profit triggers before stop in minute sequence."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Minute 1: price rises to TP, minute 2: price drops to stop
         minutes = _make_minutes(
             [
@@ -365,85 +508,108 @@ class TestFindExitInMinutes:
                 (105, 105, 94, 95),  # low=94 would hit stop at 97, but TP already hit
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, True, 97.0, 105.0, None)
+        price, reason, _ = _exit_in_span(minutes, True, 97.0, 105.0, None)
         assert reason == "take_profit"
         assert price == 105.0
 
     def test_both_on_same_bar_stop_wins(self):
         """When both levels hit on same minute bar, stop checked first."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Single bar where both stop and TP could trigger
         minutes = _make_minutes(
             [
                 (100, 106, 95, 100),  # low=95 < stop=97, high=106 > tp=105
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, True, 97.0, 105.0, None)
+        price, reason, _ = _exit_in_span(minutes, True, 97.0, 105.0, None)
         assert reason == "stop"
         assert price == 97.0
 
     def test_no_exit(self):
         """Neither level hit."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         minutes = _make_minutes(
             [
                 (100, 103, 98, 101),
                 (101, 104, 99, 102),
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, True, 95.0, 110.0, None)
+        price, reason, _ = _exit_in_span(minutes, True, 95.0, 110.0, None)
         assert price is None
         assert reason is None
 
     def test_target_exit(self):
         """Exit target hit in minutes."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         minutes = _make_minutes(
             [
                 (100, 100, 98, 99),
                 (99, 103, 99, 102),  # high=103 hits target at 102
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, True, None, None, 102.0)
+        price, reason, _ = _exit_in_span(minutes, True, None, None, 102.0)
         assert reason == "target"
         assert price == 102.0
 
     def test_short_stop_hit(self):
         """Short position: stop hit when price goes above stop level."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         minutes = _make_minutes(
             [
                 (100, 104, 98, 99),  # high=104 hits stop at 103
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, False, 103.0, None, None)
+        price, reason, _ = _exit_in_span(minutes, False, 103.0, None, None)
         assert reason == "stop"
         assert price == 103.0
 
     def test_short_tp_hit(self):
         """Short position: TP hit when price drops below TP level."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         minutes = _make_minutes(
             [
                 (100, 101, 96, 97),  # low=96 hits TP at 97
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(minutes, False, None, 97.0, None)
+        price, reason, _ = _exit_in_span(minutes, False, None, 97.0, None)
         assert reason == "take_profit"
         assert price == 97.0
 
+    def test_trailing_overtakes_fixed_stop(self):
+        """Fixed stop rules until the trail rises past it, then trailing exits."""
+        # Long, fixed stop 98, trail 3 from 100 → trail 97 < 98, fixed rules
+        minutes = _make_minutes(
+            [
+                (100, 100, 98.5, 99),  # trail=97, effective=98 (fixed), no hit
+                (99, 104, 102, 103),  # best=104, trail=101 > 98 → trailing
+                (103, 103, 100, 100),  # low=100 <= 101 → trailing exit
+            ]
+        )
+        price, reason, best = _exit_in_span(
+            minutes, True, 98.0, None, None, trail_points=3, best_price=100
+        )
+        assert (price, reason, best) == (101.0, "trailing_stop", 104.0)
+
+    def test_short_trailing_returns_best_without_exit(self):
+        """Short trail follows the running low; best carries over when no exit."""
+        minutes = _make_minutes(
+            [
+                (100, 100, 97, 98),  # best=97, trail=102
+                (98, 100.5, 96, 97),  # best=96, trail=101 (trail 4 → 100, hit)
+            ]
+        )
+        price, reason, best = _exit_in_span(
+            minutes, False, None, None, None, trail_points=5, best_price=100
+        )
+        assert (price, reason, best) == (None, None, 96.0)
+        price, reason, _ = _exit_in_span(
+            minutes, False, None, None, None, trail_points=4, best_price=100
+        )
+        assert (price, reason) == (100.0, "trailing_stop")
 
-class TestResolveExit:
-    def test_prefers_minutes_over_daily(self):
-        """When minute data available, uses it instead of daily bar."""
-        from barb.backtest.engine import _resolve_exit
 
-        daily_bar = pd.Series({"open": 100, "high": 106, "low": 95, "close": 100})
+class TestBarExit:
+    """Exits of one bar in _simulate: its minutes, or the bar itself."""
+
+    BAR = {"open": 100, "high": 106, "low": 95, "close": 100}
+
+    def test_prefers_minutes_over_bar(self):
+        """When minute data available, uses it instead of the bar."""
         # Minutes show TP hit first (opposite of conservative assumption)
         minutes = _make_minutes(
             [
@@ -451,34 +617,133 @@ class TestResolveExit:
                 (105, 105, 94, 95),  # low=94 would hit stop
             ]
         )
-        price, reason, _ = _resolve_exit(daily_bar, minutes, True, 97.0, 105.0, None, None, 1)
-        assert reason == "take_profit"  # Minute-level: TP first
+        exit_ = _bar_exit(self.BAR, minutes, stop_loss=3, take_profit=5)
+        assert exit_ == (105.0, "take_profit")  # Minute-level: TP first
 
-    def test_daily_fallback_conservative(self):
-        """Without minute data, uses conservative daily assumption (stop first)."""
-        from barb.backtest.engine import _resolve_exit
-
-        daily_bar = pd.Series({"open": 100, "high": 106, "low": 95, "close": 100})
-        price, reason, _ = _resolve_exit(daily_bar, None, True, 97.0, 105.0, None, None, 1)
-        assert reason == "stop"  # Conservative: stop checked first
+    def test_bar_fallback_conservative(self):
+        """Without minute data, uses conservative bar assumption (stop first)."""
+        exit_ = _bar_exit(self.BAR, stop_loss=3, take_profit=5)
+        assert exit_ == (97.0, "stop")  # Conservative: stop checked first
 
     def test_timeout_after_price_check(self):
         """Timeout triggers when no price exit and bars_held >= exit_bars."""
-        from barb.backtest.engine import _resolve_exit
-
-        daily_bar = pd.Series({"open": 100, "high": 103, "low": 98, "close": 101})
-        price, reason, _ = _resolve_exit(daily_bar, None, True, 95.0, 110.0, None, 3, 3)
-        assert reason == "timeout"
-        assert price == 101.0
+        bar = {"open": 100, "high": 103, "low": 98, "close": 101}
+        exit_ = _bar_exit(bar, stop_loss=5, take_profit=10, exit_bars=0)
+        assert exit_ == (101.0, "timeout")
 
     def test_no_exit_when_nothing_triggers(self):
         """No exit when levels not hit and not timed out."""
-        from barb.backtest.engine import _resolve_exit
+        bar = {"open": 100, "high": 103, "low": 98, "close": 101}
+        assert _bar_exit(bar, stop_loss=5, take_profit=10, exit_bars=5) is None
 
-        daily_bar = pd.Series({"open": 100, "high": 103, "low": 98, "close": 101})
-        price, reason, _ = _resolve_exit(daily_bar, None, True, 95.0, 110.0, None, 5, 2)
-        assert price is None
-        assert reason is None
+
+def _random_minutes(days=5, seed=3):
+    """Random-walk minute bars, 24h a day."""
+    rng = np.random.default_rng(seed)
+    n = days * 1440
+    close = 100 + np.cumsum(rng.normal(0, 0.3, n))
+    open_ = np.append(100.0, close[:-1])
+    spread = rng.uniform(0, 0.4, (2, n))
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) + spread[0],
+            "low": np.minimum(open_, close) - spread[1],
+            "close": close,
+            "volume": 1.0,
+        },
+        index=pd.date_range("2024-01-02", periods=n, freq="min"),
+    )
+
+
+class TestKernel:
+    STRATEGY = Strategy(
+        entry="close > open",
+        direction="long",
+        stop_loss=1.5,
+        take_profit="1%",
+        trailing_stop=1.0,
+        breakeven_bars=2,
+        exit_bars=6,
+    )
+
+    def test_chunks_resume_state(self, monkeypatch):
+        """Simulating in chunks gives the same trades as one pass."""
+        from barb.backtest import engine
+
+        minutes = _random_minutes()
+        expected = run_backtest(minutes, self.STRATEGY, "1h").trades
+        monkeypatch.setattr(engine, "_CHUNK_BARS", 5)
+        assert run_backtest(minutes, self.STRATEGY, "1h").trades == expected
+        assert len(expected) > 5
+
+    def test_vectorized_span_matches_loop(self):
+        """Long minute spans (array path) exit like the per-minute loop."""
+        from barb.backtest import kernel
+
+        loop = getattr(kernel.exit_in_span, "py_func", None) or kernel._exit_in_span_loop
+        minutes = _random_minutes(days=1)
+        highs, lows = minutes["high"].to_numpy(), minutes["low"].to_numpy()
+        nan = np.nan
+        cases = [
+            (True, 95.0, 0, 101.0, 100.5, nan, nan),
+            (True, 95.0, 0, 100.5, 101.0, nan, nan),
+            (False, 110.0, 0, 97.0, nan, nan, nan),
+            (True, 98.0, 1, nan, 101.0, 2.0, 100.0),
+            (True, nan, 0, nan, nan, 1.5, 100.0),
+            (False, 102.0, 0, 97.0, nan, 2.5, 100.0),
+            (False, nan, 0, nan, nan, nan, nan),
+        ]
+        for levels in cases:
+            levels += (100.0, 100.0)  # excursion extremes so far
+            assert kernel._first_exit(highs, lows, *levels) == pytest.approx(
+                loop(highs, lows, 0, len(highs), *levels), nan_ok=True
+            )
+
+    def test_short_spans_of_arrays(self):
+        """Minute arrays stay arrays: a short span at an offset exits like the loop on lists."""
+        from barb.backtest import kernel
+
+        loop = getattr(kernel.exit_in_span, "py_func", None) or kernel._exit_in_span_loop
+        minutes = _random_minutes(days=1)
+        highs, lows = minutes["high"].to_numpy(), minutes["low"].to_numpy()
+        levels = (True, highs[300] - 2, 0, highs[300] + 1, np.nan, 1.0, highs[300], 0.0, 1e9)
+        for start in range(300, 340, 7):
+            end = start + 20
+            assert kernel.exit_in_span(highs, lows, start, end, *levels) == pytest.approx(
+                loop(highs.tolist(), lows.tolist(), start, end, *levels), nan_ok=True
+            )
+
+    def test_excursions(self):
+        """MAE/MFE bound the P&L; a stop costs exactly its distance, a take profit gains it."""
+        minutes = _random_minutes()
+        for direction in ("long", "short"):
+            strategy = Strategy(
+                entry="close > open", direction=direction, stop_loss=1.5, take_profit=2.0
+            )
+            trades = run_backtest(minutes, strategy, "1h").trades
+            assert len(trades) > 5
+            assert (trades.mae >= 0).all() and (trades.mfe >= 0).all()
+            assert (trades.mfe >= trades.pnl - 1e-9).all()
+            assert (trades.mae >= -trades.pnl - 1e-9).all()
+            stops = trades[trades.exit_reason == 0]
+            assert len(stops) and stops.mae == pytest.approx(1.5)
+            targets = trades[trades.exit_reason == 3]
+            assert len(targets) and targets.mfe == pytest.approx(2.0)
+
+    def test_jit_matches_python(self):
+        """The numba kernel produces the same trades as plain Python."""
+        pytest.importorskip("numba")
+        from barb.backtest import kernel
+
+        minutes = _random_minutes()
+        expected = run_backtest(minutes, self.STRATEGY, "1h").trades
+        original = kernel.simulate_bars
+        try:
+            kernel.simulate_bars = original.py_func
+            assert run_backtest(minutes, self.STRATEGY, "1h").trades == expected
+        finally:
+            kernel.simulate_bars = original
 
 
 class TestMinuteResolutionIntegration:
@@ -630,8 +895,14 @@ class TestCommission:
 
 def _make_result(trades):
     """Helper: build BacktestResult from trade list."""
-    from barb.backtest.metrics import BacktestResult, build_equity_curve, calculate_metrics
+    from barb.backtest.metrics import (
+        BacktestResult,
+        Trades,
+        build_equity_curve,
+        calculate_metrics,
+    )
 
+    trades = Trades.from_trades(trades)
     return BacktestResult(
         trades=trades,
         metrics=calculate_metrics(trades),
@@ -697,19 +968,23 @@ class TestFormatSummary:
         assert "Top 3 trades:" in summary
         assert "% of total PnL" in summary
 
-    def test_format_summary_five_lines(self):
-        """Summary has exactly 5 lines for non-zero trades."""
+    def test_format_summary_six_lines(self):
+        """Summary has exactly 6 lines for non-zero trades, the last one excursions."""
         from datetime import date
 
         from assistant.tools.backtest import _format_summary
 
         trades = [
-            Trade(date(2024, 1, 1), 100, date(2024, 1, 2), 110, "long", 10, "target", 1),
-            Trade(date(2024, 1, 3), 100, date(2024, 1, 4), 95, "long", -5, "stop", 1),
+            Trade(date(2024, 1, 1), 100, date(2024, 1, 2), 110, "long", 10, "target", 1, 2, 10),
+            Trade(date(2024, 1, 3), 100, date(2024, 1, 4), 95, "long", -5, "stop", 1, 5, 3),
         ]
         summary = _format_summary(_make_result(trades))
         lines = summary.strip().split("\n")
-        assert len(lines) == 5
+        assert len(lines) == 6
+        assert lines[5] == (
+            "Excursions: avg MAE 3.5 | avg MFE 6.5 pts | "
+            "Winners MAE p90 2.0 | Losers MFE median 3.0"
+        )
 
     def test_format_summary_recovery_factor(self):
         """Recovery factor appears in summary line 2."""
@@ -821,8 +1096,6 @@ class TestTrailingStop:
 
     def test_trailing_stop_immediate_loss(self):
         """Price goes against immediately — exits at initial trail level."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Long entry at 100, trail=3 → initial stop=97
         # Price drops immediately
         minutes = _make_minutes(
@@ -830,7 +1103,7 @@ class TestTrailingStop:
                 (100, 100, 96, 97),  # low=96 < trail_stop=97
             ]
         )
-        price, reason, best = _find_exit_in_minutes(
+        price, reason, best = _exit_in_span(
             minutes,
             True,
             None,
@@ -844,8 +1117,6 @@ class TestTrailingStop:
 
     def test_trailing_stop_minute_precision(self):
         """Minute-level trailing: price rises, trail follows, then retrace exits."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Long entry at 100, trail=2
         # Min 1: high=103 → best=103, trail=101. low=102 > 101, no exit
         # Min 2: high=106 → best=106, trail=104. low=105 > 104, no exit
@@ -857,7 +1128,7 @@ class TestTrailingStop:
                 (105, 106, 103, 103),
             ]
         )
-        price, reason, best = _find_exit_in_minutes(
+        price, reason, best = _exit_in_span(
             minutes,
             True,
             None,
@@ -872,8 +1143,6 @@ class TestTrailingStop:
 
     def test_trailing_stop_with_tp(self):
         """Trailing stop + take profit coexist — TP wins if hit first."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Long entry at 100, trail=3, TP at 105
         # Min 1: high=105 → TP hit at 105 (before trail catches up)
         minutes = _make_minutes(
@@ -881,7 +1150,7 @@ class TestTrailingStop:
                 (100, 106, 99, 105),
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(
+        price, reason, _ = _exit_in_span(
             minutes,
             True,
             None,
@@ -897,15 +1166,13 @@ class TestTrailingStop:
 
     def test_trailing_stop_exit_reason_distinct(self):
         """Exit reason is 'trailing_stop', distinct from 'stop'."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         minutes = _make_minutes(
             [
                 (100, 105, 102, 104),  # best=105, trail=103
                 (104, 104, 102, 102),  # low=102 < 103 → trailing exit
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(
+        price, reason, _ = _exit_in_span(
             minutes,
             True,
             None,
@@ -1040,11 +1307,9 @@ class TestBreakeven:
 
     def test_breakeven_exit_reason_distinct(self):
         """Exit reason is 'breakeven', distinct from 'stop' and 'trailing_stop'."""
-        from barb.backtest.engine import _check_exit_levels
-
-        bar = pd.Series({"open": 100, "high": 103, "low": 98, "close": 99})
+        bar = pd.DataFrame({"open": [100], "high": [103], "low": [98], "close": [99]})
         # stop_reason="breakeven" → exit reason should be "breakeven"
-        price, reason, _ = _check_exit_levels(
+        price, reason, _ = _exit_in_span(
             bar,
             True,
             99.0,
@@ -1057,8 +1322,6 @@ class TestBreakeven:
 
     def test_breakeven_with_trailing(self):
         """Breakeven + trailing coexist — tighter wins."""
-        from barb.backtest.engine import _find_exit_in_minutes
-
         # Long entry at 100, breakeven active (stop=100), trail=3 from best=105
         # Trail stop = 102, breakeven stop = 100
         # Trail is tighter (102 > 100) → trailing dominates
@@ -1067,7 +1330,7 @@ class TestBreakeven:
                 (104, 105, 101, 102),  # best=105, trail=102. low=101 < 102 → trailing exit
             ]
         )
-        price, reason, _ = _find_exit_in_minutes(
+        price, reason, _ = _exit_in_span(
             minutes,
             True,
             100.0,
@@ -1090,7 +1353,7 @@ class TestTimeframe:
 
         strategy = Strategy(entry="close > 100", direction="long", exit_bars=1)
         with pytest.raises(BarbError, match="Unsupported timeframe"):
-            run_backtest(daily_df, strategy, timeframe="1m")
+            run_backtest(daily_df, strategy, timeframe="3m")
 
     def test_weekly_timeframe_rejected(self, daily_df):
         """Weekly timeframe not allowed."""
@@ -1119,6 +1382,30 @@ class TestTimeframe:
             if trade.exit_reason == "timeout":
                 assert trade.bars_held == 3
 
+    def test_minute_timeframe(self, monkeypatch):
+        """1m bars are their own minutes: same trades as with a minute index, in any chunking."""
+        from barb.backtest import engine
+
+        minutes = _random_minutes(days=2)
+        strategy = Strategy(
+            entry="close > prev(close) + 0.5",
+            direction="short",
+            stop_loss=1.0,
+            trailing_stop=0.8,
+            exit_bars=30,
+        )
+        result = run_backtest(minutes, strategy, timeframe="1m")
+        assert result.metrics.total_trades > 20
+        assert max(t.bars_held for t in result.trades) <= 30
+
+        mask = engine.evaluate(strategy.entry, minutes, engine.FUNCTIONS).fillna(False)
+        index = engine._build_minute_index(minutes, minutes)
+        prepared = engine._Prepared(bars=minutes, entry_mask=mask, minute_index=index)
+        assert engine._simulate(prepared, strategy) == result.trades
+
+        monkeypatch.setattr(engine, "_CHUNK_BARS", 7)
+        assert run_backtest(minutes, strategy, timeframe="1m").trades == result.trades
+
     def test_15m_on_real_data(self, nq_minute_slice, sessions):
         """15m timeframe on real NQ minute data."""
         df, _ = filter_session(nq_minute_slice, "RTH", sessions)
@@ -1147,3 +1434,382 @@ class TestTimeframe:
         r_hourly = run_backtest(df, strategy, timeframe="1h")
         # More bars = more opportunities
         assert r_hourly.metrics.total_trades >= r_daily.metrics.total_trades
+
+
+class TestSweep:
+    def test_variants_match_single_backtests(self):
+        """Each variant's metrics equal a standalone run_backtest with the same settings."""
+        from barb.backtest.sweep import run_backtest_sweep
+
+        minutes = _random_minutes(days=3)
+        strategy = Strategy(entry="close > prev(close) + 0.5", direction="long", exit_bars=20)
+        grid = {"stop_loss": [1.0, 2.0, None], "take_profit": [1.5, 3.0]}
+        result = run_backtest_sweep(minutes, strategy, grid, timeframe="5m")
+
+        assert result.fields == ["stop_loss", "take_profit"]
+        assert len(result.rows) == 6
+        for row in result.rows:
+            single = Strategy(**{**strategy.__dict__, **row.params})
+            assert row.metrics == run_backtest(minutes, single, timeframe="5m").metrics
+
+    def test_ranking(self, daily_df):
+        """Best first; max_drawdown ranks ascending; ties keep grid order."""
+        from barb.backtest.sweep import run_backtest_sweep
+
+        strategy = Strategy(entry="close > 105", direction="long")
+        grid = {"exit_bars": [1, 2, 3], "stop_loss": [1, 3]}
+        by_pnl = run_backtest_sweep(daily_df, strategy, grid)
+        pnls = [row.metrics.total_pnl for row in by_pnl.rows]
+        assert pnls == sorted(pnls, reverse=True)
+
+        by_dd = run_backtest_sweep(daily_df, strategy, grid, sort_by="max_drawdown")
+        drawdowns = [row.metrics.max_drawdown for row in by_dd.rows]
+        assert drawdowns == sorted(drawdowns)
+
+        flat = run_backtest_sweep(daily_df, strategy, {"slippage": [0, 0]}, sort_by="win_rate")
+        assert [row.params for row in flat.rows] == [{"slippage": 0}, {"slippage": 0}]
+
+    def test_invalid_grid(self, daily_df):
+        from barb.backtest.sweep import MAX_SWEEP_VARIANTS, run_backtest_sweep
+
+        strategy = Strategy(entry="close > 105", direction="long", exit_bars=1)
+        with pytest.raises(BarbError, match="Can't sweep 'entry'"):
+            run_backtest_sweep(daily_df, strategy, {"entry": ["close > 100"]})
+        with pytest.raises(BarbError, match="non-empty list"):
+            run_backtest_sweep(daily_df, strategy, {"stop_loss": []})
+        with pytest.raises(BarbError, match="variants"):
+            run_backtest_sweep(
+                daily_df, strategy, {"exit_bars": list(range(MAX_SWEEP_VARIANTS + 1))}
+            )
+        with pytest.raises(BarbError, match="direction"):
+            run_backtest_sweep(daily_df, strategy, {"direction": ["long", "sideways"]})
+        with pytest.raises(BarbError, match="Unknown sort metric"):
+            run_backtest_sweep(daily_df, strategy, {"exit_bars": [1]}, sort_by="sharpe")
+
+    def test_workers_match_in_process(self):
+        """Forked workers return the same ranked variants as the in-process sweep."""
+        from barb.backtest.sweep import run_backtest_sweep
+
+        minutes = _random_minutes(days=2)
+        strategy = Strategy(entry="close < prev(close) - 0.5", direction="short", exit_bars=10)
+        grid = {"trailing_stop": [0.5, 1.0, 2.0], "breakeven_bars": [None, 2]}
+        serial = run_backtest_sweep(minutes, strategy, grid, timeframe="15m", workers=1)
+        forked = run_backtest_sweep(minutes, strategy, grid, timeframe="15m", workers=2)
+        assert forked.rows == serial.rows
+
+    def test_forked_workers_dont_fan_out(self, monkeypatch):
+        """A map_forked child runs nested maps in-process instead of forking again."""
+        from barb.backtest.sweep import _PARALLEL_MIN_WORK, default_workers, map_forked
+
+        monkeypatch.setattr("barb.forking.os.sched_getaffinity", lambda pid: set(range(8)))
+
+        def nested(_):
+            return default_workers(_PARALLEL_MIN_WORK)
+
+        assert nested(None) == 8
+        assert map_forked(nested, [0, 1], workers=2, step="test") == [1, 1]
+
+    def test_concurrent_maps(self):
+        """Maps running in parallel threads each fork their own job and cancel flag."""
+        import threading
+        import time
+
+        from barb.backtest.sweep import map_forked
+
+        def quick(item):
+            time.sleep(0.2)
+            return item * 10
+
+        def slow(item):
+            time.sleep(0.6)
+            return item + 1
+
+        results, errors = {}, []
+
+        def run(name, fn):
+            try:
+                results[name] = map_forked(fn, [1, 2], workers=2, step="sweep")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=run, args=("quick", quick)),
+            threading.Thread(target=run, args=("slow", slow)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert results == {"quick": [10, 20], "slow": [2, 3]}
+
+
+def _random_daily(days=750, seed=5):
+    """Random-walk daily bars, business days from 2020."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, days))
+    open_ = np.append(100.0, close[:-1]) + rng.normal(0, 0.5, days)
+    spread = rng.uniform(0, 1.5, (2, days))
+    return pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) + spread[0],
+            "low": np.minimum(open_, close) - spread[1],
+            "close": close,
+            "volume": 1.0,
+        },
+        index=pd.bdate_range("2020-01-01", periods=days),
+    )
+
+
+class TestWalkForward:
+    STRATEGY = Strategy(entry="close < open", direction="long", exit_bars=5)
+    GRID = {"stop_loss": [1.0, 3.0, None], "take_profit": [2.0, 5.0]}
+
+    def test_rolling_windows(self):
+        """Consecutive test windows, fixed-length train windows right before each."""
+        from barb.backtest.walkforward import run_walk_forward
+
+        df = _random_daily()
+        result = run_walk_forward(df, self.STRATEGY, self.GRID, train_months=12, test_months=6)
+        windows = result.windows
+        assert [str(w.test_start) for w in windows] == [
+            "2021-01-01",
+            "2021-07-01",
+            "2022-01-03",
+            "2022-07-01",
+        ]
+        assert str(windows[0].train_start) == "2020-01-01"
+        assert str(windows[1].train_start) == "2020-07-01"
+        # The last test window ends with the data
+        assert windows[-1].test_end == df.index[-1].date()
+        for prev, w in zip(windows, windows[1:]):
+            assert pd.Timestamp(prev.test_end) < pd.Timestamp(w.test_start)
+        for w in windows:
+            assert set(w.params) == {"stop_loss", "take_profit"}
+            assert all(w.test_start <= t.entry_date <= t.exit_date <= w.test_end for t in w.trades)
+        assert result.trades == [t for w in windows for t in w.trades]
+        assert result.metrics.total_trades == sum(w.test_metrics.total_trades for w in windows)
+        assert len(result.equity_curve) == len(result.trades)
+
+    def test_anchored_windows(self):
+        from barb.backtest.walkforward import run_walk_forward
+
+        df = _random_daily()
+        result = run_walk_forward(
+            df, self.STRATEGY, self.GRID, train_months=12, test_months=6, anchored=True
+        )
+        assert {str(w.train_start) for w in result.windows} == {"2020-01-01"}
+        assert [w.train_bars for w in result.windows] == sorted(
+            w.train_bars for w in result.windows
+        )
+
+    def test_selects_best_train_variant(self):
+        """The chosen variant is the sweep winner on the train window's bars."""
+        from barb.backtest.sweep import run_backtest_sweep
+        from barb.backtest.walkforward import run_walk_forward
+
+        df = _random_daily()
+        result = run_walk_forward(df, self.STRATEGY, self.GRID, train_months=12, test_months=6)
+        for w in result.windows:
+            # The bar before the window carries the signal for its first bar
+            start = max(df.index.searchsorted(pd.Timestamp(w.train_start)) - 1, 0)
+            train = df.iloc[start : df.index.searchsorted(pd.Timestamp(w.test_start))]
+            best = run_backtest_sweep(train, self.STRATEGY, self.GRID).rows[0]
+            assert w.train_metrics == best.metrics
+
+    def test_without_grid(self):
+        """No grid: each test window trades the strategy as a backtest of its own bars."""
+        from barb.backtest.walkforward import run_walk_forward
+
+        df = _random_daily()
+        result = run_walk_forward(df, self.STRATEGY, train_months=6, test_months=3)
+        assert result.fields == []
+        assert len(result.windows) == 10
+        for w in result.windows:
+            assert w.params == {}
+            start = df.index.searchsorted(pd.Timestamp(w.test_start)) - 1
+            test = df.iloc[start : start + 1 + w.test_bars]
+            assert w.trades == run_backtest(test, self.STRATEGY).trades
+
+    def test_exit_target_evaluated_once(self, monkeypatch):
+        """Each distinct exit_target is evaluated once, not per window and variant."""
+        from barb.backtest import engine
+        from barb.backtest.walkforward import run_walk_forward
+
+        calls = []
+        evaluate = engine.evaluate
+
+        def counting(expr, df, functions):
+            calls.append(expr)
+            return evaluate(expr, df, functions)
+
+        monkeypatch.setattr(engine, "evaluate", counting)
+        grid = {"exit_target": ["ema(close, 20)", "prev(high)"], "stop_loss": [1.0, 3.0]}
+        result = run_walk_forward(
+            _random_daily(), self.STRATEGY, grid, train_months=12, test_months=6, workers=1
+        )
+        assert len(result.windows) == 4
+        assert sorted(calls) == sorted(["close < open", "ema(close, 20)", "prev(high)"])
+
+    def test_invalid(self, daily_df):
+        from barb.backtest.walkforward import run_walk_forward
+
+        with pytest.raises(BarbError, match="Not enough data"):
+            run_walk_forward(daily_df, self.STRATEGY, self.GRID)
+        with pytest.raises(BarbError, match="test_months"):
+            run_walk_forward(_random_daily(), self.STRATEGY, test_months=0)
+
+    def test_workers_match_in_process(self):
+        from barb.backtest.walkforward import run_walk_forward
+
+        df = _random_daily()
+        kwargs = {"train_months": 12, "test_months": 6, "anchored": True}
+        serial = run_walk_forward(df, self.STRATEGY, self.GRID, workers=1, **kwargs)
+        forked = run_walk_forward(df, self.STRATEGY, self.GRID, workers=3, **kwargs)
+        assert forked.windows == serial.windows
+
+
+class TestRobustness:
+    def test_vector_metrics_match_calculate_metrics(self):
+        """Row-wise drawdown and PF equal calculate_metrics on the same trade sequence."""
+        from datetime import date
+
+        from barb.backtest.robustness import _max_drawdown, _profit_factor
+
+        rng = np.random.default_rng(7)
+        rows = np.round(rng.normal(0.3, 5, (20, 30)), 2)
+        rows[0] = np.abs(rows[0])  # no losses → PF inf
+        rows[1, :5] = 0.0  # flat trades count as losses
+        for row, dd, pf in zip(rows, _max_drawdown(rows), _profit_factor(rows)):
+            trades = [
+                Trade(date(2024, 1, 1), 100, date(2024, 1, 2), 100, "long", p, "end", 1)
+                for p in row
+            ]
+            m = calculate_metrics(trades)
+            assert dd == pytest.approx(m.max_drawdown)
+            assert pf == pytest.approx(m.profit_factor)
+
+    def test_intervals(self):
+        from barb.backtest.robustness import trade_robustness
+
+        pnls = np.random.default_rng(1).normal(2, 10, 300)
+        r = trade_robustness(pnls)
+        assert r.samples == 1000
+        for interval in (r.total_pnl, r.max_drawdown, r.profit_factor, r.win_rate):
+            assert interval.low <= interval.median <= interval.high
+        assert r.total_pnl.low < pnls.sum() < r.total_pnl.high
+        assert r.win_rate.low < (pnls > 0).mean() * 100 < r.win_rate.high
+        assert 0 < r.prob_loss < 0.5
+        # Seeded: same trades, same intervals
+        assert trade_robustness(pnls) == r
+
+    def test_all_winners(self):
+        from barb.backtest.robustness import trade_robustness
+
+        r = trade_robustness([1.0, 2.0, 3.0])
+        assert r.profit_factor.low == float("inf")
+        assert r.shuffled_max_drawdown.high == 0.0
+        assert r.prob_loss == 0.0
+        assert trade_robustness([5.0]) is None
+
+    def test_long_trade_lists_get_fewer_samples(self, monkeypatch):
+        from barb.backtest import robustness
+
+        monkeypatch.setattr(robustness, "_MAX_CELLS", 10_000)
+        monkeypatch.setattr(robustness, "_BLOCK_CELLS", 1_000)
+        pnls = np.random.default_rng(2).normal(0, 1, 50)
+        assert robustness.trade_robustness(pnls).samples == 200
+        assert robustness.trade_robustness(pnls, samples=300).samples == 300
+
+    def test_backtest_result(self, daily_df):
+        strategy = Strategy(entry="close > 105", direction="long", exit_bars=1)
+        result = run_backtest(daily_df, strategy)
+        assert result.metrics.total_trades >= 2
+        assert result.robustness.total_pnl.low <= result.robustness.total_pnl.high
+        assert (
+            run_backtest(daily_df, Strategy(entry="close > 999", direction="long")).robustness
+            is None
+        )
+
+    def test_summary_line(self, daily_df):
+        from assistant.tools.backtest import _format_summary
+
+        strategy = Strategy(entry="close > 105", direction="long", exit_bars=1)
+        lines = _format_summary(run_backtest(daily_df, strategy)).split("\n")
+        assert len(lines) == 7
+        assert lines[5].startswith("Excursions: avg MAE ")
+        assert lines[6].startswith("Bootstrap 95% (1000×): Total ")
+        assert "reshuffled" in lines[6]
+
+
+class TestPortfolio:
+    STRATEGY = Strategy(entry="close < open", direction="long", stop_loss=2.0, exit_bars=5)
+    FRAMES = {"AAA": _random_daily(seed=1), "BBB": _random_daily(days=500, seed=2)}
+
+    def _load(self, symbol):
+        if symbol not in self.FRAMES:
+            raise FileNotFoundError(symbol)
+        return self.FRAMES[symbol]
+
+    def test_merged_legs(self):
+        """Each leg is its own backtest; trades merge by exit date, P&L × point value."""
+        from barb.backtest.portfolio import run_portfolio_backtest
+
+        result = run_portfolio_backtest(
+            ["AAA", "CCC", "BBB"],
+            self.STRATEGY,
+            self._load,
+            point_values={"AAA": 2.0, "BBB": 50.0, "CCC": 1.0},
+        )
+        assert [leg.symbol for leg in result.legs] == ["AAA", "BBB"]
+        assert result.missing == ["CCC"]
+        for leg in result.legs:
+            single = run_backtest(self.FRAMES[leg.symbol], self.STRATEGY)
+            assert leg.trades == single.trades
+            assert leg.pnl == pytest.approx(single.metrics.total_pnl * leg.point_value)
+
+        exits = [t.exit_date for t in result.trades]
+        assert exits == sorted(exits)
+        assert sorted(result.symbols) == ["AAA"] * len(result.legs[0].trades) + ["BBB"] * len(
+            result.legs[1].trades
+        )
+        assert result.metrics.total_pnl == pytest.approx(sum(leg.pnl for leg in result.legs))
+        assert result.equity_curve[-1] == pytest.approx(result.metrics.total_pnl)
+        assert result.robustness is not None
+
+    def test_workers_match_in_process(self):
+        from barb.backtest.portfolio import run_portfolio_backtest
+
+        serial = run_portfolio_backtest(["AAA", "BBB"], self.STRATEGY, self._load, workers=1)
+        forked = run_portfolio_backtest(["AAA", "BBB"], self.STRATEGY, self._load, workers=2)
+        assert forked.trades == serial.trades
+        assert forked.symbols == serial.symbols
+
+    def test_invalid(self):
+        from barb.backtest.portfolio import run_portfolio_backtest
+
+        with pytest.raises(BarbError, match="No instruments"):
+            run_portfolio_backtest([], self.STRATEGY, self._load)
+        with pytest.raises(BarbError, match="No point value for BBB"):
+            run_portfolio_backtest(
+                ["AAA", "BBB"], self.STRATEGY, self._load, point_values={"AAA": 2.0}
+            )
+
+    def test_tool_category(self, daily_df):
+        """category resolves through the instrument registry; P&L in the instrument's currency."""
+        from assistant.tools.backtest import run_portfolio_backtest_tool
+
+        input_data = {
+            "strategy": {"entry": "close > 105", "direction": "long", "exit_bars": 1},
+            "category": "Index",
+        }
+        result = run_portfolio_backtest_tool(input_data, lambda symbol: daily_df)
+        assert [leg.symbol for leg in result["result"].legs] == ["NQ"]
+        assert result["result"].legs[0].point_value == 20.0
+        assert " USD | Max DD " in result["model_response"].split("\n")[0]
+
+        with pytest.raises(BarbError, match="Unknown category 'metals'. Available: index"):
+            run_portfolio_backtest_tool({**input_data, "category": "metals"}, lambda s: daily_df)
+        with pytest.raises(BarbError, match="Unknown instrument: XX"):
+            run_portfolio_backtest_tool({**input_data, "instruments": ["nq", "xx"]}, None)
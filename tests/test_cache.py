@@ -0,0 +1,105 @@
+"""Tests for the tool result cache."""
+
+import pandas as pd
+
+from assistant.cache import ToolCache
+from assistant.tools import run_query
+from barb.data import data_version, invalidate_data
+from barb.results import RESULTS
+
+
+class TestKey:
+    def test_expressions_normalized(self):
+        cache = ToolCache()
+        a = {"from": "daily", "map": {"r": "high-low"}, "where": "close>open"}
+        b = {"where": "(close > open)", "map": {"r": "high - low"}, "from": "daily"}
+        assert cache.key("run_query", "NQ", a, 500) == cache.key("run_query", "nq", b, 500)
+
+    def test_steps_and_strategy_normalized(self):
+        cache = ToolCache()
+        a = {"steps": [{"from": "daily", "select": ["mean( close )"]}]}
+        b = {"steps": [{"from": "daily", "select": ["mean(close)"]}]}
+        assert cache.key("run_query", "NQ", a) == cache.key("run_query", "NQ", b)
+        s1 = {"strategy": {"entry": "rsi(close,14)<30"}, "title": "RSI dip"}
+        s2 = {"strategy": {"entry": "rsi(close, 14) < 30"}, "title": "Oversold"}
+        assert cache.key("run_backtest", "NQ", s1) == cache.key("run_backtest", "NQ", s2)
+
+    def test_distinct_inputs(self):
+        cache = ToolCache()
+        query = {"from": "daily", "period": "2024"}
+        key = cache.key("run_query", "NQ", query)
+        assert key != cache.key("run_query", "ES", query)
+        assert key != cache.key("run_query", "NQ", {**query, "period": "2023"})
+        assert key != cache.key("run_query", "NQ", query, 100)
+        # Non-expression strings are kept as is
+        assert cache.key("run_query", "NQ", {"period": "2024-01"}) != cache.key(
+            "run_query", "NQ", {"period": "2024 - 01"}
+        )
+
+    def test_data_version(self):
+        cache = ToolCache()
+        key = cache.key("run_query", "NQ", {"from": "daily"})
+        version = data_version()
+        invalidate_data()
+        assert data_version() == version + 1
+        assert cache.key("run_query", "NQ", {"from": "daily"}) != key
+
+
+class TestToolCache:
+    def test_hit(self):
+        cache = ToolCache()
+        key = cache.key("run_query", "NQ", {"from": "daily"})
+        assert cache.get(key) is None
+        cache.put(key, {"model_response": "42 rows", "table": [{"a": 1}], "profile": {"x": 1}})
+        hit = cache.get(key)
+        assert hit["table"] == [{"a": 1}]
+        assert hit["profile"] is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_errors_not_cached(self):
+        cache = ToolCache()
+        cache.put(b"k", {"model_response": "Error: Execution exceeded the 60s time limit"})
+        assert cache.get(b"k") is None
+
+    def test_cursors_reparked(self, nq_daily, sessions):
+        cache = ToolCache()
+        query = {"from": "daily", "period": "2024"}
+        result = run_query(query, nq_daily, sessions, page_size=10)
+        cache.put(b"k", result)
+        hit = cache.get(b"k")
+        assert hit["cursor"] != result["cursor"]
+        assert RESULTS.page(hit["cursor"], offset=10, limit=5) == {
+            **RESULTS.page(result["cursor"], offset=10, limit=5),
+            "cursor": hit["cursor"],
+        }
+        # Parked frames count towards the size
+        assert cache.nbytes > nq_daily.loc["2024"].memory_usage().sum() / 2
+
+    def test_card_cursors_reparked(self):
+        """Backtest replies: a card's paginated table gets a fresh cursor per hit."""
+        cache = ToolCache()
+        cursor = RESULTS.put(pd.DataFrame({"pnl": range(1000)}))
+        table = {"type": "table", "columns": ["pnl"], "rows": [], "cursor": cursor}
+        card = {"title": " · 1000 trades", "blocks": [{"type": "metrics-grid"}, table]}
+        cache.put(b"k", {"model_response": "ok", "card": card, "profile": None})
+        hit = cache.get(b"k")
+        fresh = hit["card"]["blocks"][1]["cursor"]
+        assert fresh != cursor
+        assert card["blocks"][1]["cursor"] == cursor
+        assert RESULTS.page(fresh, offset=990)["rows"][-1] == {"pnl": 999}
+
+    def test_bounded_by_bytes_lru(self):
+        table = pd.DataFrame({"v": range(1000)}).to_dict("records")
+        cache = ToolCache(max_bytes=25_000)
+        for key in (b"a", b"b"):
+            cache.put(key, {"model_response": "ok", "table": table})
+        assert cache.get(b"a") is not None  # b is now least recently used
+        cache.put(b"c", {"model_response": "ok", "table": table})
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") is not None
+        assert cache.nbytes <= cache.max_bytes
+
+    def test_oversized_skipped(self):
+        cache = ToolCache(max_bytes=100)
+        cache.put(b"k", {"model_response": "ok", "table": [{"v": i} for i in range(100)]})
+        assert len(cache) == 0
@@ -1,6 +1,6 @@
 """Tests for assistant/chat.py — helper functions."""
 
-from assistant.chat import _build_messages, _compact_output
+from assistant.chat import _build_messages, _compact_output, _with_rerun
 
 
 class TestBuildMessages:
@@ -59,3 +59,24 @@ class TestCompactOutput:
         assert _compact_output("") == "done"
         assert _compact_output(None) == "done"
         assert _compact_output({"raw": "data"}) == "done"
+
+
+class TestWithRerun:
+    def test_paginated_tables_get_rerun(self):
+        card = {
+            "title": "t",
+            "blocks": [{"type": "metrics"}, {"type": "table", "cursor": "c1"}],
+        }
+        result = _with_rerun(card, "run_backtest", "NQ", {"strategy": {}})
+        assert result["blocks"][0] == {"type": "metrics"}
+        assert result["blocks"][1]["rerun"] == {
+            "tool": "run_backtest",
+            "instrument": "NQ",
+            "input": {"strategy": {}},
+            "block": 1,
+        }
+
+    def test_card_without_cursor_unchanged(self):
+        card = {"title": "t", "blocks": [{"type": "table", "rows": []}]}
+        assert _with_rerun(card, "run_query", "NQ", {}) is card
+        assert _with_rerun(None, "run_query", "NQ", {}) is None
@@ -1,25 +1,43 @@
 """Tests for data block format — typed blocks for frontend rendering."""
 
-from datetime import date
+from datetime import date, timedelta
 
-from assistant.chat import _build_query_card
-from assistant.tools.backtest import _build_backtest_card
-from barb.backtest.metrics import BacktestResult, Trade, build_equity_curve, calculate_metrics
+import numpy as np
+
+from assistant.chat import _build_batch_card, _build_query_card
+from assistant.tools.backtest import (
+    _build_backtest_card,
+    _build_portfolio_card,
+    _build_sweep_card,
+    _build_walk_forward_card,
+)
+from barb.backtest.metrics import (
+    BacktestResult,
+    Trade,
+    Trades,
+    build_equity_curve,
+    calculate_metrics,
+)
+from barb.backtest.portfolio import PortfolioLeg, PortfolioResult
+from barb.backtest.sweep import SweepResult, SweepRow
+from barb.backtest.walkforward import WalkForwardResult, WalkForwardWindow
+from barb.results import PAGE_SIZE, RESULTS
 
 
 def _make_trades():
     """3 trades: win, loss, win."""
-    return [
+    trades = [
         Trade(
             date(2024, 1, 15), 18000.0, date(2024, 1, 16), 18100.0, "long", 100.0, "take_profit", 1
         ),
         Trade(date(2024, 1, 22), 18200.0, date(2024, 1, 23), 18150.0, "long", -50.0, "stop", 1),
         Trade(date(2024, 2, 5), 18100.0, date(2024, 2, 7), 18180.0, "long", 80.0, "timeout", 2),
     ]
+    return Trades.from_trades(trades)
 
 
 def _make_result(trades=None):
-    trades = _make_trades() if trades is None else trades
+    trades = _make_trades() if trades is None else Trades.from_trades(trades)
     metrics = calculate_metrics(trades)
     equity_curve = build_equity_curve(trades)
     return BacktestResult(trades=trades, metrics=metrics, equity_curve=equity_curve)
@@ -50,6 +68,33 @@ class TestBuildQueryCard:
         assert card["blocks"][0]["columns"] == ["date", "close"]
         assert len(card["blocks"][0]["rows"]) == 2
 
+    def test_paginated_table_carries_cursor(self):
+        result = {
+            "model_response": "Result: 1000 rows",
+            "table": [{"date": "2024-01-15", "close": 18450}],
+            "cursor": "abc",
+            "total_rows": 1000,
+            "source_rows": None,
+            "chart": None,
+        }
+        block = _build_query_card(result, "Price data")["blocks"][0]
+        assert block["cursor"] == "abc"
+        assert block["total_rows"] == 1000
+        assert len(block["rows"]) == 1
+
+    def test_source_rows_table_carries_source_cursor(self):
+        result = {
+            "model_response": "Result: 5000",
+            "table": None,
+            "source_rows": [{"date": "2024-01-15", "close": 18450}],
+            "source_row_count": 5000,
+            "source_cursor": "ev",
+            "chart": None,
+        }
+        block = _build_query_card(result, "Count query")["blocks"][0]
+        assert block["cursor"] == "ev"
+        assert block["total_rows"] == 5000
+
     def test_table_block_from_source_rows(self):
         """When table is None, source_rows become the table."""
         result = {
@@ -110,6 +155,28 @@ class TestBuildQueryCard:
         assert card is None
 
 
+class TestBuildBatchCard:
+    """_build_batch_card renders one table row per batch query."""
+
+    def test_none_without_results(self):
+        assert _build_batch_card(None, "Batch") is None
+
+    def test_row_per_query(self):
+        results = [
+            {"label": "2023", "summary": {"type": "scalar", "value": 252}, "error": None},
+            {"label": "2024", "summary": {"type": "table", "rows": 12}, "error": None},
+            {"label": "bad", "summary": None, "error": "Unknown column 'x'"},
+        ]
+        card = _build_batch_card(results, "Days per year")
+        block = card["blocks"][0]
+        assert block["columns"] == ["query", "result"]
+        assert [r["result"] for r in block["rows"]] == [
+            252,
+            "12 rows",
+            "Error: Unknown column 'x'",
+        ]
+
+
 class TestBuildBacktestCard:
     """_build_backtest_card converts BacktestResult into typed DataCard."""
 
@@ -137,6 +204,22 @@ class TestBuildBacktestCard:
         pnl_item = next(i for i in grid["items"] if i["label"] == "Total P&L")
         assert pnl_item["color"] == "green"
 
+    def test_robustness_items(self):
+        """Bootstrap P&L interval and P(loss) join the metrics grid when present."""
+        from barb.backtest.robustness import trade_robustness
+
+        result = _make_result()
+        result.robustness = trade_robustness([t.pnl for t in result.trades])
+        items = {
+            i["label"]: i["value"] for i in _build_backtest_card(result, "T")["blocks"][0]["items"]
+        }
+        assert items["P&L 95%"] == "-150 … +300"
+        assert items["P(loss)"] == "25%"  # ≥ two of the three draws are the -50 loss: 7/27
+        labels = [
+            i["label"] for i in _build_backtest_card(_make_result(), "T")["blocks"][0]["items"]
+        ]
+        assert "P(loss)" not in labels
+
     def test_area_chart_equity_and_drawdown(self):
         card = _build_backtest_card(_make_result(), "Test")
         chart = card["blocks"][1]
@@ -177,6 +260,38 @@ class TestBuildBacktestCard:
         assert table["rows"][0]["entry_date"] == "2024-01-15"
         assert table["rows"][0]["pnl"] == 100.0
         assert table["rows"][0]["exit_reason"] == "take_profit"
+        assert table["columns"][-2:] == ["mae", "mfe"]
+
+    def test_long_trade_list_capped(self):
+        """Many trades: first page of the table plus a cursor, downsampled equity."""
+        from assistant.tools.backtest import _CHART_POINTS
+
+        pnl = np.random.default_rng(3).normal(1, 20, 5000).round(2)
+        start = date(2010, 1, 4)
+        trades = [
+            Trade(
+                start + timedelta(i), 100.0, start + timedelta(i + 1), 100 + p, "long", p, "stop", 1
+            )
+            for i, p in enumerate(pnl)
+        ]
+        card = _build_backtest_card(_make_result(trades), "Many")
+
+        table = card["blocks"][3]
+        assert len(table["rows"]) == PAGE_SIZE
+        assert table["total_rows"] == 5000
+        page = RESULTS.page(table["cursor"], offset=4990, limit=10)
+        assert page["rows"][-1]["pnl"] == pnl[-1]
+        assert page["rows"][0].keys() == table["rows"][0].keys()
+        assert page["rows"][0]["exit_date"] == str(start + timedelta(4991))
+
+        chart = card["blocks"][1]["data"]
+        assert len(chart) <= _CHART_POINTS
+        equity = np.cumsum(pnl)
+        assert chart[-1]["equity"] == round(equity[-1], 2)
+        assert min(p["equity"] for p in chart) == round(equity.min(), 2)
+        assert max(p["equity"] for p in chart) == round(equity.max(), 2)
+        drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0))
+        assert min(p["drawdown"] for p in chart) == round(drawdown.min(), 2)
 
     def test_zero_trades(self):
         """Zero trades → single metrics-grid block with Trades=0."""
@@ -197,3 +312,142 @@ class TestBuildBacktestCard:
         card = _build_backtest_card(_make_result(trades), "Losing")
         pnl_item = next(i for i in card["blocks"][0]["items"] if i["label"] == "Total P&L")
         assert pnl_item["color"] == "red"
+
+
+class TestBuildSweepCard:
+    """_build_sweep_card converts SweepResult into a table of variants."""
+
+    def test_variant_rows(self):
+        no_losses = _make_trades()[::2]
+        result = SweepResult(
+            rows=[
+                SweepRow({"stop_loss": None}, calculate_metrics(no_losses)),
+                SweepRow({"stop_loss": "1%"}, calculate_metrics(_make_trades())),
+            ],
+            fields=["stop_loss"],
+            sort_by="total_pnl",
+        )
+        card = _build_sweep_card(result, "Stop sweep")
+        assert card["title"] == "Stop sweep · 2 variants"
+        table = card["blocks"][0]
+        assert table["type"] == "table"
+        assert table["columns"][:3] == ["stop_loss", "trades", "win_rate"]
+        assert table["rows"][0]["stop_loss"] == "off"
+        assert table["rows"][0]["pf"] == "inf"
+        assert table["rows"][1] == {
+            "stop_loss": "1%",
+            "trades": 3,
+            "win_rate": 66.7,
+            "pf": 3.6,
+            "total_pnl": 130.0,
+            "max_drawdown": 50.0,
+            "expectancy": 43.33,
+        }
+
+
+class TestBuildWalkForwardCard:
+    """_build_walk_forward_card: OOS metrics, stitched equity, one row per window."""
+
+    def test_blocks(self):
+        trades = _make_trades()
+        windows = [
+            WalkForwardWindow(
+                train_start=date(2023, 1, 2),
+                train_end=date(2023, 12, 29),
+                test_start=date(2024, 1, 2),
+                test_end=date(2024, 1, 31),
+                train_bars=250,
+                test_bars=21,
+                params={"stop_loss": "1%"},
+                train_metrics=calculate_metrics(trades),
+                test_metrics=calculate_metrics(trades[:2]),
+                trades=trades[:2],
+            ),
+            WalkForwardWindow(
+                train_start=date(2023, 2, 1),
+                train_end=date(2024, 1, 31),
+                test_start=date(2024, 2, 1),
+                test_end=date(2024, 2, 29),
+                train_bars=250,
+                test_bars=20,
+                params={"stop_loss": None},
+                train_metrics=calculate_metrics(trades[2:]),
+                test_metrics=calculate_metrics(trades[2:]),
+                trades=trades[2:],
+            ),
+        ]
+        result = WalkForwardResult(
+            windows=windows,
+            trades=trades,
+            metrics=calculate_metrics(trades),
+            equity_curve=build_equity_curve(trades),
+            fields=["stop_loss"],
+            sort_by="total_pnl",
+            anchored=False,
+            efficiency=0.5,
+        )
+        card = _build_walk_forward_card(result, "WF")
+        assert card["title"] == "WF · 2 windows"
+        assert [b["type"] for b in card["blocks"]] == ["metrics-grid", "area-chart", "table"]
+        items = {i["label"]: i for i in card["blocks"][0]["items"]}
+        assert items["OOS P&L"] == {"label": "OOS P&L", "value": "+130.0", "color": "green"}
+        assert items["Efficiency"]["value"] == "50%"
+        assert [p["equity"] for p in card["blocks"][1]["data"]] == [100.0, 50.0, 130.0]
+        table = card["blocks"][2]
+        assert table["columns"][:3] == ["test_start", "test_end", "stop_loss"]
+        assert table["rows"][1]["stop_loss"] == "off"
+        assert table["rows"][0]["oos_pnl"] == 50.0
+
+
+class TestBuildPortfolioCard:
+    """_build_portfolio_card: merged metrics, equity with per-instrument lines, one row per leg."""
+
+    def test_blocks(self):
+        trades = _make_trades()  # +100, -50, +80
+        legs = [
+            PortfolioLeg("NQ", 20.0, trades[1:], calculate_metrics(trades[1:]), 600.0),
+            PortfolioLeg("ES", 50.0, trades[:1], calculate_metrics(trades[:1]), 5000.0),
+        ]
+        merged = [
+            Trade(
+                t.entry_date, t.entry_price, t.exit_date, t.exit_price, t.direction, pnl, "end", 1
+            )
+            for t, pnl in zip(trades, [5000.0, -1000.0, 1600.0])
+        ]
+        merged = Trades.from_trades(merged)
+        result = PortfolioResult(
+            legs=legs,
+            trades=merged,
+            symbols=["ES", "NQ", "NQ"],
+            metrics=calculate_metrics(merged),
+            equity_curve=build_equity_curve(merged),
+            robustness=None,
+        )
+        card = _build_portfolio_card(result, "Index")
+        assert card["title"] == "Index · 2 instruments"
+        assert [b["type"] for b in card["blocks"]] == ["metrics-grid", "area-chart", "table"]
+        items = {i["label"]: i for i in card["blocks"][0]["items"]}
+        assert items["Total P&L"] == {"label": "Total P&L", "value": "+5,600.0", "color": "green"}
+
+        chart = card["blocks"][1]
+        assert [s["key"] for s in chart["series"]] == ["equity", "drawdown", "ES", "NQ"]
+        assert chart["data"][1] == {
+            "date": "2024-01-23",
+            "equity": 4000.0,
+            "drawdown": -1000.0,
+            "ES": 5000.0,
+            "NQ": -1000.0,
+        }
+
+        rows = card["blocks"][2]["rows"]
+        assert [r["instrument"] for r in rows] == ["ES", "NQ"]
+        assert rows[1] == {
+            "instrument": "NQ",
+            "trades": 2,
+            "win_rate": 50.0,
+            "pf": 1.6,
+            "total_pts": 30.0,
+            "point_value": 20.0,
+            "pnl": 600.0,
+            "share": 10.7,
+        }
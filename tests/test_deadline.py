@@ -0,0 +1,110 @@
+"""Tests for cooperative deadlines and cancellation."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from barb import interpreter
+from barb.backtest.engine import run_backtest
+from barb.backtest.strategy import Strategy
+from barb.deadline import check, deadline
+from barb.interpreter import execute
+from barb.ops import BarbError
+
+
+class TestCheck:
+    def test_noop_without_deadline(self):
+        check("anything")
+
+    def test_timeout(self):
+        with deadline(0):
+            with pytest.raises(BarbError) as exc:
+                check("map")
+        assert exc.value.error_type == "TimeoutError"
+        assert exc.value.step == "map"
+        assert "0s time limit" in str(exc.value)
+
+    def test_within_limit(self):
+        with deadline(60):
+            check("map")
+
+    def test_cancelled(self):
+        cancel = threading.Event()
+        with deadline(None, cancel):
+            check("where")
+            cancel.set()
+            with pytest.raises(BarbError) as exc:
+                check("where")
+        assert exc.value.error_type == "CancelledError"
+
+    def test_nested_only_tightens(self):
+        with deadline(0):
+            with deadline(60):
+                with pytest.raises(BarbError):
+                    check()
+
+    def test_nested_keeps_outer_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        with deadline(None, cancel):
+            with deadline(60):
+                with pytest.raises(BarbError) as exc:
+                    check()
+        assert exc.value.error_type == "CancelledError"
+
+    def test_reset_after_block(self):
+        with deadline(0):
+            pass
+        time.sleep(0.001)
+        check()
+
+
+class TestExecuteDeadline:
+    def test_timeout_carries_partial_profile(self, nq_daily, sessions):
+        with deadline(0), pytest.raises(BarbError) as exc:
+            execute({"from": "daily", "select": "count()"}, nq_daily, sessions)
+        assert exc.value.error_type == "TimeoutError"
+        assert exc.value.step == "validate"
+        # Nothing ran: the first checkpoint already failed
+        assert exc.value.profile["stages"] == []
+        assert "peak_kb" not in exc.value.profile
+
+    def test_cancel_between_stages(self, nq_minute_slice, sessions, monkeypatch):
+        """Cancellation during resample stops execution at the next stage."""
+        cancel = threading.Event()
+        real_resample = interpreter.resample
+
+        def resample_then_cancel(df, timeframe):
+            cancel.set()
+            return real_resample(df, timeframe)
+
+        monkeypatch.setattr(interpreter, "resample", resample_then_cancel)
+        query = {"session": "RTH", "from": "1h", "period": "2024-02", "map": {"r": "range()"}}
+        with deadline(60, cancel), pytest.raises(BarbError) as exc:
+            execute(query, nq_minute_slice, sessions)
+        assert exc.value.error_type == "CancelledError"
+        assert exc.value.step == "session_id"
+        names = [s["name"] for s in exc.value.profile["stages"]]
+        assert names == ["validate", "session", "period", "from"]
+
+    def test_result_without_profile_under_deadline(self, nq_daily, sessions):
+        with deadline(60):
+            result = execute({"from": "daily", "limit": 3}, nq_daily, sessions)
+        assert "profile" not in result["metadata"]
+
+
+class TestBacktestDeadline:
+    def test_cancelled_simulation(self):
+        dates = pd.date_range("2024-01-02", periods=10, freq="D")
+        df = pd.DataFrame(
+            {"open": 100.0, "high": 101.0, "low": 99.0, "close": 100.5, "volume": 1000.0},
+            index=dates,
+        )
+        cancel = threading.Event()
+        cancel.set()
+        strategy = Strategy(entry="close > 100", direction="long", exit_bars=1)
+        with deadline(None, cancel), pytest.raises(BarbError) as exc:
+            run_backtest(df, strategy)
+        assert exc.value.error_type == "CancelledError"
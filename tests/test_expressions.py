@@ -233,3 +233,8 @@ class TestDateComparison:
             "date() in [date('2024-03-01'), date('2024-03-05')]", df_with_dates, date_functions
         )
         assert list(result) == [True, False, False, False, True]
+
+    def test_date_in_list_with_unparseable_string(self, df_with_dates, date_functions):
+        """Strings that aren't dates are left as-is and simply don't match."""
+        result = evaluate("date() in ['2024-03-02', 'bogus']", df_with_dates, date_functions)
+        assert list(result) == [False, True, False, False, False]
@@ -0,0 +1,68 @@
+"""Tests for grouped aggregation over factorized keys."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from barb.grouping import Groups
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(7)
+    n = 500
+    frame = pd.DataFrame(
+        {
+            "label": rng.choice(["b", "a", "c"], n).astype(object),
+            "day": rng.integers(0, 5, n),
+            "x": rng.normal(size=n),
+            "y": rng.normal(size=n),
+        }
+    )
+    frame.loc[::17, "x"] = np.nan
+    return frame
+
+
+class TestGroups:
+    @pytest.mark.parametrize("how", ["sum", "mean", "min", "max", "std", "median"])
+    def test_matches_pandas(self, df, how):
+        expected = df.groupby("label")["x"].agg(how)
+        result = Groups(df, ["label"]).reduce(how, df["x"])
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_multi_key_index(self, df):
+        expected = df.groupby(["label", "day"])["x"].mean()
+        result = Groups(df, ["label", "day"]).reduce("mean", df["x"])
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_missing_keys_dropped(self, df):
+        df = df.assign(label=df["label"].where(df.index % 5 != 0))
+        groups = Groups(df, ["label"])
+        expected = df.groupby("label").size()
+        assert groups.reduce("count").tolist() == expected.tolist()
+        assert list(groups.index) == ["a", "b", "c"]
+
+    def test_count_condition(self, df):
+        result = Groups(df, ["day"]).reduce("count", df["x"] > 0)
+        assert result.tolist() == (df["x"] > 0).groupby(df["day"]).sum().tolist()
+
+    def test_quantile(self, df):
+        expected = df.groupby("label")["x"].quantile(0.9)
+        result = Groups(df, ["label"]).reduce("quantile", df["x"], param=0.9)
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_last_keeps_missing(self, df):
+        result = Groups(df, ["day"]).reduce("last", df["x"])
+        expected = df.groupby("day")["x"].apply(lambda s: s.iloc[-1])
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_corr(self, df):
+        result = Groups(df, ["label"]).reduce("corr", df["x"], df["y"])
+        expected = df.groupby("label").apply(lambda g: g["x"].corr(g["y"]), include_groups=False)
+        np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+    def test_corr_constant_is_nan(self):
+        df = pd.DataFrame({"k": [1, 1, 2, 2], "x": [1.0, 1.0, 1.0, 2.0], "y": [3.0, 4.0, 5.0, 7.0]})
+        result = Groups(df, ["k"]).reduce("corr", df["x"], df["y"])
+        assert np.isnan(result.iloc[0])
+        assert result.iloc[1] == pytest.approx(1.0)
@@ -4,10 +4,17 @@ Uses real NQ data (fixed slice 2024-01-01 to 2024-06-30).
 Tests the full pipeline: query → execute → result.
 """
 
+import multiprocessing
+
+import numpy as np
+import pandas as pd
 import pytest
 
-from barb.interpreter import execute
+from barb import interpreter
+from barb.deadline import deadline
+from barb.interpreter import _serialize_table, compute_map, execute, execute_batch, sort_df
 from barb.ops import BarbError
+from barb.results import RESULTS
 from barb.validation import ValidationError
 
 # --- Validation ---
@@ -144,6 +151,57 @@ class TestMap:
         assert result["summary"]["value"] > 0
 
 
+class TestParallelMap:
+    """Independent map columns evaluated on the thread pool match sequential results."""
+
+    _MAP = {
+        "rsi": "rsi(close, 14)",
+        "atr": "atr(14)",
+        "sma": "sma(close, 200)",
+        "macd": "macd(close)",
+        "ratio": "atr / sma",
+        "hot": "rsi > 70 and ratio > 0.001",
+    }
+
+    @pytest.fixture
+    def parallel(self, monkeypatch):
+        monkeypatch.setattr(interpreter, "MAP_WORKERS", 4)
+        monkeypatch.setattr(interpreter, "_PARALLEL_MIN_ROWS", 0)
+        monkeypatch.setattr(interpreter, "_MAP_POOL", None)
+
+    def test_same_frame(self, nq_minute_slice, parallel):
+        df = nq_minute_slice.iloc[:5000]
+        parallel_df = compute_map(df, self._MAP)
+        sequential_df = interpreter._compute_map_sequential(df, self._MAP)
+        pd.testing.assert_frame_equal(parallel_df, sequential_df)
+        assert list(parallel_df.columns[-6:]) == list(self._MAP)
+
+    def test_error_reported_like_sequential(self, nq_minute_slice, parallel):
+        bad = {"a": "sma(close, 5)", "b": "nope + 1", "c": "missing * 2"}
+        with pytest.raises(BarbError) as exc:
+            compute_map(nq_minute_slice.iloc[:1000], bad)
+        assert exc.value.expression == "nope + 1"
+        assert exc.value.step == "map"
+
+    def test_deadline_checked_in_pool_threads(self, nq_minute_slice, parallel, monkeypatch):
+        def no_fallback(*args):
+            raise AssertionError("timeout must not fall back to sequential")
+
+        monkeypatch.setattr(interpreter, "_compute_map_sequential", no_fallback)
+        with deadline(0), pytest.raises(BarbError) as exc:
+            compute_map(nq_minute_slice.iloc[:1000], self._MAP)
+        assert exc.value.error_type == "TimeoutError"
+
+    def test_forked_child_gets_own_pool(self, nq_minute_slice, parallel, monkeypatch):
+        # Fewer threads than columns: every thread of the parent's pool gets started
+        monkeypatch.setattr(interpreter, "MAP_WORKERS", 2)
+        df = nq_minute_slice.iloc[:1000]
+        expected = compute_map(df, self._MAP)  # the pool now exists in this process
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            result = pool.apply_async(compute_map, (df, self._MAP)).get(timeout=30)
+        pd.testing.assert_frame_equal(result, expected)
+
+
 # --- Where ---
 
 
@@ -290,6 +348,71 @@ class TestGroupBy:
         for row in result["table"]:
             assert row["count"] > 15
 
+    def test_full_aggregate_set(self, nq_daily, sessions):
+        """Expression arguments and every aggregate work per group."""
+        result = execute(
+            {
+                "from": "daily",
+                "period": "2024",
+                "map": {"weekday": "dayofweek()"},
+                "group_by": "weekday",
+                "select": (
+                    "count(green()), pct(close > open), mean(high - low), "
+                    "percentile(volume, 0.9), correlation(open, close), last(close)"
+                ),
+            },
+            nq_daily,
+            sessions,
+        )
+        df = nq_daily.loc["2024"]
+        by_day = df.groupby(df.index.dayofweek)
+        friday = next(r for r in result["table"] if r["weekday"] == "Friday")
+        fri = df[df.index.dayofweek == 4]
+        assert friday["count(green())"] == int((fri["close"] > fri["open"]).sum())
+        assert friday["pct(close > open)"] == pytest.approx(
+            (fri["close"] > fri["open"]).mean(), abs=1e-4
+        )
+        assert friday["mean(high - low)"] == pytest.approx(
+            (fri["high"] - fri["low"]).mean(), abs=1e-4
+        )
+        assert friday["percentile(volume, 0.9)"] == pytest.approx(
+            fri["volume"].quantile(0.9), abs=1e-4
+        )
+        assert friday["correlation_open"] == pytest.approx(fri["open"].corr(fri["close"]), abs=1e-4)
+        assert friday["last_close"] == fri["close"].iloc[-1]
+        assert len(result["table"]) == by_day.ngroups
+
+    def test_percentile_bad_param(self, nq_daily, sessions):
+        with pytest.raises(BarbError, match="between 0 and 1") as exc_info:
+            execute(
+                {"from": "daily", "group_by": "open", "select": "percentile(close, 90)"},
+                nq_daily,
+                sessions,
+            )
+        assert exc_info.value.step == "select"
+
+    @pytest.mark.parametrize("group_by", [None, "weekday"])
+    def test_count_needs_condition(self, nq_daily, sessions, group_by):
+        query = {"from": "daily", "map": {"weekday": "dayofweek()"}, "select": "count(close)"}
+        if group_by:
+            query["group_by"] = group_by
+        with pytest.raises(BarbError, match="condition") as exc_info:
+            execute(query, nq_daily, sessions)
+        assert exc_info.value.error_type == "ValidationError"
+        assert exc_info.value.step == "select"
+
+    def test_ungrouped_select_with_call_commas(self, nq_daily, sessions):
+        result = execute(
+            {"from": "daily", "period": "2024", "select": "percentile(close, 0.5), count()"},
+            nq_daily,
+            sessions,
+        )
+        values = result["summary"]["values"]
+        assert values["count"] == len(nq_daily.loc["2024"])
+        assert values["percentile(close, 0.5)"] == pytest.approx(
+            nq_daily.loc["2024", "close"].median()
+        )
+
 
 # --- Pct ---
 
@@ -487,6 +610,29 @@ class TestSteps:
 
 
 class TestSortLimit:
+    @pytest.mark.parametrize("ascending", [True, False])
+    @pytest.mark.parametrize("kind", ["int", "float", "datetime"])
+    def test_top_k_matches_full_sort(self, ascending, kind):
+        """Partial selection returns the head of a stable full sort, ties included."""
+        rng = np.random.default_rng(3)
+        values = rng.integers(0, 50, 2000)
+        if kind == "float":
+            values = values.astype(float)
+            values[::13] = np.nan
+        elif kind == "datetime":
+            values = pd.to_datetime(values, unit="D").to_numpy()
+            values[::13] = np.datetime64("NaT")
+        df = pd.DataFrame({"v": values, "row": np.arange(2000)})
+        sort = "v" if ascending else "v desc"
+        for k in (1, 10, 137):
+            expected = df.sort_values("v", ascending=ascending, kind="stable").head(k)
+            pd.testing.assert_frame_equal(sort_df(df, sort, limit=k), expected)
+
+    def test_top_k_missing_values_fill_tail(self):
+        df = pd.DataFrame({"v": [3.0, np.nan, 1.0, np.nan]})
+        result = sort_df(df, "v desc", limit=3)
+        assert result.index.tolist() == [0, 2, 1]
+
     def test_sort_desc(self, nq_minute_slice, sessions):
         result = execute(
             {
@@ -852,6 +998,51 @@ class TestPeriod:
         assert last_n_result["summary"]["value"] == all_result["summary"]["value"]
 
 
+class TestWarmup:
+    def test_period_indicator_matches_full_history(self, nq_daily, sessions):
+        """sma(200) over one month is warmed up on history before the period."""
+        query = {"from": "daily", "map": {"sma": "sma(close, 200)"}, "columns": ["date", "sma"]}
+        full = execute(query, nq_daily, sessions)
+        scoped = execute({**query, "period": "2024-03"}, nq_daily, sessions)
+        by_date = {r["date"]: r["sma"] for r in full["table"]}
+        assert scoped["table"]
+        for row in scoped["table"]:
+            assert row["date"].startswith("2024-03")
+            assert row["sma"] == by_date[row["date"]]
+
+    def test_where_evaluated_with_warmup(self, nq_daily, sessions):
+        """where on an indicator sees warmed-up values, rows stay in period."""
+        query = {"from": "daily", "where": "close > sma(close, 50)", "columns": ["date"]}
+        full = execute(query, nq_daily, sessions)
+        scoped = execute({**query, "period": "2024-03"}, nq_daily, sessions)
+        expected = [r["date"] for r in full["table"] if r["date"].startswith("2024-03")]
+        assert [r["date"] for r in scoped["table"]] == expected
+
+    def test_cumulative_keeps_period_scope(self, nq_daily, sessions):
+        """cumsum is path-dependent: no warm-up, accumulates from period start."""
+        result = execute(
+            {"from": "daily", "period": "2024-03", "map": {"c": "cumsum(volume)"}, "limit": 1},
+            nq_daily,
+            sessions,
+        )
+        row = result["table"][0]
+        assert row["c"] == row["volume"]
+
+    def test_steps_first_step_warmed_up(self, nq_daily, sessions):
+        flat = execute(
+            {"from": "daily", "period": "2024", "map": {"rsi": "rsi(close, 14)"}},
+            nq_daily,
+            sessions,
+        )
+        steps = execute(
+            {"steps": [{"from": "daily", "period": "2024", "map": {"rsi": "rsi(close, 14)"}}]},
+            nq_daily,
+            sessions,
+        )
+        assert flat["table"][0]["rsi"] is not None
+        assert steps["table"][0]["rsi"] == flat["table"][0]["rsi"]
+
+
 # --- Response Format ---
 
 
@@ -915,6 +1106,31 @@ class TestResponse:
             )
         assert exc_info.value.step == "map"
 
+    def test_table_summary_matches_table(self, nq_minute_slice, sessions):
+        query = {"from": "1h", "period": "2024-01", "map": {"r": "high - low"}, "sort": "r"}
+        result = execute(query, nq_minute_slice, sessions)
+        table, summary = result["table"], result["summary"]
+        values = [row["r"] for row in table]
+        assert summary["stats"]["r"]["min"] == min(values)
+        assert summary["stats"]["r"]["max"] == max(values)
+        assert summary["stats"]["r"]["mean"] == pytest.approx(sum(values) / len(values), abs=0.01)
+        assert summary["first"] == {k: table[0][k] for k in ("date", "time", "r")}
+        assert summary["last"] == {k: table[-1][k] for k in ("date", "time", "r")}
+
+    def test_grouped_min_max_rows(self, nq_minute_slice, sessions):
+        query = {
+            "from": "daily",
+            "period": "2024",
+            "map": {"weekday": "dayofweek()", "body": "close - open"},
+            "group_by": "weekday",
+            "select": "mean(body)",
+        }
+        result = execute(query, nq_minute_slice, sessions)
+        table, summary = result["table"], result["summary"]
+        agg = next(c for c in table[0] if c != "weekday")
+        assert summary["min_row"] == min(table, key=lambda r: r[agg])
+        assert summary["max_row"] == max(table, key=lambda r: r[agg])
+
 
 # --- Full Examples from Spec ---
 
@@ -1059,6 +1275,136 @@ class TestSourceRows:
         assert "close" in row
         assert "range" in row
 
+    def test_source_rows_sampled(self, nq_minute_slice, sessions):
+        """Large evidence sets ship a bounded sample plus a cursor to the rest."""
+        result = execute(
+            {"from": "1h", "period": "2024-01", "select": "count()"},
+            nq_minute_slice,
+            sessions,
+            page_size=20,
+        )
+        assert len(result["source_rows"]) == 20
+        assert result["source_row_count"] == result["summary"]["value"] > 20
+        page = RESULTS.page(result["source_cursor"], offset=0, limit=20)
+        assert page["total_rows"] == result["source_row_count"]
+        assert page["rows"] == result["source_rows"]
+
+    def test_small_evidence_has_no_cursor(self, nq_minute_slice, sessions):
+        result = execute(
+            {"from": "daily", "period": "2024-01", "select": "count()"},
+            nq_minute_slice,
+            sessions,
+        )
+        assert result["source_cursor"] is None
+        assert len(result["source_rows"]) == result["source_row_count"]
+
+
+class TestPagination:
+    def test_first_page_and_cursor(self, nq_minute_slice, sessions):
+        result = execute(
+            {"from": "1h", "period": "2024-01"}, nq_minute_slice, sessions, page_size=50
+        )
+        assert len(result["table"]) == 50
+        assert result["total_rows"] == result["summary"]["rows"] > 50
+        page = RESULTS.page(result["cursor"], offset=50, limit=10)
+        assert page["total_rows"] == result["total_rows"]
+        assert list(page["rows"][0]) == list(result["table"][0])
+
+    def test_short_table_not_paginated(self, nq_daily, sessions):
+        result = execute({"from": "daily", "limit": 10}, nq_daily, sessions, page_size=50)
+        assert result["cursor"] is None
+        assert len(result["table"]) == result["total_rows"] == 10
+
+    def test_summary_covers_all_rows(self, nq_minute_slice, sessions):
+        query = {"from": "1h", "period": "2024-01", "map": {"r": "high - low"}}
+        full = execute(query, nq_minute_slice, sessions)
+        paged = execute(query, nq_minute_slice, sessions, page_size=10)
+        assert paged["summary"] == full["summary"]
+
+
+class TestBatch:
+    _QUERIES = [
+        {"session": "RTH", "from": "1h", "period": "2024-02", "select": "count()"},
+        {
+            "session": "RTH",
+            "from": "1h",
+            "period": "2024-02",
+            "map": {"r": "range()"},
+            "select": "mean(r)",
+        },
+        {
+            "session": "RTH",
+            "from": "1h",
+            "period": "2024-02",
+            "map": {"r": "range()"},
+            "where": "r > 20",
+            "columns": ["date", "time", "r"],
+        },
+        {
+            "session": "ETH",
+            "from": "1h",
+            "period": "2024-02",
+            "map": {"h": "hour()"},
+            "group_by": "h",
+            "select": "count()",
+        },
+        {"steps": [{"from": "daily", "period": "2024"}, {"select": "count()"}]},
+    ]
+
+    def test_same_as_execute(self, nq_minute_slice, sessions):
+        batch = execute_batch(self._QUERIES, nq_minute_slice, sessions)
+        for query, result in zip(self._QUERIES, batch["results"], strict=True):
+            single = execute(query, nq_minute_slice, sessions)
+            assert result["summary"] == single["summary"]
+            assert result["table"] == single["table"]
+            assert result["source_rows"] == single["source_rows"]
+
+    def test_shares_scope_and_map(self, nq_minute_slice, sessions):
+        timings = execute_batch(self._QUERIES, nq_minute_slice, sessions)["timings"]
+        assert timings["queries"] == 5
+        assert timings["scopes"] == 2  # RTH and ETH over the same period/from
+        assert timings["maps"] == 2  # {r: range()} computed once for two queries
+
+    def test_error_isolated(self, nq_daily, sessions):
+        queries = [{"from": "daily", "select": "count()"}, {"from": "daily", "where": "nope > 1"}]
+        results = execute_batch(queries, nq_daily, sessions)["results"]
+        assert results[0]["summary"]["type"] == "scalar"
+        assert results[1]["error"]["step"] == "where"
+        assert "nope" in results[1]["error"]["message"]
+
+    def test_shared_warnings_reach_each_query(self, nq_minute_slice, sessions):
+        queries = [{"session": "NOPE", "from": "1h", "period": "2024-02", "limit": 1}] * 2
+        results = execute_batch(queries, nq_minute_slice, sessions)["results"]
+        for result in results:
+            assert result["metadata"]["warnings"] == ["Unknown session 'NOPE', using all data"]
+
+    def test_summary_only_parks_nothing(self, nq_minute_slice, sessions):
+        """page_size=0 keeps summaries but serializes and parks no rows."""
+        full = execute_batch(self._QUERIES, nq_minute_slice, sessions, page_size=10)
+        RESULTS.clear()
+        batch = execute_batch(self._QUERIES, nq_minute_slice, sessions, page_size=0)
+        assert len(RESULTS) == 0
+        for result, expected in zip(batch["results"], full["results"], strict=True):
+            assert result["summary"] == expected["summary"]
+            assert result["source_row_count"] == expected["source_row_count"]
+            assert not result["source_rows"] and not result.get("table")
+            assert result.get("cursor") is None and result["source_cursor"] is None
+
+    def test_batch_tool_parks_nothing(self, nq_minute_slice, sessions):
+        from assistant.tools import run_query_batch
+
+        # Minute rows: more evidence and table rows than any page
+        queries = [
+            *self._QUERIES,
+            {"from": "1m", "period": "2024-02", "select": "count()"},
+            {"from": "1m", "period": "2024-02"},
+        ]
+        items = [{"label": str(i), "query": q} for i, q in enumerate(queries)]
+        RESULTS.clear()
+        result = run_query_batch(items, lambda query: nq_minute_slice, sessions)
+        assert len(RESULTS) == 0
+        assert all(r["error"] is None for r in result["results"])
+
 
 class TestSerialization:
     def test_date_function_serialized_to_string(self, nq_daily, sessions):
@@ -1109,3 +1455,59 @@ class TestSerialization:
         )
         keys = list(result["table"][0].keys())
         assert keys[0] == "dow"
+
+    def test_hour_display_format(self, nq_minute_slice, sessions):
+        result = execute(
+            {"from": "1h", "period": "2024-01-02", "map": {"h": "hour()"}, "limit": 3},
+            nq_minute_slice,
+            sessions,
+        )
+        for row in result["table"]:
+            h = int(row["time"][:2])
+            assert row["h"] == f"{h:02d}:00-{h:02d}:59"
+
+    def test_time_column_format(self, nq_minute_slice, sessions):
+        result = execute(
+            {"from": "15m", "period": "2024-01-02", "limit": 5},
+            nq_minute_slice,
+            sessions,
+        )
+        for row in result["table"]:
+            assert len(row["time"]) == 5 and row["time"][2] == ":"
+            assert row["date"] == "2024-01-02"
+
+
+class TestSerializeTable:
+    """Column-wise serializer: same values as per-cell conversion."""
+
+    def test_precision_rules(self):
+        df = pd.DataFrame({"close": [1.123456789], "ratio": [1.123456789]})
+        row = _serialize_table(df)[0]
+        assert row["close"] == 1.123456789
+        assert row["ratio"] == 1.1235
+
+    def test_nan_and_nat_become_none(self):
+        df = pd.DataFrame(
+            {
+                "x": [1.5, np.nan],
+                "ts": pd.to_datetime(["2024-01-02 09:30", None]),
+                "label": ["a", None],
+            }
+        )
+        rows = _serialize_table(df)
+        assert rows[0] == {"x": 1.5, "ts": "2024-01-02T09:30:00", "label": "a"}
+        assert rows[1] == {"x": None, "ts": None, "label": None}
+
+    def test_python_types(self):
+        df = pd.DataFrame({"n": np.array([3], dtype=np.int64), "flag": [True], "v": [2.0]})
+        row = _serialize_table(df)[0]
+        assert type(row["n"]) is int
+        assert type(row["flag"]) is bool
+        assert type(row["v"]) is float
+
+    def test_object_column_mixed_values(self):
+        df = pd.DataFrame({"m": [np.float64(0.123456), "text", np.int64(2)]})
+        assert [r["m"] for r in _serialize_table(df)] == [0.1235, "text", 2]
+
+    def test_empty(self):
+        assert _serialize_table(pd.DataFrame({"a": []})) == []
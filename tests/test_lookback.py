@@ -0,0 +1,83 @@
+"""Tests for static lookback analysis and warm-up history."""
+
+import pandas as pd
+
+from barb.functions import FUNCTIONS
+from barb.lookback import _LOOKBACKS, _UNBOUNDED, required_lookback
+from barb.ops import warmup_bars
+
+
+class TestRequiredLookback:
+    def test_no_expressions(self):
+        assert required_lookback(None) == 0
+
+    def test_row_local(self):
+        assert required_lookback({"r": "high - low", "dow": "dayofweek()"}) == 0
+
+    def test_window(self):
+        assert required_lookback({"s": "sma(close, 200)"}) == 200
+
+    def test_default_argument(self):
+        assert required_lookback({"v": "volume_sma()"}) == 20
+
+    def test_nested_adds_up(self):
+        assert required_lookback({"x": "sma(prev(close, 5), 20)"}) == 25
+
+    def test_map_column_reference(self):
+        lookback = required_lookback({"s": "sma(close, 20)", "x": "prev(s, 3)"})
+        assert lookback == 23
+
+    def test_where_uses_map_columns(self):
+        assert required_lookback({"s": "sma(close, 50)"}, "prev(s) > s") == 51
+
+    def test_where_alone(self):
+        assert required_lookback(None, "close > rolling_max(high, 20)") == 20
+
+    def test_recursive_smoother_gets_extra_history(self):
+        assert required_lookback({"e": "ema(close, 20)"}) > 20
+        assert required_lookback({"r": "rsi(close, 14)"}) > 14
+
+    def test_if_keyword(self):
+        assert required_lookback({"x": "if(close > sma(close, 10), 1, 0)"}) == 10
+
+    def test_cumulative_is_unbounded(self):
+        assert required_lookback({"s": "sma(close, 20)", "c": "cumsum(volume)"}) is None
+
+    def test_non_constant_window_is_unbounded(self):
+        assert required_lookback({"n": "5", "s": "sma(close, n)"}) is None
+
+    def test_every_function_classified(self):
+        unclassified = set(FUNCTIONS) - set(_LOOKBACKS) - _UNBOUNDED
+        assert not unclassified, f"Functions without lookback: {unclassified}"
+
+
+class TestWarmupBars:
+    def _minutes(self, start, periods):
+        index = pd.date_range(start, periods=periods, freq="h")
+        return pd.DataFrame(
+            {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10},
+            index=index,
+        )
+
+    def test_returns_requested_bars(self):
+        df = self._minutes("2024-01-01", 24 * 60)
+        history = warmup_bars(df, pd.Timestamp("2024-02-01"), "daily", 10)
+        assert len(history) == 10
+        assert history.index[-1] == pd.Timestamp("2024-01-31")
+
+    def test_truncated_at_start_of_data(self):
+        df = self._minutes("2024-01-01", 24 * 60)
+        history = warmup_bars(df, pd.Timestamp("2024-01-05"), "daily", 100)
+        assert len(history) == 4
+
+    def test_no_history(self):
+        df = self._minutes("2024-01-01", 48)
+        assert warmup_bars(df, df.index[0], "daily", 10).empty
+
+    def test_partial_bar_not_merged(self):
+        """Weekly bar straddling the start: pre-period minutes stay out of it."""
+        df = self._minutes("2024-01-01", 24 * 60)
+        start = pd.Timestamp("2024-02-01")  # Thursday
+        history = warmup_bars(df, start, "weekly", 3)
+        assert (history.index < start).all()
+        assert len(history) == 3
@@ -0,0 +1,248 @@
+"""Tests for the multi-step plan optimizer (barb/planner.py)."""
+
+import pytest
+
+from barb.expressions import ExpressionError, resolve
+from barb.functions import FUNCTIONS
+from barb.interpreter import BarbError, execute
+from barb.planner import (
+    CheckOp,
+    GroupOp,
+    MapOp,
+    TrimOp,
+    WhereOp,
+    _flatten,
+    map_levels,
+    plan_steps,
+)
+
+
+class TestPrune:
+    def test_unused_before_group_by_dropped(self):
+        plan = plan_steps(
+            {
+                "steps": [
+                    {
+                        "from": "1h",
+                        "map": {"rsi": "rsi(close, 14)", "hr": "hour()", "r": "high - low"},
+                        "group_by": "hr",
+                        "select": "mean(r)",
+                    },
+                    {"select": "max(mean_r)"},
+                ]
+            }
+        )
+        assert plan[0] == CheckOp({"rsi": "rsi(close, 14)"})
+        assert plan[1] == MapOp({"hr": "hour()", "r": "high - low"})
+
+    def test_transitive_dependency_kept(self):
+        plan = plan_steps(
+            {
+                "steps": [
+                    {"map": {"a": "sma(close, 20)", "b": "a * 2", "c": "ema(close, 50)"}},
+                    {"where": "b > 0", "group_by": "x", "select": "count()"},
+                    {"select": "sum(count)"},
+                ]
+            }
+        )
+        assert plan[0] == MapOp({"a": "sma(close, 20)", "b": "a * 2"})
+        assert CheckOp({"c": "ema(close, 50)"}) in plan
+
+    def test_final_segment_kept_without_projection(self):
+        """Columns feeding the output (table or source_rows) are never pruned."""
+        query = {"steps": [{"map": {"unused": "ema(close, 50)"}}, {"select": "count()"}]}
+        assert plan_steps(query)[0] == MapOp({"unused": "ema(close, 50)"})
+
+    def test_final_segment_pruned_with_columns(self):
+        query = {
+            "columns": ["date", "r"],
+            "steps": [{"map": {"unused": "ema(close, 50)", "r": "high - low"}}, {"limit": 5}],
+        }
+        plan = plan_steps(query)
+        assert plan[:2] == [CheckOp({"unused": "ema(close, 50)"}), MapOp({"r": "high - low"})]
+
+    def test_ohlcv_overwrite_kept(self):
+        query = {
+            "steps": [
+                {"map": {"close": "close * 2"}, "group_by": "x", "select": "count()"},
+                {"select": "count()"},
+            ]
+        }
+        assert plan_steps(query)[0] == MapOp({"close": "close * 2"})
+
+
+def _error(e: BarbError) -> tuple:
+    return str(e), e.error_type, e.step, e.expression
+
+
+class TestPrunedErrors:
+    """A pruned column fails the same way it would if it were computed."""
+
+    @pytest.mark.parametrize(
+        "expr",
+        ["nope + 1", "bogus(close)", "close +", "close if open else high", 5],
+    )
+    def test_same_error_as_unoptimized(self, expr, nq_minute_slice, sessions, monkeypatch):
+        query = {
+            "columns": ["date", "r"],
+            "steps": [
+                {"from": "daily", "map": {"bad": expr, "r": "high - low"}},
+                {"limit": 5},
+            ],
+        }
+        with pytest.raises(BarbError) as optimized:
+            execute(query, nq_minute_slice, sessions)
+        monkeypatch.setattr("barb.interpreter.plan_steps", lambda q: _flatten(q["steps"]))
+        with pytest.raises(BarbError) as written:
+            execute(query, nq_minute_slice, sessions)
+        assert _error(optimized.value) == _error(written.value)
+
+    def test_earlier_columns_resolve(self):
+        resolve("a * 2 + sma(close, 5)", ["close", "a"], FUNCTIONS)
+        with pytest.raises(ExpressionError, match="Unknown column 'b'"):
+            resolve("b * 2", ["close", "a"], FUNCTIONS)
+
+
+class TestPushDown:
+    def test_row_local_where_before_row_local_maps(self):
+        plan = plan_steps(
+            {
+                "steps": [
+                    {"map": {"hr": "hour()", "r": "high - low", "r2": "r * 2"}},
+                    {"where": "hr < 19"},
+                ]
+            }
+        )
+        assert plan == [
+            MapOp({"hr": "hour()"}),
+            WhereOp(["hr < 19"]),
+            MapOp({"r": "high - low", "r2": "r * 2"}),
+            TrimOp(),
+        ]
+
+    def test_stops_at_window_function(self):
+        plan = plan_steps(
+            {"steps": [{"map": {"hr": "hour()", "s": "sma(close, 200)"}}, {"where": "hr < 19"}]}
+        )
+        assert plan == [
+            MapOp({"hr": "hour()", "s": "sma(close, 200)"}),
+            WhereOp(["hr < 19"]),
+            TrimOp(),
+        ]
+
+    def test_window_predicate_not_moved(self):
+        plan = plan_steps(
+            {"steps": [{"map": {"r": "high - low"}}, {"where": "rsi(close, 14) > 70"}]}
+        )
+        assert plan == [MapOp({"r": "high - low"}), TrimOp(), WhereOp(["rsi(close, 14) > 70"])]
+
+    def test_not_moved_across_group_by(self):
+        plan = plan_steps(
+            {
+                "steps": [
+                    {"map": {"d": "date()"}, "group_by": "d", "select": "count()"},
+                    {"map": {"big": "count > 10"}, "where": "count > 5"},
+                ]
+            }
+        )
+        assert isinstance(plan[2], GroupOp)
+        assert plan[3:] == [WhereOp(["count > 5"]), MapOp({"big": "count > 10"})]
+
+
+class TestFuse:
+    def test_consecutive_steps_share_one_map(self):
+        plan = plan_steps(
+            {"steps": [{"from": "1h"}, {"map": {"a": "sma(close, 5)"}}, {"map": {"b": "a + 1"}}]}
+        )
+        assert plan == [TrimOp(), MapOp({"a": "sma(close, 5)", "b": "a + 1"})]
+
+    def test_redefinition_splits_map(self):
+        plan = plan_steps(
+            {"steps": [{"map": {"a": "sma(close, 5)"}, "where": "a > 0"}, {"map": {"a": "a + 1"}}]}
+        )
+        assert [op for op in plan if isinstance(op, MapOp)] == [
+            MapOp({"a": "sma(close, 5)"}),
+            MapOp({"a": "a + 1"}),
+        ]
+
+    def test_row_local_filters_fused(self):
+        plan = plan_steps({"steps": [{"where": "rsi(close, 14) > 70"}, {"where": "close > open"}]})
+        assert plan == [WhereOp(["rsi(close, 14) > 70", "close > open"]), TrimOp()]
+
+    def test_window_filter_not_fused(self):
+        plan = plan_steps({"steps": [{"where": "close > open"}, {"where": "rsi(close, 14) > 70"}]})
+        assert plan == [WhereOp(["close > open"]), TrimOp(), WhereOp(["rsi(close, 14) > 70"])]
+
+
+class TestUnparseable:
+    def test_no_rewrites(self):
+        plan = plan_steps({"steps": [{"map": {"a": "high -"}}, {"where": "close > open"}]})
+        assert plan == [MapOp({"a": "high -"}), TrimOp(), WhereOp(["close > open"])]
+
+
+class TestMapLevels:
+    def test_independent_columns_share_level(self):
+        levels = map_levels(
+            {"rsi": "rsi(close, 14)", "atr": "atr(14)", "sma": "sma(close, 200)", "r": "atr / sma"},
+            ["open", "high", "low", "close", "volume"],
+        )
+        assert levels == [["rsi", "atr", "sma"], ["r"]]
+
+    def test_chain_is_sequential(self):
+        assert map_levels({"a": "high - low", "b": "a * 2"}, ["high", "low"]) is None
+
+    def test_shadowing_is_sequential(self):
+        assert map_levels({"close": "close * 2", "a": "high"}, ["close", "high"]) is None
+
+    def test_forward_reference_is_sequential(self):
+        assert map_levels({"a": "b + 1", "b": "high", "c": "low"}, ["high", "low"]) is None
+
+    def test_unparseable_is_sequential(self):
+        assert map_levels({"a": "high -", "b": "low"}, ["high", "low"]) is None
+
+
+_QUERIES = [
+    {
+        "steps": [
+            {
+                "session": "RTH",
+                "from": "1h",
+                "period": "2024-03",
+                "map": {"hr": "hour()", "r": "high - low", "rsi": "rsi(close, 14)"},
+            },
+            {"where": "hr < 15 and r > 0", "group_by": "hr", "select": "mean(r)"},
+            {"sort": "mean_r desc"},
+        ]
+    },
+    {
+        "columns": ["date", "time", "body_pts"],
+        "steps": [
+            {
+                "from": "15m",
+                "period": "2024-02",
+                "map": {"atr": "atr(14)", "body_pts": "abs(close - open)", "hr": "hour()"},
+            },
+            {"map": {"wide": "body_pts > atr"}, "where": "hr >= 10 and hr < 12"},
+            {"where": "wide", "limit": 20},
+        ],
+    },
+    {
+        "steps": [
+            {"from": "daily", "period": "2024", "map": {"g": "gap()", "d": "dayofweek()"}},
+            {"where": "d != 2", "select": "count(), mean(g)"},
+        ]
+    },
+]
+
+
+class TestSameResults:
+    """Optimized plans produce exactly what the written order produces."""
+
+    @pytest.mark.parametrize("query", _QUERIES)
+    def test_matches_unoptimized(self, query, nq_minute_slice, sessions, monkeypatch):
+        optimized = execute(query, nq_minute_slice, sessions)
+        monkeypatch.setattr("barb.interpreter.plan_steps", lambda q: _flatten(q["steps"]))
+        written = execute(query, nq_minute_slice, sessions)
+        assert optimized["summary"] == written["summary"]
+        assert optimized["table"] == written["table"]
+        assert optimized["source_rows"] == written["source_rows"]
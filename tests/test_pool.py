@@ -0,0 +1,124 @@
+"""Tests for the pre-forked tool pool."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from assistant import pool as pool_module
+from assistant.pool import ToolPool
+from assistant.tools import run_query
+from barb.deadline import check, deadline
+from barb.ops import BarbError
+from barb.results import RESULTS
+
+
+def _spin(data, seconds):
+    """Busy task: stops only at a deadline checkpoint."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        check("spin")
+        time.sleep(0.01)
+    return {"done": True}
+
+
+def _fail(data):
+    raise BarbError("Unknown column 'x'", error_type="ValidationError", step="where")
+
+
+def _hang(data, seconds):
+    """Stuck task: never reaches a checkpoint."""
+    time.sleep(seconds)
+    return {"done": True}
+
+
+def _die(data):
+    os._exit(1)
+
+
+_TEST_TASKS = {"spin": _spin, "fail": _fail, "hang": _hang, "die": _die}
+
+
+@pytest.fixture(scope="module")
+def tool_pool(nq_daily, nq_minute_slice, sessions):
+    pool_module._TASKS.update(_TEST_TASKS)
+    pool = ToolPool({"NQ": (nq_daily, nq_minute_slice, sessions)}, workers=1)
+    yield pool
+    pool.shutdown()
+    for name in _TEST_TASKS:
+        del pool_module._TASKS[name]
+
+
+class TestToolPool:
+    def test_matches_local(self, tool_pool, nq_daily, sessions):
+        query = {"from": "daily", "period": "2024", "select": "count()"}
+        result = tool_pool.call("run_query", "NQ", query, None, False)
+        assert result == run_query(query, nq_daily, sessions)
+
+    def test_contains(self, tool_pool):
+        assert "nq" in tool_pool
+        assert "ES" not in tool_pool
+
+    def test_pages_served_by_worker(self, tool_pool):
+        query = {"from": "daily", "period": "2024", "limit": 50}
+        result = tool_pool.call("run_query", "NQ", query, 10, False)
+        cursor = result["cursor"]
+        assert tool_pool.owns(cursor)
+        assert RESULTS.page(cursor) is None
+        page = tool_pool.page(cursor, offset=10, limit=10)
+        assert len(page["rows"]) == 10
+        assert page["total_rows"] == 50
+        with pytest.raises(BarbError):
+            tool_pool.page(cursor, offset=0, limit=10, sort="nope")
+        assert tool_pool.page(cursor[:-1] + "!", offset=0, limit=10) is None
+
+    def test_backtest_reply_is_json(self, tool_pool):
+        strategy = {"entry": "close > open", "direction": "long", "exit_bars": 1}
+        input_data = {"strategy": strategy, "from": "daily", "title": "T"}
+        reply = tool_pool.call("run_backtest", "NQ", input_data, False)
+        assert set(reply) == {"model_response", "card", "profile"}
+        assert reply["card"]["title"].startswith(" · ")
+
+    def test_error_propagates(self, tool_pool):
+        with pytest.raises(BarbError) as exc:
+            tool_pool.call("fail", "NQ")
+        assert exc.value.error_type == "ValidationError"
+        assert exc.value.step == "where"
+
+    def test_deadline_forwarded(self, tool_pool):
+        with deadline(0.2), pytest.raises(BarbError) as exc:
+            tool_pool.call("spin", "NQ", 30)
+        assert exc.value.error_type == "TimeoutError"
+        assert exc.value.step == "spin"
+
+    def test_cancel_stops_worker(self, tool_pool):
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        started = time.monotonic()
+        with deadline(None, cancel), pytest.raises(BarbError) as exc:
+            tool_pool.call("spin", "NQ", 30)
+        assert exc.value.error_type == "CancelledError"
+        assert time.monotonic() - started < 5
+        # The worker is free again
+        assert tool_pool.call("spin", "NQ", 0) == {"done": True}
+
+    def test_stuck_worker_restarted(self, tool_pool, monkeypatch):
+        monkeypatch.setattr(pool_module, "_KILL_GRACE", 0.2)
+        query = {"from": "daily", "period": "2024", "limit": 50}
+        cursor = tool_pool.call("run_query", "NQ", query, 10, False)["cursor"]
+        started = time.monotonic()
+        with deadline(0.2), pytest.raises(BarbError) as exc:
+            tool_pool.call("hang", "NQ", 30)
+        assert exc.value.error_type == "TimeoutError"
+        assert exc.value.step == "pool"
+        assert time.monotonic() - started < 5
+        # A fresh worker took its place; the old one's results are gone
+        assert tool_pool.call("spin", "NQ", 0) == {"done": True}
+        assert tool_pool.page(cursor, offset=0, limit=10) is None
+
+    def test_dead_worker_restarted(self, tool_pool):
+        with pytest.raises(BarbError) as exc:
+            tool_pool.call("die", "NQ")
+        assert exc.value.error_type == "WorkerError"
+        assert tool_pool.call("spin", "NQ", 0) == {"done": True}
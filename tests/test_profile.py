@@ -0,0 +1,134 @@
+"""Tests for the per-stage profiler."""
+
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from barb.backtest.engine import run_backtest
+from barb.backtest.strategy import Strategy
+from barb.interpreter import execute
+from barb.profile import profiling, stage
+
+
+def _names(stages: list[dict]) -> list[str]:
+    return [s["name"] for s in stages]
+
+
+def _find(stages: list[dict], name: str) -> dict:
+    return next(s for s in stages if s["name"] == name)
+
+
+class TestProfiler:
+    def test_disabled_yields_none(self):
+        with profiling(False) as profiler:
+            with stage("noop"):
+                pass
+        assert profiler is None
+
+    def test_nested_stages(self):
+        with profiling() as profiler:
+            with stage("outer"):
+                with stage("inner"):
+                    pass
+        profile = profiler.profile
+        assert _names(profile["stages"]) == ["outer"]
+        assert _names(profile["stages"][0]["children"]) == ["inner"]
+        assert profile["total_ms"] >= profile["stages"][0]["ms"]
+
+    def test_peak_memory_per_stage(self):
+        with profiling() as profiler:
+            with stage("big"):
+                data = np.ones(1_000_000)  # 8 MB
+                del data
+            with stage("small"):
+                pass
+        stages = profiler.profile["stages"]
+        assert _find(stages, "big")["peak_kb"] >= 7800
+        assert _find(stages, "small")["peak_kb"] < 100
+        assert profiler.profile["peak_kb"] >= 7800
+
+    def test_inner_profiling_joins_outer(self):
+        with profiling() as outer:
+            with profiling() as inner:
+                with stage("x"):
+                    pass
+        assert inner is None
+        assert _names(outer.profile["stages"]) == ["x"]
+
+    def test_tracing_stopped_after(self):
+        was_tracing = tracemalloc.is_tracing()
+        with profiling():
+            pass
+        assert tracemalloc.is_tracing() == was_tracing
+
+
+class TestExecuteProfile:
+    def test_off_by_default(self, nq_daily, sessions):
+        result = execute({"from": "daily", "limit": 5}, nq_daily, sessions)
+        assert "profile" not in result["metadata"]
+
+    def test_pipeline_stages(self, nq_minute_slice, sessions):
+        query = {
+            "session": "RTH",
+            "from": "1h",
+            "period": "2024-02",
+            "map": {"r": "range()", "avg": "sma(r, 5)"},
+            "where": "r > 0",
+            "group_by": "r",
+            "select": "count()",
+            "sort": "count desc",
+        }
+        profile = execute(query, nq_minute_slice, sessions, profile=True)["metadata"]["profile"]
+        assert _names(profile["stages"]) == [
+            "validate",
+            "session",
+            "period",
+            "from",
+            "session_id",
+            "map",
+            "where",
+            "group_by",
+            "sort",
+            "serialize",
+        ]
+        columns = _find(profile["stages"], "map")["children"]
+        assert _names(columns) == ["map:r", "map:avg"]
+        assert _names(columns[1]["children"]) == ["fn:sma"]
+
+    def test_profiled_result_unchanged(self, nq_minute_slice, sessions):
+        query = {"from": "1h", "period": "2024-02", "map": {"a": "range()", "b": "body()"}}
+        plain = execute(query, nq_minute_slice, sessions)
+        profiled = execute(query, nq_minute_slice, sessions, profile=True)
+        assert profiled["table"] == plain["table"]
+
+    def test_steps(self, nq_daily, sessions):
+        query = {
+            "steps": [
+                {"from": "daily", "period": "2024", "map": {"d": "dayofweek()"}},
+                {"group_by": "d", "select": "count()"},
+            ]
+        }
+        profile = execute(query, nq_daily, sessions, profile=True)["metadata"]["profile"]
+        assert {"plan", "map", "group_by", "serialize"} <= set(_names(profile["stages"]))
+
+
+class TestBacktestProfile:
+    def test_stages(self):
+        dates = pd.date_range("2024-01-02", periods=10, freq="D")
+        df = pd.DataFrame(
+            {"open": 100.0, "high": 101.0, "low": 99.0, "close": 100.5, "volume": 1000.0},
+            index=dates,
+        )
+        strategy = Strategy(entry="close > 100", direction="long", exit_bars=1)
+        assert "profile" not in run_backtest(df, strategy).metadata
+
+        profile = run_backtest(df, strategy, profile=True).metadata["profile"]
+        assert _names(profile["stages"]) == [
+            "from",
+            "minute_index",
+            "entry",
+            "simulate",
+            "metrics",
+            "robustness",
+        ]
@@ -0,0 +1,110 @@
+"""Tests for the server-side result store (barb/results.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from barb.ops import BarbError
+from barb.results import MAX_PAGE_SIZE, ResultStore
+
+
+@pytest.fixture
+def prepared():
+    return pd.DataFrame(
+        {
+            "date": [f"2024-01-{d:02d}" for d in range(1, 11)],
+            "range": [5.0, 3.0, np.nan, 3.0, 9.0, 1.0, 7.0, 3.0, 2.0, 8.0],
+        }
+    )
+
+
+class TestPage:
+    def test_first_page(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        page = store.page(cursor, limit=3)
+        assert page["total_rows"] == 10
+        assert page["columns"] == ["date", "range"]
+        assert [r["date"] for r in page["rows"]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert page["rows"][2]["range"] is None
+
+    def test_offset_past_end(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        assert store.page(cursor, offset=8, limit=5)["rows"][-1]["date"] == "2024-01-10"
+        assert store.page(cursor, offset=50)["rows"] == []
+
+    def test_limit_capped(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        assert store.page(cursor, limit=10**9)["limit"] == MAX_PAGE_SIZE
+
+    def test_sort_desc(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        page = store.page(cursor, limit=3, sort="range desc")
+        assert [r["range"] for r in page["rows"]] == [9.0, 8.0, 7.0]
+
+    def test_sort_stable_ties_nan_last(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        rows = store.page(cursor, sort="range")["rows"]
+        threes = [r["date"] for r in rows if r["range"] == 3.0]
+        assert threes == ["2024-01-02", "2024-01-04", "2024-01-08"]
+        assert rows[-1]["range"] is None
+
+    def test_sort_unknown_column(self, prepared):
+        store = ResultStore()
+        cursor = store.put(prepared)
+        with pytest.raises(BarbError, match="not found"):
+            store.page(cursor, sort="nope")
+
+
+class TestLifetime:
+    def test_unknown_cursor(self):
+        assert ResultStore().page("missing") is None
+
+    def test_ttl_expiry(self, prepared, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("barb.results.time.monotonic", lambda: now[0])
+        store = ResultStore(ttl=60)
+        cursor = store.put(prepared)
+        now[0] += 59
+        assert store.get(cursor) is not None
+        now[0] += 2
+        assert store.get(cursor) is None
+
+    def test_oldest_evicted(self, prepared):
+        store = ResultStore(max_entries=2)
+        first = store.put(prepared)
+        second = store.put(prepared)
+        third = store.put(prepared)
+        assert store.get(first) is None
+        assert store.get(second) is not None
+        assert store.get(third) is not None
+        assert len(store) == 2
+
+
+class TestLazy:
+    def test_prepared_on_first_fetch(self, prepared):
+        calls = []
+
+        def prepare(df):
+            calls.append(len(df))
+            return df.assign(double=df["range"] * 2)
+
+        store = ResultStore()
+        cursor = store.put(prepared, prepare=prepare)
+        assert calls == []
+        assert store.page(cursor, limit=1)["rows"][0]["double"] == 10.0
+        store.page(cursor, offset=5)
+        assert calls == [10]
+
+    def test_byte_budget_evicts_oldest(self, prepared):
+        nbytes = int(prepared.memory_usage(index=True).sum())
+        store = ResultStore(max_bytes=2 * nbytes)
+        first = store.put(prepared)
+        store.put(prepared)
+        store.put(prepared)
+        assert store.get(first) is None
+        assert len(store) == 2
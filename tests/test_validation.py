@@ -114,6 +114,24 @@ class TestGroupSelectValidation:
             }
         )
 
+    def test_expression_arguments_pass(self):
+        validate_expressions(
+            {
+                "group_by": "weekday",
+                "select": "pct(gap() > 0), percentile(high - low, 0.9), count(green())",
+            }
+        )
+
+    def test_unknown_function_in_argument(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_expressions({"group_by": "weekday", "select": "mean(bogus(close))"})
+        assert "bogus" in exc_info.value.errors[0]["message"]
+
+    def test_not_a_call(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_expressions({"group_by": "weekday", "select": "close"})
+        assert "Cannot parse aggregate" in exc_info.value.errors[0]["message"]
+
     def test_comma_separated_select(self):
         validate_expressions(
             {